@@ -0,0 +1,107 @@
+#!/usr/bin/env python
+# ========================================
+# BENCHMARK - IMPORTACIÓN/EXPORTACIÓN MASIVA DEL CATÁLOGO
+# ========================================
+#
+# Genera un feed sintético de N productos, lo importa dos veces (la primera
+# inserta, la segunda actualiza por sku) y lo exporta, midiendo filas/s.
+# Usa la base de datos configurada del servicio de productos: los productos
+# del benchmark llevan el prefijo de sku BENCH- y se borran al terminar.
+#
+# Uso (con el Python del servicio, por ejemplo dentro del contenedor):
+#   docker compose run --rm -v ./benchmarks:/benchmarks productos-service \
+#       python /benchmarks/bench_catalog.py --rows 200000
+
+import argparse
+import io
+import os
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+SKU_PREFIX = 'BENCH-'
+CATEGORY_SLUG = 'bench-catalog'
+
+
+def setup_django():
+    service_dir = ROOT / 'services' / 'productos'
+    if not service_dir.is_dir():
+        service_dir = Path.cwd()      # Dentro del contenedor el código está en /app
+    sys.path.insert(0, str(service_dir))
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'productos.settings')
+
+    import django
+    django.setup()
+
+
+def synthetic_feed(rows, fmt):
+    """Feed en memoria con la forma de un feed de proveedor"""
+    import json
+
+    buffer = io.StringIO()
+    if fmt == 'csv':
+        buffer.write('sku,name,category,price,discount_price,stock,short_description\n')
+    for i in range(rows):
+        row = {
+            'sku': f'{SKU_PREFIX}{i:08d}',
+            'name': f'Producto benchmark {i}',
+            'category': CATEGORY_SLUG,
+            'price': f'{100 + i % 900}.99',
+            'discount_price': f'{50 + i % 40}.00' if i % 3 == 0 else '',
+            'stock': i % 250,
+            'short_description': 'Producto generado para el benchmark',
+        }
+        if fmt == 'csv':
+            buffer.write(','.join(str(value) for value in row.values()) + '\n')
+        else:
+            buffer.write(json.dumps(row) + '\n')
+    buffer.seek(0)
+    return buffer
+
+
+def report(label, rows, seconds):
+    print(f'{label:<22} {rows:>9} filas  {seconds:>7.2f}s  {rows / seconds:>9.0f} filas/s')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark de importación/exportación del catálogo')
+    parser.add_argument('--rows', type=int, default=50000)
+    parser.add_argument('--format', choices=['csv', 'ndjson'], default='csv')
+    parser.add_argument('--batch-size', type=int, default=1000)
+    parser.add_argument('--keep', action='store_true', help='No borrar los productos generados')
+    args = parser.parse_args()
+
+    setup_django()
+    from core.catalog_io import export_products, import_products
+    from core.models import Category, Product
+
+    Category.objects.get_or_create(slug=CATEGORY_SLUG, defaults={'name': 'Benchmark'})
+    feed = synthetic_feed(args.rows, args.format).getvalue()
+
+    try:
+        for label in ('importar (insert)', 'importar (update)'):
+            start = time.perf_counter()
+            result = import_products(io.StringIO(feed), args.format, args.batch_size)
+            report(label, result.processed, time.perf_counter() - start)
+            if result.failed:
+                print(f'  {result.failed} filas con error, ej: {result.errors[:3]}')
+
+        start = time.perf_counter()
+        exported = sum(
+            chunk.count('\n')
+            for chunk in export_products(Product.objects.filter(sku__startswith=SKU_PREFIX), args.format)
+        )
+        if args.format == 'csv':
+            exported -= 1                                  # Encabezado
+        report('exportar', exported, time.perf_counter() - start)
+    finally:
+        if not args.keep:
+            Product.objects.filter(sku__startswith=SKU_PREFIX).delete()
+            Category.objects.filter(slug=CATEGORY_SLUG).delete()
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,226 @@
+#!/usr/bin/env python
+# ========================================
+# BENCHMARK - RENDER JSON Y COMPRESIÓN
+# ========================================
+#
+# Mide, para las respuestas de:
+#   /api/products/         (listado de productos)
+#   /api/orders/{id}/      (detalle de pedido con items)
+#   /api/users/list/       (listado de usuarios, admin)
+#
+# 1) Tiempo de render: json (como JSONRenderer de DRF) vs orjson
+# 2) Bytes en el cable: sin comprimir, gzip y brotli (si está instalado)
+#
+# Uso:
+#   python benchmarks/bench_json.py                      # payloads sintéticos
+#   python benchmarks/bench_json.py --url http://localhost --token <JWT> --order-id 1
+#                                                        # contra el gateway real
+
+import argparse
+import gzip
+import json
+import time
+from datetime import datetime, timezone
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+# ========================================
+# PAYLOADS SINTÉTICOS (misma forma que los serializers)
+# ========================================
+
+NOW = datetime(2024, 1, 15, 10, 30, tzinfo=timezone.utc).isoformat()
+
+
+def product_list_payload(count=50):
+    """Forma de ProductListSerializer (con imágenes)"""
+    return [
+        {
+            'id': i,
+            'name': f'Producto de prueba {i}',
+            'slug': f'producto-de-prueba-{i}',
+            'short_description': 'Descripción corta del producto para el listado',
+            'category': i % 10,
+            'category_name': f'Categoría {i % 10}',
+            'price': '1000.00',
+            'discount_price': '850.00',
+            'final_price': '850.00',
+            'has_discount': True,
+            'discount_percentage': 15,
+            'image': f'https://cdn.example.com/products/{i}/main.jpg',
+            'images': [f'https://cdn.example.com/products/{i}/{n}.jpg' for n in range(4)],
+            'is_active': True,
+            'is_featured': i % 7 == 0,
+            'rating': '4.50',
+            'review_count': 120,
+            'stock': 25,
+            'is_available': True,
+            'created_at': NOW,
+        }
+        for i in range(count)
+    ]
+
+
+def order_detail_payload(items=20):
+    """Forma de OrderDetailSerializer"""
+    return {
+        'id': 1,
+        'order_number': 'ORD-1A2B3C4D',
+        'user_id': 1,
+        'status': 'confirmed',
+        'subtotal': '20000.00',
+        'tax': '3800.00',
+        'shipping_cost': '150.00',
+        'discount': '0.00',
+        'total': '23950.00',
+        'shipping_address': 'Calle 5 # 10-20',
+        'shipping_city': 'Ibagué',
+        'shipping_state': 'Tolima',
+        'shipping_postal_code': '730001',
+        'shipping_country': 'Colombia',
+        'customer_email': 'juan@example.com',
+        'customer_phone': '+573001234567',
+        'notes': None,
+        'items': [
+            {
+                'id': i,
+                'product_id': i,
+                'product_name': f'Producto de prueba {i}',
+                'product_image': f'https://cdn.example.com/products/{i}/main.jpg',
+                'price': '1000.00',
+                'quantity': 1,
+                'total': '1000.00',
+                'created_at': NOW,
+            }
+            for i in range(items)
+        ],
+        'created_at': NOW,
+        'updated_at': NOW,
+    }
+
+
+def user_list_payload(count=100):
+    """Forma de la respuesta de UserListView"""
+    return {
+        'count': count,
+        'users': [
+            {
+                'id': i,
+                'email': f'user{i}@example.com',
+                'first_name': 'Juan',
+                'last_name': f'Pérez {i}',
+                'full_name': f'Juan Pérez {i}',
+                'phone': '+573001234567',
+                'address': 'Calle 5 # 10-20',
+                'city': 'Ibagué',
+                'state': 'Tolima',
+                'postal_code': '730001',
+                'country': 'Colombia',
+                'avatar': None,
+                'bio': None,
+                'is_verified': True,
+                'created_at': NOW,
+                'updated_at': NOW,
+            }
+            for i in range(count)
+        ],
+    }
+
+
+# ========================================
+# MEDICIONES
+# ========================================
+
+def render_stdlib(data):
+    """Igual que JSONRenderer de DRF (separadores compactos, UTF-8)"""
+    return json.dumps(data, ensure_ascii=False, separators=(',', ':')).encode()
+
+
+def render_orjson(data):
+    return orjson.dumps(data)
+
+
+def time_per_call(func, data, repeat):
+    """Tiempo promedio por llamada en microsegundos"""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func(data)
+    return (time.perf_counter() - start) / repeat * 1e6
+
+
+def wire_sizes(body):
+    """Bytes sin comprimir / gzip / brotli"""
+    sizes = {'identity': len(body), 'gzip': len(gzip.compress(body, compresslevel=5))}
+    if brotli is not None:
+        sizes['br'] = len(brotli.compress(body, quality=5))
+    return sizes
+
+
+def run_offline(repeat):
+    payloads = {
+        '/api/products/': product_list_payload(),
+        '/api/orders/{id}/': order_detail_payload(),
+        '/api/users/list/': user_list_payload(),
+    }
+
+    print(f"{'endpoint':<20} {'json µs':>9} {'orjson µs':>10} {'bytes':>8} {'gzip':>7} {'br':>7}")
+    for endpoint, data in payloads.items():
+        stdlib_us = time_per_call(render_stdlib, data, repeat)
+        orjson_us = time_per_call(render_orjson, data, repeat) if orjson else float('nan')
+        sizes = wire_sizes(render_stdlib(data))
+        print(
+            f"{endpoint:<20} {stdlib_us:>9.1f} {orjson_us:>10.1f} "
+            f"{sizes['identity']:>8} {sizes['gzip']:>7} {sizes.get('br', '-'):>7}"
+        )
+
+
+def run_live(base_url, token, order_id, repeat):
+    import requests
+
+    headers = {'Authorization': f'Bearer {token}'} if token else {}
+    endpoints = ['/api/products/', f'/api/orders/{order_id}/', '/api/users/list/']
+
+    print(f"{'endpoint':<20} {'encoding':>9} {'ms':>8} {'bytes':>8}")
+    with requests.Session() as session:
+        for endpoint in endpoints:
+            for encoding in ('identity', 'gzip', 'br'):
+                elapsed = 0.0
+                wire = 0
+                for _ in range(repeat):
+                    start = time.perf_counter()
+                    response = session.get(
+                        base_url + endpoint,
+                        headers={**headers, 'Accept-Encoding': encoding},
+                        stream=True,
+                    )
+                    raw = response.raw.read(decode_content=False)
+                    elapsed += time.perf_counter() - start
+                    wire = len(raw)
+                served = response.headers.get('Content-Encoding', 'identity')
+                print(f"{endpoint:<20} {served:>9} {elapsed / repeat * 1000:>8.2f} {wire:>8}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark de render JSON y compresión')
+    parser.add_argument('--url', help='URL del gateway (ej: http://localhost)')
+    parser.add_argument('--token', help='Access token JWT (pedidos y usuarios lo requieren)')
+    parser.add_argument('--order-id', default='1')
+    parser.add_argument('--repeat', type=int, default=200)
+    args = parser.parse_args()
+
+    if args.url:
+        run_live(args.url.rstrip('/'), args.token, args.order_id, max(1, args.repeat // 20))
+    else:
+        run_offline(args.repeat)
+
+
+if __name__ == '__main__':
+    main()
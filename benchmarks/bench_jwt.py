@@ -0,0 +1,98 @@
+#!/usr/bin/env python
+# ========================================
+# BENCHMARK - FIRMA Y VERIFICACIÓN DE JWT POR ALGORITMO
+# ========================================
+#
+# Mide tokens firmados/s y verificados/s (PyJWT, como simplejwt) con:
+#   HS256   secreto compartido (SECRET_KEY): rápido, pero todo servicio que
+#           verifica también puede firmar
+#   RS256   RSA 2048: firmar es caro (solo usuarios, en login/refresh) y
+#           verificar es barato (cada petición en cada servicio)
+#   ES256   ECDSA P-256: firmar barato, verificar más caro que RS256
+# y el tamaño del token con los claims de siempre vs los compactos
+# (core/tokens.py en usuarios). Los asimétricos necesitan cryptography.
+#
+# Uso:
+#   python benchmarks/bench_jwt.py
+#   python benchmarks/bench_jwt.py --iterations 20000
+
+import argparse
+import secrets
+import sys
+import time
+import uuid
+
+import jwt
+
+try:
+    from cryptography.hazmat.primitives.asymmetric import ec, rsa
+except ImportError:
+    ec = rsa = None
+
+NOW = 1_700_000_000
+
+FULL_CLAIMS = {
+    'token_type': 'access',
+    'exp': NOW + 86400,
+    'iat': NOW,
+    'jti': uuid.uuid4().hex,
+    'user_id': 12345,
+}
+
+COMPACT_CLAIMS = {
+    'token_type': 'access',
+    'exp': NOW + 86400,
+    'jti': secrets.token_urlsafe(6),
+    'user_id': 12345,
+}
+
+
+def keys():
+    """algoritmo -> (clave para firmar, clave para verificar, header)"""
+    secret = secrets.token_urlsafe(50)
+    result = {'HS256': (secret, secret, None)}
+
+    if rsa is None:
+        print('cryptography no está instalado: solo HS256\n')
+        return result
+
+    rsa_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    ec_key = ec.generate_private_key(ec.SECP256R1())
+    result['RS256'] = (rsa_key, rsa_key.public_key(), {'kid': 'bench-rsa'})
+    result['ES256'] = (ec_key, ec_key.public_key(), {'kid': 'bench-ec'})
+    return result
+
+
+def measure(function, iterations):
+    start = time.perf_counter()
+    for _ in range(iterations):
+        function()
+    return iterations / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark de firma/verificación JWT')
+    parser.add_argument('--iterations', type=int, default=5000)
+    args = parser.parse_args()
+
+    algorithm_keys = keys()
+    print(f'{"algoritmo":<10} {"firmados/s":>12} {"verificados/s":>14} {"bytes":>7} {"compacto":>9}')
+    for algorithm, (signing_key, verifying_key, headers) in algorithm_keys.items():
+        token = jwt.encode(FULL_CLAIMS, signing_key, algorithm=algorithm, headers=headers)
+        compact = jwt.encode(COMPACT_CLAIMS, signing_key, algorithm=algorithm, headers=headers)
+
+        sign_rate = measure(
+            lambda: jwt.encode(COMPACT_CLAIMS, signing_key, algorithm=algorithm, headers=headers),
+            args.iterations,
+        )
+        verify_rate = measure(
+            lambda: jwt.decode(compact, verifying_key, algorithms=[algorithm], options={'verify_exp': False}),
+            args.iterations,
+        )
+        print(f'{algorithm:<10} {sign_rate:>12.0f} {verify_rate:>14.0f} {len(token):>7} {len(compact):>9}')
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,102 @@
+#!/usr/bin/env python
+# ========================================
+# BENCHMARK - NÚMEROS DE PEDIDO: AL AZAR VS ORDENADOS POR TIEMPO
+# ========================================
+#
+# Inserta N números de pedido en una tabla temporal con índice único, una
+# vez con el formato anterior (ORD- + hex al azar) y otra con el nuevo
+# (core/order_numbers.py), y compara filas/s y el tamaño final del índice.
+# Con claves al azar cada INSERT cae en una hoja distinta del índice (más
+# páginas tocadas y divididas); con claves crecientes siempre va al final.
+# Usa la base de datos configurada del servicio de pedidos (el tamaño del
+# índice solo se reporta en PostgreSQL).
+#
+# Uso (con el Python del servicio, por ejemplo dentro del contenedor):
+#   docker compose run --rm -v ./benchmarks:/benchmarks pedidos-service \
+#       python /benchmarks/bench_order_numbers.py --rows 1000000
+
+import argparse
+import os
+import sys
+import time
+import uuid
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+TABLE = 'bench_order_numbers'
+
+
+def setup_django():
+    service_dir = ROOT / 'services' / 'pedidos'
+    if not service_dir.is_dir():
+        service_dir = Path.cwd()      # Dentro del contenedor el código está en /app
+    sys.path.insert(0, str(service_dir))
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'pedidos.settings')
+
+    import django
+    django.setup()
+
+
+def random_numbers():
+    while True:
+        yield f'ORD-{uuid.uuid4().hex[:8].upper()}'
+
+
+def ordered_numbers():
+    from core.order_numbers import OrderNumberGenerator
+
+    generator = OrderNumberGenerator(node=1)
+    while True:
+        yield generator.next_number()
+
+
+def run(connection, label, numbers, rows, batch_size):
+    from django.db import transaction
+
+    with connection.cursor() as cursor:
+        cursor.execute(f'DROP TABLE IF EXISTS {TABLE}')
+        cursor.execute(f'CREATE TABLE {TABLE} (order_number VARCHAR(50) PRIMARY KEY)')
+
+        inserted = 0
+        start = time.perf_counter()
+        while inserted < rows:
+            batch = [(next(numbers),) for _ in range(min(batch_size, rows - inserted))]
+            with transaction.atomic():                      # Un commit por lote
+                cursor.executemany(
+                    f'INSERT INTO {TABLE} (order_number) VALUES (%s) ON CONFLICT DO NOTHING', batch
+                )
+            inserted += len(batch)
+        seconds = time.perf_counter() - start
+
+        cursor.execute(f'SELECT count(*) FROM {TABLE}')
+        stored = cursor.fetchone()[0]
+        collisions = rows - stored
+
+        index_size = ''
+        if connection.vendor == 'postgresql':
+            cursor.execute(f"SELECT pg_relation_size('{TABLE}_pkey')")
+            index_size = f'  índice {cursor.fetchone()[0] / 1024 / 1024:>7.1f} MB'
+
+        cursor.execute(f'DROP TABLE {TABLE}')
+
+    print(f'{label:<18} {rows:>9} filas  {seconds:>7.2f}s  {rows / seconds:>9.0f} filas/s{index_size}')
+    if collisions:
+        print(f'  {collisions} números repetidos (en el checkout cada uno era un error 500)')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark de inserción de números de pedido')
+    parser.add_argument('--rows', type=int, default=200000)
+    parser.add_argument('--batch-size', type=int, default=1000)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.db import connection
+
+    run(connection, 'al azar (hex)', random_numbers(), args.rows, args.batch_size)
+    run(connection, 'ordenados (tiempo)', ordered_numbers(), args.rows, args.batch_size)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,162 @@
+#!/usr/bin/env python
+# ========================================
+# BENCHMARK - ARRANQUE E IMPORTS DE LOS SERVICIOS
+# ========================================
+#
+# 1) imports: perfil de tiempo de import (python -X importtime) de un
+#    servicio, con los módulos más costosos (acumulado).
+#
+#       python benchmarks/bench_startup.py imports usuarios
+#
+#    Corre con el Python del servicio, por ejemplo dentro del contenedor:
+#       docker compose run --rm -v ./benchmarks:/benchmarks usuarios-service \
+#           python /benchmarks/bench_startup.py imports usuarios
+#
+# 2) startup: segundos desde que se lanza el proceso hasta la primera
+#    respuesta 200 de una URL (por defecto /api/products/). El resultado se
+#    agrega a benchmarks/results/startup.csv para seguirlo en el tiempo.
+#
+#       python benchmarks/bench_startup.py startup \
+#           --cmd "docker compose up productos-service" \
+#           --url http://localhost:8002/api/products/
+
+import argparse
+import csv
+import shlex
+import subprocess
+import sys
+import time
+import urllib.request
+from datetime import datetime, timezone
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+RESULTS = ROOT / 'benchmarks' / 'results' / 'startup.csv'
+
+
+# ========================================
+# PERFIL DE IMPORTS
+# ========================================
+
+def profile_imports(service, top):
+    """Importa Django + urls del servicio con -X importtime y resume"""
+    service_dir = ROOT / 'services' / service
+    if not service_dir.is_dir():
+        service_dir = Path.cwd()      # Dentro del contenedor el código está en /app
+
+    code = (
+        'import os, django; '
+        f"os.environ.setdefault('DJANGO_SETTINGS_MODULE', '{service}.settings'); "
+        'django.setup(); '
+        f'import {service}.urls'
+    )
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', code],
+        cwd=service_dir, capture_output=True, text=True,
+    )
+
+    rows = []
+    for line in result.stderr.splitlines():
+        # "import time:  self [us] | cumulative | imported package"
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        rows.append((int(cumulative_us), int(self_us), name.rstrip()))
+
+    if not rows:
+        print(result.stderr, file=sys.stderr)
+        return 1
+
+    # Los módulos de primer nivel (sin sangría) suman el total
+    total_us = sum(cum for cum, _, name in rows if not name.startswith('  '))
+
+    print(f'{service}: {len(rows)} módulos, {total_us / 1000:.1f} ms en imports\n')
+    print(f"{'acumulado ms':>13} {'propio ms':>10}  módulo")
+    for cumulative_us, self_us, name in sorted(rows, reverse=True)[:top]:
+        print(f'{cumulative_us / 1000:>13.1f} {self_us / 1000:>10.1f}  {name.strip()}')
+    return 0
+
+
+# ========================================
+# TIEMPO DE ARRANQUE
+# ========================================
+
+def wait_for(url, timeout):
+    """Espera hasta que la URL responda 200; devuelve los segundos o None"""
+    start = time.perf_counter()
+    while time.perf_counter() - start < timeout:
+        try:
+            with urllib.request.urlopen(url, timeout=1) as response:
+                if response.status == 200:
+                    return time.perf_counter() - start
+        except Exception:
+            pass
+        time.sleep(0.05)
+    return None
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, text=True
+        ).strip()
+    except Exception:
+        return ''
+
+
+def measure_startup(cmd, url, timeout, label):
+    process = subprocess.Popen(shlex.split(cmd), stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        elapsed = wait_for(url, timeout)
+    finally:
+        process.terminate()
+        try:
+            process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+    if elapsed is None:
+        print(f'{url} no respondió 200 en {timeout}s', file=sys.stderr)
+        return 1
+
+    print(f'{label or cmd}: primera respuesta 200 en {elapsed:.2f}s')
+
+    RESULTS.parent.mkdir(parents=True, exist_ok=True)
+    is_new = not RESULTS.exists()
+    with open(RESULTS, 'a', newline='') as f:
+        writer = csv.writer(f)
+        if is_new:
+            writer.writerow(['timestamp', 'revision', 'label', 'url', 'seconds'])
+        writer.writerow([
+            datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            git_revision(),
+            label or cmd,
+            url,
+            f'{elapsed:.3f}',
+        ])
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark de arranque e imports')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    imports = sub.add_parser('imports', help='Perfil de tiempo de import')
+    imports.add_argument('service', choices=['usuarios', 'productos', 'pedidos'])
+    imports.add_argument('--top', type=int, default=25)
+
+    startup = sub.add_parser('startup', help='Tiempo hasta la primera respuesta 200')
+    startup.add_argument('--cmd', required=True, help='Comando que levanta el servicio')
+    startup.add_argument('--url', default='http://localhost:8002/api/products/')
+    startup.add_argument('--timeout', type=float, default=120)
+    startup.add_argument('--label', default='', help='Nombre para el CSV de resultados')
+
+    args = parser.parse_args()
+
+    if args.command == 'imports':
+        return profile_imports(args.service, args.top)
+    return measure_startup(args.cmd, args.url, args.timeout, args.label)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
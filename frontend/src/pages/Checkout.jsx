@@ -4,6 +4,7 @@ import { useSelector, useDispatch } from 'react-redux'
 import { ArrowLeft } from 'lucide-react'
 import { clearCart } from '../store/cartSlice'
 import orderService from '../services/orderService'
+import { randomUUID } from '../utils/helpers'
 
 function Checkout() {
   const [loading, setLoading] = useState(false)
@@ -25,8 +26,14 @@ function Checkout() {
   const dispatch = useDispatch()
   const navigate = useNavigate()
 
+  // Misma clave para los reintentos del mismo pedido: si el envío se corta,
+  // reintentar no crea un pedido duplicado. Cambiar el formulario es otro pedido.
+  // (Inicializador perezoso: no se genera una clave en cada render.)
+  const [idempotencyKey, setIdempotencyKey] = useState(randomUUID)
+
   const handleInputChange = (e) => {
     const { name, value } = e.target
+    setIdempotencyKey(randomUUID())
     setFormData((prev) => ({
       ...prev,
       [name]: value,
@@ -52,7 +59,7 @@ function Checkout() {
       }
 
       // Crear pedido
-      const response = await orderService.checkout(orderData)
+      const response = await orderService.checkout(orderData, idempotencyKey)
 
       setSuccess(true)
       dispatch(clearCart())
@@ -41,10 +41,12 @@ const orderService = {
     }
   },
 
-  // Procesar checkout
-  checkout: async (data) => {
+  // Procesar checkout (idempotencyKey: la misma en los reintentos)
+  checkout: async (data, idempotencyKey) => {
     try {
-      const response = await api.post('/api/cart/checkout/', data)
+      const response = await api.post('/api/cart/checkout/', data, {
+        headers: idempotencyKey ? { 'Idempotency-Key': idempotencyKey } : {},
+      })
       return response.data
     } catch (error) {
       throw error.response?.data || error.message
@@ -0,0 +1,14 @@
+// UUID v4. crypto.randomUUID() solo existe en contextos seguros (HTTPS o
+// localhost): servido por HTTP en la red local no está, pero
+// crypto.getRandomValues() sí.
+export function randomUUID() {
+  if (typeof crypto.randomUUID === 'function') {
+    return crypto.randomUUID()
+  }
+
+  const bytes = crypto.getRandomValues(new Uint8Array(16))
+  bytes[6] = (bytes[6] & 0x0f) | 0x40 // Versión 4
+  bytes[8] = (bytes[8] & 0x3f) | 0x80 // Variante RFC 4122
+  const hex = Array.from(bytes, (b) => b.toString(16).padStart(2, '0')).join('')
+  return `${hex.slice(0, 8)}-${hex.slice(8, 12)}-${hex.slice(12, 16)}-${hex.slice(16, 20)}-${hex.slice(20)}`
+}
@@ -2,23 +2,52 @@
 # ADMIN.PY - PANEL DE ADMINISTRACIÓN
 # ========================================
 
-from django.contrib import admin
-from .models import Order, OrderItem
+from django.contrib import admin, messages
+from django.db.models import F
+from django.forms.models import BaseInlineFormSet
+from django.urls import reverse
+from django.utils.html import format_html
+
+from .bulk import bulk_transition
+from .models import ArchivedOrder, Order, OrderItem, Task
+from .paginators import EstimatedCountPaginator
+from .tasks import retry_dead
+
+
+# Items que se muestran dentro del pedido (el resto, en el admin de items)
+ITEMS_SHOWN = 50
+
+
+class LimitedItemFormSet(BaseInlineFormSet):
+    """Solo los primeros ITEMS_SHOWN items del pedido"""
+    
+    def get_queryset(self):
+        if not hasattr(self, '_limited_queryset'):
+            self._limited_queryset = super().get_queryset()[:ITEMS_SHOWN]
+        return self._limited_queryset
 
 
 class OrderItemInline(admin.TabularInline):
     """
     Items del pedido mostrados DENTRO del formulario del pedido
     
-    Esto permite ver y editar los items sin ir a otra página
+    Esto permite ver los items sin ir a otra página
     
     TabularInline = Muestra como tabla dentro del pedido
     StackedInline = Mostraría cada item en su propio bloque
+    
+    Solo lectura y a lo sumo ITEMS_SHOWN filas: un pedido con miles de
+    items no los carga todos en el formulario (ver OrderAdmin.item_count)
     """
     model = OrderItem
-    extra = 0                                           # No agregar filas vacías
+    formset = LimitedItemFormSet
+    extra = 0                                                    # No agregar filas vacías
+    can_delete = False                                           # No borrar items desde el pedido
     fields = ('product_id', 'product_name', 'price', 'quantity')
     readonly_fields = ('product_id', 'product_name', 'price', 'quantity')  # No editar
+    
+    def has_add_permission(self, request, obj=None):
+        return False
 
 
 @admin.register(Order)
@@ -35,6 +64,7 @@ class OrderAdmin(admin.ModelAdmin):
         'user_id',          # Ej: 1
         'status',           # Ej: pending, shipped, delivered
         'total',            # Ej: 1150.00
+        'customer_name',    # Ej: Juan Pérez (copia, sin llamar a usuarios)
         'customer_email',   # Ej: juan@example.com
         'created_at',       # Ej: 2024-01-15
     )
@@ -55,6 +85,7 @@ class OrderAdmin(admin.ModelAdmin):
     # ========================================
     search_fields = (
         'order_number',     # Buscar por número de orden
+        'customer_name',    # Buscar por nombre del cliente
         'customer_email',   # Buscar por email
         'customer_phone',   # Buscar por teléfono
     )
@@ -65,9 +96,9 @@ class OrderAdmin(admin.ModelAdmin):
     # ========================================
     fieldsets = (
         ('Información del Pedido', {
-            'fields': ('order_number', 'user_id', 'status')
+            'fields': ('order_number', 'user_id', 'status', 'item_count')
         }),
-        # Resultado: 3 campos en sección "Información del Pedido"
+        # Resultado: 4 campos en sección "Información del Pedido"
         
         ('Totales', {
             'fields': ('subtotal', 'tax', 'shipping_cost', 'discount', 'total')
@@ -86,9 +117,9 @@ class OrderAdmin(admin.ModelAdmin):
         # Resultado: Toda la dirección en una sección
         
         ('Información de Contacto', {
-            'fields': ('customer_email', 'customer_phone')
+            'fields': ('customer_name', 'customer_email', 'customer_phone', 'customer_address')
         }),
-        # Resultado: Email y teléfono juntos
+        # Resultado: Nombre, email, teléfono y dirección juntos
         
         ('Notas', {
             'fields': ('notes',)
@@ -107,22 +138,95 @@ class OrderAdmin(admin.ModelAdmin):
     # ========================================
     readonly_fields = (
         'order_number',  # Se genera automáticamente
+        'status',        # Solo con las acciones (transiciones, eventos y rollups)
+        'item_count',    # Total de items y enlace a todos
+        'customer_name',      # Copia del cliente al comprar:
+        'customer_address',   # no se edita
         'created_at',    # Se asigna al crear
         'updated_at',    # Se actualiza automáticamente
     )
     # No queremos que cambien estos valores
     
+    def save_model(self, request, obj, form, change):
+        """
+        Al editar, guarda solo los campos cambiados y sube la versión
+        
+        Un save() completo reescribiría el estado leído al abrir el
+        formulario aunque otro proceso lo haya cambiado después.
+        """
+        if not change:
+            return super().save_model(request, obj, form, change)
+        
+        fields = [name for name in form.changed_data if name not in self.readonly_fields]
+        if not fields:
+            return
+        obj.version = F('version') + 1
+        obj.save(update_fields=[*fields, 'version', 'updated_at'])
+        obj.refresh_from_db(fields=['status', 'version', 'updated_at'])
+    
     # ========================================
     # INCLUIR ITEMS DENTRO DEL PEDIDO
     # ========================================
     inlines = [OrderItemInline]
     # Los items del pedido aparecen dentro del formulario, no en otra página
     
+    @admin.display(description='Items')
+    def item_count(self, obj):
+        """Total de items; si no entran todos en el formulario, enlace a la lista completa"""
+        count = obj.items.count() if obj.pk else 0
+        if count <= ITEMS_SHOWN:
+            return count
+        url = reverse('admin:core_orderitem_changelist') + f'?order__id__exact={obj.pk}'
+        return format_html('{} (se muestran {}: <a href="{}">ver todos</a>)', count, ITEMS_SHOWN, url)
+    
     # ========================================
     # ORDENAMIENTO
     # ========================================
     ordering = ('-created_at',)
     # El "-" significa descendente (más recientes primero)
+    
+    # ========================================
+    # TABLAS GRANDES
+    # ========================================
+    show_full_result_count = False          # Sin el COUNT(*) extra al filtrar
+    paginator = EstimatedCountPaginator     # Conteo estimado sin filtros
+    
+    # ========================================
+    # ACCIONES MASIVAS
+    # ========================================
+    # Se aplican con SQL de conjunto, por lotes (ver core/bulk.py)
+    actions = ('mark_confirmed', 'mark_shipped', 'mark_delivered', 'mark_cancelled')
+    
+    def _bulk_transition(self, request, queryset, new_status):
+        selected = queryset.count()
+        updated = bulk_transition(queryset, new_status)
+        self.message_user(
+            request,
+            f"{updated} pedido(s) pasaron a '{new_status}'.",
+            messages.SUCCESS,
+        )
+        if updated < selected:
+            self.message_user(
+                request,
+                f"{selected - updated} pedido(s) omitidos: su estado no permite el cambio.",
+                messages.WARNING,
+            )
+    
+    @admin.action(description='Marcar como confirmados')
+    def mark_confirmed(self, request, queryset):
+        self._bulk_transition(request, queryset, 'confirmed')
+    
+    @admin.action(description='Marcar como enviados')
+    def mark_shipped(self, request, queryset):
+        self._bulk_transition(request, queryset, 'shipped')
+    
+    @admin.action(description='Marcar como entregados')
+    def mark_delivered(self, request, queryset):
+        self._bulk_transition(request, queryset, 'delivered')
+    
+    @admin.action(description='Cancelar pedidos')
+    def mark_cancelled(self, request, queryset):
+        self._bulk_transition(request, queryset, 'cancelled')
 
 
 @admin.register(OrderItem)
@@ -154,4 +258,64 @@ class OrderItemAdmin(admin.ModelAdmin):
     
     readonly_fields = ('created_at',)
     
-    ordering = ('-created_at',)
\ No newline at end of file
+    ordering = ('-created_at',)
+    
+    # La columna 'order' haría un query por fila sin esto
+    list_select_related = ('order',)
+    show_full_result_count = False
+    paginator = EstimatedCountPaginator
+
+
+@admin.register(ArchivedOrder)
+class ArchivedOrderAdmin(admin.ModelAdmin):
+    """
+    Pedidos archivados (solo lectura, ver core/archive.py)
+    El detalle completo se consulta con GET /api/orders/{order_id}/
+    """
+    
+    list_display = ('order_number', 'order_id', 'user_id', 'status', 'total', 'created_at', 'archived_at')
+    list_filter = ('status',)
+    search_fields = ('order_number',)
+    fields = ('order_number', 'order_id', 'user_id', 'status', 'total', 'created_at', 'archived_at')
+    readonly_fields = fields
+    ordering = ('-created_at',)
+    show_full_result_count = False
+    paginator = EstimatedCountPaginator
+    
+    def has_add_permission(self, request):
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(Task)
+class TaskAdmin(admin.ModelAdmin):
+    """
+    Tareas en segundo plano (ver core/tasks.py)
+    Las fallidas se pueden reencolar con la acción "Reintentar"
+    """
+    
+    list_display = ('id', 'name', 'status', 'attempts', 'max_attempts', 'run_at', 'finished_at')
+    list_filter = ('status', 'name')
+    search_fields = ('name',)
+    fields = (
+        'name', 'payload', 'status', 'attempts', 'max_attempts', 'last_error',
+        'created_at', 'run_at', 'started_at', 'finished_at',
+    )
+    readonly_fields = fields
+    ordering = ('-id',)
+    actions = ['retry']
+    show_full_result_count = False
+    paginator = EstimatedCountPaginator
+    
+    def has_add_permission(self, request):
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        return False
+    
+    @admin.action(description='Reintentar tareas fallidas')
+    def retry(self, request, queryset):
+        requeued = retry_dead(queryset)
+        self.message_user(request, f"{requeued} tarea(s) reencoladas.", messages.SUCCESS)
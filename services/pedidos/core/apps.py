@@ -3,4 +3,8 @@ from django.apps import AppConfig
 class CoreConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'core'
-    verbose_name = 'Gestión de Pedidos'
\ No newline at end of file
+    verbose_name = 'Gestión de Pedidos'
+    
+    def ready(self):
+        # Registrar las tareas en segundo plano (web y worker)
+        from . import notifications  # noqa: F401
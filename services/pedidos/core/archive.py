@@ -0,0 +1,129 @@
+# ========================================
+# ARCHIVO - PEDIDOS ANTIGUOS EN ALMACENAMIENTO FRÍO
+# ========================================
+#
+# Casi todas las lecturas tocan pedidos recientes, pero las tablas de
+# pedidos e items crecían para siempre (índices y VACUUM cada vez más caros).
+# archive_orders() mueve por lotes los pedidos entregados o cancelados más
+# antiguos que la retención a ArchivedOrder: el detalle (pedido + items)
+# queda como JSON comprimido y las filas calientes se borran.
+# get_archived_order() permite seguir leyendo el detalle (lectura transparente
+# desde la vista de detalle).
+
+import json
+import logging
+import zlib
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.utils import timezone
+
+from .models import ArchivedOrder, Order, OrderItem
+
+logger = logging.getLogger(__name__)
+
+# Días que un pedido terminado se queda en las tablas calientes
+ARCHIVE_AFTER_DAYS = getattr(settings, 'ORDER_ARCHIVE_AFTER_DAYS', 365)
+
+# Solo se archivan pedidos en estado final
+ARCHIVABLE_STATUSES = ('delivered', 'cancelled')
+
+BATCH_SIZE = 500
+
+
+def compress_detail(data):
+    """dict -> JSON comprimido"""
+    content = json.dumps(data, cls=DjangoJSONEncoder, ensure_ascii=False, separators=(',', ':'))
+    return zlib.compress(content.encode('utf-8'), 9)
+
+
+def decompress_detail(payload):
+    """JSON comprimido -> dict"""
+    return json.loads(zlib.decompress(bytes(payload)).decode('utf-8'))
+
+
+def archivable_orders(days=None):
+    """Pedidos que ya se pueden archivar"""
+    days = ARCHIVE_AFTER_DAYS if days is None else days
+    cutoff = timezone.now() - timedelta(days=days)
+    return Order.objects.filter(status__in=ARCHIVABLE_STATUSES, created_at__lt=cutoff)
+
+
+def _archive_batch(orders):
+    """Copia un lote al archivo y lo borra de las tablas calientes"""
+    from .serializers import OrderDetailSerializer
+    
+    ArchivedOrder.objects.bulk_create(
+        [
+            ArchivedOrder(
+                order_id=order.id,
+                order_number=order.order_number,
+                user_id=order.user_id,
+                status=order.status,
+                total=order.total,
+                created_at=order.created_at,
+                payload=compress_detail(OrderDetailSerializer(order).data),
+            )
+            for order in orders
+        ],
+        ignore_conflicts=True,
+    )
+    
+    order_ids = [order.id for order in orders]
+    OrderItem.objects.filter(order_id__in=order_ids).delete()
+    Order.objects.filter(id__in=order_ids).delete()
+
+
+def archive_orders(days=None, batch_size=BATCH_SIZE, progress=None):
+    """
+    Archiva los pedidos terminados más antiguos que `days` (por defecto
+    ORDER_ARCHIVE_AFTER_DAYS)
+    
+    Recorre por id (keyset) en lotes de `batch_size`; cada lote es su propia
+    transacción y bloquea sus pedidos (un pedido que cambió de estado a la
+    vez no se archiva). Los rollups no cambian: el pedido sigue contando.
+    
+    `progress(archivados, último_id)` se llama después de cada lote.
+    Retorna la cantidad de pedidos archivados.
+    """
+    candidates = archivable_orders(days).order_by('id')
+    archived = 0
+    last_id = 0
+    
+    while True:
+        with transaction.atomic():
+            orders = list(
+                candidates.filter(id__gt=last_id)
+                .select_for_update(of=('self',))
+                .prefetch_related('items')[:batch_size]
+            )
+            if not orders:
+                break
+            last_id = orders[-1].id
+            _archive_batch(orders)
+        
+        archived += len(orders)
+        logger.info('archive_orders: %d pedidos archivados (hasta id %d)', archived, last_id)
+        if progress:
+            progress(archived, last_id)
+    
+    return archived
+
+
+def get_archived_order(order_id, user_id=None):
+    """
+    Detalle de un pedido archivado (el mismo formato que la API de detalle)
+    
+    Con `user_id` solo lo retorna si es de ese usuario. None si no existe.
+    """
+    archived = ArchivedOrder.objects.filter(order_id=order_id)
+    if user_id is not None:
+        archived = archived.filter(user_id=user_id)
+    
+    payload = archived.values_list('payload', flat=True).first()
+    if payload is None:
+        return None
+    
+    return {**decompress_detail(payload), 'archived': True}
@@ -0,0 +1,78 @@
+# ========================================
+# BROKER - PUBLICACIÓN DE EVENTOS
+# ========================================
+#
+# El broker es intercambiable con el setting OUTBOX_BROKER (ruta a la clase).
+# - FileBroker:     agrega los mensajes a un archivo NDJSON compartido
+#                   (volumen de docker-compose que lee productos)
+# - InMemoryBroker: guarda los mensajes en memoria del proceso (tests)
+# Un broker real (Redis Streams, RabbitMQ, Kafka...) solo necesita publish().
+
+import json
+import os
+import threading
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+
+class BaseBroker:
+    """Interfaz de un broker"""
+
+    def publish(self, messages):
+        """Publica una lista de mensajes (dicts). Debe fallar si no pudo."""
+        raise NotImplementedError
+
+
+class InMemoryBroker(BaseBroker):
+    """Broker en memoria del proceso (para tests y desarrollo)"""
+
+    messages = []
+    _lock = threading.Lock()
+
+    def publish(self, messages):
+        with self._lock:
+            self.messages.extend(messages)
+
+    @classmethod
+    def clear(cls):
+        with cls._lock:
+            cls.messages.clear()
+
+
+class FileBroker(BaseBroker):
+    """
+    Broker sobre un archivo NDJSON (un mensaje JSON por línea)
+
+    Cada lote se escribe con un solo write() en modo append, así las
+    líneas de dos relays no se mezclan. Los consumidores leen el archivo
+    desde su última posición.
+    """
+
+    def __init__(self, path=None):
+        self.path = path or getattr(
+            settings, 'ORDER_EVENTS_FILE', '/app/events/orders.ndjson'
+        )
+
+    def publish(self, messages):
+        if not messages:
+            return
+
+        data = ''.join(
+            json.dumps(message, separators=(',', ':'), default=str) + '\n'
+            for message in messages
+        ).encode()
+
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            os.write(fd, data)
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+
+def get_broker():
+    """Instancia el broker configurado en OUTBOX_BROKER"""
+    broker_class = getattr(settings, 'OUTBOX_BROKER', 'core.broker.FileBroker')
+    return import_string(broker_class)()
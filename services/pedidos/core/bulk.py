@@ -0,0 +1,79 @@
+# ========================================
+# BULK - OPERACIONES MASIVAS SOBRE PEDIDOS
+# ========================================
+#
+# Cambiar el estado de miles de pedidos con un save() por pedido es lento
+# y bloquea filas mucho tiempo. Aquí se hace por lotes, con SQL de conjunto:
+# por lote un SELECT ... FOR UPDATE, un UPDATE, un INSERT de eventos y los
+# ajustes agrupados de los rollups.
+
+import logging
+
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Order
+from .rollups import apply_order_changes
+from .outbox import (
+    record_order_events_bulk,
+    ORDER_CANCELLED,
+    ORDER_STATUS_CHANGED,
+)
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 1000
+
+
+def bulk_transition(queryset, new_status, batch_size=BATCH_SIZE, progress=None):
+    """
+    Pasa a `new_status` todos los pedidos del queryset que lo permitan
+    
+    Recorre por id (keyset) en lotes de `batch_size`; cada lote es su
+    propia transacción, así no se bloquea toda la tabla a la vez. Los
+    pedidos cuyo estado no permite la transición se omiten.
+    
+    `progress(actualizados, último_id)` se llama después de cada lote.
+    Retorna la cantidad de pedidos actualizados.
+    """
+    sources = Order.sources_for(new_status)
+    event_type = ORDER_CANCELLED if new_status == 'cancelled' else ORDER_STATUS_CHANGED
+    
+    candidates = queryset.filter(status__in=sources).order_by('id')
+    updated = 0
+    last_id = 0
+    
+    while True:
+        batch_ids = list(
+            candidates.filter(id__gt=last_id).values_list('id', flat=True)[:batch_size]
+        )
+        if not batch_ids:
+            break
+        last_id = batch_ids[-1]
+        
+        with transaction.atomic():
+            # Releer con bloqueo: alguien pudo cambiarlos desde el SELECT anterior
+            orders = list(
+                Order.objects.select_for_update()
+                .filter(id__in=batch_ids, status__in=sources)
+                .values('id', 'order_number', 'user_id', 'total', 'status', 'created_at')
+            )
+            if orders:
+                Order.objects.filter(id__in=[order['id'] for order in orders]).update(
+                    status=new_status,
+                    version=F('version') + 1,
+                    updated_at=timezone.now(),
+                )
+                record_order_events_bulk(orders, event_type, new_status)
+                apply_order_changes([
+                    {**order, 'previous_status': order['status'], 'status': new_status}
+                    for order in orders
+                ])
+        
+        updated += len(orders)
+        logger.info('bulk_transition %s: %d pedidos (hasta id %d)', new_status, updated, last_id)
+        if progress:
+            progress(updated, last_id)
+    
+    return updated
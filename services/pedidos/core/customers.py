@@ -0,0 +1,151 @@
+# ========================================
+# CLIENTES - COPIA DEL CLIENTE EN EL PEDIDO
+# ========================================
+#
+# Los listados y el admin de pedidos mostraban nombre y dirección del
+# cliente pidiéndolos al servicio de usuarios (una llamada por pedido o
+# usuario). Ahora cada pedido guarda al crearse una copia inmutable:
+#   - customer_name: nombre completo, del perfil en usuarios (la vista lo
+#     consulta con el token del comprador antes de abrir la transacción
+#     del pedido; lo que envíe el cliente se ignora)
+#   - customer_email: el email de contacto (ya existía)
+#   - customer_address: la dirección de envío con el mismo formato que
+#     User.full_address en usuarios ("dirección, ciudad, depto, CP, país")
+# Los pedidos viejos se completan con backfill_customer_snapshots, a partir
+# del archivo que genera `manage.py export_customers` en usuarios.
+
+import json
+import logging
+
+from django.db import transaction
+from django.db.models import Q
+
+from .http_client import UpstreamError, get_client
+from .models import Order
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 1000
+
+NAME_MAX_LENGTH = Order._meta.get_field('customer_name').max_length
+ADDRESS_MAX_LENGTH = Order._meta.get_field('customer_address').max_length
+
+
+def format_address(*parts):
+    """Partes de la dirección -> texto (mismo formato que User.full_address)"""
+    return ', '.join(part.strip() for part in parts if part and part.strip())[:ADDRESS_MAX_LENGTH]
+
+
+def order_address(order):
+    """Dirección completa de un pedido (instancia o dict de validated_data)"""
+    get = order.get if isinstance(order, dict) else lambda field: getattr(order, field)
+    return format_address(
+        get('shipping_address'),
+        get('shipping_city'),
+        get('shipping_state'),
+        get('shipping_postal_code'),
+        get('shipping_country'),
+    )
+
+
+def fetch_customer_name(user_id, authorization):
+    """
+    Nombre completo del cliente según su perfil en usuarios
+    
+    Se consulta con el header Authorization de quien hace el pedido. ''
+    si no se pudo (sin token, usuarios caído...): el pedido se crea igual
+    y backfill_customer_snapshots lo completa después.
+    """
+    if not authorization:
+        return ''
+    try:
+        response = get_client('usuarios').get(
+            f'/api/users/{int(user_id)}/', headers={'Authorization': authorization}
+        )
+        if response.status_code != 200:
+            logger.warning('Perfil del usuario %s: HTTP %d', user_id, response.status_code)
+            return ''
+        name = response.json().get('full_name') or ''
+    except (UpstreamError, ValueError) as exc:
+        logger.warning('Perfil del usuario %s no disponible: %s', user_id, exc)
+        return ''
+    return name.strip()[:NAME_MAX_LENGTH]
+
+
+def request_customer_name(request, user_id):
+    """
+    Nombre del perfil para un pedido de `request`
+    
+    Llamarlo FUERA de transacciones: una transacción abierta mientras
+    usuarios responde retendría la conexión y los locks (p. ej. la
+    Idempotency-Key sin confirmar) durante toda la llamada.
+    """
+    return fetch_customer_name(user_id, request.META.get('HTTP_AUTHORIZATION'))
+
+
+def snapshot_fields(validated_data, customer_name=''):
+    """Completa los campos de la copia del cliente antes de crear el pedido"""
+    validated_data['customer_name'] = customer_name
+    validated_data['customer_address'] = order_address(validated_data)
+    return validated_data
+
+
+def load_customers(lines):
+    """Líneas JSON de export_customers -> {user_id: nombre completo}"""
+    names = {}
+    for number, line in enumerate(lines, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            row = json.loads(line)
+            names[int(row['id'])] = (row.get('full_name') or '').strip()[:NAME_MAX_LENGTH]
+        except (ValueError, KeyError, TypeError) as exc:
+            raise ValueError(f'Línea {number} inválida: {exc}') from exc
+    return names
+
+
+def backfill_snapshots(names, batch_size=BATCH_SIZE, progress=None):
+    """
+    Completa la copia del cliente en los pedidos que no la tienen
+    
+    `names` es {user_id: nombre completo} (ver load_customers). Recorre por
+    id (keyset) en lotes de `batch_size`, un UPDATE masivo por lote en su
+    propia transacción. Solo llena campos vacíos: una copia existente no se
+    cambia aunque el perfil haya cambiado después.
+    
+    `progress(actualizados, último_id)` se llama después de cada lote.
+    Retorna la cantidad de pedidos actualizados.
+    """
+    pending = Order.objects.filter(Q(customer_name='') | Q(customer_address=''))
+    pending = pending.order_by('id').only(
+        'id', 'user_id', 'customer_name', 'customer_address',
+        'shipping_address', 'shipping_city', 'shipping_state',
+        'shipping_postal_code', 'shipping_country',
+    )
+    updated = 0
+    last_id = 0
+    
+    while True:
+        orders = list(pending.filter(id__gt=last_id)[:batch_size])
+        if not orders:
+            break
+        last_id = orders[-1].id
+        
+        changed = []
+        for order in orders:
+            name = order.customer_name or names.get(order.user_id, '')
+            address = order.customer_address or order_address(order)
+            if (name, address) != (order.customer_name, order.customer_address):
+                order.customer_name, order.customer_address = name, address
+                changed.append(order)
+        
+        with transaction.atomic():
+            Order.objects.bulk_update(changed, ['customer_name', 'customer_address'])
+        
+        updated += len(changed)
+        logger.info('backfill_snapshots: %d pedidos actualizados (hasta id %d)', updated, last_id)
+        if progress:
+            progress(updated, last_id)
+    
+    return updated
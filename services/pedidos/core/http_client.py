@@ -0,0 +1,343 @@
+# ========================================
+# CLIENTE HTTP ENTRE SERVICIOS
+# ========================================
+#
+# Un cliente por servicio destino ("upstream") y por proceso:
+#   - Pool de conexiones con keep-alive (requests.Session + HTTPAdapter):
+#     las llamadas reutilizan conexiones en vez de abrir una por llamada.
+#   - Timeouts de conexión y lectura siempre (nunca esperar para siempre).
+#   - Reintentos acotados con espera exponencial y jitter, solo para
+#     métodos idempotentes y errores transitorios (conexión, 429, 502-504).
+#   - Circuit breaker: tras `failure_threshold` fallas seguidas el upstream
+#     queda "abierto" `reset_timeout` segundos y las llamadas fallan al
+#     instante (CircuitOpenError); después pasa una sola de prueba.
+#   - Hedging (opcional, solo GET): si la respuesta tarda más de
+#     `hedge_after` segundos se manda una segunda petición igual y se usa
+#     la primera que responda. Recorta la cola de latencia a cambio de un
+#     poco más de carga.
+#   - Métricas por upstream (en memoria del proceso): stats().
+#
+# Uso (ver core/customers.py, que lee el perfil del comprador en usuarios):
+#     from core.http_client import get_client
+#     response = get_client('usuarios').get('/api/users/5/', headers={...})
+#
+# Configuración (settings), opciones por upstream sobre DEFAULTS:
+#     INTERNAL_UPSTREAMS = {
+#         'usuarios': {'base_url': 'http://usuarios-service:8000', 'hedge_after': 0.2},
+#     }
+# Solo pedidos llama a otros servicios, así que el módulo vive solo aquí.
+
+import logging
+import os
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    'connect_timeout': 0.5,         # Segundos para abrir la conexión
+    'read_timeout': 3.0,            # Segundos esperando la respuesta
+    'retries': 2,                   # Reintentos (además del primer intento)
+    'backoff': 0.05,                # Espera base entre reintentos (se duplica)
+    'backoff_max': 1.0,
+    'pool_size': 20,                # Conexiones guardadas por upstream
+    'failure_threshold': 5,         # Fallas seguidas que abren el circuito
+    'reset_timeout': 10.0,          # Segundos abierto antes de probar de nuevo
+    'hedge_after': None,            # Segundos antes del GET de respaldo (None = sin hedging)
+}
+
+UPSTREAMS = {
+    'usuarios': {'base_url': 'http://usuarios-service:8000'},
+    'productos': {'base_url': 'http://productos-service:8000'},
+    'pedidos': {'base_url': 'http://pedidos-service:8000'},
+}
+
+IDEMPOTENT_METHODS = frozenset({'GET', 'HEAD', 'OPTIONS', 'PUT', 'DELETE'})
+RETRY_STATUSES = frozenset({429, 502, 503, 504})
+
+# Latencias que se guardan por upstream para los percentiles
+LATENCY_SAMPLES = 1000
+
+
+class UpstreamError(Exception):
+    """No se obtuvo respuesta del upstream"""
+
+
+class CircuitOpenError(UpstreamError):
+    """El circuito del upstream está abierto: la llamada ni se intentó"""
+
+
+# ========================================
+# CIRCUIT BREAKER
+# ========================================
+
+class CircuitBreaker:
+    """Cerrado -> abierto tras N fallas seguidas -> medio abierto (una prueba) -> cerrado"""
+    
+    def __init__(self, name, failure_threshold, reset_timeout):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = 'closed'
+        self.failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+    
+    def allow(self):
+        with self._lock:
+            if self.state == 'open':
+                if time.monotonic() - self._opened_at < self.reset_timeout:
+                    return False
+                self.state = 'half_open'
+                self._probing = False
+            if self.state == 'half_open':
+                if self._probing:
+                    return False        # Ya hay una llamada de prueba en curso
+                self._probing = True
+            return True
+    
+    def record_success(self):
+        with self._lock:
+            if self.state != 'closed':
+                logger.info('Upstream %s: circuito cerrado', self.name)
+            self.state = 'closed'
+            self.failures = 0
+            self._probing = False
+    
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == 'half_open' or self.failures >= self.failure_threshold:
+                if self.state != 'open':
+                    logger.warning('Upstream %s: circuito abierto tras %d fallas', self.name, self.failures)
+                self.state = 'open'
+                self._opened_at = time.monotonic()
+                self._probing = False
+
+
+# ========================================
+# MÉTRICAS
+# ========================================
+
+class UpstreamMetrics:
+    """Contadores y latencias recientes de un upstream"""
+    
+    COUNTERS = ('requests', 'errors', 'retries', 'rejected', 'hedges', 'hedge_wins')
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = dict.fromkeys(self.COUNTERS, 0)
+        self._statuses = {}
+        self._latencies = deque(maxlen=LATENCY_SAMPLES)
+    
+    def incr(self, counter):
+        with self._lock:
+            self._counters[counter] += 1
+    
+    def observe(self, seconds, status_code=None):
+        with self._lock:
+            self._latencies.append(seconds)
+            key = str(status_code) if status_code is not None else 'error'
+            self._statuses[key] = self._statuses.get(key, 0) + 1
+    
+    def snapshot(self):
+        with self._lock:
+            latencies = sorted(self._latencies)
+            counters = dict(self._counters)
+            statuses = dict(self._statuses)
+        
+        def percentile(fraction):
+            if not latencies:
+                return None
+            return round(latencies[min(len(latencies) - 1, int(len(latencies) * fraction))] * 1000, 2)
+        
+        return {
+            **counters,
+            'statuses': statuses,
+            'latency_ms': {'p50': percentile(0.5), 'p95': percentile(0.95), 'p99': percentile(0.99)},
+        }
+
+
+# ========================================
+# CLIENTE
+# ========================================
+
+class UpstreamClient:
+    """Cliente HTTP hacia un servicio (seguro entre hilos)"""
+    
+    def __init__(self, name, base_url, **options):
+        self.name = name
+        self.base_url = base_url.rstrip('/')
+        self.options = {**DEFAULTS, **options}
+        self.breaker = CircuitBreaker(name, self.options['failure_threshold'], self.options['reset_timeout'])
+        self.metrics = UpstreamMetrics()
+        
+        # max_retries=0: los reintentos los decide este cliente
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.options['pool_size'], max_retries=0)
+        self.session = requests.Session()
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        
+        self._executor = None
+        self._executor_lock = threading.Lock()
+    
+    def get(self, path, **kwargs):
+        return self.request('GET', path, **kwargs)
+    
+    def post(self, path, **kwargs):
+        return self.request('POST', path, **kwargs)
+    
+    def put(self, path, **kwargs):
+        return self.request('PUT', path, **kwargs)
+    
+    def delete(self, path, **kwargs):
+        return self.request('DELETE', path, **kwargs)
+    
+    def request(self, method, path, idempotent=None, **kwargs):
+        """
+        Hace la petición con reintentos, circuit breaker y hedging
+        
+        Retorna el requests.Response (también los 4xx/5xx: el llamador
+        decide). Lanza CircuitOpenError si el circuito está abierto y
+        UpstreamError si no hubo respuesta tras los reintentos.
+        `idempotent` fuerza si se puede reintentar (por defecto, según el método).
+        """
+        method = method.upper()
+        if idempotent is None:
+            idempotent = method in IDEMPOTENT_METHODS
+        kwargs.setdefault('timeout', (self.options['connect_timeout'], self.options['read_timeout']))
+        url = f'{self.base_url}/{path.lstrip("/")}'
+        hedge_after = self.options['hedge_after'] if method == 'GET' else None
+        
+        attempts = 1 + (self.options['retries'] if idempotent else 0)
+        last_error = None
+        for attempt in range(attempts):
+            if attempt:
+                self.metrics.incr('retries')
+                time.sleep(self._backoff(attempt))
+            
+            try:
+                if hedge_after is not None:
+                    response = self._hedged(method, url, hedge_after, kwargs)
+                else:
+                    response = self._attempt(method, url, kwargs)
+            except CircuitOpenError:
+                raise
+            except requests.RequestException as exc:
+                last_error = exc
+                continue
+            
+            if response.status_code not in RETRY_STATUSES or attempt == attempts - 1:
+                return response
+        
+        raise UpstreamError(f'{self.name}: sin respuesta tras {attempts} intentos ({last_error})') from last_error
+    
+    def _backoff(self, attempt):
+        # "Full jitter": al azar entre 0 y la espera exponencial
+        ceiling = min(self.options['backoff'] * 2 ** (attempt - 1), self.options['backoff_max'])
+        return random.uniform(0, ceiling)
+    
+    def _attempt(self, method, url, kwargs):
+        """Un intento, contado por el breaker y las métricas"""
+        if not self.breaker.allow():
+            self.metrics.incr('rejected')
+            raise CircuitOpenError(f'{self.name}: circuito abierto')
+        
+        self.metrics.incr('requests')
+        start = time.perf_counter()
+        try:
+            response = self.session.request(method, url, **kwargs)
+        except requests.RequestException:
+            self.metrics.incr('errors')
+            self.metrics.observe(time.perf_counter() - start)
+            self.breaker.record_failure()
+            raise
+        
+        self.metrics.observe(time.perf_counter() - start, response.status_code)
+        if response.status_code in RETRY_STATUSES or response.status_code >= 500:
+            self.breaker.record_failure()
+        else:
+            self.breaker.record_success()
+        return response
+    
+    def _hedged(self, method, url, hedge_after, kwargs):
+        """GET con una segunda petición si la primera tarda más de `hedge_after`"""
+        executor = self._get_executor()
+        primary = executor.submit(self._attempt, method, url, kwargs)
+        done, _ = wait([primary], timeout=hedge_after)
+        if done or self.breaker.state != 'closed':
+            return primary.result()
+        
+        self.metrics.incr('hedges')
+        backup = executor.submit(self._attempt, method, url, kwargs)
+        pending = {primary, backup}
+        first_error = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    if future is backup:
+                        self.metrics.incr('hedge_wins')
+                    return future.result()
+                first_error = first_error or future.exception()
+        raise first_error
+    
+    def _get_executor(self):
+        if self._executor is None:
+            with self._executor_lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=self.options['pool_size'], thread_name_prefix=f'hedge-{self.name}'
+                    )
+        return self._executor
+    
+    def stats(self):
+        return {
+            **self.metrics.snapshot(),
+            'circuit': self.breaker.state,
+            'consecutive_failures': self.breaker.failures,
+        }
+
+
+# ========================================
+# CLIENTES POR PROCESO
+# ========================================
+
+_clients = {}
+_clients_pid = None
+_clients_lock = threading.Lock()
+
+
+def upstream_options(name):
+    configured = getattr(settings, 'INTERNAL_UPSTREAMS', {})
+    options = {**UPSTREAMS.get(name, {}), **configured.get(name, {})}
+    if 'base_url' not in options:
+        raise KeyError(f'Upstream desconocido: {name}')
+    return options
+
+
+def get_client(name):
+    """Cliente compartido del upstream `name` (uno por proceso: los pools no sobreviven a un fork)"""
+    global _clients_pid
+    with _clients_lock:
+        if _clients_pid != os.getpid():
+            _clients.clear()
+            _clients_pid = os.getpid()
+        if name not in _clients:
+            _clients[name] = UpstreamClient(name, **upstream_options(name))
+        return _clients[name]
+
+
+def stats():
+    """Métricas de todos los upstreams usados por este proceso"""
+    with _clients_lock:
+        clients = dict(_clients) if _clients_pid == os.getpid() else {}
+    return {name: client.stats() for name, client in clients.items()}
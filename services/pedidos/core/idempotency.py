@@ -0,0 +1,124 @@
+# ========================================
+# IDEMPOTENCIA - HEADER Idempotency-Key
+# ========================================
+#
+# Si el gateway corta por timeout, el cliente reintenta el checkout y antes
+# se creaba un segundo pedido. Con el header Idempotency-Key:
+#   1. Se inserta la clave (usuario, clave) al empezar la transacción.
+#   2. Se crea el pedido y se guarda la respuesta en esa fila.
+#   3. Commit: la clave y el pedido existen juntos, o ninguno.
+# Un reintento encuentra la fila y recibe la respuesta guardada. Un
+# duplicado que llega MIENTRAS el original corre queda esperando en el
+# INSERT (índice único) hasta que el original confirma, y entonces también
+# recibe la respuesta guardada: no se ejecuta dos veces.
+# Las claves vencen a las IDEMPOTENCY_KEY_TTL horas (el relay borra las
+# vencidas; una clave vencida se puede volver a usar).
+
+import hashlib
+import json
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.response import Response
+
+from .models import IdempotencyKey
+
+HEADER = 'Idempotency-Key'
+
+# Horas que se guarda cada clave
+KEY_TTL_HOURS = getattr(settings, 'IDEMPOTENCY_KEY_TTL', 24)
+
+MAX_KEY_LENGTH = 255
+
+
+def request_fingerprint(request):
+    """SHA-256 de método, ruta y cuerpo (ya parseado) de la petición"""
+    body = json.dumps(request.data, cls=DjangoJSONEncoder, sort_keys=True, default=str)
+    content = f'{request.method} {request.path}\n{body}'
+    return hashlib.sha256(content.encode('utf-8')).hexdigest()
+
+
+def _replay(record, fingerprint):
+    if record.fingerprint != fingerprint:
+        return Response(
+            {'error': f'La {HEADER} ya se usó con otra petición'},
+            status=status.HTTP_422_UNPROCESSABLE_ENTITY
+        )
+    response = Response(record.response, status=record.status_code)
+    response['Idempotent-Replayed'] = 'true'
+    return response
+
+
+def _claim(user_id, key, fingerprint):
+    """
+    Inserta la clave; si ya existe retorna la fila guardada
+    
+    Retorna (fila_nueva, None) o (None, fila_existente).
+    """
+    now = timezone.now()
+    for _ in range(2):
+        try:
+            with transaction.atomic():
+                return IdempotencyKey.objects.create(
+                    user_id=user_id,
+                    key=key,
+                    fingerprint=fingerprint,
+                    status_code=0,
+                    expires_at=now + timedelta(hours=KEY_TTL_HOURS),
+                ), None
+        except IntegrityError:
+            existing = IdempotencyKey.objects.filter(user_id=user_id, key=key).first()
+            if existing is not None and existing.expires_at > now:
+                return None, existing
+            # Vencida (o borrada entre medio): liberarla y volver a intentar
+            IdempotencyKey.objects.filter(user_id=user_id, key=key, expires_at__lte=now).delete()
+    raise IntegrityError(f'No se pudo reservar la {HEADER} {key!r}')
+
+
+def run_idempotent(request, create):
+    """
+    Ejecuta `create()` una sola vez por Idempotency-Key del usuario
+    
+    `create()` retorna (pedido, Response). Sin header se ejecuta siempre.
+    Solo se guardan las respuestas exitosas: si `create()` falla (ej: error
+    de validación) la transacción se revierte con la clave, y el cliente
+    puede reintentar con la misma clave.
+    """
+    key = request.headers.get(HEADER)
+    if not key:
+        return create()[1]
+    
+    if len(key) > MAX_KEY_LENGTH:
+        return Response(
+            {'error': f'{HEADER} no puede tener más de {MAX_KEY_LENGTH} caracteres'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    fingerprint = request_fingerprint(request)
+    
+    with transaction.atomic():
+        record, existing = _claim(request.user.id, key, fingerprint)
+        if existing is not None:
+            return _replay(existing, fingerprint)
+        
+        order, response = create()
+        if response.status_code >= 400:
+            transaction.set_rollback(True)
+            return response
+        
+        record.order = order
+        record.status_code = response.status_code
+        record.response = response.data
+        record.save(update_fields=['order', 'status_code', 'response'])
+    
+    return response
+
+
+def purge_expired_keys():
+    """Borra las claves vencidas"""
+    deleted, _ = IdempotencyKey.objects.filter(expires_at__lte=timezone.now()).delete()
+    return deleted
@@ -0,0 +1,36 @@
+# ========================================
+# COMANDO - ARCHIVAR PEDIDOS ANTIGUOS
+# ========================================
+# Mueve al archivo los pedidos entregados/cancelados más antiguos que la
+# retención (ORDER_ARCHIVE_AFTER_DAYS). Correrlo periódicamente (cron):
+#   python manage.py archive_orders
+#   python manage.py archive_orders --days 180 --dry-run
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.archive import ARCHIVE_AFTER_DAYS, archivable_orders, archive_orders
+
+
+class Command(BaseCommand):
+    help = 'Archiva por lotes los pedidos terminados más antiguos que la retención'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=ARCHIVE_AFTER_DAYS,
+                            help=f'Retención en días (por defecto {ARCHIVE_AFTER_DAYS})')
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--dry-run', action='store_true', help='Solo contar los pedidos a archivar')
+    
+    def handle(self, *args, **options):
+        if options['days'] < 1:
+            raise CommandError('--days debe ser mayor que 0')
+        
+        if options['dry_run']:
+            pending = archivable_orders(options['days']).count()
+            self.stdout.write(f'{pending} pedidos se archivarían')
+            return
+        
+        def progress(archived, last_id):
+            self.stdout.write(f'  {archived} pedidos archivados (hasta id {last_id})')
+        
+        archived = archive_orders(options['days'], options['batch_size'], progress=progress)
+        self.stdout.write(self.style.SUCCESS(f'{archived} pedidos archivados'))
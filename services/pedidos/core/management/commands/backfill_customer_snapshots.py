@@ -0,0 +1,41 @@
+# ========================================
+# COMANDO - COMPLETAR LA COPIA DEL CLIENTE EN PEDIDOS VIEJOS
+# ========================================
+# Los pedidos creados antes de guardar la copia del cliente la tienen vacía.
+# Primero se exportan los clientes desde usuarios (un archivo, sin llamadas
+# entre servicios) y luego se completan los pedidos por lotes:
+#   (usuarios) python manage.py export_customers > clientes.jsonl
+#   (pedidos)  python manage.py backfill_customer_snapshots clientes.jsonl
+#   (pedidos)  python manage.py backfill_customer_snapshots -    # Desde stdin
+
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.customers import BATCH_SIZE, backfill_snapshots, load_customers
+
+
+class Command(BaseCommand):
+    help = 'Completa por lotes el nombre y la dirección del cliente en los pedidos'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('customers', help='Archivo JSONL de export_customers ("-" para stdin)')
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+    
+    def handle(self, *args, **options):
+        try:
+            if options['customers'] == '-':
+                names = load_customers(sys.stdin)
+            else:
+                with open(options['customers'], encoding='utf-8') as lines:
+                    names = load_customers(lines)
+        except (OSError, ValueError) as exc:
+            raise CommandError(str(exc))
+        
+        self.stdout.write(f'{len(names)} clientes cargados')
+        
+        def progress(updated, last_id):
+            self.stdout.write(f'  {updated} pedidos actualizados (hasta id {last_id})')
+        
+        updated = backfill_snapshots(names, options['batch_size'], progress=progress)
+        self.stdout.write(self.style.SUCCESS(f'{updated} pedidos actualizados'))
@@ -0,0 +1,43 @@
+# ========================================
+# COMANDO - CAMBIO DE ESTADO MASIVO
+# ========================================
+# Para volúmenes que no caben en una petición del admin. Uso:
+#   python manage.py bulk_order_status shipped --from confirmed
+#   python manage.py bulk_order_status cancelled --from pending --before 2024-01-01
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+
+from core.bulk import bulk_transition
+from core.models import Order
+
+
+class Command(BaseCommand):
+    help = 'Cambia el estado de muchos pedidos por lotes, mostrando el avance'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('status', choices=[choice for choice, _ in Order.STATUS_CHOICES])
+        parser.add_argument('--from', dest='from_status', action='append',
+                            help='Solo pedidos en este estado (se puede repetir)')
+        parser.add_argument('--before', help='Solo pedidos creados antes de esta fecha (AAAA-MM-DD)')
+        parser.add_argument('--batch-size', type=int, default=1000)
+    
+    def handle(self, *args, **options):
+        queryset = Order.objects.all()
+        
+        if options['from_status']:
+            queryset = queryset.filter(status__in=options['from_status'])
+        
+        if options['before']:
+            before = parse_date(options['before'])
+            if before is None:
+                raise CommandError('--before debe tener el formato AAAA-MM-DD')
+            queryset = queryset.filter(created_at__date__lt=before)
+        
+        def progress(updated, last_id):
+            self.stdout.write(f'  {updated} pedidos actualizados (hasta id {last_id})')
+        
+        updated = bulk_transition(
+            queryset, options['status'], options['batch_size'], progress=progress
+        )
+        self.stdout.write(self.style.SUCCESS(f"{updated} pedidos pasaron a '{options['status']}'"))
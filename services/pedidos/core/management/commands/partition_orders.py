@@ -0,0 +1,63 @@
+# ========================================
+# COMANDO - PARTICIONES MENSUALES DE PEDIDOS (POSTGRESQL)
+# ========================================
+# Ver core/partitions.py. Uso:
+#   python manage.py partition_orders --convert --dry-run   # ver el SQL
+#   python manage.py partition_orders --convert             # una vez, en mantenimiento
+#   python manage.py partition_orders                       # cron: crear meses futuros
+#   python manage.py partition_orders --drop-empty          # quitar meses ya archivados
+#   python manage.py partition_orders --check               # verificar core_order_key
+
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import NotSupportedError
+from django.utils import timezone
+
+from core import partitions
+from core.archive import ARCHIVE_AFTER_DAYS
+
+
+class Command(BaseCommand):
+    help = 'Convierte y mantiene las particiones mensuales de pedidos e items'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--convert', action='store_true',
+                            help='Convertir las tablas existentes (copia las filas)')
+        parser.add_argument('--drop-empty', action='store_true',
+                            help='Eliminar particiones vacías más antiguas que la retención del archivo')
+        parser.add_argument('--check', action='store_true',
+                            help='Verificar que core_order_key coincida con los pedidos')
+        parser.add_argument('--months-ahead', type=int, default=partitions.MONTHS_AHEAD)
+        parser.add_argument('--dry-run', action='store_true', help='Mostrar el SQL sin ejecutarlo')
+    
+    def handle(self, *args, **options):
+        execute = not options['dry_run']
+        
+        try:
+            if options['check']:
+                return self._check()
+            if options['convert']:
+                statements = partitions.convert_tables(options['months_ahead'], execute)
+            elif options['drop_empty']:
+                before = (timezone.now() - timedelta(days=ARCHIVE_AFTER_DAYS)).date()
+                statements = partitions.drop_empty_partitions(before, execute)
+            else:
+                statements = partitions.ensure_partitions(options['months_ahead'], execute)
+        except NotSupportedError as error:
+            raise CommandError(str(error))
+        
+        for sql in statements:
+            self.stdout.write(f'{sql};')
+        
+        verb = 'se ejecutarían' if options['dry_run'] else 'ejecutadas'
+        self.stdout.write(self.style.SUCCESS(f'{len(statements)} sentencias {verb}'))
+    
+    def _check(self):
+        missing = partitions.check_order_keys()
+        if missing is None:
+            self.stdout.write('Pedidos sin particionar: order_number es UNIQUE en la tabla')
+        elif missing:
+            raise CommandError(f'{missing} pedido(s) sin su fila en {partitions.KEY_TABLE}')
+        else:
+            self.stdout.write(self.style.SUCCESS(f'{partitions.KEY_TABLE} coincide con los pedidos'))
@@ -0,0 +1,17 @@
+# ========================================
+# COMANDO - RECALCULAR ROLLUPS DE PEDIDOS
+# ========================================
+# Carga inicial o auditoría de los resúmenes (normalmente se mantienen solos):
+#   python manage.py rebuild_order_rollups
+
+from django.core.management.base import BaseCommand
+
+from core.rollups import rebuild_rollups
+
+
+class Command(BaseCommand):
+    help = 'Recalcula desde cero los resúmenes por usuario y por día de los pedidos'
+    
+    def handle(self, *args, **options):
+        users = rebuild_rollups()
+        self.stdout.write(self.style.SUCCESS(f'Rollups recalculados ({users} usuarios)'))
@@ -0,0 +1,60 @@
+# ========================================
+# COMANDO - RELAY DEL OUTBOX
+# ========================================
+# Uso:
+#   python manage.py relay_outbox            # Proceso continuo
+#   python manage.py relay_outbox --once     # Un solo lote (cron / tests)
+
+import time
+
+from django.core.management.base import BaseCommand
+
+from core.broker import get_broker
+from core.idempotency import purge_expired_keys
+from core.outbox import purge_published, relay_batch
+
+
+class Command(BaseCommand):
+    help = 'Publica en lotes los eventos pendientes del outbox de pedidos'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=100)
+        parser.add_argument('--interval', type=float, default=1.0,
+                            help='Segundos de espera cuando no hay eventos')
+        parser.add_argument('--retention-days', type=int, default=7,
+                            help='Días que se guardan los eventos ya publicados')
+        parser.add_argument('--once', action='store_true',
+                            help='Publicar un solo lote y salir')
+
+    def handle(self, *args, **options):
+        broker = get_broker()
+
+        if options['once']:
+            published = relay_batch(broker, options['batch_size'])
+            self.stdout.write(f'{published} eventos publicados')
+            return
+
+        last_purge = 0
+        while True:
+            try:
+                published = relay_batch(broker, options['batch_size'])
+            except Exception as exc:
+                # El lote se reintenta en la próxima vuelta
+                self.stderr.write(f'Error publicando eventos: {exc}')
+                published = 0
+
+            if published:
+                continue                # Hay más pendientes: seguir sin esperar
+
+            # Sin pendientes: limpiar publicados viejos y claves de
+            # idempotencia vencidas (una vez por hora)
+            if time.monotonic() - last_purge > 3600:
+                try:
+                    purge_published(options['retention_days'])
+                    purge_expired_keys()
+                except Exception as exc:
+                    # Se reintenta en la próxima hora; el relay sigue
+                    self.stderr.write(f'Error limpiando el outbox: {exc}')
+                last_purge = time.monotonic()
+
+            time.sleep(options['interval'])
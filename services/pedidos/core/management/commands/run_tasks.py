@@ -0,0 +1,63 @@
+# ========================================
+# COMANDO - WORKER DE TAREAS EN SEGUNDO PLANO
+# ========================================
+# Uso:
+#   python manage.py run_tasks               # Proceso continuo
+#   python manage.py run_tasks --once        # Un solo lote (cron / tests)
+#   python manage.py run_tasks --stats       # Métricas de la cola
+
+import json
+import time
+
+from django.core.management.base import BaseCommand
+
+from core.tasks import purge_finished, queue_stats, requeue_stale, run_batch
+
+MAINTENANCE_SECONDS = 60
+
+
+class Command(BaseCommand):
+    help = 'Ejecuta las tareas en segundo plano de pedidos (correos, etc.)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=10)
+        parser.add_argument('--interval', type=float, default=1.0,
+                            help='Segundos de espera cuando no hay tareas')
+        parser.add_argument('--retention-days', type=int, default=7,
+                            help='Días que se guardan las tareas terminadas')
+        parser.add_argument('--once', action='store_true',
+                            help='Ejecutar un solo lote y salir')
+        parser.add_argument('--stats', action='store_true',
+                            help='Mostrar profundidad y latencia de la cola y salir')
+
+    def handle(self, *args, **options):
+        if options['stats']:
+            self.stdout.write(json.dumps(queue_stats(), indent=2))
+            return
+        
+        if options['once']:
+            executed = run_batch(options['batch_size'])
+            self.stdout.write(f'{executed} tareas ejecutadas')
+            return
+        
+        last_maintenance = 0
+        while True:
+            try:
+                executed = run_batch(options['batch_size'])
+            except Exception as exc:
+                # Las tareas tomadas vuelven a la cola con requeue_stale
+                self.stderr.write(f'Error ejecutando tareas: {exc}')
+                executed = 0
+            
+            # Cada minuto, haya o no tareas: recuperar las de workers
+            # caídos y borrar las terminadas viejas
+            if time.monotonic() - last_maintenance > MAINTENANCE_SECONDS:
+                try:
+                    requeue_stale()
+                    purge_finished(options['retention_days'])
+                except Exception as exc:
+                    self.stderr.write(f'Error en el mantenimiento de la cola: {exc}')
+                last_maintenance = time.monotonic()
+            
+            if not executed:
+                time.sleep(options['interval'])
@@ -2,8 +2,41 @@
 # MODELS - SERVICIO PEDIDOS
 # ========================================
 
+from django.core.serializers.json import DjangoJSONEncoder
 from django.db import models
+from django.db.models import F
 from django.core.validators import MinValueValidator
+from django.utils import timezone
+
+
+class OrderQuerySet(models.QuerySet):
+    """Operaciones atómicas sobre pedidos"""
+    
+    def transition(self, order_id, new_status, expected_version=None, **fields):
+        """
+        Cambia el estado con UN solo UPDATE condicional:
+        
+            UPDATE ... SET status = <nuevo>, version = version + 1
+            WHERE id = <id> AND status IN (<estados que pueden pasar a nuevo>)
+        
+        Si otro proceso cambió el pedido antes, el WHERE no coincide y no
+        se pisa nada. Con `expected_version` además exige esa versión
+        (bloqueo optimista). Retorna True si se aplicó el cambio.
+        """
+        sources = Order.sources_for(new_status)
+        if not sources:
+            return False
+        
+        queryset = self.filter(id=order_id, status__in=sources)
+        if expected_version is not None:
+            queryset = queryset.filter(version=expected_version)
+        
+        return queryset.update(
+            status=new_status,
+            version=F('version') + 1,
+            updated_at=timezone.now(),
+            **fields
+        ) == 1
 
 
 class Order(models.Model):
@@ -21,6 +54,16 @@ class Order(models.Model):
         ('cancelled', 'Cancelado'),
     )
     
+    # Transiciones permitidas (máquina de estados)
+    # Entregado y cancelado son estados finales
+    ALLOWED_TRANSITIONS = {
+        'pending': ('confirmed', 'cancelled'),
+        'confirmed': ('shipped', 'cancelled'),
+        'shipped': ('delivered', 'cancelled'),
+        'delivered': (),
+        'cancelled': (),
+    }
+    
     # ========================================
     # CAMPOS PRINCIPALES
     # ========================================
@@ -30,7 +73,8 @@ class Order(models.Model):
         help_text="ID del usuario que hizo el pedido"
     )
     
-    # Número de orden único
+    # Número de orden único (con la tabla particionada lo garantiza
+    # core_order_key, ver core/partitions.py)
     order_number = models.CharField(
         max_length=50,
         unique=True,
@@ -44,6 +88,12 @@ class Order(models.Model):
         help_text="Estado del pedido"
     )
     
+    # Se incrementa en cada cambio (bloqueo optimista)
+    version = models.PositiveIntegerField(
+        default=1,
+        help_text="Versión del pedido (aumenta con cada cambio)"
+    )
+    
     # ========================================
     # TOTALES
     # ========================================
@@ -129,6 +179,22 @@ class Order(models.Model):
         help_text="Teléfono del cliente"
     )
     
+    # Copia del cliente al momento de la compra (ver core/customers.py):
+    # listados y admin la muestran sin consultar al servicio de usuarios
+    customer_name = models.CharField(
+        max_length=300,
+        blank=True,
+        default='',
+        help_text="Nombre del cliente al momento de la compra"
+    )
+    
+    customer_address = models.CharField(
+        max_length=500,
+        blank=True,
+        default='',
+        help_text="Dirección completa formateada al momento de la compra"
+    )
+    
     # ========================================
     # NOTAS
     # ========================================
@@ -167,6 +233,8 @@ class Order(models.Model):
             models.Index(fields=['status']),
         ]
     
+    objects = OrderQuerySet.as_manager()
+    
     def __str__(self):
         return f"Pedido {self.order_number}"
     
@@ -174,13 +242,25 @@ class Order(models.Model):
     # MÉTODOS ÚTILES
     # ========================================
     
+    @classmethod
+    def sources_for(cls, new_status):
+        """Estados desde los que se puede pasar a `new_status`"""
+        return [
+            source for source, targets in cls.ALLOWED_TRANSITIONS.items()
+            if new_status in targets
+        ]
+    
+    def can_transition_to(self, new_status):
+        """¿Se puede pasar del estado actual a `new_status`?"""
+        return new_status in self.ALLOWED_TRANSITIONS.get(self.status, ())
+    
     def calculate_total(self):
         """Calcula el total del pedido"""
         self.subtotal = sum(
             item.get_total() for item in self.items.all()
         )
         self.total = self.subtotal + self.tax + self.shipping_cost - self.discount
-        self.save()
+        self.save(update_fields=['subtotal', 'total', 'updated_at'])
         return self.total
 
 
@@ -265,4 +345,439 @@ class OrderItem(models.Model):
     
     def get_total(self):
         """Calcula el total para este item"""
-        return self.price * self.quantity
\ No newline at end of file
+        return self.price * self.quantity
+
+
+class OutboxEvent(models.Model):
+    """
+    Evento pendiente de publicar (patrón "transactional outbox")
+    
+    Se escribe en la MISMA transacción que el cambio del pedido, así el
+    evento existe si y solo si el cambio se guardó. El relay
+    (manage.py relay_outbox) los publica en lotes al broker.
+    """
+    
+    # ========================================
+    # CAMPOS
+    # ========================================
+    
+    event_type = models.CharField(
+        max_length=50,
+        help_text="Tipo de evento (ej: order.created, order.cancelled)"
+    )
+    
+    aggregate_id = models.BigIntegerField(
+        help_text="ID del pedido al que pertenece el evento"
+    )
+    
+    payload = models.JSONField(
+        default=dict,
+        help_text="Datos del evento"
+    )
+    
+    # ========================================
+    # TIMESTAMPS
+    # ========================================
+    
+    created_at = models.DateTimeField(
+        auto_now_add=True,
+        help_text="Fecha de creación"
+    )
+    
+    published_at = models.DateTimeField(
+        blank=True,
+        null=True,
+        help_text="Fecha de publicación (vacío = pendiente)"
+    )
+    
+    # ========================================
+    # CONFIGURACIÓN DEL MODELO
+    # ========================================
+    
+    class Meta:
+        verbose_name = 'Evento (outbox)'
+        verbose_name_plural = 'Eventos (outbox)'
+        ordering = ['id']
+        indexes = [
+            # El relay solo recorre los pendientes: índice parcial pequeño
+            models.Index(
+                fields=['id'],
+                name='outbox_pending_idx',
+                condition=models.Q(published_at__isnull=True),
+            ),
+            models.Index(fields=['published_at']),
+        ]
+    
+    def __str__(self):
+        return f"{self.event_type} #{self.aggregate_id}"
+    
+    def to_message(self):
+        """Mensaje que se publica en el broker"""
+        return {
+            'id': self.id,
+            'type': self.event_type,
+            'aggregate_id': self.aggregate_id,
+            'payload': self.payload,
+            'created_at': self.created_at.isoformat(),
+        }
+
+
+class UserOrderSummary(models.Model):
+    """
+    Resumen de pedidos por usuario (rollup, ver core/rollups.py)
+    
+    Se actualiza en la misma transacción que crea o cambia cada pedido:
+    leer el resumen de un usuario es una fila, sin recorrer sus pedidos.
+    """
+    
+    user_id = models.IntegerField(
+        unique=True,
+        help_text="ID del usuario"
+    )
+    
+    order_count = models.PositiveIntegerField(
+        default=0,
+        help_text="Pedidos realizados"
+    )
+    
+    cancelled_count = models.PositiveIntegerField(
+        default=0,
+        help_text="Pedidos cancelados"
+    )
+    
+    lifetime_spend = models.DecimalField(
+        max_digits=14,
+        decimal_places=2,
+        default=0,
+        help_text="Total gastado (sin pedidos cancelados)"
+    )
+    
+    last_order_at = models.DateTimeField(
+        blank=True,
+        null=True,
+        help_text="Fecha del último pedido"
+    )
+    
+    last_order_number = models.CharField(
+        max_length=50,
+        blank=True,
+        help_text="Número del último pedido"
+    )
+    
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        help_text="Fecha de actualización"
+    )
+    
+    class Meta:
+        verbose_name = 'Resumen de usuario'
+        verbose_name_plural = 'Resúmenes de usuarios'
+    
+    def __str__(self):
+        return f"Usuario {self.user_id}: {self.order_count} pedidos"
+
+
+class DailyOrderStats(models.Model):
+    """
+    Pedidos e ingresos por día de creación y estado actual (rollup)
+    
+    Cuando un pedido cambia de estado, se mueve de la fila (día, anterior)
+    a la fila (día, nuevo).
+    """
+    
+    day = models.DateField(
+        help_text="Día de creación de los pedidos"
+    )
+    
+    status = models.CharField(
+        max_length=20,
+        choices=Order.STATUS_CHOICES,
+        help_text="Estado actual de los pedidos"
+    )
+    
+    order_count = models.IntegerField(
+        default=0,
+        help_text="Cantidad de pedidos"
+    )
+    
+    revenue = models.DecimalField(
+        max_digits=14,
+        decimal_places=2,
+        default=0,
+        help_text="Suma de los totales"
+    )
+    
+    class Meta:
+        verbose_name = 'Estadística diaria'
+        verbose_name_plural = 'Estadísticas diarias'
+        ordering = ['-day', 'status']
+        constraints = [
+            models.UniqueConstraint(fields=['day', 'status'], name='unique_daily_status'),
+        ]
+    
+    def __str__(self):
+        return f"{self.day} {self.status}: {self.order_count}"
+
+
+class ArchivedOrder(models.Model):
+    """
+    Pedido archivado (almacenamiento frío, ver core/archive.py)
+    
+    Los pedidos entregados o cancelados más antiguos que la retención salen
+    de las tablas de pedidos e items y quedan aquí: unas pocas columnas para
+    buscarlos y el detalle completo (pedido + items) como JSON comprimido.
+    """
+    
+    # ID original del pedido (el detalle se sigue pidiendo por este ID)
+    order_id = models.BigIntegerField(
+        unique=True,
+        help_text="ID que tenía el pedido"
+    )
+    
+    order_number = models.CharField(
+        max_length=50,
+        unique=True,
+        help_text="Número único del pedido"
+    )
+    
+    user_id = models.IntegerField(
+        db_index=True,
+        help_text="ID del usuario que hizo el pedido"
+    )
+    
+    status = models.CharField(
+        max_length=20,
+        choices=Order.STATUS_CHOICES,
+        help_text="Estado final del pedido"
+    )
+    
+    total = models.DecimalField(
+        max_digits=10,
+        decimal_places=2,
+        help_text="Total del pedido"
+    )
+    
+    created_at = models.DateTimeField(
+        help_text="Fecha de creación del pedido"
+    )
+    
+    # Detalle del pedido (OrderDetailSerializer) en JSON comprimido con zlib
+    payload = models.BinaryField(
+        help_text="Detalle del pedido comprimido"
+    )
+    
+    archived_at = models.DateTimeField(
+        auto_now_add=True,
+        help_text="Fecha de archivo"
+    )
+    
+    class Meta:
+        verbose_name = 'Pedido archivado'
+        verbose_name_plural = 'Pedidos archivados'
+        ordering = ['-created_at']
+    
+    def __str__(self):
+        return f"Pedido {self.order_number} (archivado)"
+
+
+class IdempotencyKey(models.Model):
+    """
+    Idempotency-Key de una petición que crea pedidos (ver core/idempotency.py)
+    
+    Se guarda en la MISMA transacción que el pedido, con la respuesta que
+    se envió: un reintento con la misma clave recibe esa respuesta sin
+    crear otro pedido.
+    """
+    
+    user_id = models.IntegerField(
+        help_text="ID del usuario que envió la petición"
+    )
+    
+    key = models.CharField(
+        max_length=255,
+        help_text="Valor del header Idempotency-Key"
+    )
+    
+    # Hash de método, ruta y cuerpo: la misma clave con otra petición es un error
+    fingerprint = models.CharField(
+        max_length=64,
+        help_text="SHA-256 de la petición original"
+    )
+    
+    order = models.ForeignKey(
+        Order,
+        on_delete=models.SET_NULL,
+        blank=True,
+        null=True,
+        related_name='+',
+        help_text="Pedido creado por la petición"
+    )
+    
+    status_code = models.PositiveSmallIntegerField(
+        help_text="Código HTTP de la respuesta guardada"
+    )
+    
+    response = models.JSONField(
+        default=dict,
+        encoder=DjangoJSONEncoder,
+        help_text="Cuerpo de la respuesta guardada"
+    )
+    
+    created_at = models.DateTimeField(
+        auto_now_add=True,
+        help_text="Fecha de creación"
+    )
+    
+    expires_at = models.DateTimeField(
+        db_index=True,
+        help_text="Desde esta fecha la clave se puede reutilizar"
+    )
+    
+    class Meta:
+        verbose_name = 'Clave de idempotencia'
+        verbose_name_plural = 'Claves de idempotencia'
+        constraints = [
+            models.UniqueConstraint(fields=['user_id', 'key'], name='unique_idempotency_key'),
+        ]
+    
+    def __str__(self):
+        return f"{self.key} (usuario {self.user_id})"
+
+
+class OrderNumberNode(models.Model):
+    """
+    Préstamo de un nodo a un proceso que genera números de pedido (ver core/order_numbers.py)
+    
+    Hay a lo sumo NODE_COUNT filas, una por nodo. Un proceso usa el nodo
+    mientras renueva leased_until; al salir borra la fila y, si muere sin
+    borrarla, el nodo vuelve a estar libre cuando vence el préstamo.
+    """
+    
+    node = models.PositiveSmallIntegerField(
+        unique=True,
+        help_text="Nodo (0 a NODE_COUNT - 1)"
+    )
+    
+    token = models.CharField(
+        max_length=32,
+        help_text="Identifica al préstamo vigente (cambia al reasignar el nodo)"
+    )
+    
+    hostname = models.CharField(
+        max_length=255,
+        help_text="Host del proceso"
+    )
+    
+    pid = models.PositiveIntegerField(
+        help_text="PID del proceso"
+    )
+    
+    leased_until = models.DateTimeField(
+        db_index=True,
+        help_text="Vencimiento del préstamo (se renueva mientras el proceso vive)"
+    )
+    
+    created_at = models.DateTimeField(
+        auto_now_add=True,
+        help_text="Fecha de asignación"
+    )
+    
+    class Meta:
+        verbose_name = 'Nodo de numeración'
+        verbose_name_plural = 'Nodos de numeración'
+    
+    def __str__(self):
+        return f"Nodo {self.node} ({self.hostname}:{self.pid})"
+
+
+class Task(models.Model):
+    """
+    Tarea en segundo plano (cola en la base de datos, ver core/tasks.py)
+    
+    Se encola en la misma transacción que el cambio que la origina (ej: el
+    pedido), así existe si y solo si el cambio se guardó. El worker
+    (manage.py run_tasks) las toma con SELECT ... FOR UPDATE SKIP LOCKED.
+    """
+    
+    STATUS_CHOICES = (
+        ('queued', 'En cola'),
+        ('running', 'Ejecutando'),
+        ('done', 'Terminada'),
+        ('dead', 'Fallida (sin más reintentos)'),
+    )
+    
+    name = models.CharField(
+        max_length=100,
+        help_text="Nombre de la tarea registrada"
+    )
+    
+    payload = models.JSONField(
+        default=dict,
+        encoder=DjangoJSONEncoder,
+        help_text="Argumentos de la tarea"
+    )
+    
+    status = models.CharField(
+        max_length=10,
+        choices=STATUS_CHOICES,
+        default='queued',
+        help_text="Estado de la tarea"
+    )
+    
+    attempts = models.PositiveSmallIntegerField(
+        default=0,
+        help_text="Intentos realizados"
+    )
+    
+    max_attempts = models.PositiveSmallIntegerField(
+        default=5,
+        help_text="Intentos antes de pasar a fallida"
+    )
+    
+    last_error = models.TextField(
+        blank=True,
+        help_text="Error del último intento"
+    )
+    
+    # ========================================
+    # TIMESTAMPS
+    # ========================================
+    
+    created_at = models.DateTimeField(
+        auto_now_add=True,
+        help_text="Fecha en que se encoló"
+    )
+    
+    run_at = models.DateTimeField(
+        default=timezone.now,
+        help_text="No ejecutar antes de esta fecha (reintentos con espera)"
+    )
+    
+    started_at = models.DateTimeField(
+        blank=True,
+        null=True,
+        help_text="Inicio del último intento"
+    )
+    
+    finished_at = models.DateTimeField(
+        blank=True,
+        null=True,
+        help_text="Fin de la tarea"
+    )
+    
+    class Meta:
+        verbose_name = 'Tarea'
+        verbose_name_plural = 'Tareas'
+        ordering = ['-id']
+        indexes = [
+            # El worker solo recorre las que están en cola: índice parcial pequeño
+            models.Index(
+                fields=['run_at'],
+                name='task_queued_idx',
+                condition=models.Q(status='queued'),
+            ),
+            models.Index(fields=['status', 'finished_at']),
+        ]
+    
+    def __str__(self):
+        return f"{self.name} #{self.id} ({self.status})"
@@ -0,0 +1,49 @@
+# ========================================
+# NOTIFICACIONES - TAREAS DESPUÉS DEL PEDIDO
+# ========================================
+#
+# Se encolan en la transacción del pedido (ver core/tasks.py) y las ejecuta
+# el worker: un SMTP lento ya no suma a la latencia del checkout. Entrega
+# "al menos una vez": si el worker se cae a mitad, el correo puede salir
+# dos veces.
+
+import logging
+
+from django.conf import settings
+from django.core.mail import send_mail
+
+from .models import Order
+from .tasks import task
+
+logger = logging.getLogger(__name__)
+
+SEND_CONFIRMATION = 'orders.send_confirmation'
+
+
+@task(SEND_CONFIRMATION, max_attempts=8)
+def send_order_confirmation(order_id):
+    """Correo de confirmación del pedido al cliente"""
+    order = Order.objects.filter(id=order_id).prefetch_related('items').first()
+    if order is None:
+        logger.info('Pedido %s ya no existe: no se envía confirmación', order_id)
+        return
+    
+    lines = [
+        f'{item.quantity} x {item.product_name}: ${item.get_total()}'
+        for item in order.items.all()
+    ]
+    body = '\n'.join([
+        f'Recibimos tu pedido {order.order_number}.',
+        '',
+        *lines,
+        '',
+        f'Total: ${order.total}',
+        f'Envío a: {order.shipping_address}, {order.shipping_city}',
+    ])
+    
+    send_mail(
+        subject=f'Confirmación de tu pedido {order.order_number}',
+        message=body,
+        from_email=getattr(settings, 'DEFAULT_FROM_EMAIL', None),
+        recipient_list=[order.customer_email],
+    )
@@ -0,0 +1,277 @@
+# ========================================
+# NÚMEROS DE PEDIDO - ORDENADOS POR TIEMPO Y SIN COLISIONES
+# ========================================
+#
+# Antes: "ORD-" + 8 hex al azar. Con volumen aparecían colisiones (500 por
+# la restricción única) y cada INSERT caía en un lugar al azar del índice.
+# Ahora el número es un entero de 64 bits en base32 (Crockford, 13 letras):
+#
+#   | 41 bits: ms desde 2024-01-01 | 12 bits: nodo | 11 bits: secuencia |
+#
+#   - Tiempo primero: los números crecen con el tiempo y los INSERT van al
+#     final del índice (páginas calientes, sin dividir páginas al azar).
+#   - Nodo: único por proceso. Cada worker toma prestado un nodo libre (una
+#     fila en OrderNumberNode, a lo sumo NODE_COUNT) por
+#     ORDER_NUMBER_NODE_LEASE_SECONDS y lo renueva mientras genera números;
+#     al salir lo devuelve. Si el proceso muere sin devolverlo, el nodo
+#     queda libre cuando vence el préstamo (más CLOCK_SKEW de margen entre
+#     relojes). Un proceso no genera números con un préstamo vencido: lo
+#     renueva o toma otro nodo. Si los NODE_COUNT nodos están prestados,
+#     falla (NodeUnavailable) en vez de repetir un nodo. Se puede fijar con
+#     ORDER_NUMBER_NODE (sin préstamo).
+#   - Secuencia: 2048 números por milisegundo y proceso; si se agotan o el
+#     reloj retrocede, se sigue en el milisegundo siguiente al último usado.
+# Generar un número no hace consultas, salvo renovar el préstamo (una vez
+# cada media vida del préstamo).
+#
+# Los números viejos (ORD- + 8 hex) se conservan: son los que tienen los
+# clientes en sus correos. No pueden chocar con los nuevos (otro largo).
+
+import atexit
+import logging
+import os
+import socket
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+PREFIX = 'ORD-'
+ALPHABET = '0123456789ABCDEFGHJKMNPQRSTVWXYZ'
+LENGTH = 13
+
+EPOCH = datetime(2024, 1, 1, tzinfo=dt_timezone.utc)
+EPOCH_MS = int(EPOCH.timestamp() * 1000)
+
+NODE_BITS = 12
+SEQUENCE_BITS = 11
+NODE_COUNT = 1 << NODE_BITS
+SEQUENCE_MASK = (1 << SEQUENCE_BITS) - 1
+
+# Duración del préstamo de un nodo (se renueva a la mitad)
+LEASE_SECONDS = getattr(settings, 'ORDER_NUMBER_NODE_LEASE_SECONDS', 300)
+
+# Margen antes de reasignar un nodo vencido (diferencia entre relojes)
+CLOCK_SKEW = timedelta(seconds=30)
+
+# Intentos al competir con otros procesos por el mismo nodo libre
+ALLOCATE_ATTEMPTS = 5
+
+
+class NodeUnavailable(Exception):
+    """Todos los nodos están prestados: no se pueden generar números únicos"""
+
+
+def _current_ms():
+    return int(time.time() * 1000) - EPOCH_MS
+
+
+# ========================================
+# PRÉSTAMO DE NODOS
+# ========================================
+
+def _lease_period():
+    """(vencimiento en este proceso, vencimiento en la base) de un préstamo nuevo"""
+    # El reloj local se toma primero: el proceso deja de usar el nodo antes
+    # de que otro pueda tomarlo
+    deadline = time.monotonic() + LEASE_SECONDS
+    return deadline, timezone.now() + timedelta(seconds=LEASE_SECONDS)
+
+
+class NodeLease:
+    """Un nodo prestado a este proceso"""
+    
+    def __init__(self, row, deadline):
+        self.id = row.id
+        self.node = row.node
+        self.token = row.token
+        self.pid = row.pid
+        self.deadline = deadline
+    
+    def expired(self):
+        return time.monotonic() >= self.deadline
+    
+    def should_renew(self):
+        return time.monotonic() >= self.deadline - LEASE_SECONDS / 2
+    
+    def renew(self):
+        """Extiende el préstamo. False si se perdió (venció y otro tomó el nodo)"""
+        from .models import OrderNumberNode
+        
+        deadline, leased_until = _lease_period()
+        if not OrderNumberNode.objects.filter(id=self.id, token=self.token).update(leased_until=leased_until):
+            return False
+        self.deadline = deadline
+        return True
+    
+    def release(self):
+        """Devuelve el nodo (solo el proceso que lo tomó)"""
+        from .models import OrderNumberNode
+        
+        if self.pid == os.getpid():
+            OrderNumberNode.objects.filter(id=self.id, token=self.token).delete()
+            self.deadline = 0.0
+    
+    @classmethod
+    def acquire(cls):
+        """Toma un nodo libre o vencido; NodeUnavailable si no hay ninguno"""
+        from .models import OrderNumberNode
+        
+        for _ in range(ALLOCATE_ATTEMPTS):
+            fields = {
+                'token': uuid.uuid4().hex,
+                'hostname': socket.gethostname()[:255],
+                'pid': os.getpid(),
+            }
+            deadline, fields['leased_until'] = _lease_period()
+            with transaction.atomic():
+                row = OrderNumberNode.objects.select_for_update(skip_locked=True).filter(
+                    leased_until__lt=timezone.now() - CLOCK_SKEW
+                ).order_by('node').first()
+                if row is not None:
+                    # Un proceso que murió sin devolver su nodo
+                    for name, value in fields.items():
+                        setattr(row, name, value)
+                    row.save(update_fields=list(fields))
+                else:
+                    taken = set(OrderNumberNode.objects.values_list('node', flat=True))
+                    free = next((node for node in range(NODE_COUNT) if node not in taken), None)
+                    if free is None:
+                        raise NodeUnavailable(
+                            f'Los {NODE_COUNT} nodos de numeración están prestados; '
+                            'no se pueden generar números de pedido sin repetir'
+                        )
+                    try:
+                        with transaction.atomic():
+                            row = OrderNumberNode.objects.create(node=free, **fields)
+                    except IntegrityError:
+                        continue                # Otro proceso tomó ese nodo: probar otro
+            logger.info('Nodo de numeración %d para %s:%d', row.node, row.hostname, row.pid)
+            return cls(row, deadline)
+        raise NodeUnavailable('No se pudo tomar un nodo de numeración (demasiada competencia)')
+
+
+def configured_node():
+    """Nodo fijo de ORDER_NUMBER_NODE (None: se toma uno prestado)"""
+    configured = getattr(settings, 'ORDER_NUMBER_NODE', None)
+    return None if configured is None else int(configured) % NODE_COUNT
+
+
+# ========================================
+# GENERADOR
+# ========================================
+
+class OrderNumberGenerator:
+    """Genera números de pedido únicos y crecientes (seguro entre hilos)"""
+    
+    def __init__(self, node=None):
+        self._lock = threading.Lock()
+        self._fixed_node = node
+        self._lease = None
+        self._last_ms = -1
+        self._sequence = 0
+    
+    def _current_lease(self):
+        """Préstamo vigente de este proceso (se llama con self._lock tomado)"""
+        lease = self._lease
+        # Después de un fork (workers de gunicorn) el hijo necesita su propio nodo
+        if lease is None or lease.pid != os.getpid():
+            lease = None
+        elif lease.should_renew():
+            try:
+                if not lease.renew():
+                    lease = None            # Venció y otro proceso tomó el nodo
+            except Exception:
+                if lease.expired():
+                    raise
+                logger.exception('No se pudo renovar el nodo de numeración %d', lease.node)
+        if lease is None:
+            lease = self._lease = NodeLease.acquire()
+        return lease
+    
+    def node(self):
+        fixed = self._fixed_node if self._fixed_node is not None else configured_node()
+        if fixed is not None:
+            return fixed
+        with self._lock:
+            return self._current_lease().node
+    
+    def next_value(self):
+        node = self.node()
+        with self._lock:
+            now = max(_current_ms(), self._last_ms)
+            if now == self._last_ms:
+                self._sequence = (self._sequence + 1) & SEQUENCE_MASK
+                if self._sequence == 0:
+                    now += 1                # Secuencia agotada: usar el ms siguiente
+            else:
+                self._sequence = 0
+            self._last_ms = now
+            return (now << (NODE_BITS + SEQUENCE_BITS)) | (node << SEQUENCE_BITS) | self._sequence
+    
+    def next_number(self):
+        return PREFIX + encode(self.next_value())
+    
+    def release(self):
+        """Devuelve el nodo prestado (al salir del proceso)"""
+        with self._lock:
+            if self._lease is not None:
+                self._lease.release()
+                self._lease = None
+
+
+def encode(value):
+    """Entero -> base32 de largo fijo (el orden de texto = orden numérico)"""
+    chars = []
+    for _ in range(LENGTH):
+        value, digit = divmod(value, 32)
+        chars.append(ALPHABET[digit])
+    return ''.join(reversed(chars))
+
+
+def decode(order_number):
+    """
+    Partes de un número nuevo: {'created_at', 'node', 'sequence'}
+    
+    None si es un número del formato anterior o no es válido.
+    """
+    body = order_number[len(PREFIX):] if order_number.startswith(PREFIX) else ''
+    if len(body) != LENGTH or any(char not in ALPHABET for char in body):
+        return None
+    
+    value = 0
+    for char in body:
+        value = value * 32 + ALPHABET.index(char)
+    ms = value >> (NODE_BITS + SEQUENCE_BITS)
+    return {
+        'created_at': EPOCH + timedelta(milliseconds=ms),
+        'node': (value >> SEQUENCE_BITS) & (NODE_COUNT - 1),
+        'sequence': value & SEQUENCE_MASK,
+    }
+
+
+_generator = OrderNumberGenerator()
+
+
+@atexit.register
+def _release_node():
+    try:
+        _generator.release()
+    except Exception:
+        logger.exception('No se pudo devolver el nodo de numeración')
+
+
+def new_order_number():
+    """Siguiente número de pedido de este proceso"""
+    return _generator.next_number()
+
+
+def warmup():
+    """Asigna el nodo del proceso antes de recibir tráfico (post_fork)"""
+    return _generator.node()
@@ -0,0 +1,125 @@
+# ========================================
+# OUTBOX - EVENTOS DEL CICLO DE VIDA DEL PEDIDO
+# ========================================
+
+from datetime import timedelta
+
+from django.db import transaction
+from django.utils import timezone
+
+from .broker import get_broker
+from .models import OrderItem, OutboxEvent
+
+# Tipos de evento
+ORDER_CREATED = 'order.created'
+ORDER_STATUS_CHANGED = 'order.status_changed'
+ORDER_CANCELLED = 'order.cancelled'
+
+
+def record_order_event(order, event_type, **extra):
+    """
+    Registra un evento del pedido en el outbox
+
+    Debe llamarse DENTRO de la transacción que modifica el pedido.
+    """
+    payload = {
+        'order_id': order.id,
+        'order_number': order.order_number,
+        'user_id': order.user_id,
+        'status': order.status,
+        'total': str(order.total),
+        **extra,
+    }
+
+    # Creación y cancelación mueven stock: incluir los items
+    if event_type in (ORDER_CREATED, ORDER_CANCELLED):
+        payload['items'] = [
+            {'product_id': product_id, 'quantity': quantity}
+            for product_id, quantity in order.items.values_list('product_id', 'quantity')
+        ]
+
+    return OutboxEvent.objects.create(
+        event_type=event_type,
+        aggregate_id=order.id,
+        payload=payload,
+    )
+
+
+def record_order_events_bulk(orders, event_type, new_status, **extra):
+    """
+    Registra el mismo evento para muchos pedidos con UN solo INSERT
+    
+    `orders` son dicts con id, order_number, user_id, total y status
+    (estado anterior). Debe llamarse dentro de la transacción del cambio.
+    """
+    items = {}
+    if event_type in (ORDER_CREATED, ORDER_CANCELLED):
+        rows = OrderItem.objects.filter(
+            order_id__in=[order['id'] for order in orders]
+        ).values_list('order_id', 'product_id', 'quantity')
+        for order_id, product_id, quantity in rows:
+            items.setdefault(order_id, []).append(
+                {'product_id': product_id, 'quantity': quantity}
+            )
+    
+    events = []
+    for order in orders:
+        payload = {
+            'order_id': order['id'],
+            'order_number': order['order_number'],
+            'user_id': order['user_id'],
+            'status': new_status,
+            'total': str(order['total']),
+            'previous_status': order['status'],
+            **extra,
+        }
+        if event_type in (ORDER_CREATED, ORDER_CANCELLED):
+            payload['items'] = items.get(order['id'], [])
+        
+        events.append(OutboxEvent(
+            event_type=event_type,
+            aggregate_id=order['id'],
+            payload=payload,
+        ))
+    
+    return OutboxEvent.objects.bulk_create(events)
+
+
+def relay_batch(broker=None, batch_size=100):
+    """
+    Publica un lote de eventos pendientes y los marca como publicados
+
+    SELECT ... FOR UPDATE SKIP LOCKED permite correr varios relays sin
+    que publiquen el mismo evento. Si la publicación falla, la
+    transacción se revierte y el lote se reintenta en la próxima vuelta
+    (entrega "al menos una vez": los consumidores deben ser idempotentes).
+
+    Retorna la cantidad de eventos publicados.
+    """
+    broker = broker or get_broker()
+
+    with transaction.atomic():
+        events = list(
+            OutboxEvent.objects
+            .select_for_update(skip_locked=True)
+            .filter(published_at__isnull=True)
+            .order_by('id')[:batch_size]
+        )
+
+        if not events:
+            return 0
+
+        broker.publish([event.to_message() for event in events])
+
+        OutboxEvent.objects.filter(
+            id__in=[event.id for event in events]
+        ).update(published_at=timezone.now())
+
+    return len(events)
+
+
+def purge_published(days=7):
+    """Borra los eventos ya publicados hace más de `days` días"""
+    cutoff = timezone.now() - timedelta(days=days)
+    deleted, _ = OutboxEvent.objects.filter(published_at__lt=cutoff).delete()
+    return deleted
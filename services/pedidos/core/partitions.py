@@ -0,0 +1,348 @@
+# ========================================
+# PARTICIONES - PEDIDOS POR MES (POSTGRESQL)
+# ========================================
+#
+# Las tablas de pedidos e items se particionan por RANGE (created_at), una
+# partición por mes (core_order_p202401, ...) más una DEFAULT para lo que no
+# caiga en ninguna. Las consultas por fecha solo leen sus meses y, una vez
+# archivados los pedidos viejos (core/archive.py), los meses vacíos se
+# eliminan con DROP TABLE en vez de DELETE + VACUUM.
+#
+# Restricciones de PostgreSQL que cambian el esquema al convertir (no hay
+# migraciones en el servicio: este módulo es el registro de lo que cambia
+# respecto de models.py):
+#   - Las claves únicas deben incluir la columna de partición: la PK pasa a
+#     ser (id, created_at). Los ids siguen saliendo de la misma secuencia.
+#   - Una tabla particionada no puede tener UNIQUE (order_number) ni recibir
+#     claves foráneas hacia id. Para conservar ambas, los pedidos tienen una
+#     tabla de claves sin particionar, core_order_key (id PRIMARY KEY,
+#     order_number UNIQUE), que un trigger mantiene en cada INSERT, UPDATE y
+#     DELETE de core_order. Un número repetido falla igual que antes
+#     (IntegrityError) y id sigue siendo único en toda la tabla.
+#   - Las claves foráneas hacia core_order (core_orderitem.order_id y
+#     core_idempotencykey.order_id) se recrean apuntando a core_order_key:
+#     no se elimina ninguna. Las que salen de la tabla convertida se copian.
+#   - Las demás claves únicas pasan a incluir created_at. Si otra tabla
+#     apunta a core_orderitem la conversión falla (hoy ninguna lo hace).
+# check_order_keys() (manage.py partition_orders --check) verifica que la
+# tabla de claves coincida con los pedidos.
+#
+# Uso: manage.py partition_orders (ver el comando).
+
+import logging
+from datetime import date
+
+from django.db import NotSupportedError, connection, transaction
+from django.utils import timezone
+
+from .models import Order, OrderItem
+
+logger = logging.getLogger(__name__)
+
+PARTITION_COLUMN = 'created_at'
+
+# Tablas particionadas, en el orden en que se convierten
+PARTITIONED_TABLES = (Order._meta.db_table, OrderItem._meta.db_table)
+
+# Tabla de claves de los pedidos: unicidad global y destino de las FKs
+ORDER_TABLE = Order._meta.db_table
+KEY_TABLE = f'{ORDER_TABLE}_key'
+
+# Meses futuros que deben tener su partición creada de antemano
+MONTHS_AHEAD = 3
+
+
+def _require_postgres():
+    if connection.vendor != 'postgresql':
+        raise NotSupportedError('El particionado de pedidos requiere PostgreSQL')
+
+
+def _add_months(day, months):
+    month = day.month - 1 + months
+    return date(day.year + month // 12, month % 12 + 1, 1)
+
+
+def month_ranges(start, end):
+    """Meses desde el de `start` hasta el de `end` (inclusive): [(desde, hasta)]"""
+    current = date(start.year, start.month, 1)
+    ranges = []
+    while current <= end:
+        following = _add_months(current, 1)
+        ranges.append((current, following))
+        current = following
+    return ranges
+
+
+def partition_name(table, month):
+    return f'{table}_p{month:%Y%m}'
+
+
+def _partition_sql(table, month, following, parent=None):
+    return (
+        f'CREATE TABLE IF NOT EXISTS {partition_name(table, month)} '
+        f'PARTITION OF {parent or table} '
+        f"FOR VALUES FROM ('{month.isoformat()} 00:00:00+00') TO ('{following.isoformat()} 00:00:00+00')"
+    )
+
+
+def is_partitioned(table):
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT 1 FROM pg_partitioned_table WHERE partrelid = %s::regclass', [table]
+        )
+        return cursor.fetchone() is not None
+
+
+def _run(statements, execute):
+    if execute:
+        with connection.cursor() as cursor:
+            for sql in statements:
+                logger.info('partitions: %s', sql)
+                cursor.execute(sql)
+    return statements
+
+
+# ========================================
+# CONVERSIÓN DE UNA TABLA EXISTENTE
+# ========================================
+
+def _conversion_plan(cursor, table, months_ahead):
+    """SQL para pasar `table` a particionada copiando sus filas"""
+    staging = f'{table}_partitioned'
+    
+    cursor.execute(f'SELECT min({PARTITION_COLUMN}), max({PARTITION_COLUMN}) FROM {table}')
+    oldest, newest = cursor.fetchone()
+    today = timezone.now().date()
+    first = min(oldest.date(), today) if oldest else today
+    last = _add_months(max(newest.date(), today) if newest else today, months_ahead)
+    
+    # Índices (no únicos) y restricciones únicas a recrear
+    cursor.execute(
+        """
+        SELECT pg_get_indexdef(i.indexrelid)
+        FROM pg_index i
+        WHERE i.indrelid = %s::regclass AND NOT i.indisunique
+        """,
+        [table],
+    )
+    index_definitions = [row[0] for row in cursor.fetchall()]
+    cursor.execute(
+        """
+        SELECT c.conname, array_agg(a.attname ORDER BY k.ordinality)
+        FROM pg_constraint c
+        CROSS JOIN LATERAL unnest(c.conkey) WITH ORDINALITY AS k(attnum, ordinality)
+        JOIN pg_attribute a ON a.attrelid = c.conrelid AND a.attnum = k.attnum
+        WHERE c.conrelid = %s::regclass AND c.contype = 'u'
+        GROUP BY c.conname
+        """,
+        [table],
+    )
+    unique_constraints = cursor.fetchall()
+    
+    # Claves foráneas que apuntan a esta tabla y que salen de ella
+    cursor.execute(
+        """
+        SELECT conrelid::regclass::text, conname, pg_get_constraintdef(oid) FROM pg_constraint
+        WHERE confrelid = %s::regclass AND contype = 'f'
+        """,
+        [table],
+    )
+    foreign_keys = cursor.fetchall()
+    if foreign_keys and table != ORDER_TABLE:
+        raise NotSupportedError(
+            f'{table} no se puede particionar: la referencian '
+            + ', '.join(f'{referencing}.{name}' for referencing, name, _ in foreign_keys)
+        )
+    cursor.execute(
+        """
+        SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint
+        WHERE conrelid = %s::regclass AND contype = 'f'
+        """,
+        [table],
+    )
+    outgoing_keys = cursor.fetchall()
+    
+    # ¿id es IDENTITY (Django >= 4.1) o serial?
+    cursor.execute(
+        """
+        SELECT attidentity, pg_get_serial_sequence(%s, 'id') FROM pg_attribute
+        WHERE attrelid = %s::regclass AND attname = 'id'
+        """,
+        [table, table],
+    )
+    identity, sequence = cursor.fetchone()
+    
+    plan = [f'LOCK TABLE {table} IN ACCESS EXCLUSIVE MODE']
+    plan += [f'ALTER TABLE {referencing} DROP CONSTRAINT {name}' for referencing, name, _ in foreign_keys]
+    plan.append(
+        f'CREATE TABLE {staging} (LIKE {table} INCLUDING DEFAULTS INCLUDING IDENTITY '
+        f'INCLUDING CONSTRAINTS INCLUDING STORAGE) PARTITION BY RANGE ({PARTITION_COLUMN})'
+    )
+    plan += [
+        _partition_sql(table, month, following, parent=staging)
+        for month, following in month_ranges(first, last)
+    ]
+    plan.append(f'CREATE TABLE {table}_default PARTITION OF {staging} DEFAULT')
+    plan.append(f'INSERT INTO {staging} SELECT * FROM {table}')
+    
+    if not identity:
+        # serial: la secuencia pertenece a la tabla vieja, pasarla a la nueva
+        plan.append(f'ALTER SEQUENCE {sequence} OWNED BY {staging}.id')
+    
+    plan.append(f'DROP TABLE {table}')
+    plan.append(f'ALTER TABLE {staging} RENAME TO {table}')
+    plan.append(f'ALTER TABLE {table} ADD PRIMARY KEY (id, {PARTITION_COLUMN})')
+    plan += [
+        f'ALTER TABLE {table} ADD CONSTRAINT {name} UNIQUE ({", ".join(columns)}, {PARTITION_COLUMN})'
+        for name, columns in unique_constraints
+        if PARTITION_COLUMN not in columns and not (table == ORDER_TABLE and columns == ['order_number'])
+    ]
+    plan += index_definitions
+    plan += [f'ALTER TABLE {table} ADD CONSTRAINT {name} {definition}' for name, definition in outgoing_keys]
+    
+    if table == ORDER_TABLE:
+        plan += _key_table_plan()
+        plan += [
+            f'ALTER TABLE {referencing} ADD CONSTRAINT {name} '
+            + definition.replace(f'REFERENCES {table}(id)', f'REFERENCES {KEY_TABLE}(id)')
+            for referencing, name, definition in foreign_keys
+        ]
+    
+    if identity:
+        # La identidad copiada empieza de 1: continuar desde el id más alto
+        plan.append(
+            f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), "
+            f'(SELECT coalesce(max(id), 0) + 1 FROM {table}), false)'
+        )
+    return plan
+
+
+def _key_table_plan():
+    """SQL de core_order_key: la crea, la llena y la mantiene con un trigger"""
+    max_length = Order._meta.get_field('order_number').max_length
+    return [
+        f'CREATE TABLE {KEY_TABLE} (id bigint PRIMARY KEY, order_number varchar({max_length}) NOT NULL UNIQUE)',
+        f'INSERT INTO {KEY_TABLE} (id, order_number) SELECT id, order_number FROM {ORDER_TABLE}',
+        f"""CREATE OR REPLACE FUNCTION {KEY_TABLE}_sync() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'DELETE' THEN
+        DELETE FROM {KEY_TABLE} WHERE id = OLD.id;
+        RETURN OLD;
+    ELSIF TG_OP = 'UPDATE' THEN
+        UPDATE {KEY_TABLE} SET id = NEW.id, order_number = NEW.order_number WHERE id = OLD.id;
+    ELSE
+        INSERT INTO {KEY_TABLE} (id, order_number) VALUES (NEW.id, NEW.order_number);
+    END IF;
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql""",
+        # Un pedido que cambia de partición (UPDATE de created_at) dispara DELETE + INSERT
+        f'CREATE TRIGGER {KEY_TABLE}_sync AFTER INSERT OR DELETE OR UPDATE OF id, order_number '
+        f'ON {ORDER_TABLE} FOR EACH ROW EXECUTE FUNCTION {KEY_TABLE}_sync()',
+    ]
+
+
+def convert_tables(months_ahead=MONTHS_AHEAD, execute=True):
+    """
+    Convierte las tablas de pedidos e items en particionadas por mes
+    
+    Copia las filas en la misma transacción (bloquea las tablas mientras
+    tanto: correrlo en una ventana de mantenimiento). Las tablas que ya
+    están particionadas se omiten. Con `execute=False` solo retorna el SQL.
+    """
+    _require_postgres()
+    statements = []
+    
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            for table in PARTITIONED_TABLES:
+                if is_partitioned(table):
+                    continue
+                plan = _conversion_plan(cursor, table, months_ahead)
+                statements += _run(plan, execute)
+    
+    return statements
+
+
+# ========================================
+# MANTENIMIENTO
+# ========================================
+
+def check_order_keys():
+    """
+    Pedidos sin su fila en core_order_key (o con otro número)
+    
+    Debe ser 0: el trigger las mantiene. Retorna None si la tabla de
+    pedidos no está particionada (ahí rige el UNIQUE de siempre).
+    """
+    _require_postgres()
+    if not is_partitioned(ORDER_TABLE):
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            SELECT count(*) FROM {ORDER_TABLE} o
+            LEFT JOIN {KEY_TABLE} k ON k.id = o.id AND k.order_number = o.order_number
+            WHERE k.id IS NULL
+            """
+        )
+        return cursor.fetchone()[0]
+
+
+def ensure_partitions(months_ahead=MONTHS_AHEAD, execute=True):
+    """
+    Crea las particiones del mes actual y de los `months_ahead` siguientes
+    
+    Correrlo periódicamente (cron): si falta la partición de un mes, sus
+    filas caen en la DEFAULT y ya no se pueden eliminar por mes.
+    """
+    _require_postgres()
+    today = timezone.now().date()
+    statements = [
+        _partition_sql(table, month, following)
+        for table in PARTITIONED_TABLES
+        if is_partitioned(table)
+        for month, following in month_ranges(today, _add_months(today, months_ahead))
+    ]
+    return _run(statements, execute)
+
+
+def drop_empty_partitions(before, execute=True):
+    """
+    Elimina las particiones mensuales vacías que terminan antes de `before`
+    
+    Después de archivar, los meses viejos quedan vacíos: DROP TABLE libera
+    el espacio al instante, sin DELETE ni VACUUM.
+    """
+    _require_postgres()
+    statements = []
+    
+    with connection.cursor() as cursor:
+        for table in PARTITIONED_TABLES:
+            if not is_partitioned(table):
+                continue
+            cursor.execute(
+                """
+                SELECT c.relname FROM pg_inherits i
+                JOIN pg_class c ON c.oid = i.inhrelid
+                WHERE i.inhparent = %s::regclass
+                ORDER BY c.relname
+                """,
+                [table],
+            )
+            for (name,) in cursor.fetchall():
+                suffix = name[len(f'{table}_p'):]
+                if not (name.startswith(f'{table}_p') and suffix.isdigit() and len(suffix) == 6):
+                    continue                    # La DEFAULT u otra que no es mensual
+                month = date(int(suffix[:4]), int(suffix[4:]), 1)
+                if _add_months(month, 1) > before:
+                    continue
+                cursor.execute(f'SELECT EXISTS (SELECT 1 FROM {name})')
+                if cursor.fetchone()[0]:
+                    continue
+                statements += [
+                    f'ALTER TABLE {table} DETACH PARTITION {name}',
+                    f'DROP TABLE {name}',
+                ]
+    
+    return _run(statements, execute)
@@ -0,0 +1,165 @@
+# ========================================
+# ROLLUPS - RESÚMENES INCREMENTALES DE PEDIDOS
+# ========================================
+#
+# Cada alta o cambio de estado de un pedido ajusta, en su misma transacción:
+#   UserOrderSummary  -> pedidos, cancelados, gasto total y último pedido
+#   DailyOrderStats   -> pedidos e ingresos por (día de creación, estado)
+# Los ajustes son UPDATE ... SET x = x + delta (o INSERT si la fila no
+# existe), así las lecturas son una fila y no un recorrido de pedidos.
+# rebuild_rollups() los recalcula desde cero (carga inicial / auditoría),
+# incluyendo los pedidos archivados.
+
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction
+from django.db.models import Case, Count, F, Max, Q, Sum, Value, When
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import ArchivedOrder, DailyOrderStats, Order, UserOrderSummary
+
+
+def _bump(model, keys, **deltas):
+    """
+    Suma `deltas` a la fila `keys` (la crea si no existe)
+    
+    Concurrencia: si dos transacciones crean la misma fila a la vez, la
+    segunda choca con la restricción única y aplica el UPDATE.
+    """
+    changes = {field: F(field) + delta for field, delta in deltas.items()}
+    if model.objects.filter(**keys).update(**changes):
+        return
+    try:
+        with transaction.atomic():
+            model.objects.create(**keys, **deltas)
+    except IntegrityError:
+        model.objects.filter(**keys).update(**changes)
+
+
+def apply_order_changes(changes):
+    """
+    Aplica una lista de cambios de pedidos a los rollups
+    
+    Cada cambio es un dict con: user_id, created_at, total, order_number,
+    previous_status (None si el pedido es nuevo) y status. Los deltas se
+    agrupan, así un lote de N pedidos hace un UPDATE por fila de rollup.
+    """
+    daily = defaultdict(lambda: [0, Decimal('0')])
+    users = defaultdict(lambda: {'order_count': 0, 'cancelled_count': 0, 'lifetime_spend': Decimal('0')})
+    last_orders = {}
+    
+    for change in changes:
+        total = Decimal(change['total'])
+        day = timezone.localdate(change['created_at'])
+        previous, current = change['previous_status'], change['status']
+        user = users[change['user_id']]
+        
+        if previous is not None:
+            daily[day, previous][0] -= 1
+            daily[day, previous][1] -= total
+        daily[day, current][0] += 1
+        daily[day, current][1] += total
+        
+        if previous is None:
+            user['order_count'] += 1
+            if current != 'cancelled':
+                user['lifetime_spend'] += total
+            last = last_orders.get(change['user_id'])
+            if last is None or change['created_at'] > last[0]:
+                last_orders[change['user_id']] = (change['created_at'], change['order_number'])
+        
+        if current == 'cancelled' and previous not in (None, 'cancelled'):
+            user['lifetime_spend'] -= total
+        if current == 'cancelled' and previous != 'cancelled':
+            user['cancelled_count'] += 1
+    
+    for (day, status), (count, revenue) in daily.items():
+        if count or revenue:
+            _bump(DailyOrderStats, {'day': day, 'status': status}, order_count=count, revenue=revenue)
+    
+    for user_id, deltas in users.items():
+        deltas = {field: delta for field, delta in deltas.items() if delta}
+        if deltas:
+            _bump(UserOrderSummary, {'user_id': user_id}, **deltas)
+    
+    for user_id, (created_at, order_number) in last_orders.items():
+        # Solo si es más reciente que el guardado (los pedidos pueden llegar desordenados)
+        newer = Q(last_order_at__isnull=True) | Q(last_order_at__lt=created_at)
+        UserOrderSummary.objects.filter(Q(user_id=user_id) & newer).update(
+            last_order_at=created_at,
+            last_order_number=order_number,
+        )
+
+
+def apply_order_change(order, previous_status=None):
+    """Rollups de un solo pedido (alta si previous_status es None)"""
+    apply_order_changes([{
+        'user_id': order.user_id,
+        'created_at': order.created_at,
+        'total': order.total,
+        'order_number': order.order_number,
+        'previous_status': previous_status,
+        'status': order.status,
+    }])
+
+
+def rebuild_rollups():
+    """
+    Recalcula todos los rollups desde los pedidos (GROUP BY sobre los
+    pedidos y sobre los archivados, que siguen contando)
+    
+    Pensado para la carga inicial o para auditar; corre en una transacción.
+    """
+    sources = (Order.objects.order_by(), ArchivedOrder.objects.order_by())
+    
+    with transaction.atomic():
+        UserOrderSummary.objects.all().delete()
+        DailyOrderStats.objects.all().delete()
+        
+        summaries = {}
+        daily = {}
+        for queryset in sources:
+            users = queryset.values('user_id').annotate(
+                order_count=Count('id'),
+                cancelled_count=Count('id', filter=Q(status='cancelled')),
+                lifetime_spend=Sum(
+                    Case(When(status='cancelled', then=Value(Decimal('0'))), default=F('total'))
+                ),
+                last_order_at=Max('created_at'),
+            )
+            for row in users.iterator():
+                summary = summaries.setdefault(row['user_id'], UserOrderSummary(user_id=row['user_id']))
+                summary.order_count += row['order_count']
+                summary.cancelled_count += row['cancelled_count']
+                summary.lifetime_spend += row['lifetime_spend'] or 0
+                if summary.last_order_at is None or row['last_order_at'] > summary.last_order_at:
+                    summary.last_order_at = row['last_order_at']
+            
+            rows = (
+                queryset.annotate(day=TruncDate('created_at'))
+                .values('day', 'status')
+                .annotate(order_count=Count('id'), revenue=Sum('total'))
+            )
+            for row in rows.iterator():
+                stats = daily.setdefault(
+                    (row['day'], row['status']), DailyOrderStats(day=row['day'], status=row['status'])
+                )
+                stats.order_count += row['order_count']
+                stats.revenue += row['revenue']
+        
+        # Número del último pedido de cada usuario
+        for queryset in sources:
+            last_orders = queryset.order_by('user_id', '-created_at', '-id').values_list(
+                'user_id', 'created_at', 'order_number'
+            )
+            for user_id, created_at, order_number in last_orders.iterator():
+                summary = summaries[user_id]
+                if created_at == summary.last_order_at and not summary.last_order_number:
+                    summary.last_order_number = order_number
+        
+        UserOrderSummary.objects.bulk_create(summaries.values(), batch_size=1000)
+        DailyOrderStats.objects.bulk_create(daily.values(), batch_size=1000)
+    
+    return len(summaries)
@@ -2,9 +2,17 @@
 # SERIALIZERS - SERVICIO PEDIDOS
 # ========================================
 
-from rest_framework import serializers
-from .models import Order, OrderItem
-import uuid
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from rest_framework import exceptions, serializers, status
+from .customers import snapshot_fields
+from .models import DailyOrderStats, Order, OrderItem, UserOrderSummary
+from .order_numbers import new_order_number
+from .outbox import record_order_event, ORDER_CREATED
+from .notifications import SEND_CONFIRMATION
+from .rollups import apply_order_change
+from .tasks import enqueue
 
 
 class OrderItemSerializer(serializers.ModelSerializer):
@@ -42,13 +50,15 @@ class OrderListSerializer(serializers.ModelSerializer):
             'id',
             'order_number',
             'user_id',
+            'customer_name',
             'status',
+            'version',
             'total',
             'items_count',
             'created_at',
             'updated_at',
         ]
-        read_only_fields = ['id', 'order_number', 'created_at', 'updated_at']
+        read_only_fields = ['id', 'order_number', 'version', 'created_at', 'updated_at']
     
     def get_items_count(self, obj):
         """Cuenta los items del pedido"""
@@ -67,6 +77,7 @@ class OrderDetailSerializer(serializers.ModelSerializer):
             'order_number',
             'user_id',
             'status',
+            'version',
             'subtotal',
             'tax',
             'shipping_cost',
@@ -77,14 +88,16 @@ class OrderDetailSerializer(serializers.ModelSerializer):
             'shipping_state',
             'shipping_postal_code',
             'shipping_country',
+            'customer_name',
             'customer_email',
             'customer_phone',
+            'customer_address',
             'notes',
             'items',
             'created_at',
             'updated_at',
         ]
-        read_only_fields = ['id', 'order_number', 'created_at', 'updated_at']
+        read_only_fields = ['id', 'order_number', 'version', 'created_at', 'updated_at']
 
 
 class OrderCreateSerializer(serializers.ModelSerializer):
@@ -117,34 +130,103 @@ class OrderCreateSerializer(serializers.ModelSerializer):
         """Crear el pedido y sus items"""
         items_data = validated_data.pop('items')
         
-        # Generar número de orden único
-        order_number = f"ORD-{uuid.uuid4().hex[:8].upper()}"
+        # Copia del cliente en el pedido: el nombre lo trae la vista (del
+        # perfil, ver core/customers.py) y la dirección se formatea aquí
+        snapshot_fields(validated_data, self.context.get('customer_name', ''))
         
-        # Crear orden
-        order = Order.objects.create(
-            order_number=order_number,
-            **validated_data
-        )
+        # Número único y creciente, sin consultas (ver core/order_numbers.py)
+        order_number = new_order_number()
         
-        # Crear items
-        for item_data in items_data:
-            OrderItem.objects.create(order=order, **item_data)
-        
-        # Calcular totales
-        order.calculate_total()
+        # Pedido, items y evento en una sola transacción
+        with transaction.atomic():
+            # Crear orden
+            order = Order.objects.create(
+                order_number=order_number,
+                **validated_data
+            )
+            
+            # Crear items
+            for item_data in items_data:
+                OrderItem.objects.create(order=order, **item_data)
+            
+            # Calcular totales
+            order.calculate_total()
+            
+            # Avisar a los otros servicios (vía outbox) y sumar a los resúmenes
+            record_order_event(order, ORDER_CREATED)
+            apply_order_change(order)
+            
+            # Correo y demás trabajo posterior: en segundo plano
+            enqueue(SEND_CONFIRMATION, order_id=order.id)
         
         return order
 
 
+class OrderConflict(exceptions.APIException):
+    """El pedido cambió mientras se editaba (409)"""
+    
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = 'El pedido fue modificado por otra operación. Vuelve a cargarlo e intenta de nuevo.'
+    default_code = 'conflict'
+
+
 class OrderUpdateSerializer(serializers.ModelSerializer):
-    """Serializer para actualizar pedidos (solo estado)"""
+    """
+    Serializer para actualizar pedidos (estado y notas)
+    
+    Bloqueo optimista: el cliente envía la `version` que leyó. Si el
+    pedido cambió desde entonces, el UPDATE no coincide y se responde 409
+    en vez de pisar el cambio del otro.
+    """
+    
+    version = serializers.IntegerField(write_only=True)
     
     class Meta:
         model = Order
         fields = [
             'status',
             'notes',
+            'version',
         ]
+    
+    def validate(self, data):
+        """Validar versión y transición de estado"""
+        if 'version' not in data:
+            raise serializers.ValidationError({'version': 'Este campo es requerido.'})
+        
+        new_status = data.get('status')
+        if self.instance and new_status and new_status != self.instance.status:
+            if not self.instance.can_transition_to(new_status):
+                raise serializers.ValidationError({
+                    'status': f"No se puede pasar de '{self.instance.status}' a '{new_status}'"
+                })
+        
+        return data
+    
+    def update(self, instance, validated_data):
+        """Actualizar con UN UPDATE condicional sobre id + versión"""
+        expected_version = validated_data.pop('version')
+        new_status = validated_data.pop('status', instance.status)
+        
+        if new_status != instance.status:
+            # Cambio de estado: también exige que el estado actual lo permita
+            updated = Order.objects.transition(
+                instance.id, new_status, expected_version, **validated_data
+            )
+        else:
+            updated = Order.objects.filter(
+                id=instance.id, version=expected_version
+            ).update(
+                version=F('version') + 1,
+                updated_at=timezone.now(),
+                **validated_data
+            ) == 1
+        
+        if not updated:
+            raise OrderConflict()
+        
+        instance.refresh_from_db(fields=['status', 'notes', 'version', 'updated_at'])
+        return instance
 
 
 class CartItemSerializer(serializers.Serializer):
@@ -160,4 +242,28 @@ class CartItemSerializer(serializers.Serializer):
         """Validar que el precio sea positivo"""
         if value <= 0:
             raise serializers.ValidationError("El precio debe ser mayor a 0")
-        return value
\ No newline at end of file
+        return value
+
+
+class UserOrderSummarySerializer(serializers.ModelSerializer):
+    """Resumen de pedidos de un usuario"""
+    
+    class Meta:
+        model = UserOrderSummary
+        fields = [
+            'user_id',
+            'order_count',
+            'cancelled_count',
+            'lifetime_spend',
+            'last_order_at',
+            'last_order_number',
+            'updated_at',
+        ]
+
+
+class DailyOrderStatsSerializer(serializers.ModelSerializer):
+    """Pedidos e ingresos de un día y estado"""
+    
+    class Meta:
+        model = DailyOrderStats
+        fields = ['day', 'status', 'order_count', 'revenue']
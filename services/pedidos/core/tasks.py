@@ -0,0 +1,220 @@
+# ========================================
+# TAREAS - TRABAJO EN SEGUNDO PLANO
+# ========================================
+#
+# Lo que no hace falta para responder al cliente (correos, facturas...) se
+# encola como Task en la misma transacción del pedido y lo ejecuta el
+# worker (manage.py run_tasks), fuera de la latencia del checkout.
+#   - Reintentos: si la tarea falla, se reprograma con espera exponencial
+#     (TASK_RETRY_BASE_SECONDS * 2^intento, con jitter, tope TASK_RETRY_MAX_SECONDS).
+#   - Dead letter: después de max_attempts queda en estado 'dead' con su
+#     último error (se pueden reencolar desde el admin).
+#   - Worker caído: las tareas 'running' por más de TASK_STALE_SECONDS
+#     vuelven a la cola (entrega "al menos una vez": tareas idempotentes).
+#   - TASKS_EAGER=True ejecuta la tarea en el mismo proceso al confirmar la
+#     transacción (desarrollo/tests sin worker).
+#
+# Registrar una tarea:
+#     @task('orders.send_confirmation', max_attempts=5)
+#     def send_confirmation(order_id): ...
+# Encolar (dentro de la transacción):
+#     enqueue('orders.send_confirmation', order_id=order.id)
+
+import logging
+import random
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Min
+from django.utils import timezone
+
+from .models import Task
+
+logger = logging.getLogger(__name__)
+
+RETRY_BASE_SECONDS = getattr(settings, 'TASK_RETRY_BASE_SECONDS', 10)
+RETRY_MAX_SECONDS = getattr(settings, 'TASK_RETRY_MAX_SECONDS', 3600)
+STALE_SECONDS = getattr(settings, 'TASK_STALE_SECONDS', 600)
+
+# Tareas recientes que se miran para calcular la latencia
+MAX_SAMPLES = 5000
+
+# name -> (función, max_attempts)
+_registry = {}
+
+
+# ========================================
+# REGISTRO Y ENCOLADO
+# ========================================
+
+def task(name, max_attempts=5):
+    """Registra una función como tarea con ese nombre"""
+    def register(function):
+        _registry[name] = (function, max_attempts)
+        return function
+    return register
+
+
+def enqueue(name, delay=0, **payload):
+    """
+    Encola una tarea (debe llamarse DENTRO de la transacción del cambio)
+    
+    Retorna la Task creada.
+    """
+    if name not in _registry:
+        raise KeyError(f'Tarea no registrada: {name}')
+    
+    created = Task.objects.create(
+        name=name,
+        payload=payload,
+        max_attempts=_registry[name][1],
+        run_at=timezone.now() + timedelta(seconds=delay),
+    )
+    
+    if getattr(settings, 'TASKS_EAGER', False):
+        transaction.on_commit(lambda: run_task(created.id))
+    return created
+
+
+# ========================================
+# EJECUCIÓN
+# ========================================
+
+def retry_delay(attempts):
+    """Segundos de espera antes del intento `attempts` + 1 (exponencial con jitter)"""
+    delay = min(RETRY_BASE_SECONDS * 2 ** (attempts - 1), RETRY_MAX_SECONDS)
+    return delay * random.uniform(0.8, 1.2)
+
+
+def _execute(claimed):
+    """Ejecuta una tarea ya marcada como 'running' y guarda el resultado"""
+    function, _ = _registry.get(claimed.name, (None, None))
+    latency = (claimed.started_at - claimed.run_at).total_seconds()
+    
+    try:
+        if function is None:
+            raise KeyError(f'Tarea no registrada: {claimed.name}')
+        function(**claimed.payload)
+    except Exception as exc:
+        error = ''.join(traceback.format_exception_only(type(exc), exc)).strip()
+        if claimed.attempts >= claimed.max_attempts:
+            Task.objects.filter(id=claimed.id).update(
+                status='dead', last_error=error, finished_at=timezone.now()
+            )
+            logger.error('Tarea %s #%d fallida tras %d intentos: %s',
+                         claimed.name, claimed.id, claimed.attempts, error)
+        else:
+            delay = retry_delay(claimed.attempts)
+            Task.objects.filter(id=claimed.id).update(
+                status='queued', last_error=error,
+                run_at=timezone.now() + timedelta(seconds=delay),
+            )
+            logger.warning('Tarea %s #%d falló (intento %d), reintento en %.0fs: %s',
+                           claimed.name, claimed.id, claimed.attempts, delay, error)
+        return False
+    
+    Task.objects.filter(id=claimed.id).update(status='done', finished_at=timezone.now())
+    logger.info('Tarea %s #%d terminada (esperó %.2fs en cola)', claimed.name, claimed.id, latency)
+    return True
+
+
+def _claim(queryset, limit):
+    """Marca como 'running' hasta `limit` tareas del queryset que nadie más tomó"""
+    now = timezone.now()
+    with transaction.atomic():
+        claimed = list(queryset.select_for_update(skip_locked=True)[:limit])
+        for item in claimed:
+            item.status = 'running'
+            item.attempts += 1
+            item.started_at = now
+        Task.objects.bulk_update(claimed, ['status', 'attempts', 'started_at'])
+    return claimed
+
+
+def run_batch(batch_size=10):
+    """
+    Toma hasta `batch_size` tareas listas y las ejecuta
+    
+    Varias instancias del worker pueden correr a la vez (SKIP LOCKED).
+    Retorna la cantidad de tareas ejecutadas.
+    """
+    ready = Task.objects.filter(status='queued', run_at__lte=timezone.now()).order_by('run_at')
+    claimed = _claim(ready, batch_size)
+    for item in claimed:
+        _execute(item)
+    return len(claimed)
+
+
+def run_task(task_id):
+    """Ejecuta una tarea ya (modo TASKS_EAGER); si falla queda para el worker"""
+    claimed = _claim(Task.objects.filter(id=task_id, status='queued'), 1)
+    if claimed:
+        _execute(claimed[0])
+
+
+# ========================================
+# MANTENIMIENTO Y MÉTRICAS
+# ========================================
+
+def requeue_stale(seconds=None):
+    """Devuelve a la cola las tareas 'running' de un worker que se cayó"""
+    cutoff = timezone.now() - timedelta(seconds=STALE_SECONDS if seconds is None else seconds)
+    return Task.objects.filter(status='running', started_at__lt=cutoff).update(
+        status='queued', run_at=timezone.now()
+    )
+
+
+def retry_dead(queryset=None):
+    """Reencola tareas fallidas (dead letter) con sus intentos en cero"""
+    queryset = Task.objects.all() if queryset is None else queryset
+    return queryset.filter(status='dead').update(
+        status='queued', attempts=0, run_at=timezone.now(), finished_at=None
+    )
+
+
+def purge_finished(days=7):
+    """Borra las tareas terminadas hace más de `days` días"""
+    cutoff = timezone.now() - timedelta(days=days)
+    deleted, _ = Task.objects.filter(status='done', finished_at__lt=cutoff).delete()
+    return deleted
+
+
+def queue_stats(window_minutes=15):
+    """
+    Métricas de la cola: profundidad por estado, antigüedad de la tarea
+    lista más vieja y latencia (espera en cola) de las tareas recientes
+    """
+    now = timezone.now()
+    depth = dict(Task.objects.order_by().values_list('status').annotate(count=Count('id')))
+    
+    oldest_ready = Task.objects.filter(status='queued', run_at__lte=now).aggregate(
+        oldest=Min('run_at'), ready=Count('id')
+    )
+    
+    # Latencia = inicio del último intento - momento en que estaba lista
+    recent = Task.objects.filter(
+        status='done', finished_at__gte=now - timedelta(minutes=window_minutes)
+    ).order_by('-finished_at').values_list('run_at', 'started_at')[:MAX_SAMPLES]
+    latencies = sorted((started - run_at).total_seconds() for run_at, started in recent)
+    
+    def percentile(fraction):
+        if not latencies:
+            return None
+        return round(latencies[min(len(latencies) - 1, int(len(latencies) * fraction))], 3)
+    
+    return {
+        'depth': {status: depth.get(status, 0) for status, _ in Task.STATUS_CHOICES},
+        'ready': oldest_ready['ready'],
+        'oldest_ready_seconds': (
+            round((now - oldest_ready['oldest']).total_seconds(), 3) if oldest_ready['oldest'] else 0
+        ),
+        'latency_seconds': {
+            'window_minutes': window_minutes,
+            'count': len(latencies),
+            'p50': percentile(0.5),
+            'p95': percentile(0.95),
+            'max': latencies[-1] if latencies else None,
+        },
+    }
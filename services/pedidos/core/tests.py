@@ -0,0 +1,742 @@
+# ========================================
+# TESTS - SERVICIO PEDIDOS
+# ========================================
+
+import threading
+import time
+from unittest import mock
+from datetime import timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from django.contrib import admin
+from django.core import mail
+from django.db import connection
+from django.contrib.auth.models import User
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from .admin import ITEMS_SHOWN, OrderAdmin
+from .archive import archive_orders, get_archived_order
+from .broker import InMemoryBroker
+from .customers import backfill_snapshots, load_customers
+from .http_client import CircuitOpenError, UpstreamClient, UpstreamError
+from .bulk import bulk_transition
+from .models import (
+    ArchivedOrder, DailyOrderStats, IdempotencyKey, Order, OrderItem, OrderNumberNode, OutboxEvent,
+    Task, UserOrderSummary,
+)
+from . import order_numbers
+from .order_numbers import NodeUnavailable, OrderNumberGenerator, decode
+from .outbox import relay_batch, ORDER_CANCELLED, ORDER_CREATED
+from .rollups import rebuild_rollups
+from .serializers import OrderConflict, OrderCreateSerializer, OrderUpdateSerializer
+from .tasks import enqueue, queue_stats, requeue_stale, retry_dead, run_batch, task
+from .views import OrderViewSet
+
+
+ORDER_DATA = {
+    'user_id': 1,
+    'shipping_address': 'Calle 5 # 10-20',
+    'shipping_city': 'Ibagué',
+    'shipping_state': 'Tolima',
+    'shipping_postal_code': '730001',
+    'shipping_country': 'Colombia',
+    'customer_email': 'juan@example.com',
+    'customer_phone': '+573001234567',
+    'items': [
+        {'product_id': 1, 'product_name': 'iPhone 15', 'price': '1000.00', 'quantity': 2},
+    ],
+}
+
+
+def create_order(**overrides):
+    """Crea un pedido como lo hace el checkout"""
+    serializer = OrderCreateSerializer(data={**ORDER_DATA, **overrides})
+    serializer.is_valid(raise_exception=True)
+    return serializer.save()
+
+
+class OutboxTestCase(TestCase):
+    """Tests para el outbox de eventos de pedidos"""
+
+    def setUp(self):
+        InMemoryBroker.clear()
+
+    def test_create_order_records_event(self):
+        """Probar que crear un pedido deja un evento pendiente con sus items"""
+        order = create_order()
+
+        event = OutboxEvent.objects.get(aggregate_id=order.id)
+        self.assertEqual(event.event_type, ORDER_CREATED)
+        self.assertIsNone(event.published_at)
+        self.assertEqual(event.payload['items'], [{'product_id': 1, 'quantity': 2}])
+
+    def test_relay_publishes_in_batches(self):
+        """Probar que el relay publica los pendientes y los marca"""
+        for _ in range(3):
+            create_order()
+
+        self.assertEqual(relay_batch(InMemoryBroker(), batch_size=2), 2)
+        self.assertEqual(relay_batch(InMemoryBroker(), batch_size=2), 1)
+        self.assertEqual(relay_batch(InMemoryBroker(), batch_size=2), 0)
+
+        self.assertEqual(len(InMemoryBroker.messages), 3)
+        self.assertFalse(OutboxEvent.objects.filter(published_at__isnull=True).exists())
+
+    def test_failed_publish_keeps_events_pending(self):
+        """Probar que si el broker falla, los eventos siguen pendientes"""
+        create_order()
+
+        class BrokenBroker(InMemoryBroker):
+            def publish(self, messages):
+                raise ConnectionError('broker caído')
+
+        with self.assertRaises(ConnectionError):
+            relay_batch(BrokenBroker())
+
+        self.assertEqual(OutboxEvent.objects.filter(published_at__isnull=True).count(), 1)
+
+
+class OrderStateMachineTestCase(TestCase):
+    """Tests para las transiciones de estado"""
+    
+    def test_allowed_and_forbidden_transitions(self):
+        """Probar que solo se aplican las transiciones permitidas"""
+        order = create_order()
+        
+        self.assertFalse(Order.objects.transition(order.id, 'delivered'))
+        self.assertTrue(Order.objects.transition(order.id, 'confirmed'))
+        self.assertTrue(Order.objects.transition(order.id, 'shipped'))
+        self.assertTrue(Order.objects.transition(order.id, 'delivered'))
+        self.assertFalse(Order.objects.transition(order.id, 'cancelled'))
+        
+        order.refresh_from_db()
+        self.assertEqual(order.status, 'delivered')
+        self.assertEqual(order.version, 4)
+    
+    def test_stale_version_is_rejected(self):
+        """Probar que una edición con versión vieja no pisa la actual"""
+        order = create_order()
+        stale = Order.objects.get(id=order.id)
+        
+        serializer = OrderUpdateSerializer(order, data={'notes': 'primera', 'version': 1}, partial=True)
+        serializer.is_valid(raise_exception=True)
+        serializer.save()
+        
+        serializer = OrderUpdateSerializer(stale, data={'notes': 'segunda', 'version': 1}, partial=True)
+        serializer.is_valid(raise_exception=True)
+        with self.assertRaises(OrderConflict):
+            serializer.save()
+        
+        order.refresh_from_db()
+        self.assertEqual(order.notes, 'primera')
+    
+    def test_cancel_with_stale_read_conflicts(self):
+        """Probar que cancelar un pedido que cambió después de leerlo responde 409"""
+        order = create_order()
+        stale = Order.objects.get(id=order.id)
+        bulk_transition(Order.objects.filter(id=order.id), 'confirmed')
+        
+        client = APIClient()
+        client.force_authenticate(User.objects.create(username='admin', is_staff=True))
+        with mock.patch.object(OrderViewSet, 'get_object', return_value=stale):
+            response = client.post(f'/api/orders/{order.id}/cancel/')
+        
+        self.assertEqual(response.status_code, 409)
+        order.refresh_from_db()
+        self.assertEqual(order.status, 'confirmed')
+        self.assertFalse(OutboxEvent.objects.filter(event_type=ORDER_CANCELLED).exists())
+        self.assertEqual(DailyOrderStats.objects.get(status='confirmed').order_count, 1)
+    
+    def test_admin_save_keeps_concurrent_status(self):
+        """Probar que editar un pedido en el admin no reescribe su estado"""
+        order = create_order()
+        stale = Order.objects.get(id=order.id)
+        bulk_transition(Order.objects.filter(id=order.id), 'confirmed')
+        
+        model_admin = OrderAdmin(Order, admin.site)
+        self.assertIn('status', model_admin.readonly_fields)
+        stale.notes = 'llamar antes'
+        model_admin.save_model(None, stale, mock.Mock(changed_data=['notes']), change=True)
+        
+        order.refresh_from_db()
+        self.assertEqual((order.status, order.notes, order.version), ('confirmed', 'llamar antes', 3))
+    
+    def test_admin_shows_a_limited_number_of_items(self):
+        """Probar que el formulario del pedido muestra a lo sumo ITEMS_SHOWN items y enlaza al resto"""
+        order = create_order()
+        OrderItem.objects.bulk_create([
+            OrderItem(order=order, product_id=2, product_name='Funda', price='10.00', quantity=1)
+            for _ in range(ITEMS_SHOWN)
+        ])
+        admin_user = User.objects.create_superuser('admin', 'admin@example.com', 'x')
+        self.client.force_login(admin_user)
+        
+        response = self.client.get(f'/admin/core/order/{order.id}/change/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.context['inline_admin_formsets'][0].formset.forms), ITEMS_SHOWN)
+        self.assertContains(response, f'?order__id__exact={order.id}')
+        
+        response = self.client.get(f'/admin/core/orderitem/?order__id__exact={order.id}')
+        self.assertEqual(response.status_code, 200)
+        
+        response = self.client.post(f'/admin/core/order/{order.id}/change/', {
+            **{name: getattr(order, name) for name in (
+                'user_id', 'subtotal', 'tax', 'shipping_cost', 'discount', 'total',
+                'shipping_address', 'shipping_city', 'shipping_state', 'shipping_postal_code',
+                'shipping_country', 'customer_email', 'customer_phone',
+            )},
+            'notes': 'revisado',
+            'items-TOTAL_FORMS': ITEMS_SHOWN,
+            'items-INITIAL_FORMS': ITEMS_SHOWN,
+            **{f'items-{index}-id': item_id for index, item_id in enumerate(
+                order.items.order_by('id').values_list('id', flat=True)[:ITEMS_SHOWN]
+            )},
+            **{f'items-{index}-order': order.id for index in range(ITEMS_SHOWN)},
+        })
+        self.assertEqual(response.status_code, 302)
+        order.refresh_from_db()
+        self.assertEqual(order.notes, 'revisado')
+
+
+class BulkTransitionTestCase(TestCase):
+    """Tests para los cambios de estado masivos"""
+    
+    def test_bulk_cancel_skips_final_states(self):
+        """Probar que se cancelan por lotes solo los pedidos que lo permiten"""
+        orders = [create_order() for _ in range(5)]
+        Order.objects.filter(id=orders[0].id).update(status='delivered')
+        
+        calls = []
+        updated = bulk_transition(
+            Order.objects.all(), 'cancelled', batch_size=2,
+            progress=lambda done, last_id: calls.append(done),
+        )
+        
+        self.assertEqual(updated, 4)
+        self.assertEqual(calls, [2, 4])
+        self.assertEqual(Order.objects.filter(status='cancelled', version=2).count(), 4)
+        
+        events = OutboxEvent.objects.filter(event_type=ORDER_CANCELLED)
+        self.assertEqual(events.count(), 4)
+        self.assertEqual(events[0].payload['items'], [{'product_id': 1, 'quantity': 2}])
+        self.assertEqual(events[0].payload['previous_status'], 'pending')
+
+
+class OrderRollupsTestCase(TestCase):
+    """Tests para los resúmenes incrementales de pedidos"""
+    
+    def snapshot(self):
+        users = list(UserOrderSummary.objects.order_by('user_id').values(
+            'user_id', 'order_count', 'cancelled_count', 'lifetime_spend', 'last_order_number'
+        ))
+        daily = list(DailyOrderStats.objects.exclude(order_count=0).order_by('status').values(
+            'status', 'order_count', 'revenue'
+        ))
+        return users, daily
+    
+    def test_rollups_follow_creation_and_transitions(self):
+        """Probar que altas, cambios y cancelaciones masivas ajustan los resúmenes"""
+        first = create_order()
+        create_order()
+        last = create_order(user_id=2)
+        
+        summary = UserOrderSummary.objects.get(user_id=1)
+        self.assertEqual((summary.order_count, summary.lifetime_spend), (2, 4000))
+        
+        bulk_transition(Order.objects.filter(id=first.id), 'confirmed')
+        bulk_transition(Order.objects.filter(user_id=1), 'cancelled')
+        
+        users, daily = self.snapshot()
+        self.assertEqual(users[0]['cancelled_count'], 2)
+        self.assertEqual(users[0]['lifetime_spend'], 0)
+        self.assertEqual(users[1]['last_order_number'], last.order_number)
+        self.assertEqual(
+            [(row['status'], row['order_count']) for row in daily], [('cancelled', 2), ('pending', 1)]
+        )
+        
+        # Recalcular desde cero da lo mismo que lo incremental
+        rebuild_rollups()
+        self.assertEqual(self.snapshot(), (users, daily))
+    
+    def test_summary_for_another_user(self):
+        """Probar que un admin consulta el resumen de otro usuario y un user_id inválido da 400"""
+        create_order(user_id=2)
+        client = APIClient()
+        client.force_authenticate(User.objects.create(username='admin', is_staff=True))
+        
+        response = client.get('/api/orders/summary/', {'user_id': 2})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['order_count'], 1)
+        
+        response = client.get('/api/orders/summary/', {'user_id': 'abc'})
+        self.assertEqual(response.status_code, 400)
+
+
+class OrderArchiveTestCase(TestCase):
+    """Tests para el archivo de pedidos antiguos"""
+    
+    def test_archive_moves_old_finished_orders(self):
+        """Probar que solo se archivan pedidos terminados y viejos, y que se pueden leer"""
+        delivered, cancelled, pending, recent = (create_order() for _ in range(4))
+        bulk_transition(Order.objects.filter(id__in=[delivered.id, recent.id]), 'confirmed')
+        bulk_transition(Order.objects.filter(id__in=[delivered.id, recent.id]), 'shipped')
+        bulk_transition(Order.objects.filter(id__in=[delivered.id, recent.id]), 'delivered')
+        bulk_transition(Order.objects.filter(id=cancelled.id), 'cancelled')
+        Order.objects.exclude(id=recent.id).update(created_at=timezone.now() - timedelta(days=400))
+        rebuild_rollups()
+        users, daily = OrderRollupsTestCase.snapshot(self)
+        
+        self.assertEqual(archive_orders(days=365, batch_size=1), 2)
+        
+        self.assertEqual(set(Order.objects.values_list('id', flat=True)), {pending.id, recent.id})
+        self.assertFalse(OrderItem.objects.filter(order_id__in=[delivered.id, cancelled.id]).exists())
+        self.assertEqual(ArchivedOrder.objects.count(), 2)
+        
+        detail = get_archived_order(delivered.id, user_id=1)
+        self.assertEqual(detail['order_number'], delivered.order_number)
+        self.assertEqual(detail['status'], 'delivered')
+        self.assertEqual(len(detail['items']), 1)
+        self.assertTrue(detail['archived'])
+        self.assertIsNone(get_archived_order(delivered.id, user_id=2))
+        
+        # Los archivados siguen contando en los rollups
+        rebuild_rollups()
+        self.assertEqual(OrderRollupsTestCase.snapshot(self), (users, daily))
+
+
+class IdempotentCheckoutTestCase(TestCase):
+    """Tests para el checkout con Idempotency-Key"""
+    
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create(username='comprador'))
+    
+    def checkout(self, key, **overrides):
+        data = {**ORDER_DATA, **overrides}
+        return self.client.post('/api/cart/checkout/', data, format='json', HTTP_IDEMPOTENCY_KEY=key)
+    
+    def test_retry_returns_stored_response(self):
+        """Probar que un reintento con la misma clave no crea otro pedido"""
+        first = self.checkout('clave-1')
+        retry = self.checkout('clave-1')
+        
+        self.assertEqual(first.status_code, 201)
+        self.assertEqual(retry.status_code, 201)
+        self.assertEqual(retry.json()['order']['id'], first.json()['order']['id'])
+        self.assertEqual(retry['Idempotent-Replayed'], 'true')
+        self.assertEqual(Order.objects.count(), 1)
+        self.assertEqual(OutboxEvent.objects.count(), 1)
+        
+        # Otra petición con la misma clave es un error del cliente
+        self.assertEqual(self.checkout('clave-1', notes='otra').status_code, 422)
+        self.assertEqual(self.checkout('clave-2').status_code, 201)
+        self.assertEqual(Order.objects.count(), 2)
+    
+    def test_failed_request_and_expired_key_can_be_reused(self):
+        """Probar que un error no guarda la clave y que una clave vencida se libera"""
+        self.assertEqual(self.checkout('clave-1', items=[]).status_code, 400)
+        self.assertFalse(IdempotencyKey.objects.exists())
+        
+        self.assertEqual(self.checkout('clave-1').status_code, 201)
+        IdempotencyKey.objects.update(expires_at=timezone.now())
+        self.assertEqual(self.checkout('clave-1').status_code, 201)
+        self.assertEqual(Order.objects.count(), 2)
+
+
+class OrderNumberTestCase(TestCase):
+    """Tests para los números de pedido ordenados por tiempo"""
+    
+    def test_numbers_are_unique_and_increasing(self):
+        """Probar que los números crecen y no se repiten, aun entre hilos"""
+        generator = OrderNumberGenerator(node=7)
+        numbers = []
+        
+        def generate():
+            numbers.extend(generator.next_number() for _ in range(3000))
+        
+        threads = [threading.Thread(target=generate) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        
+        self.assertEqual(len(set(numbers)), 12000)
+        sequential = [generator.next_number() for _ in range(5000)]
+        self.assertEqual(sequential, sorted(sequential))
+        self.assertGreater(sequential[0], max(numbers))
+        
+        parts = decode(sequential[0])
+        self.assertEqual(parts['node'], 7)
+        self.assertLess(abs((parts['created_at'] - timezone.now()).total_seconds()), 5)
+    
+    def test_orders_get_new_numbers(self):
+        """Probar que los pedidos nuevos usan el formato nuevo y los viejos se reconocen"""
+        order = create_order()
+        self.assertEqual(len(order.order_number), len('ORD-') + 13)
+        self.assertIsNotNone(decode(order.order_number))
+        self.assertIsNone(decode('ORD-1A2B3C4D'))
+    
+    def test_nodes_are_leased_and_released(self):
+        """Probar que cada proceso toma un nodo libre y lo devuelve al salir"""
+        first, second = OrderNumberGenerator(), OrderNumberGenerator()
+        self.assertNotEqual(first.node(), second.node())
+        self.assertEqual(decode(first.next_number())['node'], first.node())
+        
+        node = first.node()
+        first.release()
+        self.assertFalse(OrderNumberNode.objects.filter(node=node).exists())
+        self.assertEqual(OrderNumberGenerator().node(), node)
+    
+    def test_expired_lease_is_reassigned(self):
+        """Probar que un nodo vencido se reasigna y su dueño anterior toma otro"""
+        stale = OrderNumberGenerator()
+        node = stale.node()
+        OrderNumberNode.objects.filter(node=node).update(
+            leased_until=timezone.now() - timedelta(hours=1)
+        )
+        self.assertEqual(OrderNumberGenerator().node(), node)
+        
+        stale._lease.deadline = 0.0     # Su préstamo venció también en el proceso
+        self.assertNotEqual(stale.node(), node)
+        self.assertEqual(OrderNumberNode.objects.count(), 2)
+    
+    def test_no_free_node_fails(self):
+        """Probar que sin nodos libres falla en vez de repetir uno"""
+        with mock.patch.object(order_numbers, 'NODE_COUNT', 2):
+            OrderNumberGenerator().node()
+            OrderNumberGenerator().node()
+            with self.assertRaises(NodeUnavailable):
+                OrderNumberGenerator().node()
+
+
+class TaskQueueTestCase(TestCase):
+    """Tests para las tareas en segundo plano"""
+    
+    def test_checkout_enqueues_confirmation(self):
+        """Probar que el pedido encola su correo y el worker lo envía"""
+        order = create_order()
+        queued = Task.objects.get()
+        self.assertEqual(queued.name, 'orders.send_confirmation')
+        self.assertEqual(queued.payload, {'order_id': order.id})
+        self.assertEqual(len(mail.outbox), 0)
+        
+        self.assertEqual(run_batch(), 1)
+        queued.refresh_from_db()
+        self.assertEqual(queued.status, 'done')
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, ['juan@example.com'])
+        self.assertIn(order.order_number, mail.outbox[0].subject)
+        self.assertEqual(run_batch(), 0)
+    
+    @override_settings(TASKS_EAGER=True)
+    def test_eager_mode_runs_on_commit(self):
+        """Probar que con TASKS_EAGER la tarea corre al confirmar, sin worker"""
+        with self.captureOnCommitCallbacks(execute=True):
+            create_order()
+        self.assertEqual(Task.objects.get().status, 'done')
+        self.assertEqual(len(mail.outbox), 1)
+    
+    def test_failures_retry_with_backoff_then_dead(self):
+        """Probar reintentos con espera, dead letter y reencolado"""
+        calls = []
+        
+        @task('tests.flaky', max_attempts=2)
+        def flaky(fail):
+            calls.append(fail)
+            if fail:
+                raise RuntimeError('SMTP caído')
+        
+        failing = enqueue('tests.flaky', fail=True)
+        self.assertEqual(run_batch(), 1)
+        failing.refresh_from_db()
+        self.assertEqual((failing.status, failing.attempts), ('queued', 1))
+        self.assertIn('SMTP caído', failing.last_error)
+        self.assertGreater(failing.run_at, timezone.now())
+        self.assertEqual(run_batch(), 0)             # Todavía esperando
+        
+        Task.objects.update(run_at=timezone.now())
+        self.assertEqual(run_batch(), 1)
+        failing.refresh_from_db()
+        self.assertEqual((failing.status, failing.attempts), ('dead', 2))
+        self.assertEqual(run_batch(), 0)
+        
+        self.assertEqual(retry_dead(), 1)
+        failing.refresh_from_db()
+        self.assertEqual((failing.status, failing.attempts), ('queued', 0))
+        self.assertEqual(len(calls), 2)
+    
+    def test_stale_tasks_and_stats(self):
+        """Probar que se recuperan tareas de un worker caído y las métricas de la cola"""
+        now = timezone.now()
+        create_order()
+        Task.objects.update(status='running', attempts=1, started_at=now - timedelta(hours=1))
+        self.assertEqual(requeue_stale(), 1)
+        run_batch()
+        
+        Task.objects.create(name='orders.send_confirmation', run_at=now - timedelta(seconds=30))
+        stats = queue_stats()
+        self.assertEqual(stats['depth']['done'], 1)
+        self.assertEqual(stats['depth']['queued'], 1)
+        self.assertEqual(stats['ready'], 1)
+        self.assertGreaterEqual(stats['oldest_ready_seconds'], 30)
+        self.assertEqual(stats['latency_seconds']['count'], 1)
+        
+        client = APIClient()
+        client.force_authenticate(User.objects.create(username='admin', is_staff=True))
+        response = client.get('/api/orders/tasks/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['depth']['queued'], 1)
+
+
+class CustomerSnapshotTestCase(TestCase):
+    """Tests para la copia del cliente en el pedido"""
+    
+    def test_checkout_stores_snapshot(self):
+        """Probar que el pedido guarda el nombre del perfil (no el que envía el cliente) y la dirección"""
+        profile = mock.Mock(status_code=200)
+        profile.json.return_value = {'id': 1, 'full_name': '  Juan Pérez '}
+        client = APIClient()
+        client.force_authenticate(User.objects.create(username='comprador', id=1))
+        client.credentials(HTTP_AUTHORIZATION='Bearer token-del-comprador')
+        data = {**ORDER_DATA, 'customer_name': 'Otro Nombre', 'shipping_address': 'Calle 5 # 10-20 '}
+        
+        with mock.patch('core.customers.get_client') as get_client:
+            get_client.return_value.get.return_value = profile
+            response = client.post('/api/cart/checkout/', data, format='json')
+        self.assertEqual(response.status_code, 201)
+        get_client.return_value.get.assert_called_once_with(
+            '/api/users/1/', headers={'Authorization': 'Bearer token-del-comprador'}
+        )
+        
+        order = Order.objects.get(id=response.json()['order']['id'])
+        self.assertEqual(order.customer_name, 'Juan Pérez')
+        self.assertEqual(order.customer_address, 'Calle 5 # 10-20, Ibagué, Tolima, 730001, Colombia')
+        listed = client.get('/api/orders/my_orders/').json()
+        self.assertEqual(listed[0]['customer_name'], 'Juan Pérez')
+    
+    def test_checkout_without_profile_leaves_name_for_backfill(self):
+        """Probar que si usuarios no responde el pedido se crea igual, sin nombre"""
+        client = APIClient()
+        client.force_authenticate(User.objects.create(username='comprador', id=1))
+        client.credentials(HTTP_AUTHORIZATION='Bearer token-del-comprador')
+        
+        with mock.patch('core.customers.get_client') as get_client:
+            get_client.return_value.get.side_effect = UpstreamError('usuarios: sin respuesta')
+            response = client.post('/api/cart/checkout/', ORDER_DATA, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(Order.objects.get().customer_name, '')
+    
+    def test_backfill_fills_only_missing_fields(self):
+        """Probar que el backfill completa pedidos viejos sin pisar copias existentes"""
+        old = create_order(user_id=5)
+        Order.objects.filter(id=old.id).update(customer_name='', customer_address='')
+        kept = create_order(user_id=5)
+        Order.objects.filter(id=kept.id).update(customer_name='Nombre al comprar')
+        
+        names = load_customers(['{"id": 5, "full_name": "Ana Gómez", "email": "ana@example.com"}', ''])
+        self.assertEqual(names, {5: 'Ana Gómez'})
+        self.assertEqual(backfill_snapshots(names, batch_size=1), 1)
+        
+        old.refresh_from_db()
+        kept.refresh_from_db()
+        self.assertEqual(old.customer_name, 'Ana Gómez')
+        self.assertEqual(old.customer_address, 'Calle 5 # 10-20, Ibagué, Tolima, 730001, Colombia')
+        self.assertEqual(kept.customer_name, 'Nombre al comprar')
+        self.assertEqual(backfill_snapshots(names), 0)
+        
+        with self.assertRaises(ValueError):
+            load_customers(['{"full_name": "Sin id"}'])
+
+
+class CustomerProfileCallTestCase(TransactionTestCase):
+    """Tests para la consulta del perfil fuera de transacciones (sin la transacción de TestCase)"""
+    
+    def test_profile_is_fetched_outside_the_idempotency_transaction(self):
+        """Probar que la llamada a usuarios no ocurre con una transacción abierta"""
+        in_transaction = []
+        
+        def fetch_profile(path, **kwargs):
+            in_transaction.append(connection.in_atomic_block)
+            return mock.Mock(status_code=200, json=lambda: {'full_name': 'Juan Pérez'})
+        
+        client = APIClient()
+        client.force_authenticate(User.objects.create(username='comprador', id=1))
+        client.credentials(HTTP_AUTHORIZATION='Bearer token-del-comprador')
+        
+        with mock.patch('core.customers.get_client') as get_client:
+            get_client.return_value.get.side_effect = fetch_profile
+            response = client.post(
+                '/api/cart/checkout/', ORDER_DATA, format='json', HTTP_IDEMPOTENCY_KEY='checkout-1'
+            )
+            self.assertEqual(response.status_code, 201)
+            response = client.post('/api/orders/', ORDER_DATA, format='json', HTTP_IDEMPOTENCY_KEY='orders-1')
+            self.assertEqual(response.status_code, 201)
+        
+        self.assertEqual(in_transaction, [False, False])
+        self.assertEqual(set(Order.objects.values_list('customer_name', flat=True)), {'Juan Pérez'})
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """Servidor de prueba: responde según la lista `script` del servidor"""
+    
+    protocol_version = 'HTTP/1.1'           # Keep-alive
+    
+    def do_GET(self):
+        server = self.server
+        with server.lock:
+            server.connections.add(self.client_address)
+            status_code, delay = server.script.pop(0) if server.script else (200, 0)
+            server.hits += 1
+        time.sleep(delay)
+        body = b'{"ok": true}'
+        self.send_response(status_code)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+    
+    do_POST = do_GET
+    
+    def log_message(self, *args):
+        pass
+
+
+class StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+    
+    def handle_error(self, request, client_address):
+        pass                                # El cliente cortó por timeout
+
+
+class HttpClientTestCase(SimpleTestCase):
+    """Tests para el cliente HTTP entre servicios (contra un servidor local)"""
+    
+    def setUp(self):
+        self.server = StubServer(('127.0.0.1', 0), StubHandler)
+        self.server.lock = threading.Lock()
+        self.server.script = []
+        self.server.connections = set()
+        self.server.hits = 0
+        threading.Thread(target=self.server.serve_forever, args=(0.05,), daemon=True).start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+    
+    def upstream(self, **options):
+        options = {'backoff': 0.001, 'read_timeout': 1.0, **options}
+        return UpstreamClient('stub', f'http://127.0.0.1:{self.server.server_port}', **options)
+    
+    def test_connections_are_reused(self):
+        """Probar que varias llamadas usan una sola conexión (keep-alive)"""
+        client = self.upstream()
+        for _ in range(5):
+            self.assertEqual(client.get('/items/').json(), {'ok': True})
+        self.assertEqual(len(self.server.connections), 1)
+        self.assertEqual(client.stats()['statuses'], {'200': 5})
+    
+    def test_retries_only_idempotent_requests(self):
+        """Probar reintentos de errores transitorios en GET y no en POST"""
+        client = self.upstream(retries=2)
+        self.server.script = [(503, 0), (502, 0)]
+        self.assertEqual(client.get('/items/').status_code, 200)
+        self.assertEqual(client.stats()['retries'], 2)
+        
+        self.server.script = [(503, 0)]
+        self.assertEqual(client.post('/items/', json={}).status_code, 503)
+        self.assertEqual(self.server.hits, 4)
+        
+        self.server.script = [(200, 0.3)] * 3
+        with self.assertRaises(UpstreamError):
+            self.upstream(retries=2, read_timeout=0.05).get('/slow/')
+    
+    def test_circuit_opens_and_recovers(self):
+        """Probar que el circuito se abre tras fallas seguidas y se cierra tras una prueba exitosa"""
+        client = self.upstream(retries=0, failure_threshold=2, reset_timeout=0.1)
+        self.server.script = [(503, 0), (503, 0)]
+        client.get('/items/')
+        client.get('/items/')
+        
+        with self.assertRaises(CircuitOpenError):
+            client.get('/items/')
+        self.assertEqual(self.server.hits, 2)
+        self.assertEqual(client.stats()['circuit'], 'open')
+        
+        time.sleep(0.15)
+        self.assertEqual(client.get('/items/').status_code, 200)
+        self.assertEqual(client.stats()['circuit'], 'closed')
+    
+    def test_slow_get_is_hedged(self):
+        """Probar que un GET lento se repite y gana la respuesta más rápida"""
+        client = self.upstream(hedge_after=0.05)
+        self.server.script = [(200, 0.5)]
+        start = time.monotonic()
+        self.assertEqual(client.get('/items/').status_code, 200)
+        self.assertLess(time.monotonic() - start, 0.4)
+        self.assertEqual(client.stats()['hedges'], 1)
+        self.assertEqual(client.stats()['hedge_wins'], 1)
+
+
+class OrderConcurrencyTestCase(TransactionTestCase):
+    """Tests de concurrencia: transiciones en paralelo"""
+    
+    THREADS = 8
+    
+    def run_in_parallel(self, target):
+        """Lanza THREADS hilos que arrancan a la vez y retorna sus resultados"""
+        barrier = threading.Barrier(self.THREADS)
+        results = []
+        lock = threading.Lock()
+        
+        def worker():
+            try:
+                barrier.wait()
+                result = target()
+                with lock:
+                    results.append(result)
+            finally:
+                connection.close()
+        
+        threads = [threading.Thread(target=worker) for _ in range(self.THREADS)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return results
+    
+    def test_parallel_transitions_apply_once(self):
+        """Probar que N cancelaciones simultáneas se aplican exactamente una vez"""
+        order = create_order()
+        
+        results = self.run_in_parallel(lambda: Order.objects.transition(order.id, 'cancelled'))
+        
+        self.assertEqual(len(results), self.THREADS)
+        self.assertEqual(results.count(True), 1)
+        order.refresh_from_db()
+        self.assertEqual(order.status, 'cancelled')
+        self.assertEqual(order.version, 2)
+    
+    def test_parallel_versioned_updates_do_not_lose_writes(self):
+        """Probar que con la misma versión solo gana una edición y las otras reciben 409"""
+        order = create_order()
+        
+        def update():
+            stale = Order.objects.get(id=order.id)
+            serializer = OrderUpdateSerializer(
+                stale, data={'notes': threading.current_thread().name, 'version': 1}, partial=True
+            )
+            serializer.is_valid(raise_exception=True)
+            try:
+                serializer.save()
+                return threading.current_thread().name
+            except OrderConflict:
+                return None
+        
+        results = self.run_in_parallel(update)
+        self.assertEqual(len(results), self.THREADS)
+        winners = [name for name in results if name]
+        
+        self.assertEqual(len(winners), 1)
+        order.refresh_from_db()
+        self.assertEqual(order.notes, winners[0])
+        self.assertEqual(order.version, 2)
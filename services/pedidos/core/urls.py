@@ -6,10 +6,20 @@ from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from .views import OrderViewSet, CartViewSet
 
-router = DefaultRouter()
-router.register(r'', OrderViewSet, basename='order')
-router.register(r'', CartViewSet, basename='cart')
+# Un router por prefijo: con los dos en el mismo router, el detalle de
+# pedidos (/{id}/) capturaba también /api/cart/checkout/ (405)
+order_router = DefaultRouter()
+order_router.register(r'', OrderViewSet, basename='order')
 
+cart_router = DefaultRouter()
+cart_router.register(r'', CartViewSet, basename='cart')
+
+# /api/orders/
 urlpatterns = [
-    path('', include(router.urls)),
-]
\ No newline at end of file
+    path('', include(order_router.urls)),
+]
+
+# /api/cart/
+cart_urlpatterns = [
+    path('', include(cart_router.urls)),
+]
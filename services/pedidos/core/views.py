@@ -6,16 +6,28 @@ from rest_framework import viewsets, status, permissions
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.views import APIView
+from django.db import transaction
+from django.db.models import Sum
+from django.http import Http404
 from django.shortcuts import get_object_or_404
+from django.utils.dateparse import parse_date
 
-from .models import Order, OrderItem
+from .archive import get_archived_order
+from .customers import request_customer_name
+from .idempotency import run_idempotent
+from .models import DailyOrderStats, Order, OrderItem, UserOrderSummary
+from .outbox import record_order_event, ORDER_STATUS_CHANGED, ORDER_CANCELLED
+from .rollups import apply_order_change
 from .serializers import (
     OrderListSerializer,
     OrderDetailSerializer,
     OrderCreateSerializer,
     OrderUpdateSerializer,
     CartItemSerializer,
+    DailyOrderStatsSerializer,
+    UserOrderSummarySerializer,
 )
+from .tasks import queue_stats
 
 
 class OrderViewSet(viewsets.ModelViewSet):
@@ -23,8 +35,10 @@ class OrderViewSet(viewsets.ModelViewSet):
     ViewSet para Pedidos
     GET    /api/orders/          - Listar pedidos del usuario
     POST   /api/orders/          - Crear pedido
-    GET    /api/orders/{id}/     - Detalle del pedido
+    GET    /api/orders/{id}/     - Detalle del pedido (también archivados)
     PUT    /api/orders/{id}/     - Actualizar estado del pedido (admin)
+    GET    /api/orders/summary/  - Resumen de pedidos del usuario
+    GET    /api/orders/stats/    - Pedidos e ingresos por día y estado (admin)
     """
     
     permission_classes = [permissions.IsAuthenticated]
@@ -57,21 +71,51 @@ class OrderViewSet(viewsets.ModelViewSet):
             return OrderListSerializer
     
     def create(self, request, *args, **kwargs):
-        """Crear un nuevo pedido"""
+        """
+        Crear un nuevo pedido
+        
+        Header opcional Idempotency-Key: los reintentos con la misma clave
+        reciben la respuesta original (ver core/idempotency.py)
+        """
         data = request.data.copy()
         
         # Si el usuario no es admin, usa su propio ID
         if not request.user.is_staff:
             data['user_id'] = request.user.id
         
-        serializer = self.get_serializer(data=data)
-        serializer.is_valid(raise_exception=True)
-        order = serializer.save()
+        # Antes de run_idempotent: la llamada a usuarios no debe ocurrir
+        # dentro de su transacción
+        customer_name = request_customer_name(request, data.get('user_id'))
         
-        return Response(
-            OrderDetailSerializer(order).data,
-            status=status.HTTP_201_CREATED
-        )
+        def create_order():
+            serializer = self.get_serializer(
+                data=data, context={**self.get_serializer_context(), 'customer_name': customer_name}
+            )
+            serializer.is_valid(raise_exception=True)
+            order = serializer.save()
+            return order, Response(
+                OrderDetailSerializer(order).data,
+                status=status.HTTP_201_CREATED
+            )
+        
+        # Con Idempotency-Key un reintento no crea otro pedido
+        return run_idempotent(request, create_order)
+    
+    def retrieve(self, request, *args, **kwargs):
+        """
+        Detalle del pedido; si ya no está en las tablas de pedidos, se lee
+        del archivo (pedidos antiguos, ver core/archive.py)
+        """
+        try:
+            return super().retrieve(request, *args, **kwargs)
+        except Http404:
+            user_id = None if request.user.is_staff else request.user.id
+            archived = None
+            if str(kwargs.get('id', '')).isdigit():
+                archived = get_archived_order(int(kwargs['id']), user_id=user_id)
+            if archived is None:
+                raise
+            return Response(archived)
     
     def update(self, request, *args, **kwargs):
         """Actualizar estado del pedido (solo admin)"""
@@ -83,6 +127,18 @@ class OrderViewSet(viewsets.ModelViewSet):
         
         return super().update(request, *args, **kwargs)
     
+    def perform_update(self, serializer):
+        """Guardar el cambio y, si cambió el estado, registrar el evento"""
+        previous_status = serializer.instance.status
+        
+        with transaction.atomic():
+            order = serializer.save()
+            
+            if order.status != previous_status:
+                event_type = ORDER_CANCELLED if order.status == 'cancelled' else ORDER_STATUS_CHANGED
+                record_order_event(order, event_type, previous_status=previous_status)
+                apply_order_change(order, previous_status)
+    
     @action(detail=False, methods=['get'], permission_classes=[permissions.IsAuthenticated])
     def my_orders(self, request):
         """
@@ -93,22 +149,109 @@ class OrderViewSet(viewsets.ModelViewSet):
         serializer = OrderListSerializer(orders, many=True)
         return Response(serializer.data)
     
+    @action(detail=False, methods=['get'], permission_classes=[permissions.IsAuthenticated])
+    def summary(self, request):
+        """
+        Resumen de pedidos del usuario (una fila, sin sumar sus pedidos)
+        GET /api/orders/summary/
+        GET /api/orders/summary/?user_id=5   (admin)
+        """
+        user_id = request.user.id
+        if request.user.is_staff and request.query_params.get('user_id'):
+            try:
+                user_id = int(request.query_params['user_id'])
+            except ValueError:
+                return Response(
+                    {'error': 'user_id debe ser un número'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+        
+        summary = UserOrderSummary.objects.filter(user_id=user_id).first()
+        if summary is None:
+            summary = UserOrderSummary(user_id=user_id)
+        return Response(UserOrderSummarySerializer(summary).data)
+    
+    @action(detail=False, methods=['get'], permission_classes=[permissions.IsAdminUser])
+    def stats(self, request):
+        """
+        Pedidos e ingresos por día y estado (solo admin)
+        GET /api/orders/stats/?from=2024-01-01&to=2024-01-31
+        """
+        queryset = DailyOrderStats.objects.all()
+        
+        for param, lookup in (('from', 'day__gte'), ('to', 'day__lte')):
+            value = request.query_params.get(param)
+            if value:
+                day = parse_date(value)
+                if day is None:
+                    return Response(
+                        {'error': f'{param} debe tener el formato AAAA-MM-DD'},
+                        status=status.HTTP_400_BAD_REQUEST
+                    )
+                queryset = queryset.filter(**{lookup: day})
+        
+        totals = {
+            row['status']: {'order_count': row['order_count'], 'revenue': row['revenue']}
+            for row in queryset.order_by().values('status').annotate(
+                order_count=Sum('order_count'), revenue=Sum('revenue')
+            )
+        }
+        return Response({
+            'totals': totals,
+            'days': DailyOrderStatsSerializer(queryset, many=True).data,
+        })
+    
+    @action(detail=False, methods=['get'], permission_classes=[permissions.IsAdminUser])
+    def tasks(self, request):
+        """
+        Cola de tareas en segundo plano: profundidad y latencia (solo admin)
+        GET /api/orders/tasks/?window=15   (minutos para la latencia)
+        """
+        try:
+            window = int(request.query_params.get('window', 15))
+        except ValueError:
+            return Response(
+                {'error': 'window debe ser un número de minutos'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        return Response(queue_stats(window))
+    
     @action(detail=True, methods=['post'], permission_classes=[permissions.IsAdminUser])
-    def cancel(self, request, pk=None):
+    def cancel(self, request, id=None):
         """
         Cancelar un pedido (solo admin)
         POST /api/orders/{id}/cancel/
         """
         order = self.get_object()
         
-        if order.status == 'delivered':
+        # Ya cancelado: no repetir el evento (liberaría el stock dos veces)
+        if order.status == 'cancelled':
+            return Response(
+                OrderDetailSerializer(order).data,
+                status=status.HTTP_200_OK
+            )
+        
+        if not order.can_transition_to('cancelled'):
             return Response(
                 {'error': 'No se puede cancelar un pedido entregado'},
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        order.status = 'cancelled'
-        order.save()
+        previous_status = order.status
+        
+        with transaction.atomic():
+            # UPDATE ... WHERE status IN (pending, confirmed, shipped) AND
+            # version = <la leída>: si otra petición lo cambió desde la
+            # lectura, no se pisa (y previous_status sigue siendo el real)
+            if not Order.objects.transition(order.id, 'cancelled', expected_version=order.version):
+                return Response(
+                    {'error': 'El pedido cambió de estado, vuelve a cargarlo'},
+                    status=status.HTTP_409_CONFLICT
+                )
+            
+            order.refresh_from_db(fields=['status', 'version', 'updated_at'])
+            record_order_event(order, ORDER_CANCELLED, previous_status=previous_status)
+            apply_order_change(order, previous_status)
         
         return Response(
             OrderDetailSerializer(order).data,
@@ -116,7 +259,7 @@ class OrderViewSet(viewsets.ModelViewSet):
         )
     
     @action(detail=True, methods=['get'], permission_classes=[permissions.IsAuthenticated])
-    def status(self, request, pk=None):
+    def status(self, request, id=None):
         """
         Obtener solo el estado de un pedido
         GET /api/orders/{id}/status/
@@ -125,6 +268,7 @@ class OrderViewSet(viewsets.ModelViewSet):
         return Response({
             'order_number': order.order_number,
             'status': order.status,
+            'version': order.version,
             'total': order.total,
             'updated_at': order.updated_at,
         })
@@ -179,6 +323,7 @@ class CartViewSet(viewsets.ViewSet):
         """
         Procesar checkout y crear pedido
         POST /api/cart/checkout/
+        Header opcional: Idempotency-Key: <uuid generado por el cliente>
         
         Body:
         {
@@ -194,12 +339,18 @@ class CartViewSet(viewsets.ViewSet):
         """
         data = request.data.copy()
         data['user_id'] = request.user.id
+        customer_name = request_customer_name(request, request.user.id)
         
-        serializer = OrderCreateSerializer(data=data)
-        serializer.is_valid(raise_exception=True)
-        order = serializer.save()
+        def create_order():
+            serializer = OrderCreateSerializer(
+                data=data, context={'request': request, 'customer_name': customer_name}
+            )
+            serializer.is_valid(raise_exception=True)
+            order = serializer.save()
+            return order, Response({
+                'message': 'Pedido creado exitosamente',
+                'order': OrderDetailSerializer(order).data,
+            }, status=status.HTTP_201_CREATED)
         
-        return Response({
-            'message': 'Pedido creado exitosamente',
-            'order': OrderDetailSerializer(order).data,
-        }, status=status.HTTP_201_CREATED)
\ No newline at end of file
+        # Con Idempotency-Key un reintento recibe el mismo pedido
+        return run_idempotent(request, create_order)
\ No newline at end of file
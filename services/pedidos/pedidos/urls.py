@@ -1,8 +1,12 @@
 from django.contrib import admin
 from django.urls import path, include
+from core.health import HealthView, ReadinessView
+from core.urls import cart_urlpatterns
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/orders/', include('core.urls')),
-    path('api/cart/', include('core.urls')),
+    path('api/cart/', include(cart_urlpatterns)),
+    path('healthz', HealthView.as_view(), name='healthz'),
+    path('readyz', ReadinessView.as_view(), name='readyz'),
 ]
\ No newline at end of file
@@ -5,4 +5,8 @@ from django.core.wsgi import get_wsgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'pedidos.settings')
 
-application = get_wsgi_application()
\ No newline at end of file
+application = get_wsgi_application()
+
+from core.health import warmup  # noqa: E402
+
+warmup()
@@ -1,7 +1,174 @@
+# ========================================
+# ADMIN.PY - PANEL DE ADMINISTRACIÓN
+# ========================================
+
+from django import forms
+from django.contrib import admin, messages
+from django.contrib.admin.helpers import ActionForm
+from django.utils import timezone
+
+from .bulk import apply_discount, change_price, update_in_batches
+from .inventory import reset_stock
+from .models import Category, PriceList, PriceRule, Product, Review
+from .paginators import EstimatedCountPaginator
+
+
+class PercentageActionForm(ActionForm):
+    """Formulario de acciones con un campo de porcentaje (precios y descuentos)"""
+    percentage = forms.DecimalField(
+        label='Porcentaje',
+        required=False,
+        max_digits=5,
+        decimal_places=2,
+    )
+
+
 @admin.register(Category)
 class CategoryAdmin(admin.ModelAdmin):
-    list_display = ('name', 'slug', 'is_active', 'created_at')
+    list_display = ('name', 'slug', 'parent', 'product_count', 'is_active', 'created_at')
     list_filter = ('is_active', 'created_at')
+    list_select_related = ('parent',)
+    readonly_fields = ('path', 'depth', 'product_count')
     search_fields = ('name', 'slug')
     prepopulated_fields = {'slug': ('name',)}
-    ordering = ('name',)
\ No newline at end of file
+    ordering = ('name',)
+    actions = ('activate', 'deactivate')
+    
+    @admin.action(description='Activar categorías')
+    def activate(self, request, queryset):
+        updated = update_in_batches(queryset, is_active=True)
+        self.message_user(request, f'{updated} categoría(s) activadas.', messages.SUCCESS)
+    
+    @admin.action(description='Desactivar categorías')
+    def deactivate(self, request, queryset):
+        updated = update_in_batches(queryset, is_active=False)
+        self.message_user(request, f'{updated} categoría(s) desactivadas.', messages.SUCCESS)
+
+
+@admin.register(Product)
+class ProductAdmin(admin.ModelAdmin):
+    list_display = ('name', 'sku', 'category', 'price', 'discount_price', 'stock', 'is_active', 'is_featured')
+    list_filter = ('is_active', 'is_featured', 'category')
+    search_fields = ('name', 'sku', 'slug')
+    prepopulated_fields = {'slug': ('name',)}
+    readonly_fields = ('rating', 'review_count', 'rating_sum',  # Los mantienen las reseñas
+                       'price_list')                            # Y core/pricing.py
+    ordering = ('-created_at',)
+    
+    # Tablas grandes: la categoría en el mismo query y sin COUNT(*) completo
+    list_select_related = ('category',)
+    show_full_result_count = False
+    paginator = EstimatedCountPaginator
+    
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        if change and 'stock' in form.changed_data:
+            # Stock absoluto: las porciones se rehacen desde este valor (core/inventory.py)
+            reset_stock([obj.pk])
+    
+    # ========================================
+    # ACCIONES MASIVAS (SQL por lotes, ver core/bulk.py)
+    # ========================================
+    action_form = PercentageActionForm
+    actions = (
+        'activate', 'deactivate', 'feature', 'unfeature',
+        'change_price_action', 'apply_discount_action',
+    )
+    
+    def _percentage(self, request):
+        """Porcentaje escrito junto al selector de acciones (None si falta o es inválido)"""
+        form = self.action_form(request.POST)
+        if form.is_valid() and form.cleaned_data['percentage'] is not None:
+            return form.cleaned_data['percentage']
+        self.message_user(request, 'Escribe un porcentaje válido.', messages.ERROR)
+        return None
+    
+    @admin.action(description='Activar productos')
+    def activate(self, request, queryset):
+        updated = update_in_batches(queryset, is_active=True)
+        self.message_user(request, f'{updated} producto(s) activados.', messages.SUCCESS)
+    
+    @admin.action(description='Desactivar productos')
+    def deactivate(self, request, queryset):
+        updated = update_in_batches(queryset, is_active=False)
+        self.message_user(request, f'{updated} producto(s) desactivados.', messages.SUCCESS)
+    
+    @admin.action(description='Marcar como destacados')
+    def feature(self, request, queryset):
+        updated = update_in_batches(queryset, is_featured=True)
+        self.message_user(request, f'{updated} producto(s) destacados.', messages.SUCCESS)
+    
+    @admin.action(description='Quitar de destacados')
+    def unfeature(self, request, queryset):
+        updated = update_in_batches(queryset, is_featured=False)
+        self.message_user(request, f'{updated} producto(s) ya no son destacados.', messages.SUCCESS)
+    
+    @admin.action(description='Cambiar precio en un porcentaje (+/-)')
+    def change_price_action(self, request, queryset):
+        percentage = self._percentage(request)
+        if percentage is None:
+            return
+        try:
+            updated = change_price(queryset, percentage)
+        except ValueError as exc:
+            self.message_user(request, str(exc), messages.ERROR)
+            return
+        self.message_user(request, f'Precio de {updated} producto(s) cambiado en {percentage}%.', messages.SUCCESS)
+    
+    @admin.action(description='Aplicar descuento en porcentaje (0 = quitar)')
+    def apply_discount_action(self, request, queryset):
+        percentage = self._percentage(request)
+        if percentage is None:
+            return
+        try:
+            updated = apply_discount(queryset, percentage)
+        except ValueError as exc:
+            self.message_user(request, str(exc), messages.ERROR)
+            return
+        self.message_user(request, f'Descuento del {percentage}% en {updated} producto(s).', messages.SUCCESS)
+
+
+@admin.register(Review)
+class ReviewAdmin(admin.ModelAdmin):
+    """
+    Reseñas. Editar o borrar una a una ajusta el rating del producto;
+    el borrado masivo no, así que se quita (usar reconcile_ratings).
+    """
+    list_display = ('product', 'user_id', 'rating', 'title', 'created_at')
+    list_filter = ('rating', 'created_at')
+    search_fields = ('product__name', 'product__sku', 'title')
+    raw_id_fields = ('product',)
+    list_select_related = ('product',)
+    show_full_result_count = False
+    paginator = EstimatedCountPaginator
+    
+    def get_actions(self, request):
+        actions = super().get_actions(request)
+        actions.pop('delete_selected', None)
+        return actions
+
+
+class PriceRuleInline(admin.TabularInline):
+    model = PriceRule
+    extra = 1
+    raw_id_fields = ('product',)
+
+
+@admin.register(PriceList)
+class PriceListAdmin(admin.ModelAdmin):
+    """
+    Listas de precios programadas. No se aplican al guardar: lo hace
+    manage.py apply_price_lists por lotes al llegar la fecha (core/pricing.py).
+    """
+    list_display = ('name', 'starts_at', 'ends_at', 'priority', 'applied_at', 'finished_at')
+    list_filter = ('starts_at', 'ends_at')
+    search_fields = ('name',)
+    readonly_fields = ('applied_at', 'finished_at', 'created_at')
+    inlines = (PriceRuleInline,)
+    actions = ('end_now',)
+    
+    @admin.action(description='Terminar ahora (se devuelven los precios en la próxima pasada)')
+    def end_now(self, request, queryset):
+        now = timezone.now()
+        ended = queryset.filter(finished_at__isnull=True, starts_at__lt=now).update(ends_at=now)
+        self.message_user(request, f'{ended} lista(s) terminadas.', messages.SUCCESS)
@@ -3,4 +3,10 @@ from django.apps import AppConfig
 class CoreConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'core'
-    verbose_name = 'Gestión de Productos'
\ No newline at end of file
+    verbose_name = 'Gestión de Productos'
+    
+    def ready(self):
+        from . import categories, home, product_cache
+        categories.connect_signals()
+        home.connect_signals()
+        product_cache.connect_signals()
@@ -0,0 +1,113 @@
+# ========================================
+# BULK - OPERACIONES MASIVAS SOBRE EL CATÁLOGO
+# ========================================
+#
+# Reprecios, descuentos y activaciones de miles de productos sin un save()
+# por producto: UPDATEs de conjunto por lotes de ids, cada lote en su propia
+# transacción para no bloquear la tabla entera.
+
+import logging
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import F
+from django.db.models.functions import Round
+from django.utils import timezone
+
+from .categories import schedule_recount
+from .home import schedule_rebuild
+from .models import Category, Product
+from .product_cache import invalidate_products
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 1000
+
+
+def update_in_batches(queryset, batch_size=BATCH_SIZE, progress=None, before_update=None, **values):
+    """
+    Aplica `queryset.update(**values)` por lotes de `batch_size` ids
+    
+    Recorre por id (keyset), así cada lote es un UPDATE ... WHERE id IN (...)
+    corto. `before_update(ids)` se llama dentro de la transacción del lote,
+    antes del UPDATE. `progress(actualizados, último_id)` se llama después
+    de cada lote. Retorna la cantidad de filas actualizadas.
+    """
+    model = queryset.model
+    ids = queryset.order_by('id').values_list('id', flat=True)
+    if any(field.name == 'updated_at' for field in model._meta.fields):
+        values.setdefault('updated_at', timezone.now())
+    
+    # Cambios que alteran los productos activos por categoría
+    recount = model is Product and bool({'is_active', 'category', 'category_id'} & set(values))
+    
+    updated = 0
+    last_id = 0
+    
+    while True:
+        batch_ids = list(ids.filter(id__gt=last_id)[:batch_size])
+        if not batch_ids:
+            break
+        last_id = batch_ids[-1]
+        
+        with transaction.atomic():
+            if recount:
+                # Categorías de antes (y la nueva, si se mueven los productos)
+                schedule_recount(
+                    set(model.objects.filter(id__in=batch_ids).values_list('category_id', flat=True))
+                    | {values.get('category_id', getattr(values.get('category'), 'pk', None))}
+                )
+            if before_update:
+                before_update(batch_ids)
+            updated += model.objects.filter(id__in=batch_ids).update(**values)
+            if model is Product:
+                invalidate_products(batch_ids)
+        
+        logger.info('bulk %s: %d filas (hasta id %d)', model._meta.label, updated, last_id)
+        if progress:
+            progress(updated, last_id)
+    
+    # queryset.update() no dispara señales: avisar a la portada
+    if updated and model in (Category, Product):
+        schedule_rebuild()
+    
+    return updated
+
+
+def change_price(queryset, percentage, **kwargs):
+    """
+    Sube (o baja, con porcentaje negativo) el precio en `percentage` %
+    
+    El precio con descuento se ajusta en la misma proporción.
+    """
+    percentage = Decimal(percentage)
+    if percentage <= -100:
+        raise ValueError('El porcentaje debe ser mayor que -100')
+    
+    factor = 1 + percentage / 100
+    return update_in_batches(
+        queryset,
+        price=Round(F('price') * factor, 2),
+        discount_price=Round(F('discount_price') * factor, 2),
+        **kwargs
+    )
+
+
+def apply_discount(queryset, percentage, **kwargs):
+    """
+    Deja el precio con descuento en `percentage` % menos que el precio
+    
+    Con 0 se quita el descuento.
+    """
+    percentage = Decimal(percentage)
+    if not 0 <= percentage < 100:
+        raise ValueError('El descuento debe estar entre 0 y 100')
+    
+    if percentage == 0:
+        return update_in_batches(queryset, discount_price=None, **kwargs)
+    
+    return update_in_batches(
+        queryset,
+        discount_price=Round(F('price') * (1 - percentage / 100), 2),
+        **kwargs
+    )
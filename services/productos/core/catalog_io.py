@@ -0,0 +1,353 @@
+# ========================================
+# CATALOG I/O - IMPORTACIÓN Y EXPORTACIÓN MASIVA DE PRODUCTOS
+# ========================================
+#
+# Los feeds de proveedores traen cientos de miles de filas. Aquí:
+# - import_products: lee CSV o NDJSON en streaming, valida por lotes y hace
+#   upsert por sku (INSERT ... ON CONFLICT (sku) DO UPDATE, un query por
+#   lote). Las filas inválidas se reportan sin abortar la importación.
+# - export_products: genera el catálogo por trozos con un cursor de servidor.
+# Ambos usan memoria constante: nunca se carga el archivo completo.
+
+import csv
+import io
+import json
+import logging
+from decimal import Decimal, InvalidOperation
+
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from django.utils.text import slugify
+
+from .categories import schedule_recount
+from .home import schedule_rebuild
+from .models import Category, Product
+from .inventory import reset_stock
+from .product_cache import invalidate_products
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 1000
+
+# Máximo de errores que se guardan en el resultado (el resto solo se cuenta)
+MAX_REPORTED_ERRORS = 1000
+
+# Columnas del formato de intercambio (la categoría va por slug)
+COLUMNS = (
+    'sku', 'name', 'slug', 'category', 'price', 'discount_price', 'stock',
+    'short_description', 'description', 'image', 'is_active', 'is_featured',
+)
+
+# Campos que se sobrescriben cuando el sku ya existe
+UPDATE_FIELDS = (
+    'name', 'slug', 'category', 'price', 'discount_price', 'stock',
+    'short_description', 'description', 'image', 'is_active', 'is_featured',
+    'updated_at',
+)
+
+TRUE_VALUES = {'1', 'true', 't', 'yes', 'y', 'si', 'sí'}
+FALSE_VALUES = {'0', 'false', 'f', 'no', 'n'}
+
+
+class RowError(ValueError):
+    """Fila inválida (se reporta y se sigue con la siguiente)"""
+
+
+# ========================================
+# LECTURA
+# ========================================
+
+def read_rows(stream, fmt='csv'):
+    """
+    Itera las filas de un archivo de texto como dicts (línea, fila)
+    
+    `fmt` es 'csv' (con encabezado) o 'ndjson' (un objeto JSON por línea).
+    Las líneas NDJSON mal formadas se entregan como RowError.
+    """
+    if fmt == 'csv':
+        reader = csv.DictReader(stream)
+        for row in reader:
+            yield reader.line_num, row
+    elif fmt == 'ndjson':
+        for line_num, line in enumerate(stream, start=1):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError as exc:
+                row = RowError(f'JSON inválido: {exc}')
+            yield line_num, row
+    else:
+        raise ValueError(f'Formato no soportado: {fmt}')
+
+
+# ========================================
+# VALIDACIÓN
+# ========================================
+
+def _text(row, field, max_length=None, required=False):
+    value = row.get(field)
+    value = '' if value is None else str(value).strip()
+    if required and not value:
+        raise RowError(f'{field}: es requerido')
+    if max_length and len(value) > max_length:
+        raise RowError(f'{field}: máximo {max_length} caracteres')
+    return value
+
+
+def _decimal(row, field, required=False):
+    value = _text(row, field, required=required)
+    if not value:
+        return None
+    try:
+        number = Decimal(value).quantize(Decimal('0.01'))
+    except InvalidOperation:
+        raise RowError(f'{field}: "{value}" no es un número')
+    if number <= 0:
+        raise RowError(f'{field}: debe ser mayor a 0')
+    return number
+
+
+def _bool(row, field, default):
+    value = _text(row, field).lower()
+    if not value:
+        return default
+    if value in TRUE_VALUES:
+        return True
+    if value in FALSE_VALUES:
+        return False
+    raise RowError(f'{field}: "{value}" no es un booleano')
+
+
+def clean_row(row, categories):
+    """
+    Valida una fila y la convierte en un Product (sin guardar)
+    
+    `categories` es el mapa slug -> id de categorías. Lanza RowError con
+    el motivo si la fila no es válida.
+    """
+    if isinstance(row, RowError):
+        raise row
+    
+    sku = _text(row, 'sku', max_length=50, required=True)
+    name = _text(row, 'name', max_length=255, required=True)
+    slug = slugify(_text(row, 'slug', max_length=50)) or slugify(f'{name}-{sku}')[:50]
+    
+    category_slug = _text(row, 'category', required=True)
+    category_id = categories.get(category_slug)
+    if category_id is None:
+        raise RowError(f'category: no existe la categoría "{category_slug}"')
+    
+    price = _decimal(row, 'price', required=True)
+    discount_price = _decimal(row, 'discount_price')
+    if discount_price is not None and discount_price >= price:
+        raise RowError('discount_price: debe ser menor que el precio')
+    
+    stock = _text(row, 'stock') or '0'
+    try:
+        stock = int(stock)
+    except ValueError:
+        raise RowError(f'stock: "{stock}" no es un entero')
+    if stock < 0:
+        raise RowError('stock: no puede ser negativo')
+    
+    return Product(
+        sku=sku,
+        name=name,
+        slug=slug,
+        category_id=category_id,
+        price=price,
+        discount_price=discount_price,
+        stock=stock,
+        short_description=_text(row, 'short_description', max_length=500),
+        description=_text(row, 'description'),
+        image=_text(row, 'image') or None,
+        is_active=_bool(row, 'is_active', True),
+        is_featured=_bool(row, 'is_featured', False),
+    )
+
+
+# ========================================
+# IMPORTACIÓN
+# ========================================
+
+class ImportResult:
+    """Resumen de una importación"""
+    
+    def __init__(self):
+        self.created = 0
+        self.updated = 0
+        self.failed = 0
+        self.skipped = 0                # Filas repetidas del mismo sku en un lote
+        self.errors = []                # [(línea, sku, motivo)], hasta MAX_REPORTED_ERRORS
+    
+    @property
+    def processed(self):
+        return self.created + self.updated + self.failed + self.skipped
+    
+    def add_error(self, line, sku, message):
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append((line, sku, message))
+    
+    def as_dict(self):
+        return {
+            'created': self.created,
+            'updated': self.updated,
+            'failed': self.failed,
+            'skipped': self.skipped,
+            'errors': [
+                {'line': line, 'sku': sku, 'error': message}
+                for line, sku, message in self.errors
+            ],
+        }
+
+
+def _upsert(products):
+    """INSERT ... ON CONFLICT (sku) DO UPDATE de un lote"""
+    Product.objects.bulk_create(
+        products,
+        update_conflicts=True,
+        unique_fields=['sku'],
+        update_fields=UPDATE_FIELDS,
+    )
+
+
+def _save_batch(batch, result):
+    """
+    Guarda un lote de (línea, Product) ya validados
+    
+    Si el lote choca con otra restricción (ej: slug repetido), se reintenta
+    fila por fila dentro de savepoints para aislar solo las culpables.
+    """
+    # Dentro del lote gana la última fila de cada sku (las anteriores se ignoran)
+    by_sku = {}
+    for line, product in batch:
+        by_sku[product.sku] = (line, product)
+    result.skipped += len(batch) - len(by_sku)
+    
+    # sku -> id de los que ya existían (sus detalles cacheados cambian)
+    existing = dict(
+        Product.objects.filter(sku__in=by_sku).values_list('sku', 'id')
+    )
+    
+    try:
+        with transaction.atomic():
+            _upsert([product for _, product in by_sku.values()])
+    except IntegrityError:
+        for line, product in by_sku.values():
+            try:
+                with transaction.atomic():
+                    _upsert([product])
+            except IntegrityError as exc:
+                result.add_error(line, product.sku, f'conflicto al guardar: {exc}')
+                existing.pop(product.sku, None)
+                by_sku[product.sku] = None
+    
+    for sku, entry in by_sku.items():
+        if entry is None:
+            continue
+        if sku in existing:
+            result.updated += 1
+        else:
+            result.created += 1
+    
+    # El stock del archivo es absoluto: rehacer las porciones desde él
+    reset_stock(existing.values())
+    invalidate_products(existing.values())
+
+
+def import_products(stream, fmt='csv', batch_size=BATCH_SIZE, progress=None):
+    """
+    Importa productos desde un archivo de texto, con upsert por sku
+    
+    Las filas se validan y guardan en lotes de `batch_size`; cada lote es
+    una transacción. `progress(result)` se llama después de cada lote.
+    Retorna un ImportResult.
+    """
+    categories = dict(Category.objects.values_list('slug', 'id'))
+    result = ImportResult()
+    batch = []
+    
+    def flush():
+        _save_batch(batch, result)
+        batch.clear()
+        logger.info(
+            'import_products: %d creados, %d actualizados, %d con error',
+            result.created, result.updated, result.failed,
+        )
+        if progress:
+            progress(result)
+    
+    for line, row in read_rows(stream, fmt):
+        try:
+            batch.append((line, clean_row(row, categories)))
+        except RowError as exc:
+            sku = row.get('sku') if isinstance(row, dict) else None
+            result.add_error(line, sku, str(exc))
+            continue
+        
+        if len(batch) >= batch_size:
+            flush()
+    
+    if batch:
+        flush()
+    
+    # bulk_create no dispara señales: avisar a la portada y recontar categorías
+    if result.created or result.updated:
+        schedule_rebuild()
+        schedule_recount(categories.values())
+    
+    return result
+
+
+# ========================================
+# EXPORTACIÓN
+# ========================================
+
+def _export_values(queryset):
+    """Filas del catálogo en el orden de COLUMNS, con un cursor de servidor"""
+    fields = [
+        'sku', 'name', 'slug', 'category__slug', 'price', 'discount_price', 'stock',
+        'short_description', 'description', 'image', 'is_active', 'is_featured',
+    ]
+    return queryset.order_by('id').values_list(*fields).iterator(chunk_size=BATCH_SIZE)
+
+
+def export_products(queryset=None, fmt='csv', chunk_rows=BATCH_SIZE):
+    """
+    Genera el catálogo como trozos de texto (CSV con encabezado o NDJSON)
+    
+    Pensado para StreamingHttpResponse o para escribir a un archivo:
+    en memoria solo hay `chunk_rows` filas a la vez.
+    """
+    if queryset is None:
+        queryset = Product.objects.all()
+    if fmt not in ('csv', 'ndjson'):
+        raise ValueError(f'Formato no soportado: {fmt}')
+    
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if fmt == 'csv':
+        writer.writerow(COLUMNS)
+    
+    pending = 0
+    for values in _export_values(queryset):
+        if fmt == 'csv':
+            writer.writerow(['' if value is None else value for value in values])
+        else:
+            buffer.write(json.dumps(dict(zip(COLUMNS, values)), default=str) + '\n')
+        
+        pending += 1
+        if pending >= chunk_rows:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+            pending = 0
+    
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def export_filename(fmt):
+    return f"productos-{timezone.now():%Y%m%d-%H%M%S}.{fmt}"
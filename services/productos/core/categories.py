@@ -0,0 +1,267 @@
+# ========================================
+# CATEGORÍAS - ÁRBOL, CONTEOS Y FACETAS
+# ========================================
+#
+# - Category.product_count guarda los productos activos DIRECTAMENTE en la
+#   categoría. Se recuenta (un GROUP BY de las categorías afectadas) al
+#   confirmar cada escritura de productos; los conteos del subárbol se suman
+#   en memoria con el árbol cacheado.
+# - facets(): conteos por categoría, rango de precio, descuento y
+#   disponibilidad para cualquier queryset filtrado, en UN query agregado.
+
+import threading
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, F, Q
+from django.db.models.signals import post_delete, post_save, pre_save
+
+from .models import Category, Product
+
+TREE_CACHE_KEY = 'catalog:category-tree'
+TREE_CACHE_TIMEOUT = 300
+
+# Rangos de precio de las facetas: [desde, hasta)
+PRICE_BUCKETS = (
+    (Decimal('0'), Decimal('50')),
+    (Decimal('50'), Decimal('100')),
+    (Decimal('100'), Decimal('250')),
+    (Decimal('250'), Decimal('500')),
+    (Decimal('500'), Decimal('1000')),
+    (Decimal('1000'), None),
+)
+
+_pending = threading.local()
+
+
+# ========================================
+# CONTEOS POR CATEGORÍA
+# ========================================
+
+def recount_categories(category_ids=None):
+    """
+    Recalcula product_count de las categorías dadas (o de todas)
+    
+    Un GROUP BY para los conteos y un UPDATE por categoría que cambió.
+    """
+    categories = Category.objects.all()
+    if category_ids is not None:
+        categories = categories.filter(id__in=category_ids)
+    
+    current = dict(categories.values_list('id', 'product_count'))
+    counts = dict(
+        Product.objects.filter(is_active=True, category_id__in=list(current))
+        .values_list('category_id')
+        .annotate(count=Count('id'))
+        .order_by()
+    )
+    
+    changed = 0
+    for category_id, stored in current.items():
+        count = counts.get(category_id, 0)
+        if count != stored:
+            Category.objects.filter(id=category_id).update(product_count=count)
+            changed += 1
+    
+    if changed:
+        cache.delete(TREE_CACHE_KEY)
+    return changed
+
+
+def _recount_after_commit():
+    category_ids = getattr(_pending, 'category_ids', None)
+    _pending.category_ids = set()
+    if category_ids:
+        recount_categories(category_ids)
+
+
+def schedule_recount(category_ids):
+    """Recuenta las categorías al confirmar la transacción actual (una vez por commit)"""
+    category_ids = {category_id for category_id in category_ids if category_id}
+    if not category_ids:
+        return
+    if not getattr(_pending, 'category_ids', None):
+        _pending.category_ids = set()
+    _pending.category_ids |= category_ids
+    transaction.on_commit(_recount_after_commit)
+
+
+def rebuild_paths():
+    """
+    Recalcula path/depth de todas las categorías desde `parent`
+    
+    Para datos cargados sin pasar por Category.save() (o anteriores al
+    árbol). Retorna la cantidad de categorías corregidas.
+    """
+    categories = {category.id: category for category in Category.objects.only('id', 'parent_id', 'path', 'depth')}
+    
+    def path_of(category, seen=()):
+        if category.parent_id is None or category.parent_id not in categories:
+            return f'/{category.id}/'
+        if category.id in seen:
+            raise ValueError(f'Ciclo en el árbol de categorías: {category.id}')
+        return f'{path_of(categories[category.parent_id], seen + (category.id,))}{category.id}/'
+    
+    changed = []
+    for category in categories.values():
+        path = path_of(category)
+        depth = path.count('/') - 2
+        if (category.path, category.depth) != (path, depth):
+            category.path, category.depth = path, depth
+            changed.append(category)
+    
+    Category.objects.bulk_update(changed, ['path', 'depth'], batch_size=1000)
+    if changed:
+        cache.delete(TREE_CACHE_KEY)
+    return len(changed)
+
+
+# ========================================
+# ÁRBOL CACHEADO
+# ========================================
+
+def get_category_tree():
+    """
+    Categorías activas con su conteo propio y el de su subárbol
+    
+    Retorna {id: {...}} con 'children' (ids) y 'tree_count'. Se cachea;
+    se invalida al cambiar categorías o conteos.
+    """
+    tree = cache.get(TREE_CACHE_KEY)
+    if tree is not None:
+        return tree
+    
+    tree = {
+        row['id']: {**row, 'children': [], 'tree_count': row['product_count']}
+        for row in Category.objects.filter(is_active=True).order_by('path').values(
+            'id', 'name', 'slug', 'parent_id', 'path', 'depth', 'product_count'
+        )
+    }
+    
+    # De las hojas hacia la raíz: sumar el conteo de cada hijo al padre
+    for node in sorted(tree.values(), key=lambda node: -node['depth']):
+        parent = tree.get(node['parent_id'])
+        if parent is not None:
+            parent['children'].append(node['id'])
+            parent['tree_count'] += node['tree_count']
+    for node in tree.values():
+        node['children'].sort(key=lambda child_id: tree[child_id]['name'])
+    
+    cache.set(TREE_CACHE_KEY, tree, TREE_CACHE_TIMEOUT)
+    return tree
+
+
+def nested_tree(tree=None, parent_id=None):
+    """El árbol como lista anidada (para la API)"""
+    tree = get_category_tree() if tree is None else tree
+    if parent_id is None:
+        roots = [node for node in tree.values() if node['parent_id'] not in tree]
+        roots.sort(key=lambda node: node['name'])
+    else:
+        roots = [tree[child_id] for child_id in tree[parent_id]['children']]
+    
+    return [
+        {
+            'id': node['id'],
+            'name': node['name'],
+            'slug': node['slug'],
+            'product_count': node['product_count'],
+            'tree_count': node['tree_count'],
+            'children': nested_tree(tree, node['id']),
+        }
+        for node in roots
+    ]
+
+
+# ========================================
+# FACETAS
+# ========================================
+
+def _bucket_key(low, high):
+    return f'{low}-{high}' if high is not None else f'{low}+'
+
+
+def facets(queryset):
+    """
+    Conteos de facetas para un queryset de productos (ya filtrado)
+    
+    Un solo query: GROUP BY categoría con conteos condicionales por rango de
+    precio, descuento y disponibilidad; los totales se suman en Python.
+    """
+    buckets = {
+        f'price_{index}': Count('id', filter=Q(price__gte=low) & (Q(price__lt=high) if high is not None else Q()))
+        for index, (low, high) in enumerate(PRICE_BUCKETS)
+    }
+    rows = (
+        queryset.order_by()
+        .values('category_id')
+        .annotate(
+            total=Count('id'),
+            discounted=Count('id', filter=Q(discount_price__isnull=False, discount_price__lt=F('price'))),
+            available=Count('id', filter=Q(is_active=True, stock__gt=0)),
+            **buckets
+        )
+    )
+    
+    tree = get_category_tree()
+    result = {
+        'total': 0,
+        'categories': [],
+        'price': [
+            {'key': _bucket_key(low, high), 'min': low, 'max': high, 'count': 0}
+            for low, high in PRICE_BUCKETS
+        ],
+        'discount': {'with_discount': 0, 'without_discount': 0},
+        'availability': {'in_stock': 0, 'out_of_stock': 0},
+    }
+    
+    for row in rows:
+        result['total'] += row['total']
+        result['discount']['with_discount'] += row['discounted']
+        result['availability']['in_stock'] += row['available']
+        for index, bucket in enumerate(result['price']):
+            bucket['count'] += row[f'price_{index}']
+        
+        node = tree.get(row['category_id'], {})
+        result['categories'].append({
+            'id': row['category_id'],
+            'name': node.get('name'),
+            'slug': node.get('slug'),
+            'count': row['total'],
+        })
+    
+    result['discount']['without_discount'] = result['total'] - result['discount']['with_discount']
+    result['availability']['out_of_stock'] = result['total'] - result['availability']['in_stock']
+    result['categories'].sort(key=lambda category: -category['count'])
+    return result
+
+
+# ========================================
+# SEÑALES
+# ========================================
+
+def _product_pre_save(sender, instance, **kwargs):
+    # Categoría anterior: si el producto se movió, hay que recontar las dos
+    instance._previous_category_id = None
+    if instance.pk:
+        instance._previous_category_id = Product.objects.filter(pk=instance.pk).values_list(
+            'category_id', flat=True
+        ).first()
+
+
+def _product_changed(sender, instance, **kwargs):
+    schedule_recount({instance.category_id, getattr(instance, '_previous_category_id', None)})
+
+
+def _categories_changed(sender, **kwargs):
+    transaction.on_commit(lambda: cache.delete(TREE_CACHE_KEY))
+
+
+def connect_signals():
+    """Llamado desde CoreConfig.ready()"""
+    pre_save.connect(_product_pre_save, sender=Product, dispatch_uid='categories-product-pre-save')
+    post_save.connect(_product_changed, sender=Product, dispatch_uid='categories-product-save')
+    post_delete.connect(_product_changed, sender=Product, dispatch_uid='categories-product-delete')
+    post_save.connect(_categories_changed, sender=Category, dispatch_uid='categories-save')
+    post_delete.connect(_categories_changed, sender=Category, dispatch_uid='categories-delete')
@@ -0,0 +1,192 @@
+# ========================================
+# EVENTOS - CONSUMIDOR DE EVENTOS DE PEDIDOS
+# ========================================
+#
+# Pedidos publica los cambios de sus pedidos (outbox + relay) en un archivo
+# NDJSON compartido. Aquí se leen y se aplican al stock:
+#   order.created   -> descontar stock y sumar las compras conjuntas
+#   order.cancelled -> devolver (liberar) el stock de los items
+# Los movimientos van a las porciones de stock (core/inventory.py); al
+# terminar cada lote se sincroniza Product.stock de los productos tocados.
+# Un mensaje que falla (JSON inválido o error del handler) se reintenta en
+# los lotes siguientes y, tras MAX_ATTEMPTS, se deja en DeadLetterEvent y se
+# salta para no bloquear al resto.
+
+import json
+import logging
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+
+from .inventory import release_items, reserve_items, sync_stock
+from .models import ConsumerOffset, DeadLetterEvent, ProcessedEvent
+from .related import record_copurchase
+
+logger = logging.getLogger(__name__)
+
+CONSUMER_NAME = 'productos.stock'
+MAX_ATTEMPTS = getattr(settings, 'ORDER_EVENTS_MAX_ATTEMPTS', 5)
+
+
+# ========================================
+# LECTURA
+# ========================================
+
+def read_events(path, position, limit=500):
+    """
+    Lee hasta `limit` líneas desde `position` (byte)
+
+    Retorna ([(posición_de_la_línea, línea)], nueva_posición). Las líneas se
+    devuelven sin decodificar: un JSON inválido se trata en consume_batch
+    como cualquier otro mensaje fallido. Una línea incompleta al final (el
+    relay la está escribiendo) se deja para la próxima lectura.
+    """
+    lines = []
+
+    try:
+        f = open(path, 'rb')
+    except FileNotFoundError:
+        return lines, position
+
+    with f:
+        f.seek(position)
+        while len(lines) < limit:
+            line = f.readline()
+            if not line.endswith(b'\n'):
+                break
+            if line.strip():
+                lines.append((position, line))
+            position += len(line)
+
+    return lines, position
+
+
+# ========================================
+# HANDLERS
+# ========================================
+
+def reserve_stock(payload):
+    """
+    Descontar el stock comprado
+
+    El pedido ya existe: si falta stock se descuenta lo que haya (sin
+    quedar negativo) y se registra el faltante.
+    """
+    items = payload.get('items', [])
+    reserved = reserve_items(items, partial=True)
+    for item in items:
+        missing = int(item['quantity']) - reserved.get(int(item['product_id']), 0)
+        if missing > 0:
+            logger.warning('Sin stock: faltan %d unidades del producto %s', missing, item['product_id'])
+
+
+def release_stock(payload):
+    """Devolver el stock de un pedido cancelado"""
+    release_items(payload.get('items', []))
+
+
+def order_created(payload):
+    """Descontar stock y registrar qué productos se compraron juntos"""
+    reserve_stock(payload)
+    record_copurchase(payload.get('items', []))
+
+
+HANDLERS = {
+    'order.created': order_created,
+    'order.cancelled': release_stock,
+}
+
+
+def process_event(message):
+    """
+    Aplica un evento una sola vez
+
+    El registro en ProcessedEvent y el cambio de stock van en la misma
+    transacción: si el evento ya se procesó, la restricción única lo
+    detecta y no se aplica de nuevo. Solo ese INSERT se trata como
+    duplicado (en su propio savepoint); un error del handler revierte todo
+    y se propaga a consume_batch, que decide si reintentar o saltarlo.
+    """
+    handler = HANDLERS.get(message['type'])
+    if handler is None:
+        return False
+
+    with transaction.atomic():
+        try:
+            with transaction.atomic():
+                ProcessedEvent.objects.create(
+                    event_id=message['id'],
+                    event_type=message['type'],
+                )
+        except IntegrityError:
+            return False                # Duplicado: ya se había aplicado
+
+        handler(message['payload'])
+
+    return True
+
+
+def record_failure(position, line, exc):
+    """
+    Registra un intento fallido del mensaje en `position`
+
+    Retorna True si ya se agotaron los intentos y hay que saltarlo.
+    """
+    try:
+        event_id = json.loads(line).get('id')
+    except (ValueError, AttributeError):
+        event_id = None
+
+    dead, _ = DeadLetterEvent.objects.get_or_create(
+        consumer=CONSUMER_NAME,
+        position=position,
+        defaults={'event_id': event_id, 'raw': line.decode('utf-8', 'replace')},
+    )
+    dead.attempts += 1
+    dead.error = f'{type(exc).__name__}: {exc}'
+    dead.skipped = dead.attempts >= MAX_ATTEMPTS
+    dead.save(update_fields=['attempts', 'error', 'skipped', 'updated_at'])
+
+    if dead.skipped:
+        logger.error('Evento en posición %d descartado tras %d intentos: %s',
+                     position, dead.attempts, dead.error)
+    else:
+        logger.warning('Evento en posición %d falló (intento %d): %s',
+                       position, dead.attempts, dead.error)
+    return dead.skipped
+
+
+def consume_batch(path=None, limit=500):
+    """
+    Procesa el siguiente lote de eventos y guarda la posición
+
+    Si un mensaje falla, el lote se corta ahí y la posición queda en ese
+    mensaje para reintentarlo en el próximo lote; tras MAX_ATTEMPTS se
+    salta. Retorna la cantidad de mensajes que se dejaron atrás.
+    """
+    path = path or getattr(settings, 'ORDER_EVENTS_FILE', '/app/events/orders.ndjson')
+    offset, _ = ConsumerOffset.objects.get_or_create(name=CONSUMER_NAME)
+
+    lines, position = read_events(path, offset.position, limit)
+
+    touched = set()
+    consumed = 0
+    for start, line in lines:
+        try:
+            message = json.loads(line)
+            if process_event(message):
+                touched.update(item['product_id'] for item in message['payload'].get('items', []))
+        except Exception as exc:
+            if not record_failure(start, line, exc):
+                position = start        # Reintentar desde este mensaje
+                break
+        consumed += 1
+
+    if touched:
+        sync_stock(touched)
+
+    if position != offset.position:
+        offset.position = position
+        offset.save(update_fields=['position', 'updated_at'])
+
+    return consumed
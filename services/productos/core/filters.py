@@ -0,0 +1,43 @@
+# ========================================
+# FILTROS - SERVICIO PRODUCTOS
+# ========================================
+
+import django_filters
+from django.db.models import F, Q
+
+from .models import Category, Product
+
+
+class ProductFilter(django_filters.FilterSet):
+    """
+    Filtros del listado (y de las facetas) de productos
+    
+    ?category=5          solo esa categoría
+    ?category_tree=5     la categoría y todas sus subcategorías (id o slug)
+    ?min_price=&max_price=, ?has_discount=true, ?available=true
+    """
+    
+    category_tree = django_filters.CharFilter(method='filter_category_tree')
+    min_price = django_filters.NumberFilter(field_name='price', lookup_expr='gte')
+    max_price = django_filters.NumberFilter(field_name='price', lookup_expr='lt')
+    has_discount = django_filters.BooleanFilter(method='filter_has_discount')
+    available = django_filters.BooleanFilter(method='filter_available')
+    
+    class Meta:
+        model = Product
+        fields = ['category', 'is_featured']
+    
+    def filter_category_tree(self, queryset, name, value):
+        lookup = {'id': value} if value.isdigit() else {'slug': value}
+        path = Category.objects.filter(**lookup).values_list('path', flat=True).first()
+        if not path:
+            return queryset.none()
+        # Un JOIN con categorías y un rango del índice de path
+        return queryset.filter(category__path__startswith=path)
+    
+    def filter_has_discount(self, queryset, name, value):
+        discounted = Q(discount_price__isnull=False, discount_price__lt=F('price'))
+        return queryset.filter(discounted) if value else queryset.exclude(discounted)
+    
+    def filter_available(self, queryset, name, value):
+        return queryset.filter(stock__gt=0) if value else queryset.filter(stock__lte=0)
@@ -0,0 +1,135 @@
+# ========================================
+# HOME - SNAPSHOT DE LA PÁGINA DE INICIO
+# ========================================
+#
+# La portada pedía destacados, categorías y listado en cada visita. Aquí se
+# arma UN documento JSON (destacados, categorías activas con su cantidad de
+# productos y novedades) que se guarda:
+#   - en la base de datos (CatalogSnapshot), compartido por todos los workers
+#   - en el cache del proceso, para que servirlo sea una sola lectura
+# Se reconstruye al confirmar cambios del catálogo (señales) y con
+# manage.py build_home_snapshot (cron, para los cambios por queryset.update).
+
+import json
+import logging
+import threading
+
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.utils import timezone
+
+from .models import CatalogSnapshot, Category, Product
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_NAME = 'home'
+CACHE_KEY = 'catalog:home'
+
+# Segundos que un worker sirve su copia antes de releer la base de datos
+CACHE_TIMEOUT = 30
+
+FEATURED_LIMIT = 10
+NEWEST_LIMIT = 12
+
+_pending = threading.local()
+
+
+# ========================================
+# CONSTRUCCIÓN
+# ========================================
+
+def build_home_data():
+    """Consultas de la portada (3 queries)"""
+    from .serializers import CategorySerializer, ProductListSerializer
+    
+    active = Product.objects.filter(is_active=True).select_related('category')
+    
+    # product_count es el conteo cacheado de la categoría (core/categories.py)
+    categories = Category.objects.filter(is_active=True).order_by('name')
+    
+    return {
+        'featured': ProductListSerializer(
+            active.filter(is_featured=True).order_by('-created_at')[:FEATURED_LIMIT], many=True
+        ).data,
+        'categories': CategorySerializer(categories, many=True).data,
+        'newest': ProductListSerializer(
+            active.order_by('-created_at')[:NEWEST_LIMIT], many=True
+        ).data,
+        'generated_at': timezone.now(),
+    }
+
+
+def rebuild_home_snapshot():
+    """Arma el snapshot, lo guarda en la base de datos y en el cache"""
+    data = build_home_data()
+    content = json.dumps(data, cls=DjangoJSONEncoder, ensure_ascii=False)
+    
+    CatalogSnapshot.objects.update_or_create(
+        name=SNAPSHOT_NAME, defaults={'content': content}
+    )
+    snapshot = {'content': content, 'data': json.loads(content)}
+    cache.set(CACHE_KEY, snapshot, CACHE_TIMEOUT)
+    logger.info('Snapshot de portada reconstruido (%d bytes)', len(content))
+    return snapshot
+
+
+def get_home_snapshot():
+    """
+    Snapshot de la portada: {'content': JSON listo para enviar, 'data': dict}
+    
+    Cache del proceso -> fila en la base de datos -> construir.
+    """
+    snapshot = cache.get(CACHE_KEY)
+    if snapshot is not None:
+        return snapshot
+    
+    content = CatalogSnapshot.objects.filter(name=SNAPSHOT_NAME).values_list(
+        'content', flat=True
+    ).first()
+    if content is None:
+        return rebuild_home_snapshot()
+    
+    snapshot = {'content': content, 'data': json.loads(content)}
+    cache.set(CACHE_KEY, snapshot, CACHE_TIMEOUT)
+    return snapshot
+
+
+# ========================================
+# RECONSTRUCCIÓN AL CAMBIAR EL CATÁLOGO
+# ========================================
+
+def _rebuild_after_commit():
+    if not getattr(_pending, 'dirty', False):
+        return                          # Ya se reconstruyó después de este commit
+    _pending.dirty = False
+    try:
+        rebuild_home_snapshot()
+    except Exception:
+        # El cron lo reconstruirá; no romper la petición que guardó el cambio
+        logger.exception('No se pudo reconstruir el snapshot de portada')
+
+
+def schedule_rebuild():
+    """
+    Reconstruye el snapshot cuando se confirme la transacción actual
+    
+    Varios cambios en la misma transacción (ej: una acción del admin)
+    disparan una sola reconstrucción. Si la transacción se revierte, no
+    se reconstruye nada.
+    """
+    _pending.dirty = True
+    transaction.on_commit(_rebuild_after_commit)
+
+
+def _catalog_changed(sender, **kwargs):
+    schedule_rebuild()
+
+
+def connect_signals():
+    """Llamado desde CoreConfig.ready()"""
+    # Las reseñas no: son frecuentes y el rating puede esperar al cron
+    for model in (Product, Category):
+        post_save.connect(_catalog_changed, sender=model, dispatch_uid=f'home-save-{model.__name__}')
+        post_delete.connect(_catalog_changed, sender=model, dispatch_uid=f'home-delete-{model.__name__}')
@@ -0,0 +1,296 @@
+# ========================================
+# INVENTARIO - STOCK EN PORCIONES
+# ========================================
+#
+# Con Product.stock como una sola fila, todas las compras de un producto
+# popular esperan el mismo lock. Aquí el stock de cada producto se reparte
+# en STOCK_SHARDS porciones (StockShard) y cada movimiento toca una sola:
+#   - reserve(): elige al azar una porción con unidades suficientes que
+#     nadie tenga bloqueada (SELECT ... FOR UPDATE SKIP LOCKED) y la
+#     descuenta. Solo si ninguna alcanza sola (queda poco stock) bloquea
+#     todas las del producto y descuenta de varias. Nunca deja stock
+#     negativo: sin unidades suficientes lanza InsufficientStock (o, con
+#     partial=True, descuenta lo que haya). La base de datos lo garantiza
+#     además con un CHECK (quantity >= 0).
+#   - release(): suma a una porción al azar.
+#   - available_stock(): el stock exacto (suma de las porciones), sin locks.
+# Product.stock (listados, filtros, facetas, detalle) queda como la suma
+# sincronizada: sync_stock() la actualiza con un UPDATE por lotes solo
+# donde cambió. La llaman el consumidor de eventos al terminar cada lote y
+# `manage.py sync_stock --interval N` (solo revisa los productos con
+# movimientos recientes); entre medio puede atrasarse unos segundos, pero
+# las reservas siempre ven el stock real.
+#
+# Las porciones se crean la primera vez que se mueve el stock del producto,
+# a partir de Product.stock. Para fijar un stock absoluto se escribe
+# Product.stock y se llama reset_stock() (lo hacen el admin, la API y la
+# importación): las porciones se vuelven a crear desde ese valor.
+#
+# Con el tiempo unas porciones se vacían antes que otras y las reservas
+# caen al camino lento; rebalance() las reparte de nuevo (sync_stock
+# --rebalance).
+
+import logging
+import random
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Min, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .bulk import update_in_batches
+from .models import Product, StockShard
+
+logger = logging.getLogger(__name__)
+
+# Porciones por producto (más = menos contención, más filas por producto)
+STOCK_SHARDS = getattr(settings, 'STOCK_SHARDS', 8)
+
+
+class InsufficientStock(Exception):
+    """No hay unidades suficientes para la reserva"""
+    
+    def __init__(self, product_id, requested, available):
+        super().__init__(
+            f'Producto {product_id}: se pidieron {requested} unidades y hay {available}'
+        )
+        self.product_id = product_id
+        self.requested = requested
+        self.available = available
+
+
+# ========================================
+# PORCIONES
+# ========================================
+
+def _split(product_id, total, shards=None):
+    """`total` repartido en porciones lo más parejas posible"""
+    shards = shards or STOCK_SHARDS
+    base, extra = divmod(max(total, 0), shards)
+    return [
+        StockShard(product_id=product_id, shard=number, quantity=base + (number < extra))
+        for number in range(shards)
+    ]
+
+
+def _ensure_shards(product_id):
+    """
+    Crea las porciones del producto desde Product.stock si aún no existen
+    
+    Debe llamarse dentro de una transacción. Retorna False si el producto
+    no existe.
+    """
+    if StockShard.objects.filter(product_id=product_id).exists():
+        return True
+    
+    # El lock del producto ordena a quienes llegan a la vez: solo uno las crea
+    stock = Product.objects.select_for_update().filter(id=product_id).values_list(
+        'stock', flat=True
+    ).first()
+    if stock is None:
+        return False
+    if not StockShard.objects.filter(product_id=product_id).exists():
+        StockShard.objects.bulk_create(_split(product_id, stock))
+    return True
+
+
+def reset_stock(product_ids):
+    """
+    Descarta las porciones: el próximo movimiento parte de Product.stock
+    
+    Llamar después de escribir un stock absoluto en Product.stock.
+    """
+    product_ids = list(product_ids)
+    if product_ids:
+        StockShard.objects.filter(product_id__in=product_ids).delete()
+
+
+# ========================================
+# MOVIMIENTOS
+# ========================================
+
+def _take_from_one(product_id, quantity):
+    """Camino rápido: descontar todo de una porción libre. False si no hay ninguna"""
+    start = random.randrange(STOCK_SHARDS)
+    candidates = StockShard.objects.select_for_update(skip_locked=True).filter(
+        product_id=product_id, quantity__gte=quantity
+    ).order_by('shard').only('id')
+    shard = (
+        candidates.filter(shard__gte=start).first()
+        or candidates.filter(shard__lt=start).first()
+    )
+    if shard is None:
+        return False
+    StockShard.objects.filter(pk=shard.pk).update(
+        quantity=F('quantity') - quantity, updated_at=timezone.now()
+    )
+    return True
+
+
+def _take_from_all(product_id, quantity, partial):
+    """Camino lento: bloquear todas las porciones y descontar de varias"""
+    shards = list(
+        StockShard.objects.select_for_update().filter(product_id=product_id).order_by('shard')
+    )
+    available = sum(shard.quantity for shard in shards)
+    if available < quantity and not partial:
+        raise InsufficientStock(product_id, quantity, available)
+    
+    taken = remaining = min(quantity, available)
+    now = timezone.now()
+    for shard in sorted(shards, key=lambda shard: -shard.quantity):
+        if not remaining:
+            break
+        used = min(shard.quantity, remaining)
+        shard.quantity -= used
+        shard.updated_at = now
+        remaining -= used
+    StockShard.objects.bulk_update(shards, ['quantity', 'updated_at'])
+    return taken
+
+
+def reserve(product_id, quantity, partial=False):
+    """
+    Descuenta `quantity` unidades del producto
+    
+    Lanza InsufficientStock si no alcanzan (con partial=True descuenta las
+    que haya). Retorna las unidades descontadas (0 si el producto no existe).
+    """
+    if quantity <= 0:
+        return 0
+    with transaction.atomic():
+        if not _ensure_shards(product_id):
+            return 0
+        if _take_from_one(product_id, quantity):
+            return quantity
+        return _take_from_all(product_id, quantity, partial)
+
+
+def release(product_id, quantity):
+    """Devuelve `quantity` unidades al producto (False si el producto no existe)"""
+    if quantity <= 0:
+        return True
+    with transaction.atomic():
+        if not _ensure_shards(product_id):
+            return False
+        shards = StockShard.objects.filter(product_id=product_id)
+        values = {'quantity': F('quantity') + quantity, 'updated_at': timezone.now()}
+        if not shards.filter(shard=random.randrange(STOCK_SHARDS)).update(**values):
+            # STOCK_SHARDS cambió desde que se crearon las porciones
+            shards.filter(shard=0).update(**values)
+    return True
+
+
+def _quantities(items):
+    """[{'product_id', 'quantity'}] -> [(product_id, total)] ordenado por producto"""
+    totals = {}
+    for item in items:
+        product_id = int(item['product_id'])
+        totals[product_id] = totals.get(product_id, 0) + int(item['quantity'])
+    # Siempre el mismo orden de locks entre transacciones: sin deadlocks
+    return sorted(totals.items())
+
+
+def reserve_items(items, partial=False):
+    """
+    Reserva los items de un pedido, todos o ninguno
+    
+    Con partial=True descuenta lo que haya de cada uno. Retorna
+    {product_id: unidades descontadas}.
+    """
+    with transaction.atomic():
+        return {
+            product_id: reserve(product_id, quantity, partial=partial)
+            for product_id, quantity in _quantities(items)
+        }
+
+
+def release_items(items):
+    """Devuelve al stock los items de un pedido"""
+    with transaction.atomic():
+        for product_id, quantity in _quantities(items):
+            release(product_id, quantity)
+
+
+# ========================================
+# LECTURA Y MANTENIMIENTO
+# ========================================
+
+def available_stock(product_ids):
+    """Stock exacto por producto: {product_id: unidades}"""
+    product_ids = [int(product_id) for product_id in product_ids]
+    levels = dict(
+        Product.objects.filter(id__in=product_ids).values_list('id', 'stock')
+    )
+    levels.update(
+        StockShard.objects.filter(product_id__in=product_ids)
+        .values('product_id').annotate(total=Sum('quantity'))
+        .values_list('product_id', 'total')
+    )
+    return levels
+
+
+def _moved_since(since):
+    """Productos con movimientos desde `since` (subquery)"""
+    return StockShard.objects.filter(updated_at__gte=since).values('product_id')
+
+
+def sync_stock(product_ids=None, since=None, batch_size=1000):
+    """
+    Copia a Product.stock la suma de las porciones donde difiere
+    
+    Solo productos con porciones (los demás no se movieron) y, con `since`,
+    solo los que tuvieron movimientos desde entonces. Retorna la cantidad
+    de productos actualizados.
+    """
+    totals = Subquery(
+        StockShard.objects.filter(product=OuterRef('pk'))
+        .values('product').annotate(total=Sum('quantity')).values('total')
+    )
+    queryset = Product.objects.annotate(shard_total=totals).filter(
+        shard_total__isnull=False
+    ).exclude(stock=F('shard_total'))
+    if product_ids is not None:
+        queryset = queryset.filter(id__in=list(product_ids))
+    if since is not None:
+        queryset = queryset.filter(id__in=_moved_since(since))
+    
+    # Si reset_stock borra las porciones entre el filtro y el UPDATE, la
+    # subquery da NULL: se conserva el stock que ya tenía
+    return update_in_batches(queryset, batch_size=batch_size, stock=Coalesce(totals, F('stock')))
+
+
+def rebalance(product_ids=None, since=None):
+    """
+    Reparte de nuevo el stock de los productos con alguna porción vacía
+    
+    (Si el total alcanza para todas.) Con `since`, solo los que tuvieron
+    movimientos desde entonces. Retorna la cantidad de productos
+    rebalanceados.
+    """
+    shards = StockShard.objects.all()
+    if product_ids is not None:
+        shards = shards.filter(product_id__in=list(product_ids))
+    if since is not None:
+        shards = shards.filter(product_id__in=_moved_since(since))
+    skewed = shards.values('product_id').annotate(
+        total=Sum('quantity'), lowest=Min('quantity')
+    ).filter(lowest=0, total__gte=STOCK_SHARDS)
+    
+    rebalanced = 0
+    for product_id in skewed.values_list('product_id', flat=True):
+        with transaction.atomic():
+            shards = list(
+                StockShard.objects.select_for_update().filter(product_id=product_id).order_by('shard')
+            )
+            even = _split(product_id, sum(shard.quantity for shard in shards), len(shards))
+            now = timezone.now()
+            for shard, target in zip(shards, even):
+                shard.quantity, shard.updated_at = target.quantity, now
+            StockShard.objects.bulk_update(shards, ['quantity', 'updated_at'])
+        rebalanced += 1
+    
+    if rebalanced:
+        logger.info('rebalance: %d productos', rebalanced)
+    return rebalanced
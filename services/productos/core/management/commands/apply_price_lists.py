@@ -0,0 +1,47 @@
+# ========================================
+# COMANDO - LISTAS DE PRECIOS PROGRAMADAS
+# ========================================
+# Uso:
+#   python manage.py apply_price_lists                          # Una pasada
+#   python manage.py apply_price_lists --interval 30            # Cada 30 segundos
+#   python manage.py apply_price_lists --interval 30 --pause 0.05
+
+import time
+
+from django.core.management.base import BaseCommand
+
+from core.bulk import BATCH_SIZE
+from core.pricing import run_price_lists
+
+
+class Command(BaseCommand):
+    help = 'Aplica las listas de precios vigentes y termina las vencidas, por lotes (ver core/pricing.py)'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--interval', type=float, default=0,
+                            help='Segundos entre pasadas (0 = una sola vez)')
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+        parser.add_argument('--pause', type=float, default=0,
+                            help='Segundos de espera entre lotes (reparte la carga de escritura)')
+    
+    def handle(self, *args, **options):
+        def progress(updated, last_id):
+            if options['pause']:
+                time.sleep(options['pause'])
+        
+        while True:
+            try:
+                result = run_price_lists(batch_size=options['batch_size'], progress=progress)
+                if any(result.values()) or not options['interval']:
+                    self.stdout.write(
+                        f"{result['applied']} producto(s) con lista aplicada, "
+                        f"{result['reverted']} devueltos a su precio"
+                    )
+            except Exception as exc:
+                if not options['interval']:
+                    raise
+                self.stderr.write(f'Error aplicando listas de precios: {exc}')
+            
+            if not options['interval']:
+                return
+            time.sleep(options['interval'])
@@ -0,0 +1,34 @@
+# ========================================
+# COMANDO - SNAPSHOT DE LA PORTADA
+# ========================================
+# Uso:
+#   python manage.py build_home_snapshot                 # Una vez
+#   python manage.py build_home_snapshot --interval 300  # Cada 5 minutos
+
+import time
+
+from django.core.management.base import BaseCommand
+
+from core.home import rebuild_home_snapshot
+
+
+class Command(BaseCommand):
+    help = 'Reconstruye el snapshot de la página de inicio'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--interval', type=float, default=0,
+                            help='Segundos entre reconstrucciones (0 = una sola vez)')
+    
+    def handle(self, *args, **options):
+        while True:
+            try:
+                snapshot = rebuild_home_snapshot()
+                self.stdout.write(f"Snapshot de portada: {len(snapshot['content'])} bytes")
+            except Exception as exc:
+                if not options['interval']:
+                    raise
+                self.stderr.write(f'Error reconstruyendo la portada: {exc}')
+            
+            if not options['interval']:
+                return
+            time.sleep(options['interval'])
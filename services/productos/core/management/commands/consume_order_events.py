@@ -0,0 +1,40 @@
+# ========================================
+# COMANDO - CONSUMIDOR DE EVENTOS DE PEDIDOS
+# ========================================
+# Uso:
+#   python manage.py consume_order_events            # Proceso continuo
+#   python manage.py consume_order_events --once     # Un solo lote
+
+import time
+
+from django.core.management.base import BaseCommand
+
+from core.events import consume_batch
+
+
+class Command(BaseCommand):
+    help = 'Aplica al stock los eventos publicados por el servicio de pedidos'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--path', help='Archivo de eventos (por defecto ORDER_EVENTS_FILE)')
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--interval', type=float, default=1.0,
+                            help='Segundos de espera cuando no hay eventos nuevos')
+        parser.add_argument('--once', action='store_true',
+                            help='Procesar un solo lote y salir')
+
+    def handle(self, *args, **options):
+        if options['once']:
+            read = consume_batch(options['path'], options['batch_size'])
+            self.stdout.write(f'{read} eventos leídos')
+            return
+
+        while True:
+            try:
+                read = consume_batch(options['path'], options['batch_size'])
+            except Exception as exc:
+                self.stderr.write(f'Error procesando eventos: {exc}')
+                read = 0
+
+            if not read:
+                time.sleep(options['interval'])
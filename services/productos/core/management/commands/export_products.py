@@ -0,0 +1,36 @@
+# ========================================
+# COMANDO - EXPORTACIÓN MASIVA DE PRODUCTOS
+# ========================================
+# Uso:
+#   python manage.py export_products catalogo.csv
+#   python manage.py export_products - --format ndjson --active > catalogo.ndjson
+
+import sys
+
+from django.core.management.base import BaseCommand
+
+from core.catalog_io import export_products
+from core.models import Product
+
+
+class Command(BaseCommand):
+    help = 'Exporta el catálogo a CSV o NDJSON en streaming'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="Archivo de salida ('-' para stdout)")
+        parser.add_argument('--format', choices=['csv', 'ndjson'], default='csv')
+        parser.add_argument('--active', action='store_true', help='Solo productos activos')
+    
+    def handle(self, *args, **options):
+        queryset = Product.objects.all()
+        if options['active']:
+            queryset = queryset.filter(is_active=True)
+        
+        path = options['path']
+        stream = sys.stdout if path == '-' else open(path, 'w', newline='', encoding='utf-8')
+        try:
+            for chunk in export_products(queryset, options['format']):
+                stream.write(chunk)
+        finally:
+            if stream is not sys.stdout:
+                stream.close()
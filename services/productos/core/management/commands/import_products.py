@@ -0,0 +1,60 @@
+# ========================================
+# COMANDO - IMPORTACIÓN MASIVA DE PRODUCTOS
+# ========================================
+# Uso:
+#   python manage.py import_products feed.csv
+#   python manage.py import_products feed.ndjson --format ndjson --errors errores.csv
+#   cat feed.csv | python manage.py import_products -
+
+import csv
+import sys
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.catalog_io import BATCH_SIZE, import_products
+
+
+class Command(BaseCommand):
+    help = 'Importa productos desde CSV o NDJSON (upsert por sku, por lotes)'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="Archivo a importar ('-' para stdin)")
+        parser.add_argument('--format', choices=['csv', 'ndjson'],
+                            help='Por defecto se deduce de la extensión')
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+        parser.add_argument('--errors', help='Archivo CSV donde guardar las filas con error')
+    
+    def handle(self, *args, **options):
+        path = options['path']
+        fmt = options['format'] or ('ndjson' if path.endswith(('.ndjson', '.jsonl')) else 'csv')
+        start = time.perf_counter()
+        
+        def progress(result):
+            elapsed = time.perf_counter() - start
+            self.stdout.write(
+                f'  {result.processed} filas ({result.processed / elapsed:.0f} filas/s): '
+                f'{result.created} nuevas, {result.updated} actualizadas, {result.failed} con error'
+            )
+        
+        try:
+            stream = sys.stdin if path == '-' else open(path, newline='', encoding='utf-8')
+        except OSError as exc:
+            raise CommandError(f'No se pudo abrir {path}: {exc}')
+        
+        with stream:
+            result = import_products(stream, fmt, options['batch_size'], progress=progress)
+        
+        if options['errors'] and result.errors:
+            with open(options['errors'], 'w', newline='', encoding='utf-8') as f:
+                writer = csv.writer(f)
+                writer.writerow(['line', 'sku', 'error'])
+                writer.writerows(result.errors)
+        
+        elapsed = time.perf_counter() - start
+        self.stdout.write(self.style.SUCCESS(
+            f'{result.processed} filas en {elapsed:.1f}s: {result.created} nuevas, '
+            f'{result.updated} actualizadas, {result.failed} con error, {result.skipped} repetidas'
+        ))
+        for line, sku, message in result.errors[:20]:
+            self.stderr.write(f'  línea {line} ({sku or "sin sku"}): {message}')
@@ -0,0 +1,23 @@
+# ========================================
+# COMANDO - ÁRBOL Y CONTEOS DE CATEGORÍAS
+# ========================================
+# Recalcula path/depth desde `parent` y los conteos de productos.
+# Para datos anteriores al árbol o cargados sin pasar por el ORM:
+#   python manage.py rebuild_category_tree
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from core.categories import rebuild_paths, recount_categories
+
+
+class Command(BaseCommand):
+    help = 'Recalcula las rutas del árbol de categorías y sus conteos de productos'
+    
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            paths = rebuild_paths()
+            counts = recount_categories()
+        self.stdout.write(self.style.SUCCESS(
+            f'{paths} rutas y {counts} conteos de categorías corregidos'
+        ))
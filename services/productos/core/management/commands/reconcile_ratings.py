@@ -0,0 +1,23 @@
+# ========================================
+# COMANDO - CONCILIACIÓN DE RATINGS
+# ========================================
+# Uso (por ejemplo, una vez por noche desde cron):
+#   python manage.py reconcile_ratings
+
+from django.core.management.base import BaseCommand
+
+from core.reviews import BATCH_SIZE, reconcile_ratings
+
+
+class Command(BaseCommand):
+    help = 'Recalcula rating y review_count desde las reseñas y corrige los desvíos'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+    
+    def handle(self, *args, **options):
+        def progress(checked, fixed):
+            self.stdout.write(f'  {checked} productos revisados, {fixed} corregidos')
+        
+        fixed = reconcile_ratings(options['batch_size'], progress=progress)
+        self.stdout.write(self.style.SUCCESS(f'{fixed} productos corregidos'))
@@ -0,0 +1,26 @@
+# ========================================
+# COMANDO - PRODUCTOS RELACIONADOS
+# ========================================
+# Uso:
+#   python manage.py refresh_related_products          # Incremental (cada pocos minutos)
+#   python manage.py refresh_related_products --full   # Todo el catálogo (de noche)
+
+from django.core.management.base import BaseCommand
+
+from core.related import BATCH_SIZE, refresh_related
+
+
+class Command(BaseCommand):
+    help = 'Recalcula por lotes los productos relacionados (compras conjuntas + categoría)'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--full', action='store_true',
+                            help='Recalcular todos los productos activos')
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+    
+    def handle(self, *args, **options):
+        def progress(refreshed, last_id):
+            self.stdout.write(f'  {refreshed} productos recalculados (hasta id {last_id})')
+        
+        refreshed = refresh_related(options['full'], options['batch_size'], progress=progress)
+        self.stdout.write(self.style.SUCCESS(f'{refreshed} productos recalculados'))
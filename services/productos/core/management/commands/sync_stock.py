@@ -0,0 +1,56 @@
+# ========================================
+# COMANDO - SINCRONIZAR EL STOCK DE LAS PORCIONES
+# ========================================
+# Uso:
+#   python manage.py sync_stock                          # Una vez
+#   python manage.py sync_stock --interval 5             # Cada 5 segundos
+#   python manage.py sync_stock --interval 5 --rebalance # Y repartir las porciones vacías
+#
+# La primera pasada revisa todos los productos; las siguientes solo los que
+# tuvieron movimientos en los últimos LOOKBACK segundos (con margen para las
+# transacciones que confirman tarde).
+
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from core.inventory import rebalance, sync_stock
+
+# Segundos hacia atrás que revisa cada pasada (al menos 2 intervalos)
+LOOKBACK = 60
+
+
+class Command(BaseCommand):
+    help = 'Copia a Product.stock la suma de las porciones de stock (ver core/inventory.py)'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--interval', type=float, default=0,
+                            help='Segundos entre sincronizaciones (0 = una sola vez)')
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--rebalance', action='store_true',
+                            help='Repartir de nuevo el stock de los productos con porciones vacías')
+    
+    def handle(self, *args, **options):
+        lookback = timedelta(seconds=max(LOOKBACK, 2 * options['interval']))
+        since = None
+        while True:
+            started = timezone.now()
+            try:
+                if options['rebalance']:
+                    rebalanced = rebalance(since=since)
+                    if rebalanced or not options['interval']:
+                        self.stdout.write(f'{rebalanced} producto(s) rebalanceados')
+                updated = sync_stock(since=since, batch_size=options['batch_size'])
+                since = started - lookback
+                if updated or not options['interval']:
+                    self.stdout.write(f'Stock sincronizado en {updated} producto(s)')
+            except Exception as exc:
+                if not options['interval']:
+                    raise
+                self.stderr.write(f'Error sincronizando el stock: {exc}')
+            
+            if not options['interval']:
+                return
+            time.sleep(options['interval'])
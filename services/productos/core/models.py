@@ -2,8 +2,46 @@
 # MODELS - SERVICIO PRODUCTOS
 # ========================================
 
-from django.db import models
-from django.core.validators import MinValueValidator
+from decimal import Decimal
+
+from django.db import models, transaction
+from django.db.models import Case, DecimalField, ExpressionWrapper, F, FloatField, Value, When
+from django.db.models.functions import Concat, Round, Substr
+from django.core.exceptions import ValidationError
+from django.core.validators import MaxValueValidator, MinValueValidator
+
+
+class ProductQuerySet(models.QuerySet):
+    """Operaciones atómicas sobre productos"""
+    
+    def apply_review(self, product_id, rating_delta, count_delta):
+        """
+        Ajusta el rating con UN solo UPDATE, sin recalcular desde las reseñas:
+        
+            UPDATE ... SET rating_sum = rating_sum + Δs,
+                           review_count = review_count + Δc,
+                           rating = (rating_sum + Δs) / (review_count + Δc)
+        
+        Las expresiones del SET usan los valores anteriores de la fila,
+        así dos reseñas simultáneas no se pisan.
+        """
+        new_sum = F('rating_sum') + rating_delta
+        new_count = F('review_count') + count_delta
+        # "* 1.0" evita la división entera (entero / entero truncaría)
+        average = ExpressionWrapper(
+            new_sum * Value(1.0) / new_count,
+            output_field=FloatField(),
+        )
+        
+        return self.filter(id=product_id).update(
+            rating_sum=new_sum,
+            review_count=new_count,
+            rating=Case(
+                When(review_count__gt=-count_delta, then=Round(average, 2)),
+                default=Value(Decimal('0')),
+                output_field=DecimalField(max_digits=3, decimal_places=2),
+            ),
+        )
 
 
 class Category(models.Model):
@@ -41,6 +79,41 @@ class Category(models.Model):
         help_text="¿La categoría está activa?"
     )
     
+    # ========================================
+    # ÁRBOL (RUTA MATERIALIZADA)
+    # ========================================
+    
+    parent = models.ForeignKey(
+        'self',
+        on_delete=models.PROTECT,
+        blank=True,
+        null=True,
+        related_name='children',
+        help_text="Categoría padre (vacío = raíz)"
+    )
+    
+    # Ids desde la raíz, ej: "/1/5/12/". El subárbol de una categoría son
+    # las filas con path LIKE '<su path>%' (un rango del índice)
+    path = models.CharField(
+        max_length=255,
+        default='',
+        editable=False,
+        help_text="Ruta de ids desde la raíz"
+    )
+    
+    depth = models.PositiveSmallIntegerField(
+        default=0,
+        editable=False,
+        help_text="Nivel en el árbol (0 = raíz)"
+    )
+    
+    # Productos activos directamente en esta categoría (ver core/categories.py)
+    product_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        help_text="Productos activos en la categoría"
+    )
+    
     # ========================================
     # TIMESTAMPS
     # ========================================
@@ -65,10 +138,61 @@ class Category(models.Model):
         ordering = ['name']
         indexes = [
             models.Index(fields=['slug']),
+            models.Index(fields=['path'], name='category_path_idx', opclasses=['varchar_pattern_ops']),
         ]
     
     def __str__(self):
         return self.name
+    
+    # ========================================
+    # ÁRBOL
+    # ========================================
+    
+    def clean(self):
+        if self.parent_id and self.pk:
+            parent_path = Category.objects.filter(pk=self.parent_id).values_list('path', flat=True).first() or ''
+            if f'/{self.pk}/' in parent_path or self.parent_id == self.pk:
+                raise ValidationError({'parent': 'Una categoría no puede estar dentro de sí misma'})
+    
+    def save(self, *args, **kwargs):
+        """Guarda y mantiene path/depth (y los de todo el subárbol si se movió)"""
+        with transaction.atomic():
+            old_path, old_depth = None, 0
+            if self.pk:
+                old_path, old_depth = Category.objects.filter(pk=self.pk).values_list(
+                    'path', 'depth'
+                ).first() or (None, 0)
+            
+            parent_path, parent_depth = '/', -1
+            if self.parent_id:
+                parent_path, parent_depth = Category.objects.filter(
+                    pk=self.parent_id
+                ).values_list('path', 'depth').get()
+                if self.pk and f'/{self.pk}/' in parent_path:
+                    raise ValueError('Una categoría no puede estar dentro de sí misma')
+            
+            super().save(*args, **kwargs)
+            
+            new_path = f'{parent_path}{self.pk}/'
+            new_depth = parent_depth + 1
+            if new_path == old_path:
+                return
+            
+            Category.objects.filter(pk=self.pk).update(path=new_path, depth=new_depth)
+            if old_path:
+                # Mover el subárbol: reemplazar el prefijo en un solo UPDATE
+                Category.objects.filter(path__startswith=old_path).exclude(pk=self.pk).update(
+                    path=Concat(Value(new_path), Substr('path', len(old_path) + 1)),
+                    depth=F('depth') + (new_depth - old_depth),
+                )
+            self.path, self.depth = new_path, new_depth
+    
+    def get_descendants(self, include_self=True):
+        """Subárbol de la categoría (un query por el índice de path)"""
+        queryset = Category.objects.filter(path__startswith=self.path)
+        if not include_self:
+            queryset = queryset.exclude(pk=self.pk)
+        return queryset
 
 
 class Product(models.Model):
@@ -132,6 +256,17 @@ class Product(models.Model):
         help_text="Precio con descuento (opcional)"
     )
     
+    # Lista de precios que fijó discount_price (la maneja core/pricing.py)
+    price_list = models.ForeignKey(
+        'PriceList',
+        on_delete=models.PROTECT,
+        blank=True,
+        null=True,
+        editable=False,
+        related_name='+',
+        help_text="Lista de precios aplicada"
+    )
+    
     # ========================================
     # INVENTARIO
     # ========================================
@@ -196,6 +331,12 @@ class Product(models.Model):
         help_text="Cantidad de reseñas"
     )
     
+    # Suma de las estrellas de todas las reseñas: rating = rating_sum / review_count
+    rating_sum = models.PositiveIntegerField(
+        default=0,
+        help_text="Suma de las calificaciones de las reseñas"
+    )
+    
     # ========================================
     # TIMESTAMPS
     # ========================================
@@ -222,8 +363,11 @@ class Product(models.Model):
             models.Index(fields=['slug']),
             models.Index(fields=['category']),
             models.Index(fields=['is_active']),
+            models.Index(fields=['-rating']),
         ]
     
+    objects = ProductQuerySet.as_manager()
+    
     def __str__(self):
         return self.name
     
@@ -255,4 +399,623 @@ class Product(models.Model):
     @property
     def is_available(self):
         """¿El producto está disponible?"""
-        return self.is_active and self.stock > 0
\ No newline at end of file
+        return self.is_active and self.stock > 0
+
+
+class PriceList(models.Model):
+    """
+    Lista de precios programada (promoción): reglas de descuento con vigencia
+    
+    manage.py apply_price_lists la aplica por lotes al empezar y devuelve
+    los precios anteriores al terminar (ver core/pricing.py).
+    """
+    
+    name = models.CharField(
+        max_length=200,
+        help_text="Nombre de la lista (ej: Cyber Monday)"
+    )
+    
+    starts_at = models.DateTimeField(
+        db_index=True,
+        help_text="Inicio de la vigencia"
+    )
+    
+    ends_at = models.DateTimeField(
+        blank=True,
+        null=True,
+        db_index=True,
+        help_text="Fin de la vigencia (vacío = sin fin)"
+    )
+    
+    # Si dos listas vigentes tocan el mismo producto, gana la de mayor prioridad
+    priority = models.IntegerField(
+        default=0,
+        help_text="Prioridad (mayor gana)"
+    )
+    
+    applied_at = models.DateTimeField(
+        blank=True,
+        null=True,
+        editable=False,
+        help_text="Última aplicación completa"
+    )
+    
+    finished_at = models.DateTimeField(
+        blank=True,
+        null=True,
+        editable=False,
+        help_text="Fecha en que se devolvieron los precios"
+    )
+    
+    created_at = models.DateTimeField(
+        auto_now_add=True,
+        help_text="Fecha de creación"
+    )
+    
+    class Meta:
+        verbose_name = 'Lista de precios'
+        verbose_name_plural = 'Listas de precios'
+        ordering = ['-starts_at']
+        constraints = [
+            models.CheckConstraint(
+                check=models.Q(ends_at__isnull=True) | models.Q(ends_at__gt=F('starts_at')),
+                name='price_list_ends_after_start',
+            ),
+        ]
+    
+    def __str__(self):
+        return self.name
+    
+    def clean(self):
+        if self.ends_at and self.starts_at and self.ends_at <= self.starts_at:
+            raise ValidationError({'ends_at': 'El fin debe ser posterior al inicio'})
+
+
+class PriceRule(models.Model):
+    """
+    Regla de una lista de precios: a qué productos y qué descuento
+    
+    Para un producto o para una categoría (con sus subcategorías). El
+    descuento es un porcentaje sobre el precio o, solo para un producto, un
+    precio con descuento fijo. Dentro de una lista, la regla del producto
+    gana sobre la de su categoría.
+    """
+    
+    price_list = models.ForeignKey(
+        PriceList,
+        on_delete=models.CASCADE,
+        related_name='rules',
+        help_text="Lista de precios"
+    )
+    
+    product = models.ForeignKey(
+        Product,
+        on_delete=models.CASCADE,
+        blank=True,
+        null=True,
+        related_name='+',
+        help_text="Producto (o categoría)"
+    )
+    
+    category = models.ForeignKey(
+        Category,
+        on_delete=models.CASCADE,
+        blank=True,
+        null=True,
+        related_name='+',
+        help_text="Categoría, con sus subcategorías (o producto)"
+    )
+    
+    discount_percentage = models.DecimalField(
+        max_digits=5,
+        decimal_places=2,
+        blank=True,
+        null=True,
+        validators=[MinValueValidator(Decimal('0.01')), MaxValueValidator(Decimal('99.99'))],
+        help_text="Descuento en porcentaje sobre el precio"
+    )
+    
+    discount_price = models.DecimalField(
+        max_digits=10,
+        decimal_places=2,
+        blank=True,
+        null=True,
+        validators=[MinValueValidator(0.01)],
+        help_text="Precio con descuento fijo (solo para un producto)"
+    )
+    
+    class Meta:
+        verbose_name = 'Regla de precios'
+        verbose_name_plural = 'Reglas de precios'
+        constraints = [
+            models.CheckConstraint(
+                check=models.Q(product__isnull=True) ^ models.Q(category__isnull=True),
+                name='price_rule_one_target',
+            ),
+            models.CheckConstraint(
+                check=models.Q(discount_percentage__isnull=True) ^ models.Q(discount_price__isnull=True),
+                name='price_rule_one_discount',
+            ),
+        ]
+    
+    def __str__(self):
+        target = f'producto {self.product_id}' if self.product_id else f'categoría {self.category_id}'
+        discount = f'{self.discount_percentage}%' if self.discount_percentage is not None else f'${self.discount_price}'
+        return f"{self.price_list_id}: {target} -> {discount}"
+    
+    def clean(self):
+        if bool(self.product_id) == bool(self.category_id):
+            raise ValidationError('Elige un producto o una categoría')
+        if (self.discount_percentage is None) == (self.discount_price is None):
+            raise ValidationError('Elige un porcentaje o un precio con descuento')
+        if self.discount_price is not None and not self.product_id:
+            raise ValidationError({'discount_price': 'El precio fijo es solo para un producto'})
+
+
+class PriceListItem(models.Model):
+    """
+    Producto al que se le aplicó una lista, con su precio con descuento anterior
+    
+    Al terminar la lista (o si otra de mayor prioridad la reemplaza) el
+    producto vuelve a `previous_discount_price`.
+    """
+    
+    price_list = models.ForeignKey(
+        PriceList,
+        on_delete=models.CASCADE,
+        related_name='items',
+        help_text="Lista de precios"
+    )
+    
+    product = models.ForeignKey(
+        Product,
+        on_delete=models.CASCADE,
+        related_name='+',
+        help_text="Producto"
+    )
+    
+    previous_discount_price = models.DecimalField(
+        max_digits=10,
+        decimal_places=2,
+        blank=True,
+        null=True,
+        help_text="Precio con descuento antes de las listas"
+    )
+    
+    class Meta:
+        verbose_name = 'Producto en lista de precios'
+        verbose_name_plural = 'Productos en listas de precios'
+        constraints = [
+            models.UniqueConstraint(fields=['price_list', 'product'], name='unique_price_list_item'),
+        ]
+    
+    def __str__(self):
+        return f"{self.price_list_id}: {self.product_id}"
+
+
+class StockShard(models.Model):
+    """
+    Una porción del stock de un producto (ver core/inventory.py)
+    
+    El stock disponible es la suma de las porciones: cada compra descuenta
+    de una sola, así las compras simultáneas del mismo producto bloquean
+    filas distintas. Product.stock es la suma, sincronizada cada pocos
+    segundos (manage.py sync_stock).
+    """
+    
+    product = models.ForeignKey(
+        Product,
+        on_delete=models.CASCADE,
+        related_name='stock_shards',
+        help_text="Producto"
+    )
+    
+    shard = models.PositiveSmallIntegerField(
+        help_text="Número de porción (0..STOCK_SHARDS-1)"
+    )
+    
+    quantity = models.IntegerField(
+        default=0,
+        help_text="Unidades en esta porción"
+    )
+    
+    # Se escribe en cada movimiento: sync_stock solo revisa lo reciente
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        db_index=True,
+        help_text="Último movimiento"
+    )
+    
+    class Meta:
+        verbose_name = 'Porción de stock'
+        verbose_name_plural = 'Porciones de stock'
+        constraints = [
+            models.UniqueConstraint(fields=['product', 'shard'], name='unique_stock_shard'),
+            # Última barrera contra el stock negativo (los descuentos ya lo verifican)
+            models.CheckConstraint(check=models.Q(quantity__gte=0), name='stock_shard_non_negative'),
+        ]
+    
+    def __str__(self):
+        return f"{self.product_id}#{self.shard}: {self.quantity}"
+
+
+class ProcessedEvent(models.Model):
+    """
+    Evento de otro servicio ya procesado (idempotencia del consumidor)
+    
+    El relay de pedidos entrega "al menos una vez": si un evento llega
+    dos veces, el segundo se ignora gracias a la restricción única.
+    """
+    
+    event_id = models.BigIntegerField(
+        unique=True,
+        help_text="ID del evento en el outbox de origen"
+    )
+    
+    event_type = models.CharField(
+        max_length=50,
+        help_text="Tipo de evento"
+    )
+    
+    processed_at = models.DateTimeField(
+        auto_now_add=True,
+        help_text="Fecha de procesamiento"
+    )
+    
+    class Meta:
+        verbose_name = 'Evento procesado'
+        verbose_name_plural = 'Eventos procesados'
+    
+    def __str__(self):
+        return f"{self.event_type} #{self.event_id}"
+
+
+class ConsumerOffset(models.Model):
+    """Posición de lectura de un consumidor de eventos"""
+    
+    name = models.CharField(
+        max_length=100,
+        unique=True,
+        help_text="Nombre del consumidor"
+    )
+    
+    position = models.BigIntegerField(
+        default=0,
+        help_text="Posición (byte) hasta donde se leyó"
+    )
+    
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        help_text="Fecha de actualización"
+    )
+    
+    class Meta:
+        verbose_name = 'Posición de consumidor'
+        verbose_name_plural = 'Posiciones de consumidores'
+    
+    def __str__(self):
+        return f"{self.name} @ {self.position}"
+
+
+class DeadLetterEvent(models.Model):
+    """
+    Mensaje de eventos que el consumidor no pudo procesar
+    
+    Se identifica por su posición en el archivo. Guarda la línea original
+    y el último error; con `skipped` el consumidor ya lo dejó atrás y
+    queda para revisión manual.
+    """
+    
+    consumer = models.CharField(
+        max_length=100,
+        help_text="Nombre del consumidor"
+    )
+    
+    position = models.BigIntegerField(
+        help_text="Posición (byte) del mensaje en el archivo"
+    )
+    
+    event_id = models.BigIntegerField(
+        null=True,
+        blank=True,
+        help_text="ID del evento, si la línea se pudo leer"
+    )
+    
+    raw = models.TextField(
+        help_text="Línea original"
+    )
+    
+    error = models.TextField(
+        blank=True,
+        help_text="Último error"
+    )
+    
+    attempts = models.PositiveIntegerField(
+        default=0,
+        help_text="Intentos fallidos"
+    )
+    
+    skipped = models.BooleanField(
+        default=False,
+        help_text="El consumidor lo saltó tras agotar los intentos"
+    )
+    
+    created_at = models.DateTimeField(
+        auto_now_add=True,
+        help_text="Fecha del primer fallo"
+    )
+    
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        help_text="Fecha del último fallo"
+    )
+    
+    class Meta:
+        verbose_name = 'Evento fallido'
+        verbose_name_plural = 'Eventos fallidos'
+        constraints = [
+            models.UniqueConstraint(fields=['consumer', 'position'], name='unique_dead_letter_position'),
+        ]
+    
+    def __str__(self):
+        return f"{self.consumer} @ {self.position} ({self.attempts} intentos)"
+
+
+class Review(models.Model):
+    """
+    Reseña de un producto
+    
+    Guardar o borrar una reseña ajusta rating/review_count del producto en
+    la misma transacción (Product.objects.apply_review). Los cambios que no
+    pasan por save()/delete() (ej: queryset.delete()) los corrige
+    manage.py reconcile_ratings.
+    """
+    
+    # ========================================
+    # RELACIONES
+    # ========================================
+    
+    product = models.ForeignKey(
+        Product,
+        on_delete=models.CASCADE,
+        related_name='reviews',
+        help_text="Producto reseñado"
+    )
+    
+    # Referencia al usuario (por ID, es otro servicio)
+    user_id = models.IntegerField(
+        help_text="ID del usuario que escribió la reseña"
+    )
+    
+    # ========================================
+    # CONTENIDO
+    # ========================================
+    
+    rating = models.PositiveSmallIntegerField(
+        validators=[MinValueValidator(1), MaxValueValidator(5)],
+        help_text="Calificación (1-5)"
+    )
+    
+    title = models.CharField(
+        max_length=200,
+        blank=True,
+        help_text="Título de la reseña"
+    )
+    
+    comment = models.TextField(
+        blank=True,
+        help_text="Comentario"
+    )
+    
+    # ========================================
+    # TIMESTAMPS
+    # ========================================
+    
+    created_at = models.DateTimeField(
+        auto_now_add=True,
+        help_text="Fecha de creación"
+    )
+    
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        help_text="Fecha de actualización"
+    )
+    
+    # ========================================
+    # CONFIGURACIÓN DEL MODELO
+    # ========================================
+    
+    class Meta:
+        verbose_name = 'Reseña'
+        verbose_name_plural = 'Reseñas'
+        ordering = ['-created_at']
+        constraints = [
+            # Una reseña por usuario y producto
+            models.UniqueConstraint(fields=['product', 'user_id'], name='unique_review_per_user'),
+        ]
+        indexes = [
+            models.Index(fields=['product', '-created_at']),
+        ]
+    
+    def __str__(self):
+        return f"{self.rating}★ - producto {self.product_id}"
+    
+    def _stored(self):
+        """(rating, product_id) guardados, con la fila bloqueada (None si es nueva)"""
+        if self.pk is None:
+            return None
+        return Review.objects.select_for_update().filter(pk=self.pk).values_list(
+            'rating', 'product_id'
+        ).first()
+    
+    def save(self, *args, **kwargs):
+        with transaction.atomic():
+            previous = self._stored()
+            super().save(*args, **kwargs)
+            
+            if previous is None:
+                Product.objects.apply_review(self.product_id, self.rating, 1)
+                return
+            
+            old_rating, old_product_id = previous
+            if old_product_id != self.product_id:
+                Product.objects.apply_review(old_product_id, -old_rating, -1)
+                Product.objects.apply_review(self.product_id, self.rating, 1)
+            elif old_rating != self.rating:
+                Product.objects.apply_review(self.product_id, self.rating - old_rating, 0)
+    
+    def delete(self, *args, **kwargs):
+        with transaction.atomic():
+            previous = self._stored()
+            result = super().delete(*args, **kwargs)
+            if previous is not None:
+                old_rating, old_product_id = previous
+                Product.objects.apply_review(old_product_id, -old_rating, -1)
+            return result
+
+
+class CoPurchase(models.Model):
+    """
+    Veces que dos productos se compraron en el mismo pedido
+    
+    Se guarda en ambos sentidos (A->B y B->A) para leer por `product`
+    con el índice. Lo alimenta el consumidor de eventos order.created.
+    """
+    
+    product = models.ForeignKey(
+        Product,
+        on_delete=models.CASCADE,
+        related_name='+',
+        help_text="Producto"
+    )
+    
+    other = models.ForeignKey(
+        Product,
+        on_delete=models.CASCADE,
+        related_name='+',
+        help_text="Producto comprado junto con el anterior"
+    )
+    
+    count = models.PositiveIntegerField(
+        default=0,
+        help_text="Pedidos en los que aparecen juntos"
+    )
+    
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        help_text="Fecha de actualización"
+    )
+    
+    class Meta:
+        verbose_name = 'Compra conjunta'
+        verbose_name_plural = 'Compras conjuntas'
+        constraints = [
+            models.UniqueConstraint(fields=['product', 'other'], name='unique_copurchase_pair'),
+        ]
+        indexes = [
+            models.Index(fields=['product', '-count']),
+            models.Index(fields=['updated_at']),
+        ]
+    
+    def __str__(self):
+        return f"{self.product_id} + {self.other_id} ({self.count})"
+
+
+class RelatedProduct(models.Model):
+    """
+    Productos relacionados precalculados (manage.py refresh_related_products)
+    
+    /api/products/{id}/related/ los lee con un solo query por el índice
+    (product, position), sin recorrer la categoría.
+    """
+    
+    product = models.ForeignKey(
+        Product,
+        on_delete=models.CASCADE,
+        related_name='related_entries',
+        help_text="Producto"
+    )
+    
+    related = models.ForeignKey(
+        Product,
+        on_delete=models.CASCADE,
+        related_name='+',
+        help_text="Producto recomendado"
+    )
+    
+    position = models.PositiveSmallIntegerField(
+        help_text="Orden de la recomendación (0 = la mejor)"
+    )
+    
+    score = models.FloatField(
+        default=0,
+        help_text="Puntaje (compras conjuntas + similitud de categoría)"
+    )
+    
+    class Meta:
+        verbose_name = 'Producto relacionado'
+        verbose_name_plural = 'Productos relacionados'
+        ordering = ['product', 'position']
+        constraints = [
+            models.UniqueConstraint(fields=['product', 'related'], name='unique_related_product'),
+        ]
+        indexes = [
+            models.Index(fields=['product', 'position']),
+        ]
+    
+    def __str__(self):
+        return f"{self.product_id} -> {self.related_id} #{self.position}"
+
+
+class JobCheckpoint(models.Model):
+    """Última ejecución de un proceso por lotes (para trabajar de forma incremental)"""
+    
+    name = models.CharField(
+        max_length=100,
+        unique=True,
+        help_text="Nombre del proceso"
+    )
+    
+    last_run_at = models.DateTimeField(
+        blank=True,
+        null=True,
+        help_text="Inicio de la última ejecución completa"
+    )
+    
+    class Meta:
+        verbose_name = 'Checkpoint de proceso'
+        verbose_name_plural = 'Checkpoints de procesos'
+    
+    def __str__(self):
+        return f"{self.name} @ {self.last_run_at}"
+
+
+class CatalogSnapshot(models.Model):
+    """
+    Documento JSON precalculado (ej: la portada, ver core/home.py)
+    
+    Guardarlo en la base de datos lo comparte entre workers y reinicios;
+    cada worker además lo tiene en su cache.
+    """
+    
+    name = models.CharField(
+        max_length=50,
+        unique=True,
+        help_text="Nombre del snapshot"
+    )
+    
+    content = models.TextField(
+        help_text="JSON listo para enviar"
+    )
+    
+    built_at = models.DateTimeField(
+        auto_now=True,
+        help_text="Fecha de construcción"
+    )
+    
+    class Meta:
+        verbose_name = 'Snapshot del catálogo'
+        verbose_name_plural = 'Snapshots del catálogo'
+    
+    def __str__(self):
+        return f"{self.name} @ {self.built_at}"
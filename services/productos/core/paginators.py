@@ -0,0 +1,48 @@
+# ========================================
+# PAGINADORES - CONTEO ESTIMADO PARA TABLAS GRANDES
+# ========================================
+
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils.functional import cached_property
+
+# Por debajo de esto, COUNT(*) es barato y exacto
+ESTIMATE_THRESHOLD = 100000
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginador que evita COUNT(*) sobre la tabla completa
+    
+    En PostgreSQL un COUNT(*) sin filtros recorre toda la tabla. Para el
+    listado sin filtros se usa la estimación del planner (pg_class.reltuples);
+    con filtros, o si la tabla es pequeña, se cuenta normalmente.
+    """
+    
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        query = getattr(queryset, 'query', None)
+        
+        if query is not None and not query.where:
+            estimate = self._estimate(queryset)
+            if estimate is not None and estimate > ESTIMATE_THRESHOLD:
+                return estimate
+        
+        return super().count
+    
+    @staticmethod
+    def _estimate(queryset):
+        """Filas estimadas de la tabla (None si no es PostgreSQL o no hay estadísticas)"""
+        connection = connections[queryset.db]
+        if connection.vendor != 'postgresql':
+            return None
+        
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT reltuples::bigint FROM pg_class WHERE relname = %s',
+                [queryset.model._meta.db_table],
+            )
+            row = cursor.fetchone()
+        
+        return row[0] if row and row[0] > 0 else None
@@ -0,0 +1,181 @@
+# ========================================
+# PRICING - LISTAS DE PRECIOS PROGRAMADAS
+# ========================================
+#
+# Las promociones se cargan antes como listas de precios (PriceList) con
+# vigencia y reglas por producto o por categoría (PriceRule). Nadie edita
+# productos a medianoche: `manage.py apply_price_lists --interval 30`
+# revisa las listas y
+#   - al empezar una lista, fija discount_price en sus productos;
+#   - al terminar, les devuelve el discount_price que tenían antes
+#     (guardado en PriceListItem al aplicarla).
+# Todo pasa por bulk.update_in_batches: UPDATEs por lotes de ids, cada uno
+# en su transacción (locks cortos, sin tomar la tabla entera), con pausa
+# opcional entre lotes, invalidando el detalle cacheado de cada lote
+# (core/product_cache.py) y reconstruyendo la portada una vez al final.
+#
+# Solo se escribe discount_price (el precio base no cambia) y solo si queda
+# menor que el precio, así has_discount/final_price, el filtro has_discount
+# y las facetas coinciden. Si dos listas vigentes tocan el mismo producto,
+# gana la de mayor prioridad (a igual prioridad, la que lo tomó primero);
+# cuando termina, la otra lo vuelve a tomar en la misma pasada.
+#
+# Las reglas se leen al aplicar: cambiar una lista ya aplicada solo afecta
+# a los productos que aún no tomó. Un discount_price editado a mano en un
+# producto con lista se pierde al terminar la lista.
+
+import logging
+
+from django.db.models import F, OuterRef, Q, Subquery
+from django.db.models.functions import Round
+from django.utils import timezone
+
+from .bulk import BATCH_SIZE, update_in_batches
+from .models import Category, PriceList, PriceListItem, Product
+
+logger = logging.getLogger(__name__)
+
+
+# ========================================
+# APLICAR
+# ========================================
+
+def running_lists(now=None):
+    """Listas vigentes, de mayor a menor prioridad"""
+    now = now or timezone.now()
+    return PriceList.objects.filter(
+        Q(ends_at__isnull=True) | Q(ends_at__gt=now),
+        starts_at__lte=now,
+        finished_at__isnull=True,
+    ).order_by('-priority', 'starts_at', 'id')
+
+
+def _eligible(price_list):
+    """Productos que la lista puede tomar (libres o en una lista de menor prioridad)"""
+    return Product.objects.exclude(price_list=price_list).filter(
+        Q(price_list__isnull=True) | Q(price_list__priority__lt=price_list.priority)
+    )
+
+
+def _remember_previous(price_list, product_ids):
+    """
+    Guarda el discount_price anterior de los productos del lote
+    
+    Si el producto venía de otra lista, el anterior es el de esa lista
+    (el precio de antes de todas las promociones).
+    """
+    rows = list(
+        Product.objects.select_for_update().filter(id__in=product_ids)
+        .values_list('id', 'discount_price', 'price_list_id')
+    )
+    previous = {product_id: discount_price for product_id, discount_price, _ in rows}
+    taken_from = {product_id: list_id for product_id, _, list_id in rows if list_id}
+    if taken_from:
+        for product_id, list_id, discount_price in PriceListItem.objects.filter(
+            product_id__in=taken_from
+        ).values_list('product_id', 'price_list_id', 'previous_discount_price'):
+            if taken_from[product_id] == list_id:
+                previous[product_id] = discount_price
+    
+    PriceListItem.objects.bulk_create(
+        [
+            PriceListItem(price_list=price_list, product_id=product_id, previous_discount_price=discount_price)
+            for product_id, discount_price in previous.items()
+        ],
+        update_conflicts=True,
+        unique_fields=['price_list', 'product'],
+        update_fields=['previous_discount_price'],
+    )
+
+
+def _apply_rule(price_list, rule, batch_size, progress):
+    products = _eligible(price_list)
+    if rule.product_id:
+        products = products.filter(id=rule.product_id)
+    else:
+        path = Category.objects.filter(id=rule.category_id).values_list('path', flat=True).get()
+        products = products.filter(category__path__startswith=path)
+    
+    if rule.discount_price is not None:
+        # Un precio fijo que no es menor que el precio no es un descuento
+        products = products.filter(price__gt=rule.discount_price)
+        discount_price = rule.discount_price
+    else:
+        discount_price = Round(F('price') * (1 - rule.discount_percentage / 100), 2)
+    
+    return update_in_batches(
+        products,
+        batch_size=batch_size,
+        progress=progress,
+        before_update=lambda ids: _remember_previous(price_list, ids),
+        discount_price=discount_price,
+        price_list=price_list,
+    )
+
+
+def apply_price_list(price_list, batch_size=BATCH_SIZE, progress=None):
+    """
+    Aplica la lista a los productos que aún no tomó
+    
+    Primero las reglas por producto y después las de categoría (que ya no
+    tocan a los productos con regla propia). Se puede repetir: solo
+    escribe los productos nuevos o liberados. Retorna los productos
+    actualizados.
+    """
+    rules = list(price_list.rules.order_by(F('product_id').asc(nulls_last=True), 'id'))
+    updated = sum(_apply_rule(price_list, rule, batch_size, progress) for rule in rules)
+    
+    PriceList.objects.filter(id=price_list.id).update(applied_at=timezone.now())
+    if updated:
+        logger.info('Lista de precios "%s": %d productos', price_list, updated)
+    return updated
+
+
+# ========================================
+# TERMINAR
+# ========================================
+
+def ended_lists(now=None):
+    """Listas vencidas cuyos precios aún no se devolvieron"""
+    now = now or timezone.now()
+    return PriceList.objects.filter(ends_at__lte=now, finished_at__isnull=True).order_by('ends_at', 'id')
+
+
+def revert_price_list(price_list, batch_size=BATCH_SIZE, progress=None):
+    """
+    Devuelve a los productos de la lista su discount_price anterior
+    
+    Marca la lista como terminada. Retorna los productos actualizados.
+    """
+    previous = PriceListItem.objects.filter(
+        price_list=price_list, product=OuterRef('pk')
+    ).values('previous_discount_price')[:1]
+    
+    updated = update_in_batches(
+        Product.objects.filter(price_list=price_list),
+        batch_size=batch_size,
+        progress=progress,
+        discount_price=Subquery(previous),
+        price_list=None,
+    )
+    
+    PriceList.objects.filter(id=price_list.id).update(finished_at=timezone.now())
+    logger.info('Lista de precios "%s" terminada: %d productos', price_list, updated)
+    return updated
+
+
+def run_price_lists(now=None, batch_size=BATCH_SIZE, progress=None):
+    """
+    Una pasada: termina las listas vencidas y aplica las vigentes
+    
+    Retorna {'reverted': productos, 'applied': productos}.
+    """
+    now = now or timezone.now()
+    reverted = sum(
+        revert_price_list(price_list, batch_size, progress) for price_list in ended_lists(now)
+    )
+    # De mayor a menor prioridad: las de menor ya no toman lo de las otras
+    applied = sum(
+        apply_price_list(price_list, batch_size, progress) for price_list in running_lists(now)
+    )
+    return {'reverted': reverted, 'applied': applied}
@@ -0,0 +1,72 @@
+# ========================================
+# CACHE DEL DETALLE DE PRODUCTO
+# ========================================
+#
+# GET /api/products/{id}/ se sirve desde el cache: el JSON de
+# ProductDetailSerializer por producto, calculado una sola vez aunque miles
+# de peticiones lo pidan a la vez y refrescado antes de vencer (ver
+# core/singleflight.py). También se cachea "no existe / inactivo" para que
+# los ids inválidos no vayan cada vez a la base de datos.
+#   - Se borra al confirmar cambios del producto (save/delete, admin,
+#     importación, bulk.update_in_batches).
+#   - Stock (eventos de pedidos), rating (reseñas) y el nombre de la
+#     categoría se actualizan con queryset.update() o en otra tabla: se ven
+#     a más tardar en PRODUCT_DETAIL_CACHE_SECONDS. Nadie valida el stock
+#     contra este valor: pedidos no lo consulta al comprar, y el consumidor
+#     de eventos (core/events.py) descuenta lo que haya y registra el faltante.
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+
+from . import singleflight
+from .models import Product
+
+# Segundos que se guarda el detalle de un producto
+PRODUCT_DETAIL_CACHE_SECONDS = getattr(settings, 'PRODUCT_DETAIL_CACHE_SECONDS', 60)
+
+# Cambiar si cambia el formato del detalle serializado
+KEY_VERSION = 1
+
+
+def _key(product_id):
+    return f'product-detail:v{KEY_VERSION}:{product_id}'
+
+
+def serialize_product(product):
+    from .serializers import ProductDetailSerializer
+    return dict(ProductDetailSerializer(product).data)
+
+
+def get_product_detail(product_id, queryset=None):
+    """
+    Detalle serializado de un producto activo (cache o base de datos)
+    
+    `queryset` son los productos visibles (por defecto, los activos).
+    None si el producto no existe o no está en el queryset.
+    """
+    if queryset is None:
+        queryset = Product.objects.filter(is_active=True)
+    
+    def compute():
+        product = queryset.select_related('category').filter(id=product_id).first()
+        return None if product is None else serialize_product(product)
+    
+    return singleflight.cached(_key(product_id), compute, PRODUCT_DETAIL_CACHE_SECONDS)
+
+
+def invalidate_products(product_ids):
+    """Borra los detalles del cache (al confirmar la transacción, si hay una)"""
+    keys = [_key(product_id) for product_id in product_ids]
+    if keys:
+        transaction.on_commit(lambda: singleflight.invalidate(*keys))
+
+
+def _product_changed(sender, instance, **kwargs):
+    invalidate_products([instance.pk])
+
+
+def connect_signals():
+    """Llamado desde CoreConfig.ready()"""
+    post_save.connect(_product_changed, sender=Product, dispatch_uid='product-cache-save')
+    post_delete.connect(_product_changed, sender=Product, dispatch_uid='product-cache-delete')
@@ -0,0 +1,186 @@
+# ========================================
+# RELACIONADOS - RECOMENDACIONES PRECALCULADAS
+# ========================================
+#
+# 1. Compras conjuntas: el consumidor de eventos suma, por cada order.created,
+#    los pares de productos del pedido (record_copurchase).
+# 2. refresh_related: por lotes, recalcula los relacionados de los productos
+#    cuyas compras conjuntas cambiaron desde la última ejecución y los guarda
+#    en RelatedProduct. Si faltan, se completa con la misma categoría
+#    (mejor calificados primero).
+
+import logging
+from itertools import permutations
+
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import CoPurchase, JobCheckpoint, Product, RelatedProduct
+
+logger = logging.getLogger(__name__)
+
+JOB_NAME = 'productos.related'
+
+# Recomendaciones guardadas por producto
+RELATED_SIZE = 10
+
+# Pedidos con más productos distintos solo cuentan los primeros
+# (los pares crecen al cuadrado)
+MAX_BASKET = 20
+
+# Peso extra de una compra conjunta de la misma categoría
+SAME_CATEGORY_BONUS = 0.2
+
+# Puntaje de los productos que solo comparten categoría
+CATEGORY_ONLY_SCORE = 0.1
+
+BATCH_SIZE = 500
+
+
+# ========================================
+# COMPRAS CONJUNTAS
+# ========================================
+
+def record_copurchase(items):
+    """
+    Suma 1 a cada par de productos comprados juntos en un pedido
+    
+    Se llama dentro de la transacción del consumidor de eventos (idempotente).
+    """
+    product_ids = list(dict.fromkeys(item['product_id'] for item in items))[:MAX_BASKET]
+    product_ids = list(
+        Product.objects.filter(id__in=product_ids).values_list('id', flat=True)
+    )
+    if len(product_ids) < 2:
+        return 0
+    
+    pairs = CoPurchase.objects.filter(product_id__in=product_ids, other_id__in=product_ids)
+    existing = set(pairs.values_list('product_id', 'other_id'))
+    pairs.update(count=F('count') + 1, updated_at=timezone.now())
+    
+    CoPurchase.objects.bulk_create(
+        [
+            CoPurchase(product_id=a, other_id=b, count=1)
+            for a, b in permutations(product_ids, 2)
+            if (a, b) not in existing
+        ],
+        ignore_conflicts=True,
+    )
+    return len(product_ids)
+
+
+# ========================================
+# CÁLCULO DE RELACIONADOS
+# ========================================
+
+def _category_candidates(category_ids):
+    """Mejores productos activos de cada categoría: {category_id: [ids]}"""
+    candidates = {}
+    for category_id in category_ids:
+        candidates[category_id] = list(
+            Product.objects.filter(category_id=category_id, is_active=True)
+            .order_by('-rating', '-review_count', '-id')
+            .values_list('id', flat=True)[:RELATED_SIZE + 1]
+        )
+    return candidates
+
+
+def compute_related(products):
+    """
+    Calcula los relacionados de una lista de productos (id, category_id)
+    
+    Retorna una lista de RelatedProduct sin guardar.
+    """
+    product_ids = [product_id for product_id, _ in products]
+    
+    # Compras conjuntas de todo el lote en un query
+    copurchases = {}
+    rows = (
+        CoPurchase.objects.filter(product_id__in=product_ids, other__is_active=True)
+        .values_list('product_id', 'other_id', 'count', 'other__category_id')
+        .order_by('product_id', '-count')
+    )
+    for product_id, other_id, count, other_category in rows:
+        copurchases.setdefault(product_id, []).append((other_id, count, other_category))
+    
+    by_category = _category_candidates({category_id for _, category_id in products})
+    
+    entries = []
+    for product_id, category_id in products:
+        pairs = copurchases.get(product_id, [])
+        top = pairs[0][1] if pairs else 1
+        
+        scored = {}
+        for other_id, count, other_category in pairs:
+            score = count / top
+            if other_category == category_id:
+                score += SAME_CATEGORY_BONUS
+            scored[other_id] = score
+        
+        ranked = sorted(scored.items(), key=lambda pair: (-pair[1], pair[0]))[:RELATED_SIZE]
+        
+        # Completar con la misma categoría
+        chosen = {other_id for other_id, _ in ranked}
+        for other_id in by_category.get(category_id, []):
+            if len(ranked) >= RELATED_SIZE:
+                break
+            if other_id != product_id and other_id not in chosen:
+                ranked.append((other_id, CATEGORY_ONLY_SCORE))
+                chosen.add(other_id)
+        
+        entries.extend(
+            RelatedProduct(product_id=product_id, related_id=other_id, position=position, score=score)
+            for position, (other_id, score) in enumerate(ranked)
+        )
+    
+    return entries
+
+
+def _rebuild(products):
+    """Reemplaza los relacionados de un lote de productos en una transacción"""
+    entries = compute_related(products)
+    with transaction.atomic():
+        RelatedProduct.objects.filter(product_id__in=[product_id for product_id, _ in products]).delete()
+        RelatedProduct.objects.bulk_create(entries)
+    return len(entries)
+
+
+def refresh_related(full=False, batch_size=BATCH_SIZE, progress=None):
+    """
+    Recalcula los productos relacionados por lotes
+    
+    Incremental (por defecto): solo los productos con compras conjuntas
+    nuevas desde la última ejecución y los que aún no tienen relacionados.
+    Con `full=True` recalcula todo el catálogo activo.
+    Retorna la cantidad de productos recalculados.
+    """
+    checkpoint, _ = JobCheckpoint.objects.get_or_create(name=JOB_NAME)
+    started_at = timezone.now()
+    
+    queryset = Product.objects.filter(is_active=True)
+    if not full and checkpoint.last_run_at is not None:
+        changed = CoPurchase.objects.filter(
+            updated_at__gte=checkpoint.last_run_at
+        ).values('product_id')
+        queryset = queryset.filter(id__in=changed) | queryset.filter(related_entries__isnull=True)
+    
+    candidates = queryset.order_by('id').values_list('id', 'category_id').distinct()
+    refreshed = 0
+    last_id = 0
+    
+    while True:
+        products = list(candidates.filter(id__gt=last_id)[:batch_size])
+        if not products:
+            break
+        last_id = products[-1][0]
+        
+        _rebuild(products)
+        refreshed += len(products)
+        logger.info('refresh_related: %d productos (hasta id %d)', refreshed, last_id)
+        if progress:
+            progress(refreshed, last_id)
+    
+    checkpoint.last_run_at = started_at
+    checkpoint.save(update_fields=['last_run_at'])
+    return refreshed
@@ -0,0 +1,81 @@
+# ========================================
+# RESEÑAS - CONCILIACIÓN DEL RATING
+# ========================================
+#
+# rating/review_count se mantienen en línea en cada save()/delete() de
+# Review. Si algo los desvía (borrados masivos, SQL a mano, restauraciones)
+# reconcile_ratings los recalcula por lotes y corrige solo los que difieren.
+
+import logging
+from decimal import ROUND_HALF_UP, Decimal
+
+from django.db import transaction
+from django.db.models import Count, Sum
+
+from .models import Product, Review
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 1000
+
+
+def expected_rating(rating_sum, review_count):
+    """Promedio con 2 decimales, como lo guarda apply_review"""
+    if not review_count:
+        return Decimal('0.00')
+    return (Decimal(rating_sum) / review_count).quantize(Decimal('0.01'), ROUND_HALF_UP)
+
+
+def reconcile_ratings(batch_size=BATCH_SIZE, progress=None):
+    """
+    Recalcula rating_sum/review_count/rating desde las reseñas
+    
+    Recorre los productos por id en lotes: por lote, bloquea las filas, un
+    GROUP BY sobre las reseñas y un bulk_update de los que no coinciden. Retorna la cantidad
+    de productos corregidos.
+    """
+    fixed = 0
+    checked = 0
+    last_id = 0
+    
+    while True:
+        with transaction.atomic():
+            # Bloquear el lote antes de agregar: apply_review espera a que
+            # termine, así ninguna reseña nueva se cuela entre el GROUP BY
+            # y el bulk_update (y se pisaría su delta)
+            products = list(
+                Product.objects.select_for_update().filter(id__gt=last_id).order_by('id')
+                .only('id', 'rating', 'rating_sum', 'review_count')[:batch_size]
+            )
+            if not products:
+                break
+            last_id = products[-1].id
+            
+            totals = {
+                row['product_id']: (row['total'], row['count'])
+                for row in Review.objects.filter(product_id__in=[p.id for p in products])
+                .values('product_id')
+                .annotate(total=Sum('rating'), count=Count('id'))
+                .order_by()
+            }
+            
+            drifted = []
+            for product in products:
+                rating_sum, review_count = totals.get(product.id, (0, 0))
+                rating = expected_rating(rating_sum, review_count)
+                if (product.rating_sum, product.review_count, product.rating) != (rating_sum, review_count, rating):
+                    product.rating_sum = rating_sum
+                    product.review_count = review_count
+                    product.rating = rating
+                    drifted.append(product)
+            
+            if drifted:
+                Product.objects.bulk_update(drifted, ['rating_sum', 'review_count', 'rating'])
+        
+        fixed += len(drifted)
+        checked += len(products)
+        logger.info('reconcile_ratings: %d revisados, %d corregidos', checked, fixed)
+        if progress:
+            progress(checked, fixed)
+    
+    return fixed
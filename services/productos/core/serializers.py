@@ -2,8 +2,11 @@
 # SERIALIZERS - SERVICIO PRODUCTOS
 # ========================================
 
+from django.db import transaction
 from rest_framework import serializers
-from .models import Category, Product
+
+from .inventory import reset_stock
+from .models import Category, Product, Review
 
 
 class CategorySerializer(serializers.ModelSerializer):
@@ -17,11 +20,20 @@ class CategorySerializer(serializers.ModelSerializer):
             'slug',
             'description',
             'image',
+            'parent',
+            'depth',
+            'product_count',
             'is_active',
             'created_at',
             'updated_at',
         ]
-        read_only_fields = ['id', 'created_at', 'updated_at']
+        read_only_fields = ['id', 'depth', 'product_count', 'created_at', 'updated_at']
+    
+    def validate_parent(self, value):
+        """Validar que la categoría no quede dentro de sí misma"""
+        if value and self.instance and f'/{self.instance.pk}/' in f'{value.path}/{value.pk}/':
+            raise serializers.ValidationError("Una categoría no puede estar dentro de sí misma")
+        return value
 
 
 class ProductListSerializer(serializers.ModelSerializer):
@@ -142,4 +154,29 @@ class ProductCreateUpdateSerializer(serializers.ModelSerializer):
                     'discount_price': 'El precio con descuento debe ser menor que el precio original'
                 })
         
-        return data
\ No newline at end of file
+        return data
+    
+    def update(self, instance, validated_data):
+        """Un stock enviado es absoluto: las porciones se rehacen desde él (core/inventory.py)"""
+        with transaction.atomic():
+            instance = super().update(instance, validated_data)
+            if 'stock' in validated_data:
+                reset_stock([instance.pk])
+        return instance
+
+
+class ReviewSerializer(serializers.ModelSerializer):
+    """Serializer para reseñas (el usuario y el producto los pone la vista)"""
+    
+    class Meta:
+        model = Review
+        fields = [
+            'id',
+            'user_id',
+            'rating',
+            'title',
+            'comment',
+            'created_at',
+            'updated_at',
+        ]
+        read_only_fields = ['id', 'user_id', 'created_at', 'updated_at']
@@ -0,0 +1,182 @@
+# ========================================
+# SINGLE-FLIGHT - UN SOLO CÁLCULO POR CLAVE
+# ========================================
+#
+# En un lanzamiento miles de peticiones piden la misma clave a la vez; si
+# todas fallan el cache al mismo tiempo, todas calculan lo mismo contra la
+# base de datos ("thundering herd"). cached() lo evita en dos niveles:
+#   - Coalescencia: en el proceso, los hilos que fallan la misma clave
+#     esperan al primero (el "líder") y usan su resultado. Entre procesos,
+#     el líder toma un lock en el cache (cache.add); los demás esperan a
+#     que aparezca el valor (hasta WAIT_TIMEOUT, después calculan igual).
+#   - Refresco anticipado probabilístico (XFetch, Vattani et al. 2015):
+#     cada entrada guarda cuánto costó calcularla (delta) y cuándo vence.
+#     Una lectura la recalcula antes de vencer con probabilidad creciente
+#     al acercarse el vencimiento y mayor cuanto más cara es:
+#         ahora - delta * beta * ln(random()) >= vence
+#     Así una sola petición la refresca mientras las demás siguen
+#     sirviendo la copia vigente, y la entrada casi nunca llega a vencer.
+#     Mientras alguien refresca (lock tomado) nadie más lo intenta.
+#   - Generación: invalidate() cambia la generación de la clave y cada
+#     entrada guarda la generación con la que se empezó a calcular. Si un
+#     cálculo que empezó antes de la invalidación guarda después, su entrada
+#     queda con la generación vieja y se ignora como si no existiera.
+# Con REDIS_URL el cache (y el lock) se comparten entre workers; con
+# locmem la coalescencia entre procesos no aplica, pero sí la del proceso.
+
+import math
+import random
+import threading
+import time
+import uuid
+
+from django.core.cache import cache
+
+# Mayor = refresca antes (1.0 es el valor del paper)
+BETA = 1.0
+
+# Segundos que un proceso espera el valor que calcula otro proceso
+WAIT_TIMEOUT = 2.0
+WAIT_INTERVAL = 0.02
+
+# Vida máxima del lock entre procesos (por si el líder muere calculando)
+LOCK_TIMEOUT = 10
+
+
+class _Flight:
+    """Un cálculo en curso en este proceso"""
+    
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+
+_flights = {}
+_flights_lock = threading.Lock()
+
+
+def _lock_key(key):
+    return f'{key}:lock'
+
+
+def _generation_key(key):
+    return f'{key}:gen'
+
+
+def _read(key):
+    """(entrada vigente o None, generación actual) en un solo viaje al cache"""
+    found = cache.get_many([key, _generation_key(key)])
+    entry = found.get(key)
+    generation = found.get(_generation_key(key))
+    if entry is not None and entry.get('gen') != generation:
+        entry = None                    # Calculada antes de una invalidación
+    return entry, generation
+
+
+def _should_refresh(entry, beta):
+    """XFetch: ¿refrescar ya esta entrada vigente?"""
+    return time.time() - entry['delta'] * beta * math.log(1.0 - random.random()) >= entry['expiry']
+
+
+def _store(key, value, delta, timeout, generation):
+    cache.set(key, {
+        'value': value, 'delta': delta, 'expiry': time.time() + timeout, 'gen': generation,
+    }, timeout)
+
+
+def _compute_and_store(key, compute, timeout, generation):
+    """Calcula como líder entre procesos; libera el lock al terminar"""
+    start = time.perf_counter()
+    try:
+        value = compute()
+        _store(key, value, time.perf_counter() - start, timeout, generation)
+        return value
+    finally:
+        cache.delete(_lock_key(key))
+
+
+def _wait_for_value(key):
+    """Espera a que otro proceso guarde la clave; None si no llega a tiempo"""
+    deadline = time.monotonic() + WAIT_TIMEOUT
+    while time.monotonic() < deadline:
+        time.sleep(WAIT_INTERVAL)
+        entry, _ = _read(key)
+        if entry is not None:
+            return entry
+        if cache.get(_lock_key(key)) is None:
+            return None                 # El líder terminó (o falló) sin guardar
+    return None
+
+
+def _load(key, compute, timeout, beta):
+    """Lo que hace el líder del proceso: cache, refresco o cálculo"""
+    entry, generation = _read(key)
+    if entry is not None and not _should_refresh(entry, beta):
+        return entry['value']
+    
+    if cache.add(_lock_key(key), 1, LOCK_TIMEOUT):
+        return _compute_and_store(key, compute, timeout, generation)
+    
+    if entry is not None:
+        return entry['value']           # Otro proceso ya la está refrescando
+    
+    entry = _wait_for_value(key)
+    if entry is not None:
+        return entry['value']
+    
+    # El otro proceso tarda o falló: calcular sin lock
+    start = time.perf_counter()
+    value = compute()
+    _store(key, value, time.perf_counter() - start, timeout, generation)
+    return value
+
+
+def cached(key, compute, timeout, beta=BETA):
+    """
+    Valor de `key` en el cache, o `compute()` calculado una sola vez
+    
+    Las peticiones concurrentes por la misma clave comparten el cálculo y
+    las entradas vigentes se refrescan antes de vencer (ver arriba).
+    `compute` puede retornar None (se cachea igual: sirve para "no existe").
+    Si `compute` lanza una excepción, les llega a todos los que esperaban.
+    """
+    entry, _ = _read(key)
+    if entry is not None and not _should_refresh(entry, beta):
+        return entry['value']
+    
+    with _flights_lock:
+        flight = _flights.get(key)
+        leader = flight is None
+        if leader:
+            flight = _flights[key] = _Flight()
+    
+    if not leader:
+        flight.done.wait()
+        if flight.error is not None:
+            raise flight.error
+        return flight.value
+    
+    try:
+        flight.value = _load(key, compute, timeout, beta)
+        return flight.value
+    except Exception as exc:
+        flight.error = exc
+        raise
+    finally:
+        with _flights_lock:
+            del _flights[key]
+        flight.done.set()
+
+
+def invalidate(*keys):
+    """
+    Borra las claves del cache y cambia su generación
+    
+    No espera a los cálculos en curso: lo que guarden después queda con la
+    generación anterior y se ignora. La generación no vence (una clave
+    chica por entrada invalidada alguna vez).
+    """
+    if keys:
+        cache.set_many({_generation_key(key): uuid.uuid4().hex for key in keys}, None)
+        cache.delete_many(list(keys))
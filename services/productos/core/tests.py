@@ -1,3 +1,43 @@
+# ========================================
+# TESTS - SERVICIO PRODUCTOS
+# ========================================
+
+import io
+import json
+import os
+import tempfile
+import threading
+import time
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import IntegrityError
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from . import singleflight
+from .bulk import apply_discount, change_price, update_in_batches
+from .catalog_io import export_products, import_products
+from .categories import facets, get_category_tree
+from .home import get_home_snapshot
+from .inventory import (
+    STOCK_SHARDS, InsufficientStock, available_stock, rebalance, release, reserve,
+    reserve_items, reset_stock, sync_stock,
+)
+from .events import CONSUMER_NAME, HANDLERS, consume_batch
+from .models import (
+    Category, ConsumerOffset, CoPurchase, DeadLetterEvent, PriceList, PriceRule, ProcessedEvent,
+    Product, RelatedProduct, Review, StockShard,
+)
+from .pricing import run_price_lists
+from .related import refresh_related
+from .reviews import reconcile_ratings
+
+
 class CategoryModelTestCase(TestCase):
     def setUp(self):
         self.category_data = {
@@ -8,4 +48,656 @@ class CategoryModelTestCase(TestCase):
     
     def test_create_category(self):
         category = Category.objects.create(**self.category_data)
-        self.assertEqual(category.name, self.category_data['name'])
\ No newline at end of file
+        self.assertEqual(category.name, self.category_data['name'])
+
+
+class OrderEventsConsumerTestCase(TestCase):
+    """Tests para el consumidor de eventos de pedidos"""
+    
+    def setUp(self):
+        category = Category.objects.create(name='Electrónica', slug='electronica')
+        self.product = Product.objects.create(
+            name='iPhone 15', slug='iphone-15', category=category,
+            price=1000, stock=10, sku='IPH-15',
+        )
+        
+        fd, self.path = tempfile.mkstemp(suffix='.ndjson')
+        os.close(fd)
+        self.addCleanup(os.remove, self.path)
+    
+    def publish(self, *messages):
+        with open(self.path, 'a') as f:
+            for message in messages:
+                f.write(json.dumps(message) + '\n')
+    
+    def event(self, event_id, event_type):
+        return {
+            'id': event_id,
+            'type': event_type,
+            'aggregate_id': 1,
+            'payload': {'items': [{'product_id': self.product.id, 'quantity': 3}]},
+        }
+    
+    def test_created_and_cancelled_move_stock(self):
+        """Probar que crear descuenta y cancelar libera el stock"""
+        self.publish(self.event(1, 'order.created'))
+        consume_batch(self.path)
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.stock, 7)
+        
+        self.publish(self.event(2, 'order.cancelled'))
+        consume_batch(self.path)
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.stock, 10)
+    
+    def test_duplicated_event_applied_once(self):
+        """Probar que un evento entregado dos veces se aplica una sola vez"""
+        self.publish(self.event(1, 'order.created'), self.event(1, 'order.created'))
+        self.assertEqual(consume_batch(self.path), 2)
+        
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.stock, 7)
+    
+    def test_handler_failure_is_retried(self):
+        """Probar que un error del handler no marca el evento ni avanza la posición"""
+        self.publish(self.event(1, 'order.created'))
+        
+        def broken(payload):
+            raise IntegrityError('conflicto en el handler')
+        
+        with mock.patch.dict(HANDLERS, {'order.created': broken}):
+            self.assertEqual(consume_batch(self.path), 0)
+        
+        self.assertFalse(ProcessedEvent.objects.exists())
+        self.assertEqual(ConsumerOffset.objects.get(name=CONSUMER_NAME).position, 0)
+        self.assertEqual(DeadLetterEvent.objects.get().attempts, 1)
+        
+        self.assertEqual(consume_batch(self.path), 1)
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.stock, 7)
+    
+    def test_poison_message_is_skipped_after_max_attempts(self):
+        """Probar que una línea inválida no bloquea los eventos siguientes"""
+        with open(self.path, 'a') as f:
+            f.write('{"id": 1, "type": "order.cr\n')
+        self.publish(self.event(2, 'order.created'))
+        
+        with mock.patch('core.events.MAX_ATTEMPTS', 3):
+            for _ in range(2):
+                self.assertEqual(consume_batch(self.path), 0)
+            self.product.refresh_from_db()
+            self.assertEqual(self.product.stock, 10)
+            
+            self.assertEqual(consume_batch(self.path), 2)
+        
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.stock, 7)
+        
+        dead = DeadLetterEvent.objects.get()
+        self.assertEqual((dead.position, dead.attempts, dead.skipped), (0, 3, True))
+        self.assertIn('JSONDecodeError', dead.error)
+        self.assertEqual(ConsumerOffset.objects.get(name=CONSUMER_NAME).position,
+                         os.path.getsize(self.path))
+
+
+class BulkPricingTestCase(TestCase):
+    """Tests para los cambios masivos de precio"""
+    
+    def setUp(self):
+        category = Category.objects.create(name='Electrónica', slug='electronica')
+        for i in range(5):
+            Product.objects.create(
+                name=f'Producto {i}', slug=f'producto-{i}', category=category,
+                price=100, sku=f'SKU-{i}',
+            )
+    
+    def test_change_price_in_batches(self):
+        """Probar que el precio cambia en todos los lotes, con progreso"""
+        calls = []
+        updated = change_price(
+            Product.objects.all(), 10, batch_size=2,
+            progress=lambda done, last_id: calls.append(done),
+        )
+        
+        self.assertEqual(updated, 5)
+        self.assertEqual(calls, [2, 4, 5])
+        self.assertEqual(set(Product.objects.values_list('price', flat=True)), {Decimal('110.00')})
+    
+    def test_apply_and_remove_discount(self):
+        """Probar que el descuento se calcula sobre el precio y 0 lo quita"""
+        apply_discount(Product.objects.filter(sku='SKU-0'), Decimal('15'))
+        product = Product.objects.get(sku='SKU-0')
+        self.assertEqual(product.discount_price, Decimal('85.00'))
+        self.assertEqual(product.discount_percentage, 15)
+        
+        apply_discount(Product.objects.filter(sku='SKU-0'), 0)
+        product.refresh_from_db()
+        self.assertIsNone(product.discount_price)
+
+
+class CatalogImportExportTestCase(TestCase):
+    """Tests para la importación/exportación masiva del catálogo"""
+    
+    CSV = (
+        'sku,name,category,price,discount_price,stock\n'
+        'SKU-1,Producto 1,electronica,100,,5\n'
+        'SKU-2,Producto 2,no-existe,100,,5\n'
+        'SKU-3,Producto 3,electronica,abc,,5\n'
+        'SKU-4,Producto 4,electronica,50,60,5\n'
+        'SKU-5,Producto 5,electronica,80,70,0\n'
+    )
+    
+    def setUp(self):
+        Category.objects.create(name='Electrónica', slug='electronica')
+    
+    def test_import_reports_errors_without_aborting(self):
+        """Probar que las filas inválidas se reportan y las válidas se guardan"""
+        result = import_products(io.StringIO(self.CSV), 'csv', batch_size=2)
+        
+        self.assertEqual((result.created, result.updated, result.failed), (2, 0, 3))
+        self.assertEqual([line for line, _, _ in result.errors], [3, 4, 5])
+        self.assertEqual(
+            sorted(Product.objects.values_list('sku', flat=True)), ['SKU-1', 'SKU-5']
+        )
+    
+    def test_import_upserts_by_sku(self):
+        """Probar que una segunda importación actualiza por sku sin duplicar"""
+        import_products(io.StringIO(self.CSV), 'csv')
+        
+        ndjson = json.dumps({'sku': 'SKU-1', 'name': 'Nuevo nombre', 'category': 'electronica',
+                             'price': '120.50', 'stock': 9}) + '\n'
+        result = import_products(io.StringIO(ndjson), 'ndjson')
+        
+        self.assertEqual((result.created, result.updated), (0, 1))
+        product = Product.objects.get(sku='SKU-1')
+        self.assertEqual(product.name, 'Nuevo nombre')
+        self.assertEqual(product.price, Decimal('120.50'))
+        self.assertEqual(Product.objects.count(), 2)
+    
+    def test_export_roundtrip(self):
+        """Probar que lo exportado se puede volver a importar tal cual"""
+        import_products(io.StringIO(self.CSV), 'csv')
+        exported = ''.join(export_products(fmt='csv', chunk_rows=1))
+        
+        self.assertEqual(exported.splitlines()[0].split(',')[0], 'sku')
+        result = import_products(io.StringIO(exported), 'csv')
+        self.assertEqual((result.created, result.updated, result.failed), (0, 2, 0))
+
+
+class ReviewRatingTestCase(TestCase):
+    """Tests para el rating incremental de productos"""
+    
+    def setUp(self):
+        category = Category.objects.create(name='Electrónica', slug='electronica')
+        self.product = Product.objects.create(
+            name='iPhone 15', slug='iphone-15', category=category, price=1000, sku='IPH-15',
+        )
+    
+    def assertRating(self, rating, count):
+        self.product.refresh_from_db()
+        self.assertEqual((self.product.rating, self.product.review_count), (Decimal(rating), count))
+    
+    def test_rating_follows_insert_update_delete(self):
+        """Probar que crear, editar y borrar reseñas ajusta el rating"""
+        first = Review.objects.create(product=self.product, user_id=1, rating=5)
+        Review.objects.create(product=self.product, user_id=2, rating=4)
+        self.assertRating('4.50', 2)
+        
+        first.rating = 1
+        first.save()
+        self.assertRating('2.50', 2)
+        
+        first.delete()
+        self.assertRating('4.00', 1)
+        
+        Review.objects.get(user_id=2).delete()
+        self.assertRating('0.00', 0)
+    
+    def test_reconcile_fixes_drift(self):
+        """Probar que la conciliación corrige lo que no pasó por save()/delete()"""
+        Review.objects.create(product=self.product, user_id=1, rating=5)
+        Review.objects.create(product=self.product, user_id=2, rating=2)
+        Review.objects.filter(user_id=2).delete()          # Sin ajustar el rating
+        self.assertRating('3.50', 2)
+        
+        self.assertEqual(reconcile_ratings(), 1)
+        self.assertRating('5.00', 1)
+        self.assertEqual(reconcile_ratings(), 0)
+
+
+class RelatedProductsTestCase(TestCase):
+    """Tests para los productos relacionados precalculados"""
+    
+    def setUp(self):
+        self.phones = Category.objects.create(name='Celulares', slug='celulares')
+        self.cases = Category.objects.create(name='Accesorios', slug='accesorios')
+        self.phone = self.product('phone', self.phones)
+        self.other_phone = self.product('other-phone', self.phones)
+        self.case = self.product('case', self.cases)
+        self.charger = self.product('charger', self.cases)
+        
+        fd, self.path = tempfile.mkstemp(suffix='.ndjson')
+        os.close(fd)
+        self.addCleanup(os.remove, self.path)
+    
+    def product(self, slug, category):
+        return Product.objects.create(
+            name=slug, slug=slug, category=category, price=10, stock=100, sku=slug,
+        )
+    
+    def order(self, event_id, *products):
+        with open(self.path, 'a') as f:
+            f.write(json.dumps({
+                'id': event_id,
+                'type': 'order.created',
+                'aggregate_id': event_id,
+                'payload': {'items': [{'product_id': p.id, 'quantity': 1} for p in products]},
+            }) + '\n')
+        consume_batch(self.path)
+    
+    def related_ids(self, product):
+        return list(
+            RelatedProduct.objects.filter(product=product).values_list('related_id', flat=True)
+        )
+    
+    def test_copurchases_rank_first_and_category_fills(self):
+        """Probar que lo comprado junto va primero y se completa con la categoría"""
+        self.order(1, self.phone, self.case, self.charger)
+        self.order(2, self.phone, self.charger)
+        self.order(2, self.phone, self.charger)          # Duplicado: no cuenta
+        
+        self.assertEqual(CoPurchase.objects.get(product=self.phone, other=self.charger).count, 2)
+        
+        refresh_related()
+        self.assertEqual(
+            self.related_ids(self.phone), [self.charger.id, self.case.id, self.other_phone.id]
+        )
+    
+    def test_incremental_refresh_only_touches_changed_products(self):
+        """Probar que la ejecución incremental recalcula solo lo que cambió"""
+        self.assertEqual(refresh_related(), 4)
+        self.assertEqual(refresh_related(), 0)
+        
+        self.order(1, self.phone, self.case)
+        self.assertEqual(refresh_related(), 2)
+        self.assertEqual(self.related_ids(self.case)[0], self.phone.id)
+
+
+class HomeSnapshotTestCase(TestCase):
+    """Tests para el snapshot de la portada"""
+    
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.category = Category.objects.create(name='Electrónica', slug='electronica')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.product = Product.objects.create(
+                name='iPhone 15', slug='iphone-15', category=self.category,
+                price=1000, sku='IPH-15', is_featured=True,
+            )
+    
+    def test_home_is_served_from_the_snapshot(self):
+        """Probar que la portada sale del cache sin tocar la base de datos"""
+        get_home_snapshot()
+        
+        with self.assertNumQueries(0):
+            response = self.client.get('/api/products/home/')
+        
+        data = response.json()
+        self.assertEqual([p['name'] for p in data['featured']], ['iPhone 15'])
+        self.assertEqual(data['categories'][0]['product_count'], 1)
+    
+    def test_catalog_changes_rebuild_the_snapshot(self):
+        """Probar que un cambio confirmado reconstruye la portada"""
+        with self.captureOnCommitCallbacks(execute=True):
+            self.product.is_featured = False
+            self.product.save()
+        
+        self.assertEqual(get_home_snapshot()['data']['featured'], [])
+        
+        with self.captureOnCommitCallbacks(execute=True):
+            change_price(Product.objects.all(), 10)
+        
+        self.assertEqual(get_home_snapshot()['data']['newest'][0]['price'], '1100.00')
+
+
+class CategoryTreeTestCase(TestCase):
+    """Tests para el árbol de categorías, sus conteos y las facetas"""
+    
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.tech = Category.objects.create(name='Tecnología', slug='tecnologia')
+        self.phones = Category.objects.create(name='Celulares', slug='celulares', parent=self.tech)
+        self.cases = Category.objects.create(name='Fundas', slug='fundas', parent=self.phones)
+    
+    def product(self, sku, category, price, **extra):
+        with self.captureOnCommitCallbacks(execute=True):
+            return Product.objects.create(
+                name=sku, slug=sku, sku=sku, category=category, price=price, **extra
+            )
+    
+    def test_paths_follow_moves(self):
+        """Probar que mover una categoría actualiza todo su subárbol"""
+        self.assertEqual(self.cases.path, f'/{self.tech.id}/{self.phones.id}/{self.cases.id}/')
+        
+        self.phones.parent = None
+        self.phones.save()
+        
+        self.cases.refresh_from_db()
+        self.assertEqual(self.cases.path, f'/{self.phones.id}/{self.cases.id}/')
+        self.assertEqual(self.cases.depth, 1)
+        self.assertEqual(list(self.tech.get_descendants()), [self.tech])
+    
+    def test_counts_follow_product_writes(self):
+        """Probar que los conteos se mantienen al crear, mover y desactivar"""
+        phone = self.product('phone', self.phones, 1000)
+        self.product('case', self.cases, 20)
+        
+        tree = get_category_tree()
+        self.assertEqual(tree[self.tech.id]['tree_count'], 2)
+        self.assertEqual(tree[self.phones.id]['product_count'], 1)
+        
+        with self.captureOnCommitCallbacks(execute=True):
+            phone.category = self.cases
+            phone.save()
+        with self.captureOnCommitCallbacks(execute=True):
+            update_in_batches(Product.objects.filter(sku='case'), is_active=False)
+        
+        self.assertEqual(
+            dict(Category.objects.values_list('slug', 'product_count')),
+            {'tecnologia': 0, 'celulares': 0, 'fundas': 1},
+        )
+    
+    def test_facets_in_one_query(self):
+        """Probar que las facetas salen de un solo query y respetan los filtros"""
+        self.product('phone', self.phones, 1000, stock=3)
+        self.product('case', self.cases, 20, discount_price=15)
+        self.product('other', self.tech, 60)
+        get_category_tree()
+        
+        with self.assertNumQueries(1):
+            result = facets(Product.objects.filter(category__path__startswith=self.phones.path))
+        
+        self.assertEqual(result['total'], 2)
+        self.assertEqual({c['slug']: c['count'] for c in result['categories']}, {'celulares': 1, 'fundas': 1})
+        self.assertEqual([b['count'] for b in result['price']], [1, 0, 0, 0, 0, 1])
+        self.assertEqual(result['discount'], {'with_discount': 1, 'without_discount': 1})
+        self.assertEqual(result['availability'], {'in_stock': 1, 'out_of_stock': 1})
+        
+        response = self.client.get('/api/products/facets/', {'category_tree': 'celulares', 'max_price': 100})
+        self.assertEqual(response.json()['total'], 1)
+
+
+class ProductDetailCacheTestCase(TestCase):
+    """Tests para el detalle cacheado y el single-flight"""
+    
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.category = Category.objects.create(name='Electrónica', slug='electronica')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.product = Product.objects.create(
+                name='iPhone 15', slug='iphone-15', category=self.category, price=1000, sku='IPH-15',
+            )
+    
+    def test_detail_is_served_from_the_cache(self):
+        """Probar que el segundo pedido del detalle no toca la base de datos"""
+        url = f'/api/products/{self.product.id}/'
+        self.assertEqual(self.client.get(url).json()['category_name'], 'Electrónica')
+        
+        with self.assertNumQueries(0):
+            response = self.client.get(url)
+        self.assertEqual(response.json()['name'], 'iPhone 15')
+        
+        with self.captureOnCommitCallbacks(execute=True):
+            self.product.name = 'iPhone 15 Pro'
+            self.product.save()
+        self.assertEqual(self.client.get(url).json()['name'], 'iPhone 15 Pro')
+        
+        with self.captureOnCommitCallbacks(execute=True):
+            change_price(Product.objects.all(), 10)
+        self.assertEqual(self.client.get(url).json()['price'], '1100.00')
+    
+    def test_missing_and_inactive_products_are_404(self):
+        """Probar que inactivos e inexistentes responden 404 (también desde el cache)"""
+        with self.captureOnCommitCallbacks(execute=True):
+            self.product.is_active = False
+            self.product.save()
+        
+        url = f'/api/products/{self.product.id}/'
+        self.assertEqual(self.client.get(url).status_code, 404)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get(url).status_code, 404)
+        self.assertEqual(self.client.get('/api/products/abc/').status_code, 404)
+    
+    def test_concurrent_misses_share_one_computation(self):
+        """Probar que los hilos que fallan la misma clave calculan una sola vez"""
+        calls = []
+        started = threading.Event()
+        
+        def compute():
+            calls.append(1)
+            started.set()
+            time.sleep(0.2)
+            return {'id': 1}
+        
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(singleflight.cached('test:sf', compute, 60)))
+            for _ in range(10)
+        ]
+        threads[0].start()
+        started.wait(1)
+        for thread in threads[1:]:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, [{'id': 1}] * 10)
+    
+    def test_invalidation_during_compute_discards_the_result(self):
+        """Probar que lo calculado antes de una invalidación no se sirve después"""
+        def stale():
+            singleflight.invalidate('test:gen')     # El commit llega mientras se calcula
+            return 'old'
+        
+        self.assertEqual(singleflight.cached('test:gen', stale, 60), 'old')
+        self.assertEqual(singleflight.cached('test:gen', lambda: 'new', 60), 'new')
+        self.assertEqual(singleflight.cached('test:gen', lambda: 'newer', 60), 'new')
+    
+    def test_early_refresh(self):
+        """Probar el refresco anticipado: una sola lectura recalcula, las demás sirven la copia"""
+        now = time.time()
+        fresh = {'value': 'old', 'delta': 0.01, 'expiry': now + 60}
+        expired = {'value': 'old', 'delta': 0.01, 'expiry': now - 1}
+        self.assertFalse(singleflight._should_refresh(fresh, 1.0))
+        self.assertTrue(singleflight._should_refresh(expired, 1.0))
+        
+        # Otro proceso ya está refrescando: se sirve la copia sin calcular
+        cache.set('test:early', expired, 60)
+        cache.add('test:early:lock', 1, 10)
+        self.assertEqual(singleflight.cached('test:early', lambda: 'new', 60), 'old')
+        
+        cache.delete('test:early:lock')
+        self.assertEqual(singleflight.cached('test:early', lambda: 'new', 60), 'new')
+        self.assertEqual(cache.get('test:early')['value'], 'new')
+        self.assertIsNone(cache.get('test:early:lock'))
+
+
+class InventoryTestCase(TestCase):
+    """Tests para el stock en porciones"""
+    
+    def setUp(self):
+        category = Category.objects.create(name='Electrónica', slug='electronica')
+        self.product = Product.objects.create(
+            name='iPhone 15', slug='iphone-15', category=category,
+            price=1000, stock=10, sku='IPH-15',
+        )
+    
+    def test_reserve_and_release_never_go_negative(self):
+        """Probar que las reservas salen de las porciones y no dejan stock negativo"""
+        self.assertEqual(reserve(self.product.id, 3), 3)
+        self.assertEqual(StockShard.objects.filter(product=self.product).count(), STOCK_SHARDS)
+        self.assertEqual(available_stock([self.product.id]), {self.product.id: 7})
+        
+        # Ninguna porción tiene 6 unidades sola: se descuenta de varias
+        self.assertEqual(reserve(self.product.id, 6), 6)
+        with self.assertRaises(InsufficientStock):
+            reserve(self.product.id, 2)
+        self.assertEqual(reserve(self.product.id, 5, partial=True), 1)
+        self.assertEqual(available_stock([self.product.id]), {self.product.id: 0})
+        self.assertFalse(StockShard.objects.filter(quantity__lt=0).exists())
+        
+        release(self.product.id, 4)
+        self.assertEqual(available_stock([self.product.id]), {self.product.id: 4})
+    
+    def test_api_stock_edit_survives_sync(self):
+        """Probar que un stock enviado por la API reemplaza las porciones"""
+        reserve(self.product.id, 4)
+        sync_stock()
+        
+        api = APIClient()
+        api.force_authenticate(User(username='admin', is_staff=True))
+        response = api.patch(f'/api/products/{self.product.id}/', {'stock': 50}, format='json')
+        self.assertEqual(response.status_code, 200)
+        
+        sync_stock()
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.stock, 50)
+        self.assertEqual(reserve(self.product.id, 5), 5)
+        sync_stock()
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.stock, 45)
+    
+    def test_sync_keeps_stock_when_shards_vanish(self):
+        """Probar que un reset_stock entre el filtro y el UPDATE no deja stock NULL"""
+        reserve(self.product.id, 4)
+        original = update_in_batches
+        
+        def reset(ids):
+            Product.objects.filter(id=self.product.id).update(stock=50)
+            reset_stock([self.product.id])
+        
+        def reset_then_update(queryset, **kwargs):
+            return original(queryset, before_update=reset, **kwargs)
+        
+        with mock.patch('core.inventory.update_in_batches', reset_then_update):
+            sync_stock()
+        
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.stock, 50)
+    
+    def test_reserve_items_is_all_or_nothing(self):
+        """Probar que si un item no alcanza no se reserva ninguno"""
+        other = Product.objects.create(
+            name='Funda', slug='funda', category=self.product.category, price=20, stock=1, sku='FUN-1',
+        )
+        with self.assertRaises(InsufficientStock):
+            reserve_items([
+                {'product_id': self.product.id, 'quantity': 2},
+                {'product_id': other.id, 'quantity': 2},
+            ])
+        self.assertEqual(available_stock([self.product.id, other.id]), {self.product.id: 10, other.id: 1})
+    
+    def test_sync_reset_and_rebalance(self):
+        """Probar la sincronización de Product.stock, el stock absoluto y el rebalanceo"""
+        reserve(self.product.id, 9)
+        self.assertEqual(sync_stock(), 1)
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.stock, 1)
+        self.assertEqual(sync_stock(), 0)
+        
+        Product.objects.filter(id=self.product.id).update(stock=40)
+        reset_stock([self.product.id])
+        reserve(self.product.id, 4)
+        StockShard.objects.filter(product=self.product, shard=0).update(quantity=0)
+        self.assertEqual(rebalance(), 1)
+        quantities = set(StockShard.objects.filter(product=self.product).values_list('quantity', flat=True))
+        self.assertLessEqual(max(quantities) - min(quantities), 1)
+        
+        total = available_stock([self.product.id])[self.product.id]
+        response = self.client.get(f'/api/products/{self.product.id}/stock/')
+        self.assertEqual(response.json(), {'product_id': self.product.id, 'stock': total, 'is_available': True})
+
+
+class PriceListTestCase(TestCase):
+    """Tests para las listas de precios programadas"""
+    
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.now = timezone.now()
+        self.tech = Category.objects.create(name='Tecnología', slug='tecnologia')
+        self.phones = Category.objects.create(name='Celulares', slug='celulares', parent=self.tech)
+        self.phone = Product.objects.create(
+            name='iPhone 15', slug='iphone-15', category=self.phones, price=1000, sku='IPH-15',
+        )
+        self.case = Product.objects.create(
+            name='Funda', slug='funda', category=self.tech, price=20, discount_price=18, sku='FUN-1',
+        )
+    
+    def price_list(self, name, start, end=None, priority=0, **rule):
+        price_list = PriceList.objects.create(
+            name=name, starts_at=self.now + timedelta(hours=start),
+            ends_at=self.now + timedelta(hours=end) if end is not None else None, priority=priority,
+        )
+        PriceRule.objects.create(price_list=price_list, **rule)
+        return price_list
+    
+    def prices(self):
+        return {
+            product.sku: (product.final_price, product.has_discount, product.price_list_id)
+            for product in Product.objects.all()
+        }
+    
+    def test_lists_apply_and_revert_on_schedule(self):
+        """Probar que una lista se aplica al empezar y devuelve los precios al terminar"""
+        sale = self.price_list('Cyber', start=1, end=3, category=self.tech, discount_percentage=10)
+        PriceRule.objects.create(price_list=sale, product=self.phone, discount_price=800)
+        
+        self.assertEqual(run_price_lists(self.now), {'reverted': 0, 'applied': 0})
+        
+        url = f'/api/products/{self.phone.id}/'
+        self.assertEqual(self.client.get(url).json()['final_price'], '1000.00')
+        
+        with self.captureOnCommitCallbacks(execute=True):
+            result = run_price_lists(self.now + timedelta(hours=2), batch_size=1)
+        self.assertEqual(result, {'reverted': 0, 'applied': 2})
+        self.assertEqual(self.prices(), {
+            'IPH-15': (Decimal('800.00'), True, sale.id),     # La regla del producto gana
+            'FUN-1': (Decimal('18.00'), True, sale.id),
+        })
+        self.assertEqual(self.client.get(url).json()['final_price'], '800.00')
+        
+        # Repetir la pasada no vuelve a escribir
+        self.assertEqual(run_price_lists(self.now + timedelta(hours=2)), {'reverted': 0, 'applied': 0})
+        
+        with self.captureOnCommitCallbacks(execute=True):
+            result = run_price_lists(self.now + timedelta(hours=4))
+        self.assertEqual(result, {'reverted': 2, 'applied': 0})
+        self.assertEqual(self.prices(), {
+            'IPH-15': (Decimal('1000.00'), False, None),
+            'FUN-1': (Decimal('18.00'), True, None),
+        })
+        self.assertEqual(self.client.get(url).json()['final_price'], '1000.00')
+    
+    def test_higher_priority_wins_and_hands_back(self):
+        """Probar que la lista de mayor prioridad toma el producto y al terminar lo devuelve"""
+        base = self.price_list('Temporada', start=0, category=self.tech, discount_percentage=10)
+        flash = self.price_list('Flash', start=1, end=2, priority=5, product=self.phone, discount_percentage=50)
+        
+        run_price_lists(self.now + timedelta(minutes=1))
+        self.assertEqual(self.prices()['IPH-15'], (Decimal('900.00'), True, base.id))
+        
+        run_price_lists(self.now + timedelta(hours=1, minutes=1))
+        self.assertEqual(self.prices()['IPH-15'], (Decimal('500.00'), True, flash.id))
+        
+        run_price_lists(self.now + timedelta(hours=3))
+        self.assertEqual(self.prices()['IPH-15'], (Decimal('900.00'), True, base.id))
+        
+        base.ends_at = self.now + timedelta(hours=4)
+        base.save()
+        run_price_lists(self.now + timedelta(hours=5))
+        self.assertEqual(self.prices()['IPH-15'], (Decimal('1000.00'), False, None))
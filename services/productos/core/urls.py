@@ -6,11 +6,20 @@ from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from .views import CategoryViewSet, ProductViewSet
 
-# Crear router y registrar viewsets
-router = DefaultRouter()
-router.register(r'', CategoryViewSet, basename='category')
-router.register(r'', ProductViewSet, basename='product')
+# Un router por prefijo: con los dos en el mismo router, el detalle de
+# categorías (/{id}/) capturaba también /api/products/featured/, etc.
+category_router = DefaultRouter()
+category_router.register(r'', CategoryViewSet, basename='category')
 
+product_router = DefaultRouter()
+product_router.register(r'', ProductViewSet, basename='product')
+
+# /api/products/
 urlpatterns = [
-    path('', include(router.urls)),
-]
\ No newline at end of file
+    path('', include(product_router.urls)),
+]
+
+# /api/categories/
+category_urlpatterns = [
+    path('', include(category_router.urls)),
+]
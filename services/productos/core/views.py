@@ -2,17 +2,29 @@
 # VIEWS - SERVICIO PRODUCTOS
 # ========================================
 
+import io
+
 from rest_framework import viewsets, status, permissions
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.views import APIView
+from rest_framework.parsers import MultiPartParser
 from rest_framework.filters import SearchFilter, OrderingFilter
 from django_filters.rest_framework import DjangoFilterBackend
+from django.http import Http404, HttpResponse, StreamingHttpResponse
 from django.shortcuts import get_object_or_404
 
-from .models import Category, Product
+from .catalog_io import export_filename, export_products, import_products
+from .categories import facets, nested_tree
+from .filters import ProductFilter
+from .home import get_home_snapshot
+from .inventory import available_stock
+from .models import Category, Product, RelatedProduct, Review
+from .product_cache import get_product_detail
+from .related import RELATED_SIZE
 from .serializers import (
     CategorySerializer,
+    ReviewSerializer,
     ProductListSerializer,
     ProductDetailSerializer,
     ProductCreateUpdateSerializer,
@@ -25,6 +37,7 @@ class CategoryViewSet(viewsets.ModelViewSet):
     GET    /api/categories/           - Listar categorías
     POST   /api/categories/           - Crear categoría (admin)
     GET    /api/categories/{id}/      - Detalle de categoría
+    GET    /api/categories/tree/      - Árbol con conteos
     PUT    /api/categories/{id}/      - Actualizar categoría (admin)
     DELETE /api/categories/{id}/      - Eliminar categoría (admin)
     """
@@ -33,6 +46,14 @@ class CategoryViewSet(viewsets.ModelViewSet):
     serializer_class = CategorySerializer
     lookup_field = 'id'
     
+    @action(detail=False, methods=['get'])
+    def tree(self, request):
+        """
+        Árbol de categorías con conteos (propios y del subárbol)
+        GET /api/categories/tree/
+        """
+        return Response(nested_tree())
+    
     def get_permissions(self):
         """Permisos por acción"""
         if self.action in ['create', 'update', 'partial_update', 'destroy']:
@@ -47,18 +68,26 @@ class ProductViewSet(viewsets.ModelViewSet):
     ViewSet para Productos
     GET    /api/products/             - Listar productos
     POST   /api/products/             - Crear producto (admin)
-    GET    /api/products/{id}/        - Detalle de producto
+    GET    /api/products/{id}/        - Detalle de producto (cacheado)
     PUT    /api/products/{id}/        - Actualizar producto (admin)
     DELETE /api/products/{id}/        - Eliminar producto (admin)
     GET    /api/products/featured/    - Productos destacados
+    GET    /api/products/home/        - Portada precalculada
+    GET    /api/products/facets/      - Facetas de la búsqueda actual
+    POST   /api/products/import/      - Importación masiva CSV/NDJSON (admin)
+    GET    /api/products/export/      - Exportación masiva CSV/NDJSON (admin)
+    GET    /api/products/{id}/stock/  - Stock exacto del producto
+    GET    /api/products/{id}/reviews/ - Reseñas del producto
+    POST   /api/products/{id}/reviews/ - Crear/actualizar mi reseña (autenticado)
+    DELETE /api/products/{id}/reviews/ - Borrar mi reseña (autenticado)
     """
     
     queryset = Product.objects.filter(is_active=True)
     lookup_field = 'id'
     filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter]
-    filterset_fields = ['category', 'is_featured']
+    filterset_class = ProductFilter
     search_fields = ['name', 'description', 'sku']
-    ordering_fields = ['price', 'created_at', 'rating']
+    ordering_fields = ['price', 'created_at', 'rating', 'review_count']
     ordering = ['-created_at']
     
     def get_serializer_class(self):
@@ -72,21 +101,167 @@ class ProductViewSet(viewsets.ModelViewSet):
     
     def get_permissions(self):
         """Permisos por acción"""
-        if self.action in ['create', 'update', 'partial_update', 'destroy']:
+        if self.action in ['create', 'update', 'partial_update', 'destroy',
+                           'import_catalog', 'export_catalog']:
             permission_classes = [permissions.IsAdminUser]
+        elif self.action == 'reviews' and self.request.method != 'GET':
+            permission_classes = [permissions.IsAuthenticated]
         else:
             permission_classes = [permissions.AllowAny]
         return [permission() for permission in permission_classes]
     
+    def retrieve(self, request, id=None):
+        """
+        Detalle desde el cache (ver core/product_cache.py)
+        
+        Las peticiones simultáneas por el mismo producto comparten una sola
+        consulta y serialización.
+        """
+        if not str(id).isdigit():
+            raise Http404
+        
+        data = get_product_detail(int(id), self.get_queryset())
+        if data is None:
+            raise Http404
+        return Response(data)
+    
+    @action(detail=True, methods=['get'], permission_classes=[permissions.AllowAny])
+    def stock(self, request, id=None):
+        """
+        Stock exacto del producto (suma de sus porciones, ver core/inventory.py)
+        GET /api/products/{id}/stock/
+        
+        El 'stock' del detalle y los listados se sincroniza cada pocos
+        segundos; este es el que usan las reservas. Se lee del primario.
+        """
+        if not str(id).isdigit():
+            raise Http404
+        
+        if not Product.objects.filter(id=id, is_active=True).exists():
+            raise Http404
+        stock = available_stock([id])[int(id)]
+        return Response({'product_id': int(id), 'stock': stock, 'is_available': stock > 0})
+    
+    @action(detail=True, methods=['get', 'post', 'delete'])
+    def reviews(self, request, id=None):
+        """
+        Reseñas del producto
+        GET    /api/products/{id}/reviews/
+        POST   /api/products/{id}/reviews/  {"rating": 1-5, "title", "comment"}
+        DELETE /api/products/{id}/reviews/
+        
+        Cada usuario tiene una reseña por producto: POST la crea o la
+        actualiza. El rating del producto se ajusta en la misma transacción.
+        """
+        product = self.get_object()
+        
+        if request.method == 'GET':
+            queryset = product.reviews.all()
+            page = self.paginate_queryset(queryset)
+            if page is not None:
+                return self.get_paginated_response(ReviewSerializer(page, many=True).data)
+            return Response(ReviewSerializer(queryset, many=True).data)
+        
+        review = Review.objects.filter(product=product, user_id=request.user.id).first()
+        
+        if request.method == 'DELETE':
+            if review is None:
+                return Response(
+                    {'error': 'No tienes una reseña para este producto'},
+                    status=status.HTTP_404_NOT_FOUND
+                )
+            review.delete()
+            return Response(status=status.HTTP_204_NO_CONTENT)
+        
+        serializer = ReviewSerializer(review, data=request.data)
+        serializer.is_valid(raise_exception=True)
+        serializer.save(product=product, user_id=request.user.id)
+        return Response(
+            serializer.data,
+            status=status.HTTP_200_OK if review else status.HTTP_201_CREATED
+        )
+    
+    @action(detail=False, methods=['post'], url_path='import', parser_classes=[MultiPartParser])
+    def import_catalog(self, request):
+        """
+        Importación masiva con upsert por sku
+        POST /api/products/import/  (multipart: file, file_format=csv|ndjson)
+        
+        Las filas inválidas se reportan en 'errors' sin abortar el resto.
+        Para feeds muy grandes usar: manage.py import_products
+        """
+        upload = request.FILES.get('file')
+        if upload is None:
+            return Response(
+                {'error': 'file es requerido'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        fmt = request.data.get('file_format') or (
+            'ndjson' if upload.name.endswith(('.ndjson', '.jsonl')) else 'csv'
+        )
+        if fmt not in ('csv', 'ndjson'):
+            return Response(
+                {'error': 'file_format debe ser csv o ndjson'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        # Se lee el archivo en streaming, sin cargarlo completo
+        stream = io.TextIOWrapper(upload.file, encoding='utf-8-sig', newline='')
+        result = import_products(stream, fmt)
+        return Response(result.as_dict())
+    
+    @action(detail=False, methods=['get'], url_path='export')
+    def export_catalog(self, request):
+        """
+        Exportación masiva en streaming
+        GET /api/products/export/?file_format=csv|ndjson
+        """
+        fmt = request.query_params.get('file_format', 'csv')
+        if fmt not in ('csv', 'ndjson'):
+            return Response(
+                {'error': 'file_format debe ser csv o ndjson'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        content_type = 'text/csv' if fmt == 'csv' else 'application/x-ndjson'
+        response = StreamingHttpResponse(
+            export_products(Product.objects.all(), fmt),
+            content_type=f'{content_type}; charset=utf-8',
+        )
+        response['Content-Disposition'] = f'attachment; filename="{export_filename(fmt)}"'
+        return response
+    
+    @action(detail=False, methods=['get'], permission_classes=[permissions.AllowAny])
+    def facets(self, request):
+        """
+        Facetas para la búsqueda/filtros actuales
+        GET /api/products/facets/?search=...&category_tree=...&min_price=...
+        
+        Conteos por categoría, rango de precio, descuento y disponibilidad,
+        con los mismos filtros que el listado, en un solo query agregado.
+        """
+        return Response(facets(self.filter_queryset(self.get_queryset())))
+    
+    @action(detail=False, methods=['get'], permission_classes=[permissions.AllowAny])
+    def home(self, request):
+        """
+        Página de inicio en un solo documento precalculado
+        GET /api/products/home/
+        
+        Destacados, categorías activas (con product_count) y novedades.
+        El JSON ya está armado: se envía tal cual desde el cache.
+        """
+        snapshot = get_home_snapshot()
+        return HttpResponse(snapshot['content'], content_type='application/json')
+    
     @action(detail=False, methods=['get'], permission_classes=[permissions.AllowAny])
     def featured(self, request):
         """
-        Obtener productos destacados
+        Obtener productos destacados (del snapshot de la portada)
         GET /api/products/featured/
         """
-        featured_products = self.queryset.filter(is_featured=True)[:10]
-        serializer = ProductListSerializer(featured_products, many=True)
-        return Response(serializer.data)
+        return Response(get_home_snapshot()['data']['featured'])
     
     @action(detail=False, methods=['get'], permission_classes=[permissions.AllowAny])
     def by_category(self, request):
@@ -107,16 +282,37 @@ class ProductViewSet(viewsets.ModelViewSet):
         return Response(serializer.data)
     
     @action(detail=True, methods=['get'], permission_classes=[permissions.AllowAny])
-    def related(self, request, pk=None):
+    def related(self, request, id=None):
         """
-        Obtener productos relacionados (misma categoría)
-        GET /api/products/{id}/related/
+        Obtener productos relacionados (precalculados)
+        GET /api/products/{id}/related/?limit=5
+        
+        Se leen de RelatedProduct (compras conjuntas + categoría, ver
+        core/related.py) en un query por índice. Si el producto aún no
+        tiene relacionados calculados, se usa la misma categoría.
         """
-        product = self.get_object()
-        related_products = Product.objects.filter(
-            category=product.category,
-            is_active=True
-        ).exclude(id=product.id)[:5]
+        if not str(id).isdigit():
+            raise Http404
+        
+        try:
+            limit = min(max(int(request.query_params.get('limit', 5)), 1), RELATED_SIZE)
+        except ValueError:
+            limit = 5
+        
+        entries = (
+            RelatedProduct.objects
+            .filter(product_id=id, related__is_active=True)
+            .select_related('related__category')
+            .order_by('position')[:limit]
+        )
+        related_products = [entry.related for entry in entries]
+        
+        if not related_products:
+            product = self.get_object()
+            related_products = Product.objects.filter(
+                category_id=product.category_id,
+                is_active=True
+            ).exclude(id=product.id).select_related('category')[:limit]
         
         serializer = ProductListSerializer(related_products, many=True)
         return Response(serializer.data)
\ No newline at end of file
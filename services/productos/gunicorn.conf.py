@@ -0,0 +1,35 @@
+# ========================================
+# GUNICORN - CONFIGURACIÓN DEL SERVIDOR
+# ========================================
+# Gunicorn lee este archivo automáticamente (./gunicorn.conf.py)
+
+import multiprocessing
+import os
+
+bind = '0.0.0.0:8000'
+workers = int(os.environ.get('GUNICORN_WORKERS', multiprocessing.cpu_count() * 2 + 1))
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 30))
+
+# ========================================
+# PRECARGA (preload)
+# ========================================
+# Django, DRF, simplejwt y la app se importan UNA vez en el proceso master
+# y los workers se crean con fork(): arrancan ya importados y comparten
+# la memoria de esos módulos (copy-on-write).
+preload_app = True
+
+
+def when_ready(server):
+    """
+    En el master, antes de crear los workers: cerrar las conexiones a la
+    base de datos abiertas durante el warmup (no se deben compartir entre
+    procesos después del fork)
+    """
+    from django.db import connections
+    connections.close_all()
+
+
+def post_fork(server, worker):
+    """En cada worker: abrir su propia conexión y terminar el warmup"""
+    from core.health import warmup
+    warmup()
@@ -2,9 +2,13 @@
 
 from django.contrib import admin
 from django.urls import path, include
+from core.health import HealthView, ReadinessView
+from core.urls import category_urlpatterns
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/products/', include('core.urls')),
-    path('api/categories/', include('core.urls')),
+    path('api/categories/', include(category_urlpatterns)),
+    path('healthz', HealthView.as_view(), name='healthz'),
+    path('readyz', ReadinessView.as_view(), name='readyz'),
 ]
\ No newline at end of file
@@ -5,6 +5,7 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
 from .models import User
+from .profile_cache import invalidate_profile, store_profile
 
 
 @admin.register(User)
@@ -86,4 +87,21 @@ class UserAdmin(BaseUserAdmin):
             'classes': ('wide',),
             'fields': ('email', 'first_name', 'last_name', 'password1', 'password2'),
         }),
-    )
\ No newline at end of file
+    )
+    
+    # ========================================
+    # CACHE DEL PERFIL (ver core/profile_cache.py)
+    # ========================================
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        store_profile(obj)
+    
+    def delete_model(self, request, obj):
+        user_id = obj.id
+        super().delete_model(request, obj)
+        invalidate_profile(user_id)
+    
+    def delete_queryset(self, request, queryset):
+        user_ids = list(queryset.values_list('id', flat=True))
+        super().delete_queryset(request, queryset)
+        invalidate_profile(*user_ids)
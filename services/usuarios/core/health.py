@@ -0,0 +1,158 @@
+# ========================================
+# HEALTH - LIVENESS, READINESS Y WARMUP
+# ========================================
+
+import importlib
+import logging
+import threading
+import time
+
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+from django.urls import get_resolver
+from rest_framework import permissions, status
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+logger = logging.getLogger(__name__)
+
+# Módulos que se importan antes de aceptar tráfico
+# (evita que la primera petición de cada worker pague el import)
+WARMUP_MODULES = [
+    'core.models',
+    'core.serializers',
+    'core.views',
+    'core.throttles',
+    'rest_framework_simplejwt.authentication',
+    'rest_framework_simplejwt.tokens',
+]
+
+# Estado del proceso (cada worker de gunicorn tiene el suyo)
+_state = {
+    'warm': False,
+    'migrations_applied': False,
+    'warmup_attempted_at': None,
+}
+
+# Segundos entre reintentos del warmup desde /readyz si falló
+WARMUP_RETRY_SECONDS = 5
+
+_warmup_lock = threading.Lock()
+
+
+# ========================================
+# WARMUP
+# ========================================
+
+def warmup():
+    """
+    Prepara el worker antes de recibir tráfico:
+    1. Importa los módulos de la app
+    2. Carga todas las rutas (resolver de URLs)
+    3. Abre la conexión a la base de datos
+    """
+    _state['warmup_attempted_at'] = time.monotonic()
+
+    for module in WARMUP_MODULES:
+        importlib.import_module(module)
+
+    get_resolver().url_patterns
+
+    try:
+        connection.ensure_connection()
+    except Exception:
+        logger.exception('Warmup: no se pudo conectar a la base de datos')
+        return False
+
+    _state['warm'] = True
+    return True
+
+
+def retry_warmup():
+    """
+    Reintenta el warmup si falló (p. ej. la base no estaba lista al arrancar)
+
+    A lo sumo uno cada WARMUP_RETRY_SECONDS y uno a la vez por worker: las
+    sondas de readiness no deben martillar una base de datos caída.
+    """
+    if _state['warm']:
+        return True
+    attempted_at = _state['warmup_attempted_at']
+    if attempted_at is not None and time.monotonic() - attempted_at < WARMUP_RETRY_SECONDS:
+        return False
+    if not _warmup_lock.acquire(blocking=False):
+        return False
+    try:
+        return _state['warm'] or warmup()
+    finally:
+        _warmup_lock.release()
+
+
+# ========================================
+# CHEQUEOS
+# ========================================
+
+def check_database():
+    """¿La base de datos responde?"""
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT 1')
+        return True
+    except Exception:
+        return False
+
+
+def check_migrations():
+    """¿Todas las migraciones están aplicadas? (se recuerda una vez que sí)"""
+    if not _state['migrations_applied']:
+        try:
+            executor = MigrationExecutor(connection)
+            targets = executor.loader.graph.leaf_nodes()
+            _state['migrations_applied'] = not executor.migration_plan(targets)
+        except Exception:
+            return False
+    return _state['migrations_applied']
+
+
+# ========================================
+# VISTAS
+# ========================================
+
+class HealthView(APIView):
+    """
+    Liveness: el proceso está vivo y responde
+    GET /healthz
+    """
+
+    permission_classes = [permissions.AllowAny]
+    authentication_classes = []
+    throttle_classes = []
+
+    def get(self, request):
+        return Response({'status': 'ok'}, status=status.HTTP_200_OK)
+
+
+class ReadinessView(APIView):
+    """
+    Readiness: el worker puede recibir tráfico real
+    GET /readyz  - 200 si todo está listo, 503 si no (si el warmup
+    falló, lo reintenta: ver retry_warmup)
+    """
+
+    permission_classes = [permissions.AllowAny]
+    authentication_classes = []
+    throttle_classes = []
+
+    def get(self, request):
+        checks = {
+            'database': check_database(),
+            'migrations': check_migrations(),
+            'warm': retry_warmup(),
+        }
+
+        ready = all(checks.values())
+
+        return Response(
+            {'status': 'ready' if ready else 'not_ready', 'checks': checks},
+            status=status.HTTP_200_OK if ready else status.HTTP_503_SERVICE_UNAVAILABLE
+        )
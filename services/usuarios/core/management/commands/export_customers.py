@@ -0,0 +1,45 @@
+# ========================================
+# COMANDO - EXPORTAR CLIENTES (JSON POR LÍNEA)
+# ========================================
+# Una línea por usuario con id, nombre completo, email y dirección
+# (User.full_address). La usa pedidos para completar la copia del cliente
+# en los pedidos viejos sin llamar a este servicio pedido por pedido:
+#   python manage.py export_customers > clientes.jsonl
+#   python manage.py export_customers --output clientes.jsonl
+
+import json
+
+from django.core.management.base import BaseCommand
+
+from core.models import User
+
+
+class Command(BaseCommand):
+    help = 'Exporta id, nombre, email y dirección de los usuarios en JSON por línea'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--output', help='Archivo de salida (por defecto stdout)')
+        parser.add_argument('--chunk-size', type=int, default=2000)
+    
+    def handle(self, *args, **options):
+        users = User.objects.order_by('id').only(
+            'id', 'first_name', 'last_name', 'email',
+            'address', 'city', 'state', 'postal_code', 'country',
+        ).iterator(chunk_size=options['chunk_size'])
+        
+        output = open(options['output'], 'w', encoding='utf-8') if options['output'] else self.stdout
+        exported = 0
+        try:
+            for user in users:
+                output.write(json.dumps({
+                    'id': user.id,
+                    'full_name': user.get_full_name(),
+                    'email': user.email,
+                    'full_address': user.full_address,
+                }, ensure_ascii=False) + '\n')
+                exported += 1
+        finally:
+            if options['output']:
+                output.close()
+        
+        self.stderr.write(f'{exported} usuarios exportados')
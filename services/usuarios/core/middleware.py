@@ -0,0 +1,54 @@
+# ========================================
+# MIDDLEWARE - CONTROL DE ADMISIÓN (LOAD SHEDDING)
+# ========================================
+
+import json
+import time
+
+from django.conf import settings
+from django.http import HttpResponse
+
+
+class LoadSheddingMiddleware:
+    """
+    Rechaza rápido (503) las peticiones que esperaron demasiado en cola
+
+    El gateway agrega el header "X-Request-Start: t=<epoch en segundos>"
+    cuando recibe la petición. Si cuando un worker la toma ya pasaron más
+    de LOAD_SHED_MAX_QUEUE_MS, el cliente probablemente ya se rindió:
+    responder 503 sin ejecutar la vista libera el worker para las
+    peticiones que sí llegan a tiempo, en lugar de que la latencia
+    crezca para todos.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.max_queue_ms = getattr(settings, 'LOAD_SHED_MAX_QUEUE_MS', 0)
+
+    def __call__(self, request):
+        if self.max_queue_ms:
+            queued_ms = self.get_queue_time_ms(request)
+            if queued_ms is not None and queued_ms > self.max_queue_ms:
+                response = HttpResponse(
+                    json.dumps({'error': 'Servicio sobrecargado, intenta de nuevo'}),
+                    status=503,
+                    content_type='application/json',
+                )
+                response['Retry-After'] = '1'
+                return response
+
+        return self.get_response(request)
+
+    @staticmethod
+    def get_queue_time_ms(request):
+        """Milisegundos desde que el gateway recibió la petición"""
+        header = request.META.get('HTTP_X_REQUEST_START', '')
+        if not header.startswith('t='):
+            return None
+
+        try:
+            started = float(header[2:])
+        except ValueError:
+            return None
+
+        return (time.time() - started) * 1000
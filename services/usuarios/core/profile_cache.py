@@ -0,0 +1,76 @@
+# ========================================
+# CACHE DEL PERFIL - LECTURAS SIN BASE DE DATOS
+# ========================================
+#
+# El frontend pide el perfil en cada carga de página. El perfil serializado
+# (UserDetailSerializer, con full_name y full_address ya calculados) se
+# guarda en el cache por usuario y las lecturas lo sirven desde ahí.
+#   - Cuando cambia se reescribe con el perfil nuevo (ProfileView.put/patch
+#     y el admin al guardar) o se borra (admin al borrar usuarios). Se
+#     reescribe en vez de borrar: si no, el siguiente hueco podría llenarse
+#     desde una réplica atrasada con el perfil de antes de la edición.
+#   - Cambios por otros caminos (shell, queryset.update) se ven a más
+#     tardar en PROFILE_CACHE_SECONDS.
+# Con REDIS_URL el cache se comparte entre workers (si no, es por proceso
+# y la invalidación solo llega al proceso que atendió la edición).
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from .models import User
+from .serializers import UserDetailSerializer
+
+# Segundos que se guarda un perfil en el cache
+PROFILE_CACHE_SECONDS = getattr(settings, 'PROFILE_CACHE_SECONDS', 300)
+
+# Cambiar si cambia el formato del perfil serializado
+KEY_VERSION = 1
+
+
+def _key(user_id):
+    return f'profile:v{KEY_VERSION}:{user_id}'
+
+
+def serialize_profile(user):
+    return dict(UserDetailSerializer(user).data)
+
+
+def get_profile(user_id):
+    """
+    Perfil serializado del usuario (cache o base de datos)
+    
+    None si el usuario no existe.
+    """
+    key = _key(user_id)
+    profile = cache.get(key)
+    if profile is not None:
+        return profile
+    
+    user = User.objects.filter(id=user_id).first()
+    if user is None:
+        return None
+    
+    profile = serialize_profile(user)
+    cache.set(key, profile, PROFILE_CACHE_SECONDS)
+    return profile
+
+
+def store_profile(user):
+    """
+    Guarda en el cache el perfil recién editado y lo retorna serializado
+    
+    Dentro de una transacción se guarda al confirmar (si se revierte, el
+    cache no cambia).
+    """
+    profile = serialize_profile(user)
+    key = _key(user.id)
+    transaction.on_commit(lambda: cache.set(key, profile, PROFILE_CACHE_SECONDS))
+    return profile
+
+
+def invalidate_profile(*user_ids):
+    """Borra los perfiles del cache (al confirmar la transacción, si hay una)"""
+    keys = [_key(user_id) for user_id in user_ids]
+    if keys:
+        transaction.on_commit(lambda: cache.delete_many(keys))
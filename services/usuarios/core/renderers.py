@@ -0,0 +1,65 @@
+# ========================================
+# RENDERERS Y PARSERS - JSON RÁPIDO (ORJSON)
+# ========================================
+
+from rest_framework.utils.encoders import JSONEncoder
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+try:
+    import orjson
+except ImportError:  # orjson es opcional: sin él se usa el JSON estándar de DRF
+    orjson = None
+
+
+class ORJSONRenderer(JSONRenderer):
+    """
+    Renderer JSON basado en orjson (varias veces más rápido que json.dumps)
+
+    Produce la misma salida que JSONRenderer: las fechas, decimales y
+    textos "lazy" se delegan al encoder de DRF para mantener el formato.
+    Si orjson no está instalado o se pide indentación, usa JSONRenderer.
+    """
+
+    options = (
+        orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+        if orjson else 0
+    )
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        """Renderizar los datos a JSON (bytes)"""
+        if orjson is None:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        if data is None:
+            return b''
+
+        # Pretty print (?format=json; indent=4): dejarlo al renderer estándar
+        if self.get_indent(accepted_media_type, renderer_context or {}) is not None:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        ret = orjson.dumps(data, default=JSONEncoder().default, option=self.options)
+
+        # Igual que DRF: escapar \u2028 y \u2029 para que sea JavaScript válido
+        return ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+
+
+class ORJSONParser(JSONParser):
+    """
+    Parser JSON basado en orjson
+
+    orjson solo acepta UTF-8 y rechaza NaN/Infinity (igual que STRICT_JSON).
+    """
+
+    renderer_class = ORJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        """Parsear el cuerpo de la petición"""
+        if orjson is None:
+            return super().parse(stream, media_type, parser_context)
+
+        try:
+            return orjson.loads(stream.read())
+        except orjson.JSONDecodeError as exc:
+            raise ParseError('JSON parse error - %s' % str(exc))
@@ -0,0 +1,196 @@
+# ========================================
+# RÉPLICAS DE LECTURA - ROUTER DE BASE DE DATOS
+# ========================================
+#
+# Las lecturas seguras (GET) de las vistas marcadas con ReplicaReadMixin van
+# a una réplica; todo lo demás (escrituras, transacciones, vistas sin marcar,
+# comandos) sigue en 'default'.
+#   - Leer lo propio: cuando una petición escribe, su usuario queda fijado
+#     al primario unos segundos (en el cache, compartido si hay Redis), así
+#     la siguiente lectura ve su cambio aunque la réplica vaya atrasada.
+#   - Retraso: cada DATABASE_REPLICA_CHECK_INTERVAL segundos se mide el
+#     retraso de cada réplica; si supera DATABASE_REPLICA_MAX_LAG o no
+#     responde, sus lecturas vuelven al primario.
+#
+# Configuración (settings):
+#   DATABASES['replica_1'] = {..., 'TEST': {'MIRROR': 'default'}}
+#   DATABASE_ROUTERS = ['core.replicas.ReplicaRouter']
+#   MIDDLEWARE += ['core.replicas.ReplicaMiddleware']
+#   DATABASE_REPLICAS = ['replica_1']    # Por defecto: todo alias != default
+# Sin réplicas configuradas todo se lee del primario.
+
+import logging
+import random
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections
+from rest_framework.permissions import SAFE_METHODS
+
+logger = logging.getLogger(__name__)
+
+# Segundos de retraso tolerados en una réplica
+MAX_LAG = getattr(settings, 'DATABASE_REPLICA_MAX_LAG', 2)
+
+# Cada cuánto se vuelve a medir el retraso de una réplica (por proceso)
+CHECK_INTERVAL = getattr(settings, 'DATABASE_REPLICA_CHECK_INTERVAL', 5)
+
+# Un usuario que escribió lee del primario durante el peor retraso aceptado
+# más lo que puede tardar en notarse (una medición vieja)
+PIN_SECONDS = MAX_LAG + CHECK_INTERVAL
+
+LAG_SQL = """
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() THEN 0
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp())
+    END
+"""
+
+_state = threading.local()
+
+# alias -> (momento de la medición, ¿sana?)
+_health = {}
+
+
+# ========================================
+# ESTADO DE LAS RÉPLICAS
+# ========================================
+
+def replica_aliases():
+    configured = getattr(settings, 'DATABASE_REPLICAS', None)
+    if configured is not None:
+        return list(configured)
+    return [alias for alias in settings.DATABASES if alias != DEFAULT_DB_ALIAS]
+
+
+def replica_lag(alias):
+    """Segundos de retraso de la réplica (0 si no es PostgreSQL)"""
+    connection = connections[alias]
+    if connection.vendor != 'postgresql':
+        return 0.0
+    with connection.cursor() as cursor:
+        cursor.execute(LAG_SQL)
+        return float(cursor.fetchone()[0] or 0)
+
+
+def is_healthy(alias):
+    """¿La réplica responde y va al día? (medición cacheada CHECK_INTERVAL s)"""
+    now = time.monotonic()
+    checked = _health.get(alias)
+    if checked is not None and now - checked[0] < CHECK_INTERVAL:
+        return checked[1]
+    
+    try:
+        lag = replica_lag(alias)
+        healthy = lag <= MAX_LAG
+        if not healthy:
+            logger.warning('Réplica %s atrasada %.1fs: lecturas al primario', alias, lag)
+    except Exception:
+        logger.warning('Réplica %s no disponible: lecturas al primario', alias, exc_info=True)
+        connections[alias].close()
+        healthy = False
+    
+    _health[alias] = (now, healthy)
+    return healthy
+
+
+def choose_replica():
+    """Alias de una réplica sana al azar, o None"""
+    healthy = [alias for alias in replica_aliases() if is_healthy(alias)]
+    return random.choice(healthy) if healthy else None
+
+
+# ========================================
+# LEER LO PROPIO
+# ========================================
+
+def _pin_key(user_id):
+    return f'replica:pin:{user_id}'
+
+
+def pin_to_primary(user_id):
+    cache.set(_pin_key(user_id), True, PIN_SECONDS)
+
+
+def is_pinned(user_id):
+    return bool(cache.get(_pin_key(user_id)))
+
+
+# ========================================
+# ROUTER, MIDDLEWARE Y MIXIN
+# ========================================
+
+class ReplicaRouter:
+    """Lecturas a réplica solo dentro de una vista marcada; escrituras al primario"""
+    
+    def db_for_read(self, model, **hints):
+        if not getattr(_state, 'replica', False):
+            return DEFAULT_DB_ALIAS
+        # En una transacción se lee lo que la transacción ve
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        return choose_replica() or DEFAULT_DB_ALIAS
+    
+    def db_for_write(self, model, **hints):
+        _state.wrote = True
+        return DEFAULT_DB_ALIAS
+    
+    def allow_relation(self, obj1, obj2, **hints):
+        return True                     # Mismos datos en el primario y las réplicas
+    
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == DEFAULT_DB_ALIAS
+
+
+class ReplicaMiddleware:
+    """
+    Reinicia el estado del router en cada petición y, si la petición
+    escribió, fija a su usuario al primario por PIN_SECONDS
+    """
+    
+    def __init__(self, get_response):
+        self.get_response = get_response
+    
+    def __call__(self, request):
+        _state.replica = False
+        _state.wrote = False
+        try:
+            response = self.get_response(request)
+            user = getattr(request, 'user', None)
+            if _state.wrote and user is not None and user.is_authenticated:
+                pin_to_primary(user.id)
+            return response
+        finally:
+            _state.replica = False
+            _state.wrote = False
+
+
+class ReplicaReadMixin:
+    """
+    Para vistas DRF: las acciones de `replica_actions` leen de una réplica
+    
+    En ViewSets son nombres de acción ('list', 'retrieve', ...); en APIView,
+    métodos HTTP en minúscula ('get'). Solo aplica a métodos seguros y si
+    el usuario no escribió hace poco (ver pin_to_primary).
+    """
+    
+    replica_actions = ()
+    
+    def initial(self, request, *args, **kwargs):
+        # Autenticación, permisos y throttling se resuelven en el primario
+        super().initial(request, *args, **kwargs)
+        _state.replica = self.use_replica(request)
+    
+    def use_replica(self, request):
+        action = getattr(self, 'action', None) or request.method.lower()
+        if request.method not in SAFE_METHODS or action not in self.replica_actions:
+            return False
+        user = request.user
+        return not (user is not None and user.is_authenticated and is_pinned(user.id))
+    
+    def finalize_response(self, request, response, *args, **kwargs):
+        _state.replica = False
+        return super().finalize_response(request, response, *args, **kwargs)
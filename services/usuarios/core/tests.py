@@ -3,7 +3,7 @@
 # ========================================
 
 from django.test import TestCase
-from rest_framework.test import APITestCase
+from rest_framework.test import APITestCase, APITransactionTestCase
 from rest_framework import status
 from .models import User
 
@@ -95,4 +95,364 @@ class LoginAPITestCase(APITestCase):
             'password': 'wrongpassword'
         }
         response = self.client.post('/api/auth/login/', data, format='json')
-        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
\ No newline at end of file
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class ORJSONRendererTestCase(TestCase):
+    """Tests para el renderer JSON rápido"""
+    
+    def test_same_output_as_json_renderer(self):
+        """Probar que produce el mismo JSON que el renderer estándar de DRF"""
+        from decimal import Decimal
+        from django.utils import timezone
+        from rest_framework.renderers import JSONRenderer
+        from .renderers import ORJSONRenderer
+        
+        data = {
+            'total': Decimal('1150.00'),
+            'created_at': timezone.now(),
+            'name': 'Ibagué ',
+        }
+        self.assertEqual(ORJSONRenderer().render(data), JSONRenderer().render(data))
+
+
+class AuthThrottleTestCase(APITestCase):
+    """Tests para el rate limiting de login"""
+    
+    def setUp(self):
+        from django.core.cache import cache
+        cache.clear()
+    
+    def test_login_throttled_per_account(self):
+        """Probar que una misma cuenta recibe 429 al agotar sus intentos"""
+        data = {'email': 'victima@example.com', 'password': 'wrongpassword'}
+        
+        for _ in range(5):
+            response = self.client.post('/api/auth/login/', data, format='json')
+            self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        
+        response = self.client.post('/api/auth/login/', data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertIn('Retry-After', response)
+    
+    def test_refresh_not_throttled(self):
+        """Probar que /refresh/ no comparte el límite del login"""
+        data = {'email': 'victima@example.com', 'password': 'wrongpassword'}
+        for _ in range(6):
+            self.client.post('/api/auth/login/', data, format='json')
+        
+        response = self.client.post('/api/auth/refresh/', {}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+    
+    def test_concurrent_requests_share_the_bucket(self):
+        """Probar que peticiones simultáneas no gastan la misma ficha"""
+        import threading
+        from rest_framework.test import APIRequestFactory
+        from .throttles import AuthIPThrottle
+        
+        request = APIRequestFactory().post('/api/auth/login/')
+        results = []
+        
+        def hit():
+            results.append(AuthIPThrottle().allow_request(request, None))
+        
+        limit = AuthIPThrottle().num_requests
+        threads = [threading.Thread(target=hit) for _ in range(limit * 2)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(results.count(True), limit)
+    
+    def test_local_buckets_are_bounded(self):
+        """Probar que el respaldo en memoria no crece sin límite si el cache falla"""
+        from unittest import mock
+        from rest_framework.test import APIRequestFactory
+        from . import throttles
+        
+        self.addCleanup(throttles.TokenBucketThrottle._local_buckets.clear)
+        with mock.patch.object(throttles.TokenBucketThrottle, '_cache_allow', side_effect=ConnectionError), \
+                mock.patch.object(throttles, 'MAX_LOCAL_BUCKETS', 3):
+            for number in range(10):
+                request = APIRequestFactory().post('/api/auth/login/', REMOTE_ADDR=f'10.0.0.{number}')
+                self.assertTrue(throttles.AuthIPThrottle().allow_request(request, None))
+        self.assertEqual(len(throttles.TokenBucketThrottle._local_buckets), 3)
+
+    
+    def test_redis_script_receives_the_bucket(self):
+        """Probar que con REDIS_URL el balde se consume con el script Lua"""
+        from unittest import mock
+        from django.core.cache import cache
+        from django.test import override_settings
+        from rest_framework.test import APIRequestFactory
+        from . import throttles
+        
+        calls = []
+        
+        def script(keys, args):
+            calls.append((keys, args))
+            return [1, b'4.5'] if len(calls) == 1 else [0, b'0.2']
+        
+        request = APIRequestFactory().post('/api/auth/login/', REMOTE_ADDR='10.0.0.1')
+        with override_settings(REDIS_URL='redis://stub:6379/0'), \
+                mock.patch.object(throttles.TokenBucketThrottle, '_redis_script', script):
+            throttle = throttles.AuthIPThrottle()
+            self.assertTrue(throttle.allow_request(request, None))
+            self.assertEqual(throttle.tokens, 4.5)
+            self.assertFalse(throttles.AuthIPThrottle().allow_request(request, None))
+        
+        keys, args = calls[0]
+        self.assertEqual(keys, [cache.make_and_validate_key(throttle.key)])
+        self.assertEqual(args[0], throttle.num_requests)
+    
+    def test_redis_script_against_a_live_server(self):
+        """Probar el script Lua contra un Redis real (TEST_REDIS_URL)"""
+        import os
+        import unittest
+        from unittest import mock
+        from django.test import override_settings
+        from rest_framework.test import APIRequestFactory
+        from . import throttles
+        
+        url = os.environ.get('TEST_REDIS_URL')
+        try:
+            import redis
+            redis.Redis.from_url(url).ping()
+        except Exception:
+            raise unittest.SkipTest('Sin Redis (TEST_REDIS_URL)')
+        
+        request = APIRequestFactory().post('/api/auth/login/', REMOTE_ADDR='10.0.0.2')
+        with override_settings(REDIS_URL=url), \
+                mock.patch.object(throttles.TokenBucketThrottle, '_redis_script', None):
+            limit = throttles.AuthIPThrottle().num_requests
+            key = throttles.AuthIPThrottle().get_cache_key(request, None)
+            redis.Redis.from_url(url).delete(throttles.cache.make_and_validate_key(key))
+            results = [throttles.AuthIPThrottle().allow_request(request, None) for _ in range(limit + 1)]
+        self.assertEqual(results.count(True), limit)
+
+
+class LoadSheddingTestCase(APITestCase):
+    """Tests para el control de admisión"""
+    
+    def test_request_queued_too_long_is_rejected(self):
+        """Probar que una petición que esperó demasiado en cola recibe 503"""
+        import time
+        stale = 't=%.3f' % (time.time() - 60)
+        response = self.client.post(
+            '/api/auth/refresh/', {}, format='json', HTTP_X_REQUEST_START=stale
+        )
+        self.assertEqual(response.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+
+
+class HealthAPITestCase(APITestCase):
+    """Tests para /healthz y /readyz"""
+    
+    def test_liveness(self):
+        """Probar que /healthz responde sin autenticación"""
+        response = self.client.get('/healthz')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+    
+    def test_readiness_after_warmup(self):
+        """Probar que /readyz responde 200 una vez calentado el worker"""
+        from .health import warmup
+        self.assertTrue(warmup())
+        
+        response = self.client.get('/readyz')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(all(response.data['checks'].values()))
+    
+    def test_readiness_recovers_after_failed_warmup(self):
+        """Probar que /readyz reintenta (con pausa) un warmup que falló"""
+        from unittest import mock
+        from . import health
+        
+        self.addCleanup(health._state.update, health._state.copy())
+        health._state['warm'] = False
+        with mock.patch.object(health.connection, 'ensure_connection', side_effect=OSError('db caída')):
+            self.assertFalse(health.warmup())
+        
+        # Dentro de la pausa no se reintenta
+        response = self.client.get('/readyz')
+        self.assertEqual(response.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertFalse(response.data['checks']['warm'])
+        
+        with mock.patch.object(health, 'WARMUP_RETRY_SECONDS', 0):
+            response = self.client.get('/readyz')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(health._state['warm'])
+
+
+class ReplicaRoutingTestCase(APITransactionTestCase):
+    """Tests para el ruteo de lecturas a réplicas (sin transacción: dentro de una se lee del primario)"""
+    
+    def setUp(self):
+        from django.core.cache import cache
+        from . import replicas
+        cache.clear()
+        replicas._health.clear()
+        self.user = User.objects.create_user(
+            username='lector', email='lector@example.com', first_name='Ana', last_name='Lectora',
+            password='testpass123'
+        )
+        self.client.force_authenticate(self.user)
+    
+    def test_reads_go_to_replica_until_user_writes(self):
+        """Probar que quien acaba de escribir lee del primario"""
+        from unittest import mock
+        from . import replicas
+        
+        with mock.patch.object(replicas, 'choose_replica', return_value='default') as choose:
+            response = self.client.get(f'/api/users/{self.user.id}/')
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertTrue(choose.called)
+            
+            choose.reset_mock()
+            self.client.patch('/api/users/profile/', {'first_name': 'Ana María'}, format='json')
+            response = self.client.get(f'/api/users/{self.user.id}/')
+            self.assertEqual(response.data['first_name'], 'Ana María')
+            self.assertFalse(choose.called)
+    
+    def test_lagging_replica_falls_back_to_primary(self):
+        """Probar que una réplica atrasada deja de recibir lecturas"""
+        from unittest import mock
+        from django.test import override_settings
+        from . import replicas
+        
+        with override_settings(DATABASE_REPLICAS=['default']):
+            with mock.patch.object(replicas, 'replica_lag', return_value=replicas.MAX_LAG + 1):
+                self.assertIsNone(replicas.choose_replica())
+            
+            replicas._health.clear()
+            self.assertEqual(replicas.choose_replica(), 'default')
+
+
+class ProfileCacheTestCase(APITestCase):
+    """Tests para el cache del perfil"""
+    
+    def setUp(self):
+        from django.core.cache import cache
+        cache.clear()
+        self.user = User.objects.create_user(
+            username='perfil', email='perfil@example.com', first_name='Ana', last_name='Gómez',
+            password='testpass123', city='Ibagué', country='Colombia'
+        )
+        self.client.force_authenticate(self.user)
+    
+    def test_profile_is_served_from_cache(self):
+        """Probar que la segunda lectura no consulta la base de datos"""
+        first = self.client.get('/api/users/profile/')
+        self.assertEqual(first.status_code, status.HTTP_200_OK)
+        self.assertEqual(first.data['full_name'], 'Ana Gómez')
+        self.assertEqual(first.data['full_address'], 'Ibagué, Colombia')
+        
+        with self.assertNumQueries(0):
+            second = self.client.get('/api/users/profile/')
+            detail = self.client.get(f'/api/users/{self.user.id}/')
+        self.assertEqual(second.data, first.data)
+        self.assertEqual(detail.data, first.data)
+        self.assertEqual(self.client.get('/api/users/999999/').status_code, status.HTTP_404_NOT_FOUND)
+    
+    def test_edits_refresh_cached_profile(self):
+        """Probar que editar el perfil o pasar por el admin actualiza el cache"""
+        from django.contrib import admin
+        from .profile_cache import get_profile
+        
+        self.client.get('/api/users/profile/')
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.patch('/api/users/profile/', {'city': 'Bogotá'}, format='json')
+        self.assertEqual(response.data['user']['full_address'], 'Bogotá, Colombia')
+        self.assertEqual(self.client.get('/api/users/profile/').data['city'], 'Bogotá')
+        
+        model_admin = admin.site._registry[User]
+        self.user.first_name = 'Ana María'
+        with self.captureOnCommitCallbacks(execute=True):
+            model_admin.save_model(None, self.user, None, True)
+        self.assertEqual(get_profile(self.user.id)['full_name'], 'Ana María Gómez')
+        
+        with self.captureOnCommitCallbacks(execute=True):
+            model_admin.delete_queryset(None, User.objects.filter(id=self.user.id))
+        self.assertIsNone(get_profile(self.user.id))
+
+
+class TokenIssuanceTestCase(APITestCase):
+    """Tests para la emisión de tokens compactos y el JWKS"""
+    
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='tokens', email='tokens@example.com', first_name='Ana', last_name='Token',
+            password='testpass123'
+        )
+    
+    def login(self):
+        response = self.client.post(
+            '/api/auth/login/', {'email': 'tokens@example.com', 'password': 'testpass123'}, format='json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.data['tokens']
+    
+    def test_compact_tokens_verify_with_simplejwt(self):
+        """Probar que los tokens compactos no llevan iat y se verifican igual que antes"""
+        import jwt
+        from rest_framework_simplejwt.tokens import AccessToken
+        
+        tokens = self.login()
+        claims = jwt.decode(tokens['access'], options={'verify_signature': False})
+        self.assertEqual(set(claims), {'token_type', 'exp', 'jti', 'user_id'})
+        self.assertLess(len(claims['jti']), 32)
+        self.assertEqual(AccessToken(tokens['access'])['user_id'], self.user.id)
+        
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {tokens['access']}")
+        self.assertEqual(self.client.get('/api/users/profile/').status_code, status.HTTP_200_OK)
+    
+    def test_refresh_rotates_without_database_writes(self):
+        """Probar que el refresh rota el token sin escribir en la base de datos"""
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        
+        tokens = self.login()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post('/api/auth/refresh/', {'refresh': tokens['refresh']}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertFalse([query for query in queries if not query['sql'].startswith('SELECT')])
+        self.assertNotEqual(response.data['refresh'], tokens['refresh'])
+        
+        # Un access token no sirve como refresh
+        response = self.client.post('/api/auth/refresh/', {'refresh': tokens['access']}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+    
+    def test_jwks_is_empty_with_shared_secret(self):
+        """Probar que con HS256 no se publica ninguna clave"""
+        response = self.client.get('/api/auth/jwks/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, {'keys': []})
+    
+    def test_asymmetric_tokens_carry_kid_from_jwks(self):
+        """Probar que con RS256 el kid del token está en el JWKS y verifica con la clave pública"""
+        import jwt
+        from jwt import algorithms
+        if not algorithms.has_crypto:
+            self.skipTest('cryptography no está instalado')
+        
+        from cryptography.hazmat.primitives import serialization
+        from cryptography.hazmat.primitives.asymmetric import rsa
+        from django.test import override_settings
+        
+        key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+        private_pem = key.private_bytes(
+            serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption()
+        ).decode()
+        public_pem = key.public_key().public_bytes(
+            serialization.Encoding.PEM, serialization.PublicFormat.SubjectPublicKeyInfo
+        ).decode()
+        
+        from django.conf import settings
+        jwt_settings = {
+            **settings.SIMPLE_JWT, 'ALGORITHM': 'RS256', 'SIGNING_KEY': private_pem, 'VERIFYING_KEY': public_pem,
+        }
+        with override_settings(SIMPLE_JWT=jwt_settings):
+            access = self.login()['access']
+            keys = self.client.get('/api/auth/jwks/').data['keys']
+        
+        self.assertEqual(jwt.get_unverified_header(access)['kid'], keys[0]['kid'])
+        public_key = jwt.PyJWK(keys[0]).key
+        self.assertEqual(jwt.decode(access, public_key, algorithms=['RS256'])['user_id'], self.user.id)
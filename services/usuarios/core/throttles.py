@@ -0,0 +1,169 @@
+# ========================================
+# THROTTLES - LÍMITE DE PETICIONES (TOKEN BUCKET)
+# ========================================
+
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.throttling import SimpleRateThrottle
+
+# Máximo de baldes en el respaldo local (los menos usados se descartan)
+MAX_LOCAL_BUCKETS = 10000
+
+# Consumir una ficha en Redis en un solo paso (nadie lee el balde a la vez)
+# KEYS[1] = balde; ARGV = capacidad, fichas por segundo, ahora, TTL
+TOKEN_BUCKET_LUA = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local now = tonumber(ARGV[3])
+local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(bucket[1]) or capacity
+local last = tonumber(bucket[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - last) * rate)
+local allowed = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+    allowed = 1
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now))
+redis.call('EXPIRE', KEYS[1], ARGV[4])
+return {allowed, tostring(tokens)}
+"""
+
+
+class TokenBucketThrottle(SimpleRateThrottle):
+    """
+    Throttle tipo "token bucket"
+
+    Cada clave (IP, cuenta...) tiene un balde con `num_requests` fichas
+    que se rellena a razón de num_requests / duration fichas por segundo.
+    Cada petición consume una ficha; sin fichas -> 429 con Retry-After.
+
+    A diferencia de SimpleRateThrottle no guarda el historial de
+    peticiones, solo (fichas, timestamp), así que cada chequeo es O(1).
+
+    Con REDIS_URL el balde se comparte entre workers y se actualiza con un
+    script Lua: leer, descontar y guardar es una sola operación, así dos
+    peticiones simultáneas no gastan la misma ficha. El script corre por
+    una conexión propia de redis-py (la API del backend de cache de Django
+    no expone el cliente) sobre la misma clave que usaría el cache. Con otro
+    cache (locmem, uno por proceso) se lee y escribe bajo un lock del
+    proceso. Si el cache falla se usa un balde local en memoria del
+    proceso para no dejar de limitar (a lo sumo MAX_LOCAL_BUCKETS claves:
+    descartar un balde equivale a darlo por lleno).
+    """
+
+    # Respaldo local: {clave: (fichas, timestamp)}, del menos al más usado
+    _local_buckets = OrderedDict()
+    _local_lock = threading.Lock()
+    # Script Lua registrado en el cliente de redis-py (se crea al primer uso)
+    _redis_script = None
+
+    def allow_request(self, request, view):
+        if self.rate is None:
+            return True
+
+        self.key = self.get_cache_key(request, view)
+        if self.key is None:
+            return True
+
+        self.now = self.timer()
+        refill_rate = self.num_requests / self.duration
+
+        try:
+            if getattr(settings, 'REDIS_URL', ''):
+                allowed, tokens = self._redis_allow(refill_rate)
+            else:
+                allowed, tokens = self._cache_allow(refill_rate)
+        except Exception:
+            allowed, tokens = self._local_allow(refill_rate)
+
+        self.tokens = tokens
+        self.refill_rate = refill_rate
+        return allowed
+
+    def _consume(self, bucket, refill_rate):
+        """(fichas, timestamp) -> (permitida, fichas restantes)"""
+        tokens, last = bucket or (self.num_requests, self.now)
+        tokens = min(self.num_requests, tokens + max(0, self.now - last) * refill_rate)
+        if tokens >= 1:
+            return True, tokens - 1
+        return False, tokens
+
+    @staticmethod
+    def _get_redis_script():
+        """Script Lua sobre un cliente de redis-py conectado a REDIS_URL"""
+        if TokenBucketThrottle._redis_script is None:
+            import redis
+            client = redis.Redis.from_url(settings.REDIS_URL)
+            TokenBucketThrottle._redis_script = client.register_script(TOKEN_BUCKET_LUA)
+        return TokenBucketThrottle._redis_script
+
+    def _redis_allow(self, refill_rate):
+        """Atómico en Redis (script Lua)"""
+        allowed, tokens = self._get_redis_script()(
+            keys=[cache.make_and_validate_key(self.key)],
+            args=[self.num_requests, refill_rate, self.now, max(1, int(self.duration))],
+        )
+        return bool(allowed), float(tokens)
+
+    def _cache_allow(self, refill_rate):
+        """Cache del proceso (locmem): atómico con el lock del proceso"""
+        with self._local_lock:
+            allowed, tokens = self._consume(cache.get(self.key), refill_rate)
+            cache.set(self.key, (tokens, self.now), self.duration)
+        return allowed, tokens
+
+    def _local_allow(self, refill_rate):
+        """Mismo algoritmo, pero en memoria del proceso"""
+        with self._local_lock:
+            allowed, tokens = self._consume(self._local_buckets.pop(self.key, None), refill_rate)
+            self._local_buckets[self.key] = (tokens, self.now)
+            while len(self._local_buckets) > MAX_LOCAL_BUCKETS:
+                self._local_buckets.popitem(last=False)
+        return allowed, tokens
+
+    def wait(self):
+        """Segundos hasta que haya una ficha disponible"""
+        return max(0.0, (1 - self.tokens) / self.refill_rate)
+
+    def timer(self):
+        return time.time()
+
+
+class AuthIPThrottle(TokenBucketThrottle):
+    """
+    Límite por IP para login y registro
+    Scope 'auth_ip' en DEFAULT_THROTTLE_RATES
+    """
+
+    scope = 'auth_ip'
+
+    def get_cache_key(self, request, view):
+        return self.cache_format % {
+            'scope': self.scope,
+            'ident': self.get_ident(request),
+        }
+
+
+class AuthAccountThrottle(TokenBucketThrottle):
+    """
+    Límite por cuenta (email) para login y registro
+    Frena ataques distribuidos contra una misma cuenta
+    Scope 'auth_account' en DEFAULT_THROTTLE_RATES
+    """
+
+    scope = 'auth_account'
+
+    def get_cache_key(self, request, view):
+        email = request.data.get('email') if hasattr(request.data, 'get') else None
+        if not email:
+            return None
+
+        return self.cache_format % {
+            'scope': self.scope,
+            'ident': str(email).strip().lower(),
+        }
@@ -0,0 +1,199 @@
+# ========================================
+# TOKENS JWT - EMISIÓN COMPACTA Y FIRMA ASIMÉTRICA
+# ========================================
+#
+# Todos los tokens se emiten desde aquí (registro, login y refresh).
+#   - Compactos (JWT_COMPACT_TOKENS, por defecto sí): sin 'iat' (nadie lo
+#     lee; 'exp' alcanza) y con 'jti' corto en vez de un uuid de 32 letras.
+#     Quedan 'token_type', 'exp', 'jti' y 'user_id', así que cualquier
+#     servicio con simplejwt los sigue verificando igual.
+#   - Asimétricos (JWT_PRIVATE_KEY_FILE, ver settings): firma RS256/ES256
+#     con la clave privada, solo en usuarios. El header lleva 'kid' y
+#     GET /api/auth/jwks/ publica las claves públicas (JWKS). Los demás
+#     servicios verifican localmente, sin compartir SECRET_KEY y sin
+#     llamar a usuarios por petición:
+#
+#         SIMPLE_JWT = {
+#             'ALGORITHM': 'RS256',
+#             'JWK_URL': 'http://usuarios-service:8000/api/auth/jwks/',
+#         }
+#
+#     (PyJWKClient descarga el JWKS una vez y lo guarda en memoria; un
+#     'kid' desconocido, por ejemplo tras rotar la clave, lo vuelve a pedir.)
+#     Requiere el paquete cryptography.
+#
+# El refresh no escribe en la base de datos: el refresh rotado no se
+# registra como OutstandingToken (sin la app token_blacklist, que no está en
+# INSTALLED_APPS, tampoco el del login).
+#
+# Para comparar algoritmos: benchmarks/bench_jwt.py
+
+import base64
+import hashlib
+import json
+import secrets
+from functools import lru_cache
+
+import jwt
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from jwt import algorithms
+from rest_framework_simplejwt import tokens
+from rest_framework_simplejwt.backends import TokenBackend
+from rest_framework_simplejwt import settings as jwt_settings
+
+
+# ========================================
+# CONFIGURACIÓN Y CLAVES
+# ========================================
+
+def _jwt_settings():
+    # simplejwt reemplaza el objeto cuando cambia SIMPLE_JWT: leerlo siempre
+    return jwt_settings.api_settings
+
+
+def compact_tokens():
+    return getattr(settings, 'JWT_COMPACT_TOKENS', True)
+
+
+def is_asymmetric():
+    return not _jwt_settings().ALGORITHM.startswith('HS')
+
+
+def _public_jwk(public_pem, algorithm):
+    """Clave pública PEM -> JWK (dict) con su 'kid'"""
+    if not algorithms.has_crypto:
+        raise ImproperlyConfigured(f'JWT con {algorithm} requiere el paquete cryptography')
+    algorithm_impl = algorithms.get_default_algorithms()[algorithm]
+    jwk = json.loads(algorithm_impl.to_jwk(algorithm_impl.prepare_key(public_pem)))
+    jwk.update({'kid': key_id(jwk), 'alg': algorithm, 'use': 'sig'})
+    return jwk
+
+
+def key_id(jwk):
+    """Huella RFC 7638 de la clave: SHA-256 de sus campos obligatorios"""
+    required = {'RSA': ('e', 'kty', 'n'), 'EC': ('crv', 'kty', 'x', 'y')}[jwk['kty']]
+    canonical = json.dumps({name: jwk[name] for name in required}, separators=(',', ':'), sort_keys=True)
+    digest = hashlib.sha256(canonical.encode('utf-8')).digest()
+    return base64.urlsafe_b64encode(digest).rstrip(b'=').decode('ascii')
+
+
+@lru_cache(maxsize=4)
+def _jwks(algorithm, public_pems):
+    return {'keys': [_public_jwk(pem, algorithm) for pem in public_pems]}
+
+
+def jwks():
+    """Claves públicas vigentes (la actual primero); vacío con HS256"""
+    if not is_asymmetric():
+        return {'keys': []}
+    public_pems = (_jwt_settings().VERIFYING_KEY, *getattr(settings, 'JWT_PREVIOUS_PUBLIC_KEYS', []))
+    return _jwks(_jwt_settings().ALGORITHM, tuple(public_pems))
+
+
+# ========================================
+# BACKEND Y CLASES DE TOKEN
+# ========================================
+
+class KeyedTokenBackend(TokenBackend):
+    """TokenBackend que pone el 'kid' de la clave en el header del token"""
+    
+    def __init__(self, *args, key_id=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.key_id = key_id
+    
+    def encode(self, payload):
+        if self.key_id is None:
+            return super().encode(payload)
+        
+        jwt_payload = payload.copy()
+        if self.audience is not None:
+            jwt_payload['aud'] = self.audience
+        if self.issuer is not None:
+            jwt_payload['iss'] = self.issuer
+        return jwt.encode(
+            jwt_payload,
+            self.signing_key,
+            algorithm=self.algorithm,
+            headers={'kid': self.key_id},
+            json_encoder=self.json_encoder,
+        )
+
+
+@lru_cache(maxsize=4)
+def _token_backend(algorithm, signing_key, verifying_key):
+    return KeyedTokenBackend(
+        algorithm,
+        signing_key,
+        verifying_key,
+        _jwt_settings().AUDIENCE,
+        _jwt_settings().ISSUER,
+        leeway=_jwt_settings().LEEWAY,
+        json_encoder=_jwt_settings().JSON_ENCODER,
+        key_id=jwks()['keys'][0]['kid'] if is_asymmetric() else None,
+    )
+
+
+class IssuedTokenMixin:
+    """Firma con KeyedTokenBackend y, en modo compacto, omite 'iat' y acorta 'jti'"""
+    
+    jti_bytes = 12
+    
+    def __init__(self, token=None, verify=True):
+        super().__init__(token, verify)
+        if token is None and compact_tokens():
+            self.payload.pop('iat', None)
+    
+    def set_jti(self):
+        if not compact_tokens():
+            return super().set_jti()
+        self.payload[_jwt_settings().JTI_CLAIM] = secrets.token_urlsafe(self.jti_bytes)
+    
+    def get_token_backend(self):
+        return _token_backend(
+            _jwt_settings().ALGORITHM, _jwt_settings().SIGNING_KEY, _jwt_settings().VERIFYING_KEY
+        )
+
+
+class AccessToken(IssuedTokenMixin, tokens.AccessToken):
+    # Un access token nunca se revoca por jti: solo tiene que ser distinto
+    jti_bytes = 6
+
+
+class RefreshToken(IssuedTokenMixin, tokens.RefreshToken):
+    access_token_class = AccessToken
+
+
+# ========================================
+# EMISIÓN
+# ========================================
+
+def issue_tokens(user):
+    """Par de tokens nuevo para el usuario: {'refresh', 'access'}"""
+    refresh = RefreshToken.for_user(user)
+    return {
+        'refresh': str(refresh),
+        'access': str(refresh.access_token),
+    }
+
+
+def refresh_tokens(raw_refresh):
+    """
+    Access token nuevo a partir de un refresh token válido
+    
+    Con ROTATE_REFRESH_TOKENS también se emite un refresh nuevo (mismos
+    claims, nuevo 'jti' y vencimiento). Lanza TokenError si no es válido.
+    """
+    refresh = RefreshToken(raw_refresh)
+    access = str(refresh.access_token)
+    
+    if _jwt_settings().ROTATE_REFRESH_TOKENS:
+        refresh.set_jti()
+        refresh.set_exp()
+        if not compact_tokens():
+            refresh.set_iat()
+    
+    return {
+        'access': access,
+        'refresh': str(refresh),
+    }
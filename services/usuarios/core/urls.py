@@ -11,6 +11,7 @@ from .views import (
     UserDetailView,
     RefreshTokenView,
     LogoutView,
+    JWKSView,
 )
 
 urlpatterns = [
@@ -34,6 +35,10 @@ urlpatterns = [
     # POST /api/auth/logout/
     path('logout/', LogoutView.as_view(), name='logout'),
     
+    # Claves públicas para verificar tokens (firma asimétrica)
+    # GET /api/auth/jwks/
+    path('jwks/', JWKSView.as_view(), name='jwks'),
+    
     # ========================================
     # PERFIL DE USUARIO
     # ========================================
@@ -6,16 +6,20 @@ from rest_framework import viewsets, status, permissions
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.views import APIView
+from rest_framework_simplejwt.exceptions import TokenError
 from rest_framework_simplejwt.tokens import RefreshToken
-from django.shortcuts import get_object_or_404
+from django.http import Http404
 
 from .models import User
+from .profile_cache import get_profile, store_profile
+from .replicas import ReplicaReadMixin
+from .throttles import AuthIPThrottle, AuthAccountThrottle
+from .tokens import issue_tokens, jwks, refresh_tokens
 from .serializers import (
     UserSerializer,
     UserCreateSerializer,
     UserLoginSerializer,
     UserUpdateSerializer,
-    UserDetailSerializer,
 )
 
 
@@ -26,6 +30,7 @@ class RegisterView(APIView):
     """
     
     permission_classes = [permissions.AllowAny]
+    throttle_classes = [AuthIPThrottle, AuthAccountThrottle]  # Hashear contraseñas es costoso
     
     def post(self, request):
         """Registrar nuevo usuario"""
@@ -37,16 +42,11 @@ class RegisterView(APIView):
             # Crear el usuario
             user = serializer.save()
             
-            # Generar tokens JWT
-            refresh = RefreshToken.for_user(user)
-            
+            # Generar tokens JWT (ver core/tokens.py)
             return Response({
                 'message': 'Usuario registrado exitosamente',
                 'user': UserSerializer(user).data,
-                'tokens': {
-                    'refresh': str(refresh),
-                    'access': str(refresh.access_token),
-                }
+                'tokens': issue_tokens(user),
             }, status=status.HTTP_201_CREATED)
         
         return Response(
@@ -62,6 +62,7 @@ class LoginView(APIView):
     """
     
     permission_classes = [permissions.AllowAny]
+    throttle_classes = [AuthIPThrottle, AuthAccountThrottle]  # Hashear contraseñas es costoso
     
     def post(self, request):
         """Hacer login"""
@@ -73,16 +74,11 @@ class LoginView(APIView):
             # Obtener el usuario validado
             user = serializer.validated_data['user']
             
-            # Generar tokens JWT
-            refresh = RefreshToken.for_user(user)
-            
+            # Generar tokens JWT (ver core/tokens.py)
             return Response({
                 'message': 'Sesión iniciada exitosamente',
                 'user': UserSerializer(user).data,
-                'tokens': {
-                    'refresh': str(refresh),
-                    'access': str(refresh.access_token),
-                }
+                'tokens': issue_tokens(user),
             }, status=status.HTTP_200_OK)
         
         return Response(
@@ -97,6 +93,8 @@ class ProfileView(APIView):
     GET /api/users/profile/  - Obtener perfil
     PUT /api/users/profile/  - Actualizar perfil
     PATCH /api/users/profile/ - Actualizar perfil (parcial)
+    
+    El perfil se sirve desde el cache (ver core/profile_cache.py)
     """
     
     permission_classes = [permissions.IsAuthenticated]
@@ -104,10 +102,11 @@ class ProfileView(APIView):
     def get(self, request):
         """Obtener perfil del usuario actual"""
         
-        user = request.user
-        serializer = UserDetailSerializer(user)
+        profile = get_profile(request.user.id)
+        if profile is None:
+            return Response({'error': 'Usuario no encontrado'}, status=status.HTTP_404_NOT_FOUND)
         
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        return Response(profile, status=status.HTTP_200_OK)
     
     def put(self, request):
         """Actualizar perfil completo"""
@@ -119,7 +118,7 @@ class ProfileView(APIView):
             serializer.save()
             return Response({
                 'message': 'Perfil actualizado exitosamente',
-                'user': UserDetailSerializer(user).data,
+                'user': store_profile(user),     # El cache queda con el perfil nuevo
             }, status=status.HTTP_200_OK)
         
         return Response(
@@ -141,7 +140,7 @@ class ProfileView(APIView):
             serializer.save()
             return Response({
                 'message': 'Perfil actualizado exitosamente',
-                'user': UserDetailSerializer(user).data,
+                'user': store_profile(user),     # El cache queda con el perfil nuevo
             }, status=status.HTTP_200_OK)
         
         return Response(
@@ -170,23 +169,27 @@ class UserListView(APIView):
         }, status=status.HTTP_200_OK)
 
 
-class UserDetailView(APIView):
+class UserDetailView(ReplicaReadMixin, APIView):
     """
     Vista para ver detalles de un usuario específico
     GET /api/users/{id}/
+    
+    Se sirve desde el cache del perfil; si no está, se lee de una réplica
+    si hay (ver core/profile_cache.py y core/replicas.py)
     """
     
     permission_classes = [permissions.IsAuthenticated]
+    replica_actions = ('get',)
     
     def get(self, request, user_id):
         """Obtener detalles de un usuario"""
         
-        # Obtener usuario o devolver 404
-        user = get_object_or_404(User, id=user_id)
+        # Obtener perfil o devolver 404
+        profile = get_profile(user_id)
+        if profile is None:
+            raise Http404
         
-        serializer = UserDetailSerializer(user)
-        
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        return Response(profile, status=status.HTTP_200_OK)
 
 
 class RefreshTokenView(APIView):
@@ -209,15 +212,10 @@ class RefreshTokenView(APIView):
                     status=status.HTTP_400_BAD_REQUEST
                 )
             
-            # Crear nuevo token de acceso
-            refresh = RefreshToken(refresh_token)
-            
-            return Response({
-                'access': str(refresh.access_token),
-                'refresh': str(refresh),
-            }, status=status.HTTP_200_OK)
+            # Crear nuevo token de acceso (y refresh nuevo si se rotan)
+            return Response(refresh_tokens(refresh_token), status=status.HTTP_200_OK)
         
-        except Exception as e:
+        except TokenError:
             return Response(
                 {'error': 'Token inválido o expirado'},
                 status=status.HTTP_401_UNAUTHORIZED
@@ -251,4 +249,22 @@ class LogoutView(APIView):
             return Response(
                 {'error': 'Error al cerrar sesión'},
                 status=status.HTTP_400_BAD_REQUEST
-            )
\ No newline at end of file
+            )
+
+
+class JWKSView(APIView):
+    """
+    Claves públicas para verificar los tokens (JWKS)
+    GET /api/auth/jwks/
+    
+    Solo con firma asimétrica (ver core/tokens.py); con HS256 la lista
+    está vacía. Los demás servicios la descargan una vez y la guardan.
+    """
+    
+    permission_classes = [permissions.AllowAny]
+    authentication_classes = []
+    
+    def get(self, request):
+        response = Response(jwks(), status=status.HTTP_200_OK)
+        response['Cache-Control'] = 'public, max-age=300'
+        return response
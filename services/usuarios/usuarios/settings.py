@@ -21,12 +21,8 @@ ALLOWED_HOSTS = config('ALLOWED_HOSTS', default='localhost,127.0.0.1').split(','
 # ========================================
 INSTALLED_APPS = [
     # Django built-in
-    'django.contrib.admin',
     'django.contrib.auth',
     'django.contrib.contenttypes',
-    'django.contrib.sessions',
-    'django.contrib.messages',
-    'django.contrib.staticfiles',
     
     # Third-party
     'rest_framework',                    # Django REST Framework
@@ -37,20 +33,41 @@ INSTALLED_APPS = [
     'core',                              # Nuestra aplicación
 ]
 
+# Panel /admin/ y las apps que solo él necesita. Las réplicas que solo
+# sirven la API pueden arrancar con ENABLE_ADMIN=False: menos imports al
+# iniciar y menos middleware en cada petición.
+ENABLE_ADMIN = config('ENABLE_ADMIN', default=True, cast=bool)
+
+if ENABLE_ADMIN:
+    INSTALLED_APPS = [
+        'django.contrib.admin',
+        'django.contrib.sessions',
+        'django.contrib.messages',
+        'django.contrib.staticfiles',
+    ] + INSTALLED_APPS
+
 # ========================================
 # MIDDLEWARE
 # ========================================
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'core.middleware.LoadSheddingMiddleware',           # Rechazar rápido si hay cola
+    'core.replicas.ReplicaMiddleware',                  # Réplicas: leer lo propio
     'corsheaders.middleware.CorsMiddleware',            # CORS debe estar aquí
     'django.middleware.common.CommonMiddleware',
-    'django.middleware.csrf.CsrfViewMiddleware',
-    'django.contrib.sessions.middleware.SessionMiddleware',
-    'django.contrib.auth.middleware.AuthenticationMiddleware',
-    'django.contrib.messages.middleware.MessageMiddleware',
-    'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
+# Sesiones, CSRF y mensajes solo hacen falta para el admin
+# (la API se autentica con JWT)
+if ENABLE_ADMIN:
+    MIDDLEWARE += [
+        'django.middleware.csrf.CsrfViewMiddleware',
+        'django.contrib.sessions.middleware.SessionMiddleware',
+        'django.contrib.auth.middleware.AuthenticationMiddleware',
+        'django.contrib.messages.middleware.MessageMiddleware',
+        'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    ]
+
 ROOT_URLCONF = 'usuarios.urls'
 
 TEMPLATES = [
@@ -85,6 +102,23 @@ DATABASES = {
     }
 }
 
+# Réplicas de lectura (streaming replication del primario): "host:puerto,..."
+# Ej. en local con una segunda instancia: USUARIOS_DB_REPLICAS=localhost:5433
+# Solo las vistas marcadas leen de ellas (ver core/replicas.py)
+for index, replica in enumerate(filter(None, config('USUARIOS_DB_REPLICAS', default='').split(',')), 1):
+    host, _, port = replica.strip().partition(':')
+    DATABASES[f'replica_{index}'] = {
+        **DATABASES['default'],
+        'HOST': host,
+        'PORT': port or DATABASES['default']['PORT'],
+        'TEST': {'MIRROR': 'default'},
+    }
+
+DATABASE_ROUTERS = ['core.replicas.ReplicaRouter']
+
+# Segundos de retraso tolerados antes de volver a leer del primario
+DATABASE_REPLICA_MAX_LAG = config('DATABASE_REPLICA_MAX_LAG', default=2, cast=float)
+
 # ========================================
 # VALIDACIÓN DE CONTRASEÑAS
 # ========================================
@@ -128,8 +162,7 @@ REST_FRAMEWORK = {
     # Autenticación por defecto
     'DEFAULT_AUTHENTICATION_CLASSES': [
         'rest_framework_simplejwt.authentication.JWTAuthentication',
-        'rest_framework.authentication.SessionAuthentication',
-    ],
+    ] + (['rest_framework.authentication.SessionAuthentication'] if ENABLE_ADMIN else []),
     
     # Permisos por defecto
     'DEFAULT_PERMISSION_CLASSES': [
@@ -146,12 +179,54 @@ REST_FRAMEWORK = {
         'rest_framework.filters.OrderingFilter',
     ],
     
-    # Formato de respuesta
+    # Formato de respuesta (orjson; cae a JSONRenderer si no está instalado)
     'DEFAULT_RENDERER_CLASSES': [
-        'rest_framework.renderers.JSONRenderer',
+        'core.renderers.ORJSONRenderer',
+    ],
+    
+    # Formato de entrada
+    'DEFAULT_PARSER_CLASSES': [
+        'core.renderers.ORJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
     ],
+    
+    # Límites de peticiones (token bucket, ver core/throttles.py)
+    'DEFAULT_THROTTLE_RATES': {
+        'auth_ip': config('THROTTLE_AUTH_IP', default='20/min'),            # Por IP
+        'auth_account': config('THROTTLE_AUTH_ACCOUNT', default='5/min'),   # Por email
+    },
+    'NUM_PROXIES': 1,                    # Detrás del API Gateway (X-Forwarded-For)
 }
 
+# ========================================
+# CACHE - CONTADORES COMPARTIDOS
+# ========================================
+# Con REDIS_URL los contadores de rate limiting se comparten entre workers.
+# Sin él se usa memoria local del proceso.
+REDIS_URL = config('REDIS_URL', default='')
+
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
+# ========================================
+# CONTROL DE ADMISIÓN
+# ========================================
+# Si una petición esperó más que esto en cola (header X-Request-Start del
+# gateway), se responde 503 sin procesarla. 0 = desactivado.
+LOAD_SHED_MAX_QUEUE_MS = config('LOAD_SHED_MAX_QUEUE_MS', default=2000, cast=int)
+
 # ========================================
 # JWT - AUTENTICACIÓN POR TOKENS
 # ========================================
@@ -166,6 +241,28 @@ SIMPLE_JWT = {
     'SIGNING_KEY': SECRET_KEY,
 }
 
+# Tokens compactos: sin 'iat' y con 'jti' corto (ver core/tokens.py)
+JWT_COMPACT_TOKENS = config('JWT_COMPACT_TOKENS', default=True, cast=bool)
+
+# Firma asimétrica (RS256/ES256): usuarios firma con la clave privada y los
+# demás servicios verifican con la pública, que publica /api/auth/jwks/.
+# Sin JWT_PRIVATE_KEY_FILE se sigue firmando con HS256 y SECRET_KEY.
+JWT_PRIVATE_KEY_FILE = config('JWT_PRIVATE_KEY_FILE', default='')
+
+if JWT_PRIVATE_KEY_FILE:
+    SIMPLE_JWT.update({
+        'ALGORITHM': config('JWT_ALGORITHM', default='RS256'),
+        'SIGNING_KEY': Path(JWT_PRIVATE_KEY_FILE).read_text(),
+        'VERIFYING_KEY': Path(config('JWT_PUBLIC_KEY_FILE')).read_text(),
+    })
+
+# Claves públicas anteriores que siguen en el JWKS durante una rotación
+# (archivos PEM separados por coma)
+JWT_PREVIOUS_PUBLIC_KEYS = [
+    Path(path.strip()).read_text()
+    for path in config('JWT_PREVIOUS_PUBLIC_KEY_FILES', default='').split(',') if path.strip()
+]
+
 # ========================================
 # CORS - CROSS-ORIGIN RESOURCE SHARING
 # ========================================
@@ -2,15 +2,23 @@
 # URLs PRINCIPALES - SERVICIO USUARIOS
 # ========================================
 
-from django.contrib import admin
+from django.conf import settings
 from django.urls import path, include
+from core.health import HealthView, ReadinessView
 
 urlpatterns = [
-    # Panel de administración de Django
-    path('admin/', admin.site.urls),
-    
     # Rutas de la aplicación 'core'
     # Prefijo: /api/auth/ y /api/users/
     path('api/auth/', include('core.urls')),
     path('api/users/', include('core.urls')),
-]
\ No newline at end of file
+    
+    # Health checks (gateway y docker-compose)
+    path('healthz', HealthView.as_view(), name='healthz'),
+    path('readyz', ReadinessView.as_view(), name='readyz'),
+]
+
+# Panel de administración de Django (se puede apagar con ENABLE_ADMIN=False)
+if settings.ENABLE_ADMIN:
+    from django.contrib import admin
+    
+    urlpatterns += [path('admin/', admin.site.urls)]
@@ -9,4 +9,9 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'usuarios.settings')
 
 # Obtener la aplicación WSGI
-application = get_wsgi_application()
\ No newline at end of file
+application = get_wsgi_application()
+
+# Calentar el worker antes de recibir tráfico (ver core/health.py)
+from core.health import warmup  # noqa: E402
+
+warmup()